@@ -338,12 +338,12 @@ def loads(s, encoding=None, cls=None, object_hook=None, parse_float=None,
     kwarg; otherwise ``JSONDecoder`` is used.
 
     """
-    if (cls is None and encoding is None and object_hook is None and
-            parse_int is None and parse_float is None and
-            parse_constant is None and object_pairs_hook is None and not kw):
+    if cls is None and encoding is None and parse_constant is None and not kw:
         if _pypyjson and not isinstance(s, unicode):
-            return _pypyjson.loads(s)
-        else:
+            return _pypyjson.loads(s, object_hook, object_pairs_hook,
+                                   parse_float, parse_int)
+        elif (object_hook is None and object_pairs_hook is None and
+                parse_int is None and parse_float is None):
             return _default_decoder.decode(s)
     if cls is None:
         cls = JSONDecoder
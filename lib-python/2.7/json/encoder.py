@@ -206,6 +206,22 @@ class JSONEncoder(object):
         '{"foo": ["bar", "baz"]}'
 
         """
+        if (_pypyjson_dumps is not None and self.ensure_ascii and
+                self.encoding == 'utf-8' and
+                FLOAT_REPR is float.__repr__ and
+                type(self.item_separator) is str and
+                type(self.key_separator) is str and
+                (self.indent is None or type(self.indent) is int)):
+            # encode everything at interp-level, unless 'o' contains
+            # objects that need app-level code, like self.default():
+            # then the result is None, and we start again.  No app-level
+            # code was called so far, so this is not visible.
+            res = _pypyjson_dumps(o, self.sort_keys, self.indent,
+                                  self.item_separator, self.key_separator,
+                                  self.allow_nan, self.skipkeys,
+                                  self.check_circular)
+            if res is not None:
+                return res
         if self.check_circular:
             markers = {}
         else:
@@ -536,3 +552,7 @@ try:
     from _pypyjson import raw_encode_basestring_ascii
 except ImportError:
     pass
+try:
+    from _pypyjson import dumps as _pypyjson_dumps
+except ImportError:
+    _pypyjson_dumps = None
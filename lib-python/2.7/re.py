@@ -193,6 +193,23 @@ def compile(pattern, flags=0):
     "Compile a regular expression pattern, returning a pattern object."
     return _compile(pattern, flags)
 
+try:
+    from _sre import RegexSet as _RegexSet
+except ImportError:
+    pass
+else:
+    # PyPy extension
+    __all__.append("compile_set")
+    def compile_set(patterns, flags=0):
+        """Compile a sequence of patterns into a set.  Its search() and
+        match() methods return the indexes of the patterns that match,
+        scanning the string only once; search_matches() also returns
+        the match objects.  The flags apply to the patterns given as
+        strings."""
+        return _RegexSet([pattern if isinstance(pattern, _pattern_type)
+                          else _compile(pattern, flags)
+                          for pattern in patterns])
+
 def purge():
     "Clear the regular expression cache"
     _cache.clear()
@@ -153,6 +153,16 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
     BoolOption("lonepycfiles", "Import pyc files with no matching py file",
                default=False),
 
+    BoolOption("dircache",
+               "Cache the directory listings used to find modules to import",
+               default=False),
+
+    StrOption("preimportmodules",
+              "Comma-separated list of pure-Python modules of the stdlib "
+              "to import at translation time",
+              cmdline="--preimport",
+              default=""),
+
     StrOption("soabi",
               "Tag to differentiate extension modules built for different Python interpreters",
               cmdline="--soabi",
@@ -199,10 +209,36 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                    "use specialised tuples",
                    default=False),
 
+        BoolOption("withtuplekeys",
+                   "use special dict and set strategies for keys that are "
+                   "tuples of two or three ints or strings",
+                   default=False),
+
+        BoolOption("withrope",
+                   "represent the long strings built by concatenation or "
+                   "slicing as ropes",
+                   default=False),
+
         BoolOption("withliststrategies",
                    "enable optimized ways to store lists of primitives ",
                    default=True),
 
+        BoolOption("withnarrowintlists",
+                   "store the lists of small ints as C chars, shorts or ints",
+                   default=False,
+                   requires=[("objspace.std.withliststrategies", True)]),
+
+        BoolOption("withcopyonwritelists",
+                   "share the items of long lists with their copies and "
+                   "slices until one of them is modified",
+                   default=False,
+                   requires=[("objspace.std.withliststrategies", True)]),
+
+        BoolOption("withunboxedattributes",
+                   "store the instance attributes that only ever contain "
+                   "ints or floats unboxed",
+                   default=False),
+
         BoolOption("withmethodcachecounter",
                    "try to cache methods and provide a counter in __pypy__. "
                    "for testing purposes only.",
@@ -26,6 +26,94 @@ def debug(msg):
     except OSError:
         pass     # bah, no working stderr :-(
 
+# __________  Preimported modules  __________
+
+# stdlib modules that can be imported at translation time.  They were
+# checked not to depend, when imported, on the state of the process
+# (environment, current directory, command-line flags, codec registry,
+# random seeds, threads...), and to import only each other or built-in
+# modules.  Any other module is refused, also when imported indirectly.
+PREIMPORT_SAFE = ['UserDict', '__future__', '_abcoll', '_weakrefset', 'abc',
+                  'bisect', 'collections', 'copy', 'copy_reg', 'dis',
+                  'heapq', 'keyword', 'opcode', 're', 'sre_compile',
+                  'sre_constants', 'sre_parse', 'stat', 'string', 'struct',
+                  'textwrap', 'token', 'types', 'weakref', 'xml', 'xml.dom',
+                  'xml.dom.NodeFilter', 'xml.dom.domreg',
+                  'xml.dom.minicompat']
+
+def preimport_modules(space, names):
+    """Translation-time: import the comma-separated stdlib modules 'names'.
+    Returns a list of (name, w_module, relpath) for all the pure-Python
+    modules that got imported, to be installed at startup by
+    install_preimported_modules().
+    """
+    from pypy.module.sys.initpath import compute_stdlib_path
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    if not names:
+        return []
+    prefix = os.path.dirname(os.path.abspath(pypydir))
+    path = compute_stdlib_path(None, prefix)
+    # only the new pure-Python modules are removed from sys.modules again;
+    # the built-in ones stay there, as if imported normally
+    w_imported = space.appexec(
+        [space.newlist([space.newtext(p) for p in path]),
+         space.newlist([space.newtext(name) for name in names])],
+        """(path, names):
+        import sys
+        saved = sys.path[:], sys.dont_write_bytecode
+        before = set(sys.modules)
+        sys.path[:] = path
+        sys.dont_write_bytecode = True
+        try:
+            for name in names:
+                __import__(name)
+        finally:
+            sys.path[:], sys.dont_write_bytecode = saved
+            imported = []
+            for name in sys.modules.keys():
+                module = sys.modules[name]
+                if name not in before and (module is None or
+                                           hasattr(module, '__file__')):
+                    imported.append((name, sys.modules.pop(name)))
+        return imported
+    """)
+    result = []
+    for w_item in space.listview(w_imported):
+        w_name, w_module = space.fixedview(w_item, 2)
+        name = space.text_w(w_name)
+        if space.is_w(w_module, space.w_None):
+            continue    # marker of a failed relative import
+        filename = os.path.abspath(space.text_w(
+            space.getattr(w_module, space.newtext('__file__'))))
+        if (not filename.startswith(prefix + os.sep) or
+                not filename.endswith(('.py', '.pyc'))):
+            raise Exception("--preimport=%s: the module %r is not a "
+                            "pure-Python module of the stdlib" % (
+                                ', '.join(names), name))
+        if name not in PREIMPORT_SAFE:
+            raise Exception("--preimport=%s: the module %r would be "
+                            "imported, but it is not known to be safe to "
+                            "import at translation time" % (
+                                ', '.join(names), name))
+        relpath = filename[len(prefix) + 1:]
+        result.append((name, w_module, relpath))
+    result.sort()
+    for name in names:
+        if name not in [item[0] for item in result]:
+            raise Exception("--preimport: %r is not a pure-Python module "
+                            "of the stdlib" % (name,))
+    return result
+
+def install_preimported_modules(space):
+    """Startup: put the modules imported at translation time in sys.modules.
+    Their __file__ and __path__ are fixed later by sys.pypy_find_stdlib(),
+    when the stdlib is found.
+    """
+    from pypy.module.sys.state import get as get_state
+    w_modules = space.sys.get('modules')
+    for name, w_module, _ in get_state(space).preimported:
+        space.setitem(w_modules, space.newtext(name), w_module)
+
 # __________  Entry point  __________
 
 
@@ -65,6 +153,7 @@ def create_entry_point(space, w_dict):
         try:
             try:
                 space.startup()
+                install_preimported_modules(space)
                 w_executable = space.newtext(argv[0])
                 w_argv = space.newlist([space.newtext(s) for s in argv[1:]])
                 w_exitcode = space.call_function(w_entry_point, w_executable, w_argv)
@@ -119,6 +208,7 @@ def get_additional_entrypoints(space, w_initstdio):
                       " not found in %s or in any parent directory" % home1)
             return rffi.cast(rffi.INT, 1)
         space.startup()
+        install_preimported_modules(space)
         must_leave = space.threadlocals.try_enter_thread(space)
         try:
             # initialize sys.{path,executable,stdin,stdout,stderr}
@@ -378,6 +468,7 @@ class PyPyTarget(object):
         return self.space.fromcache(LowLevelGcHooks)
 
     def get_entry_point(self, config):
+        from pypy.module.sys.state import get as get_state
         self.space = make_objspace(config)
 
         # manually imports app_main.py
@@ -385,6 +476,8 @@ class PyPyTarget(object):
         app = gateway.applevel(open(filename).read(), 'app_main.py', 'app_main')
         app.hidden_applevel = False
         w_dict = app.getwdict(self.space)
+        get_state(self.space).preimported = preimport_modules(
+            self.space, config.objspace.preimportmodules)
         entry_point, _ = create_entry_point(self.space, w_dict)
 
         return entry_point, None, PyPyAnnotatorPolicy()
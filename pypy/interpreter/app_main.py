@@ -45,6 +45,8 @@ PYTHONIOENCODING: Encoding[:errors] used for stdin/stdout/stderr.
 PYPY_IRC_TOPIC: if set to a non-empty value, print a random #pypy IRC
                topic at startup of interactive mode.
 PYPYLOG: If set to a non-empty value, enable logging.
+PYPY_JIT_CACHE: file in which the JIT records the loops it compiled, to
+               compile them again early in the next runs.
 """
 
 try:
@@ -265,6 +267,11 @@ def set_jit_option(options, jitparam, *args):
         import pypyjit
         pypyjit.set_param(jitparam)
 
+def set_jit_cache(filename):
+    if 'pypyjit' in sys.builtin_module_names:
+        import pypyjit
+        pypyjit.enable_warmup_cache(filename)
+
 def run_faulthandler():
     if 'faulthandler' in sys.builtin_module_names:
         import faulthandler
@@ -615,6 +622,11 @@ def run_command_line(interactive,
     mainmodule = type(sys)('__main__')
     sys.modules['__main__'] = mainmodule
 
+    # enable the JIT warm-up cache before 'site' starts creating code objects
+    jit_cache = not ignore_environment and getenv('PYPY_JIT_CACHE')
+    if jit_cache:
+        set_jit_cache(jit_cache)
+
     if not no_site:
         try:
             import site
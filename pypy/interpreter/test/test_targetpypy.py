@@ -1,5 +1,8 @@
+import py
 from pypy.goal.targetpypystandalone import get_entry_point, create_entry_point
+from pypy.goal.targetpypystandalone import PyPyTarget, preimport_modules
 from pypy.config.pypyoption import get_pypy_config
+from pypy.module.sys.state import get as get_state
 from rpython.rtyper.lltypesystem import rffi, lltype
 
 class TestTargetPyPy(object):
@@ -8,6 +11,62 @@ class TestTargetPyPy(object):
         entry_point = get_entry_point(config)[0]
         entry_point(['pypy-c' , '-S', '-c', 'print 3'])
 
+    def test_preimport(self):
+        config = get_pypy_config(translating=False)
+        config.objspace.preimportmodules = 'keyword, xml.dom'
+        target = PyPyTarget()
+        entry_point = target.get_entry_point(config)[0]
+        space = target.space
+        preimported = get_state(space).preimported
+        names = [name for name, _, _ in preimported]
+        assert names == ['keyword', 'xml', 'xml.dom', 'xml.dom.domreg',
+                         'xml.dom.minicompat']
+        w_modules = space.sys.get('modules')
+        assert space.finditem_str(w_modules, 'xml.dom') is None
+        res = entry_point(['pypy-c', '-S', '-c', """if 1:
+            import sys, os
+            import keyword, xml.dom
+            assert xml.dom.__file__.startswith(sys.prefix + os.sep)
+            assert xml.dom.__path__ == [os.path.dirname(xml.dom.__file__)]
+            assert keyword.iskeyword('def')
+            import xml.dom.NodeFilter
+        """])
+        assert res == 0
+        for name, w_module, _ in preimported:
+            assert space.finditem_str(w_modules, name) is w_module
+
+    def test_preimport_unsafe(self):
+        config = get_pypy_config(translating=False)
+        target = PyPyTarget()
+        target.get_entry_point(config)
+        space = target.space
+        assert get_state(space).preimported == []
+        py.test.raises(Exception, preimport_modules, space, 'shutil')
+        py.test.raises(Exception, preimport_modules, space, 'math')
+        py.test.raises(Exception, preimport_modules, space, 'fnmatch')
+        w_modules = space.sys.get('modules')
+        assert space.finditem_str(w_modules, 'shutil') is None
+        assert space.finditem_str(w_modules, 'fnmatch') is None
+        #
+        for i in range(2):
+            names = [name for name, _, _ in preimport_modules(space, 're')]
+            assert names == ['copy_reg', 're', 'sre_compile',
+                             'sre_constants', 'sre_parse', 'types']
+            assert space.finditem_str(w_modules, 're') is None
+            assert space.finditem_str(w_modules, '_sre') is not None
+
+    def test_preimport_safe_modules(self):
+        from pypy.goal.targetpypystandalone import PREIMPORT_SAFE
+        config = get_pypy_config(translating=False)
+        # the built-in modules that a translated pypy has
+        for name in ['_collections', 'struct', 'itertools', 'thread']:
+            setattr(config.objspace.usemodules, name, True)
+        target = PyPyTarget()
+        target.get_entry_point(config)
+        for name in PREIMPORT_SAFE:
+            # only imports modules of PREIMPORT_SAFE or built-in ones
+            preimport_modules(target.space, name)
+
 def test_execute_source(space):
     _, d = create_entry_point(space, None)
     execute_source = d['pypy_execute_source']
@@ -0,0 +1,28 @@
+# NOT_RPYTHON
+
+def iterdecode(source, array=False, chunk_size=65536, object_hook=None,
+               object_pairs_hook=None, parse_float=None, parse_int=None):
+    """Yield the JSON values read from 'source', which is either a file-like
+    object with a read() method or an object with the buffer interface,
+    like an mmap.  The values are separated by whitespace, e.g. one per
+    line; with array=True, 'source' contains a single array and its items
+    are yielded instead.  Only 'chunk_size' bytes of the source and the
+    value being decoded are kept in memory."""
+    from _pypyjson import IncrementalDecoder
+    decoder = IncrementalDecoder(array, object_hook, object_pairs_hook,
+                                 parse_float, parse_int)
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            for value in decoder.feed(chunk):
+                yield value
+    else:
+        length = len(source)
+        for start in range(0, length, chunk_size):
+            chunk = buffer(source, start, chunk_size)
+            for value in decoder.feed(chunk):
+                yield value
+    for value in decoder.close():
+        yield value
@@ -77,15 +77,12 @@ class JSONDecoder(W_Root):
         self.space = space
         self.w_empty_string = space.newutf8("", 0)
 
-        self.s = s
-
-        # we put our string in a raw buffer so:
-        # 1) we automatically get the '\0' sentinel at the end of the string,
-        #    which means that we never have to check for the "end of string"
-        # 2) we can pass the buffer directly to strtod
-        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
-        self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
-        self.pos = 0
+        # total size of the input decoded so far, see decode_string()
+        self.total_size = 0
+        # added to the positions in the error messages: the incremental
+        # decoder sets it to the position of the text in the whole stream
+        self.pos_offset = 0
+        self.init_buffer(s)
         self.intcache = space.fromcache(IntCache)
 
         # two caches, one for keys, one for general strings. they both have the
@@ -112,15 +109,45 @@ class JSONDecoder(W_Root):
         # object, before they get copied into the eventual dict
         self.scratch = [[None] * self.DEFAULT_SIZE_SCRATCH]
 
+        # the callables given to json.loads(), or None
+        self.w_object_hook = None
+        self.w_object_pairs_hook = None
+        self.w_parse_float = None
+        self.w_parse_int = None
+
+
+    def init_buffer(self, s):
+        """ Start decoding the string s. The caches are kept, so that the
+        incremental decoder can decode many strings with the same decoder.
+        """
+        self.s = s
+        self.total_size += len(s)
+
+        # we put our string in a raw buffer so:
+        # 1) we automatically get the '\0' sentinel at the end of the string,
+        #    which means that we never have to check for the "end of string"
+        # 2) we can pass the buffer directly to strtod
+        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
+        self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
+        self.pos = 0
+
+    def free_buffer(self):
+        if self.end_ptr:
+            rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
+            lltype.free(self.end_ptr, flavor='raw')
+            self.end_ptr = lltype.nullptr(rffi.CCHARPP.TO)
 
     def close(self):
-        rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
-        lltype.free(self.end_ptr, flavor='raw')
+        self.free_buffer()
+        self.cleanup_unclear_objects()
+
+    def cleanup_unclear_objects(self):
         # clean up objects that are instances of now blocked maps
         for w_obj in self.unclear_objects:
             jsonmap = self._get_jsonmap_from_dict(w_obj)
             if jsonmap.is_state_blocked():
                 self._devolve_jsonmap_dict(w_obj)
+        self.unclear_objects = []
 
     def getslice(self, start, end):
         assert start >= 0
@@ -147,7 +174,12 @@ class JSONDecoder(W_Root):
         elif ch == '[':
             return self.decode_array(i+1)
         elif ch == '{':
-            return self.decode_object(i+1)
+            if self.w_object_pairs_hook is not None:
+                return self.decode_object_pairs(i+1)
+            w_res = self.decode_object(i+1)
+            if self.w_object_hook is not None:
+                w_res = self.space.call_function(self.w_object_hook, w_res)
+            return w_res
         elif ch == 'n':
             return self.decode_null(i+1)
         elif ch == 't':
@@ -171,7 +203,20 @@ class JSONDecoder(W_Root):
 
     @specialize.arg(1)
     def _raise(self, msg, *args):
-        raise oefmt(self.space.w_ValueError, msg, *args)
+        # all the integer arguments are positions in the input
+        if len(args) == 1:
+            raise oefmt(self.space.w_ValueError, msg,
+                        self._errorpos(args[0]))
+        else:
+            assert len(args) == 2
+            raise oefmt(self.space.w_ValueError, msg,
+                        self._errorpos(args[0]), self._errorpos(args[1]))
+
+    @specialize.argtype(1)
+    def _errorpos(self, arg):
+        if isinstance(arg, int):
+            return arg + self.pos_offset
+        return arg
 
     def decode_null(self, i):
         if (self.ll_chars[i]   == 'u' and
@@ -229,6 +274,10 @@ class JSONDecoder(W_Root):
             return self.decode_float(start)
         elif ch == 'e' or ch == 'E':
             return self.decode_float(start)
+        elif self.w_parse_int is not None:
+            self.pos = i
+            return self.space.call_function(self.w_parse_int,
+                    self.space.newtext(self.getslice(start, i)))
         elif ovf_maybe:
             return self.decode_int_slow(start)
 
@@ -241,6 +290,9 @@ class JSONDecoder(W_Root):
         floatval = rdtoa.dg_strtod(start, self.end_ptr)
         diff = rffi.cast(rffi.SIGNED, self.end_ptr[0]) - rffi.cast(rffi.SIGNED, start)
         self.pos = i + diff
+        if self.w_parse_float is not None:
+            return self.space.call_function(self.w_parse_float,
+                    self.space.newtext(self.getslice(i, self.pos)))
         return self.space.newfloat(floatval)
 
     def decode_int_slow(self, i):
@@ -385,6 +437,59 @@ class JSONDecoder(W_Root):
             else:
                 self._raise_object_error(ch, start, i - 1)
 
+    def decode_object_pairs(self, i):
+        """ Decode an object for object_pairs_hook, i.e. as a list of
+        (key, value) tuples that keeps repeated keys. i must be after the
+        opening '{'. The keys are still parsed with the maps, until the
+        object stops following them. """
+        space = self.space
+        start = i
+        pairs_w = []
+        i = self.skip_whitespace(i)
+        if self.ll_chars[i] == '}':
+            self.pos = i+1
+            return space.call_function(self.w_object_pairs_hook,
+                                       space.newlist(pairs_w))
+        currmap = self.startmap
+        contextmap = None
+        while True:
+            # parse a key: value
+            w_key = None
+            if currmap is not None:
+                newmap = self.decode_key_map(i, currmap)
+                if newmap is None:
+                    # repeated key, re-parse it without the maps
+                    currmap = None
+                else:
+                    assert isinstance(newmap, JSONMap)
+                    currmap = contextmap = newmap
+                    w_key = newmap.w_key
+            if w_key is None:
+                contextmap = None
+                w_key = self.decode_key_string(i)
+            i = self.skip_whitespace(self.pos)
+            ch = self.ll_chars[i]
+            if ch != ':':
+                self._raise("No ':' found at char %d", i)
+            i += 1
+
+            w_value = self.decode_any(i, contextmap)
+            pairs_w.append(space.newtuple([w_key, w_value]))
+            i = self.skip_whitespace(self.pos)
+            ch = self.ll_chars[i]
+            i += 1
+            if ch == '}':
+                self.pos = i
+                return space.call_function(self.w_object_pairs_hook,
+                                           space.newlist(pairs_w))
+            elif ch == ',':
+                i = self.skip_whitespace(i)
+                if currmap is not None and (currmap.is_state_blocked() or
+                        len(pairs_w) > self.MAX_MAP_SIZE):
+                    currmap = None
+            else:
+                self._raise_object_error(ch, start, i - 1)
+
     def _create_dict_map(self, values_w, jsonmap):
         from pypy.objspace.std.jsondict import from_values_and_jsonmap
         return from_values_and_jsonmap(self.space, values_w, jsonmap)
@@ -566,7 +671,7 @@ class JSONDecoder(W_Root):
             contextmap.decoded_strings += 1
             if not contextmap.should_cache_strings():
                 cache = False
-        if len(self.s) < self.MIN_SIZE_FOR_STRING_CACHE:
+        if self.total_size < self.MIN_SIZE_FOR_STRING_CACHE:
             cache = False
 
         if not cache:
@@ -1174,12 +1279,21 @@ class JSONMap(MapBase):
         return res
 
 @jit.dont_look_inside
-def loads(space, w_s):
+def loads(space, w_s, w_object_hook=None, w_object_pairs_hook=None,
+          w_parse_float=None, w_parse_int=None):
     if space.isinstance_w(w_s, space.w_unicode):
         raise oefmt(space.w_TypeError,
                     "Expected utf8-encoded str, got unicode")
     s = space.bytes_w(w_s)
     decoder = JSONDecoder(space, s)
+    if not space.is_none(w_object_hook):
+        decoder.w_object_hook = w_object_hook
+    if not space.is_none(w_object_pairs_hook):
+        decoder.w_object_pairs_hook = w_object_pairs_hook
+    if not space.is_none(w_parse_float):
+        decoder.w_parse_float = w_parse_float
+    if not space.is_none(w_parse_int):
+        decoder.w_parse_int = w_parse_int
     try:
         w_res = decoder.decode_any(0)
         i = decoder.skip_whitespace(decoder.pos)
@@ -1,6 +1,12 @@
+import math
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib import rutf8
 from pypy.interpreter import unicodehelper
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+from pypy.objspace.std.floatobject import float2string
+from pypy.objspace.std.listobject import W_ListObject
 
 
 HEX = '0123456789abcdef'
@@ -16,17 +22,20 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
                        for _i in range(32)]
 
 
+def _first_special_char(s):
+    for i in range(len(s)):
+        c = s[i]
+        if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+            pass
+        else:
+            return i
+    return len(s)
+
 def raw_encode_basestring_ascii(space, w_string):
     if space.isinstance_w(w_string, space.w_bytes):
         s = space.bytes_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
-        else:
+        first = _first_special_char(s)
+        if first == len(s):
             # the input is a string with only non-special ascii chars
             return w_string
 
@@ -44,7 +53,25 @@ def raw_encode_basestring_ascii(space, w_string):
         s = space.utf8_w(w_string)
         sb = StringBuilder(len(s))
         first = 0
+    _escape_utf8(sb, s, first)
+    res = sb.build()
+    return space.newtext(res)
+
+def _write_basestring_ascii(space, sb, w_string):
+    # like raw_encode_basestring_ascii, but appends to 'sb'
+    if space.isinstance_w(w_string, space.w_bytes):
+        s = space.bytes_w(w_string)
+        first = _first_special_char(s)
+        sb.append_slice(s, 0, first)
+        if first == len(s):
+            return
+        unicodehelper.check_utf8_or_raise(space, s)
+    else:
+        s = space.utf8_w(w_string)
+        first = 0
+    _escape_utf8(sb, s, first)
 
+def _escape_utf8(sb, s, first):
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +104,249 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
-    res = sb.build()
+
+class Unsupported(Exception):
+    """ Raised when the encoder meets an object that only the app-level
+    json.encoder knows how to handle: instances of other types, which go
+    through JSONEncoder.default(), subclasses of list, tuple and dict,
+    which may override iteration, and subclasses of int and long, which
+    may override __str__().  It is raised before any app-level code is
+    called, so that the app-level encoder can start again from scratch. """
+
+
+def _is_builtin_key(space, w_key):
+    # the keys that can be sorted without calling app-level code
+    w_type = space.type(w_key)
+    return (space.is_w(w_type, space.w_bytes) or
+            space.is_w(w_type, space.w_unicode) or
+            space.is_w(w_type, space.w_int) or
+            space.is_w(w_type, space.w_long) or
+            space.is_w(w_type, space.w_float) or
+            space.is_w(w_type, space.w_bool) or
+            space.is_w(w_type, space.w_NoneType))
+
+
+class JSONEncoder(object):
+    def __init__(self, space, sort_keys, indent, item_separator,
+                 key_separator, allow_nan, skipkeys, check_circular):
+        self.space = space
+        self.sort_keys = sort_keys
+        self.indent = indent   # -1 for no indentation
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.allow_nan = allow_nan
+        self.skipkeys = skipkeys
+        self.check_circular = check_circular
+        self.markers = []
+        self.builder = StringBuilder()
+
+    def encode(self, w_obj):
+        self.encode_any(w_obj, 0)
+        return self.builder.build()
+
+    def mark(self, w_obj):
+        if self.check_circular:
+            for w_marker in self.markers:
+                if w_marker is w_obj:
+                    raise oefmt(self.space.w_ValueError,
+                                "Circular reference detected")
+            self.markers.append(w_obj)
+
+    def unmark(self):
+        if self.check_circular:
+            self.markers.pop()
+
+    def emit_indent(self, level):
+        # returns the separator to use between the items
+        if self.indent < 0:
+            return self.item_separator
+        newline_indent = '\n' + ' ' * (self.indent * (level + 1))
+        self.builder.append(newline_indent)
+        return self.item_separator + newline_indent
+
+    def emit_unindent(self, level):
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append_multiple_char(' ', self.indent * level)
+
+    def floatstr(self, value):
+        if math.isnan(value):
+            text = 'NaN'
+        elif math.isinf(value):
+            text = 'Infinity' if value > 0.0 else '-Infinity'
+        else:
+            return float2string(value, 'r', 0)
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                "Out of range float values are not JSON compliant: %s",
+                float2string(value, 'r', 0))
+        return text
+
+    def encode_any(self, w_obj, level):
+        space = self.space
+        sb = self.builder
+        if (space.isinstance_w(w_obj, space.w_bytes) or
+                space.isinstance_w(w_obj, space.w_unicode)):
+            sb.append('"')
+            _write_basestring_ascii(space, sb, w_obj)
+            sb.append('"')
+        elif space.is_w(w_obj, space.w_None):
+            sb.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            sb.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            sb.append('false')
+        elif space.is_w(space.type(w_obj), space.w_int):
+            sb.append(str(space.int_w(w_obj)))
+        elif space.is_w(space.type(w_obj), space.w_long):
+            sb.append(space.text_w(space.str(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_int) or
+                space.isinstance_w(w_obj, space.w_long)):
+            raise Unsupported
+        elif space.isinstance_w(w_obj, space.w_float):
+            sb.append(self.floatstr(space.float_w(w_obj)))
+        elif space.is_w(space.type(w_obj), space.w_list):
+            assert isinstance(w_obj, W_ListObject)
+            self.encode_list(w_obj, level)
+        elif space.is_w(space.type(w_obj), space.w_tuple):
+            self.encode_items(w_obj, space.fixedview(w_obj), level)
+        elif space.is_w(space.type(w_obj), space.w_dict):
+            assert isinstance(w_obj, W_DictMultiObject)
+            self.encode_dict(w_obj, level)
+        else:
+            raise Unsupported
+
+    def encode_list(self, w_list, level):
+        intlist = self.space.listview_int(w_list)
+        if intlist is None:
+            self.encode_items(w_list, w_list.getitems(), level)
+            return
+        # fast path for lists using the integer strategy
+        sb = self.builder
+        if not intlist:
+            sb.append('[]')
+            return
+        self.mark(w_list)
+        sb.append('[')
+        separator = self.emit_indent(level)
+        for i in range(len(intlist)):
+            if i > 0:
+                sb.append(separator)
+            sb.append(str(intlist[i]))
+        self.emit_unindent(level)
+        sb.append(']')
+        self.unmark()
+
+    def encode_items(self, w_obj, items_w, level):
+        sb = self.builder
+        if not items_w:
+            sb.append('[]')
+            return
+        self.mark(w_obj)
+        sb.append('[')
+        separator = self.emit_indent(level)
+        for i in range(len(items_w)):
+            if i > 0:
+                sb.append(separator)
+            self.encode_any(items_w[i], level + 1)
+        self.emit_unindent(level)
+        sb.append(']')
+        self.unmark()
+
+    def encode_dict(self, w_dict, level):
+        space = self.space
+        sb = self.builder
+        if w_dict.length() == 0:
+            sb.append('{}')
+            return
+        self.mark(w_dict)
+        sb.append('{')
+        separator = self.emit_indent(level)
+        first = True
+        if self.sort_keys:
+            w_keys = space.call_method(w_dict, 'keys')
+            for w_key in space.listview(w_keys):
+                if not _is_builtin_key(space, w_key):
+                    raise Unsupported
+            space.call_method(w_keys, 'sort')
+            for w_key in space.listview(w_keys):
+                w_value = space.getitem(w_dict, w_key)
+                if self.encode_item(w_key, w_value, separator, first, level):
+                    first = False
+        else:
+            iteritems = w_dict.iteritems()
+            while True:
+                w_key, w_value = iteritems.next_item()
+                if w_key is None:
+                    break
+                if self.encode_item(w_key, w_value, separator, first, level):
+                    first = False
+        self.emit_unindent(level)
+        sb.append('}')
+        self.unmark()
+
+    def encode_item(self, w_key, w_value, separator, first, level):
+        # returns False if the key was skipped
+        space = self.space
+        sb = self.builder
+        key = None
+        if (space.isinstance_w(w_key, space.w_bytes) or
+                space.isinstance_w(w_key, space.w_unicode)):
+            pass
+        # JavaScript is weakly typed for these, so it makes sense to
+        # also allow them.  Many encoders seem to do something like this.
+        elif space.isinstance_w(w_key, space.w_float):
+            key = self.floatstr(space.float_w(w_key))
+        elif space.is_w(w_key, space.w_True):
+            key = 'true'
+        elif space.is_w(w_key, space.w_False):
+            key = 'false'
+        elif space.is_w(w_key, space.w_None):
+            key = 'null'
+        elif (space.is_w(space.type(w_key), space.w_int) or
+                space.is_w(space.type(w_key), space.w_long)):
+            key = space.text_w(space.str(w_key))
+        elif (space.isinstance_w(w_key, space.w_int) or
+                space.isinstance_w(w_key, space.w_long)):
+            raise Unsupported
+        elif self.skipkeys:
+            return False
+        else:
+            raise oefmt(space.w_TypeError, "key %R is not a string", w_key)
+        if not first:
+            sb.append(separator)
+        sb.append('"')
+        if key is None:
+            _write_basestring_ascii(space, sb, w_key)
+        else:
+            sb.append(key)
+        sb.append('"')
+        sb.append(self.key_separator)
+        self.encode_any(w_value, level + 1)
+        return True
+
+
+@unwrap_spec(sort_keys=bool, item_separator='text', key_separator='text',
+             allow_nan=bool, skipkeys=bool, check_circular=bool)
+def dumps(space, w_obj, sort_keys=False, w_indent=None, item_separator=', ',
+          key_separator=': ', allow_nan=True, skipkeys=False,
+          check_circular=True):
+    """Encode 'w_obj' as ascii JSON in a single pass, with the same
+    output as json.JSONEncoder(ensure_ascii=True).encode().  Returns None
+    if the object contains something that needs the app-level encoder:
+    instances of other types, for which JSONEncoder.default() must be
+    called, subclasses of list, tuple, dict, int and long, or, with
+    sort_keys, keys of other types.  No app-level code was called then,
+    and the caller must encode the whole object again with the app-level
+    code."""
+    if space.is_none(w_indent):
+        indent = -1
+    else:
+        indent = max(space.int_w(w_indent), 0)
+    encoder = JSONEncoder(space, sort_keys, indent, item_separator,
+                          key_separator, allow_nan, skipkeys, check_circular)
+    try:
+        res = encoder.encode(w_obj)
+    except Unsupported:
+        return space.w_None
     return space.newtext(res)
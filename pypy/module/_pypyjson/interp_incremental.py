@@ -0,0 +1,244 @@
+from rpython.rlib.rstring import StringBuilder
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.module._pypyjson.interp_decoder import JSONDecoder, is_whitespace
+
+# buffers that are not strings are fed to the scanner in slices of this size
+CHUNK_SIZE = 64 * 1024
+
+# the string caches of the decoder are cleared before a value when they have
+# more entries than this, so that they don't grow with the whole stream
+MAX_CACHED_STRINGS = 10000
+
+# the states of the scanner between two values
+BEFORE_ARRAY = 0   # array mode: waiting for the '['
+BEFORE_ITEM = 1    # waiting for the next value
+AFTER_ITEM = 2     # array mode: waiting for ',' or ']'
+AFTER_ARRAY = 3    # array mode: only whitespace may follow
+
+
+class W_IncrementalDecoder(W_Root):
+    """ Decode a stream of JSON text given in chunks of any size. The stream
+    is either a sequence of values separated by whitespace (e.g. one per
+    line), or, in array mode, a single array whose items are returned one by
+    one.
+
+    The chunks are only scanned to find where each value ends; the text of a
+    complete value is then decoded by one JSONDecoder, which keeps its string
+    caches from one value to the next (the maps are global anyway), up to
+    MAX_CACHED_STRINGS entries. Each value is otherwise decoded as if it was
+    given to loads() alone, so at most one value is kept in memory, together
+    with the current chunk. """
+
+    def __init__(self, space, array, w_object_hook, w_object_pairs_hook,
+                 w_parse_float, w_parse_int):
+        self.space = space
+        self.array = array
+        self.reset()
+        # the decoder only holds its raw buffer while it decodes a value
+        self.decoder = JSONDecoder(space, "")
+        self.decoder.free_buffer()
+        if not space.is_none(w_object_hook):
+            self.decoder.w_object_hook = w_object_hook
+        if not space.is_none(w_object_pairs_hook):
+            self.decoder.w_object_pairs_hook = w_object_pairs_hook
+        if not space.is_none(w_parse_float):
+            self.decoder.w_parse_float = w_parse_float
+        if not space.is_none(w_parse_int):
+            self.decoder.w_parse_int = w_parse_int
+
+    def reset(self):
+        """ Forget the text seen so far: the next chunk starts a new stream.
+        """
+        self.state = BEFORE_ARRAY if self.array else BEFORE_ITEM
+        self.after_comma = False
+        # the scanner state inside a value
+        self.in_value = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        # the beginning of the current value, from the previous chunks
+        self.pending = StringBuilder()
+        # the position in the stream of the current chunk and value, for
+        # the error messages
+        self.stream_pos = 0
+        self.value_pos = 0
+
+    def feed_w(self, space, w_data):
+        """ Feed a chunk of utf8-encoded text, as a string or any object
+        with the buffer interface (e.g. an mmap). Returns the list of the
+        values that are complete. After an error, the decoder starts again
+        with a new stream. """
+        if space.isinstance_w(w_data, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        values_w = []
+        try:
+            if space.isinstance_w(w_data, space.w_bytes):
+                self.feed(space.bytes_w(w_data), values_w)
+            else:
+                buf = space.readbuf_w(w_data)
+                length = buf.getlength()
+                pos = 0
+                while pos < length:
+                    size = min(CHUNK_SIZE, length - pos)
+                    self.feed(buf.getslice(pos, 1, size), values_w)
+                    pos += size
+        except OperationError:
+            self.reset()
+            raise
+        finally:
+            self.decoder.cleanup_unclear_objects()
+        return space.newlist(values_w)
+
+    def close_w(self, space):
+        """ Signal the end of the input. Returns the list of the values that
+        were still pending, i.e. a number at the very end of the text. The
+        decoder can then be fed a new stream. """
+        values_w = []
+        try:
+            if self.in_value:
+                # decoding the incomplete text gives the right error message
+                self.value_done("", 0, 0, values_w)
+            if self.array and self.state != AFTER_ARRAY:
+                raise oefmt(space.w_ValueError,
+                            "Unterminated array at end of input (char %d)",
+                            self.stream_pos)
+        finally:
+            self.reset()
+            self.decoder.cleanup_unclear_objects()
+        return space.newlist(values_w)
+
+    def feed(self, s, values_w):
+        i = 0
+        start = 0
+        length = len(s)
+        while i < length:
+            ch = s[i]
+            if not self.in_value:
+                if is_whitespace(ch):
+                    i += 1
+                    continue
+                if self.array:
+                    if self.state == BEFORE_ARRAY:
+                        if ch != '[':
+                            self._raise_unexpected(ch, i)
+                        self.state = BEFORE_ITEM
+                        i += 1
+                        continue
+                    elif self.state == AFTER_ITEM:
+                        if ch == ',':
+                            self.state = BEFORE_ITEM
+                            self.after_comma = True
+                        elif ch == ']':
+                            self.state = AFTER_ARRAY
+                        else:
+                            self._raise_unexpected(ch, i)
+                        i += 1
+                        continue
+                    elif self.state == AFTER_ARRAY:
+                        self._raise_unexpected(ch, i)
+                    elif ch == ']' and not self.after_comma:
+                        # empty array
+                        self.state = AFTER_ARRAY
+                        i += 1
+                        continue
+                # a value starts here
+                self.in_value = True
+                start = i
+                self.value_pos = self.stream_pos + i
+                self.depth = 0
+                if ch == '[' or ch == '{':
+                    self.depth = 1
+                elif ch == '"':
+                    self.in_string = True
+                i += 1
+            elif self.in_string:
+                i += 1
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self.value_done(s, start, i, values_w)
+            elif self.depth == 0:
+                # a number, or true, false, null, NaN, Infinity: it ends
+                # with the first character that cannot be part of it
+                if (is_whitespace(ch) or ch == ',' or ch == ']' or
+                        ch == '}' or ch == '[' or ch == '{' or ch == '"' or
+                        ch == ':'):
+                    self.value_done(s, start, i, values_w)
+                else:
+                    i += 1
+            else:
+                i += 1
+                if ch == '"':
+                    self.in_string = True
+                elif ch == '[' or ch == '{':
+                    self.depth += 1
+                elif ch == ']' or ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self.value_done(s, start, i, values_w)
+        if self.in_value:
+            self.pending.append_slice(s, start, length)
+        self.stream_pos += length
+
+    def value_done(self, s, start, end, values_w):
+        self.pending.append_slice(s, start, end)
+        data = self.pending.build()
+        self.pending = StringBuilder()
+        self.in_value = False
+        self.in_string = False
+        self.escape = False
+        if self.array:
+            self.state = AFTER_ITEM
+            self.after_comma = False
+        values_w.append(self.decode(data))
+
+    def decode(self, data):
+        decoder = self.decoder
+        # the size of the input counts per value, to decide whether to use
+        # the string cache for the values (see decode_string())
+        decoder.total_size = 0
+        if (len(decoder.cache_keys) + len(decoder.cache_values) >
+                MAX_CACHED_STRINGS):
+            decoder.cache_keys = {}
+            decoder.cache_values = {}
+        decoder.init_buffer(data)
+        decoder.pos_offset = self.value_pos
+        try:
+            w_res = decoder.decode_any(0)
+            i = decoder.skip_whitespace(decoder.pos)
+            if i < len(data):
+                raise oefmt(self.space.w_ValueError,
+                            "Extra data: char %d - %d", self.value_pos + i,
+                            self.value_pos + len(data) - 1)
+            return w_res
+        finally:
+            decoder.free_buffer()
+
+    def _raise_unexpected(self, ch, i):
+        raise oefmt(self.space.w_ValueError,
+                    "Unexpected '%s' when decoding a stream of array items "
+                    "(char %d)", ch, self.stream_pos + i)
+
+
+@unwrap_spec(array=bool)
+def descr_new_incremental_decoder(space, w_subtype, array=False,
+                                  w_object_hook=None, w_object_pairs_hook=None,
+                                  w_parse_float=None, w_parse_int=None):
+    return W_IncrementalDecoder(space, array, w_object_hook,
+                                w_object_pairs_hook, w_parse_float, w_parse_int)
+
+W_IncrementalDecoder.typedef = TypeDef(
+    'IncrementalDecoder',
+    __new__ = interp2app(descr_new_incremental_decoder),
+    feed = interp2app(W_IncrementalDecoder.feed_w),
+    close = interp2app(W_IncrementalDecoder.close_w),
+)
+W_IncrementalDecoder.typedef.acceptable_as_base_class = False
@@ -272,9 +272,20 @@ class TestJson(object):
         assert m2.instantiation_count == 2
         dec.close()
 
+    def test_incremental_caches_bounded(self):
+        from pypy.module._pypyjson import interp_incremental
+        space = self.space
+        dec = interp_incremental.W_IncrementalDecoder(
+            space, False, None, None, None, None)
+        limit = interp_incremental.MAX_CACHED_STRINGS
+        for i in range(limit + 100):
+            dec.feed_w(space, space.newbytes('{"key%d": 1}\n' % i))
+            assert dec.decoder.total_size < 20
+        assert len(dec.decoder.cache_keys) <= limit
+
 
 class AppTest(object):
-    spaceconfig = {"objspace.usemodules._pypyjson": True}
+    spaceconfig = {"usemodules": ["_pypyjson", "struct"]}
 
     def test_raise_on_unicode(self):
         import _pypyjson
@@ -513,6 +524,241 @@ class AppTest(object):
         assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
         assert check("\x07") == "\\u0007"
 
+    def test_object_hook(self):
+        import _pypyjson
+        calls = []
+        def hook(d):
+            calls.append(d)
+            return len(d)
+        res = _pypyjson.loads('[{"a": 1, "b": {}}, {"a": 2, "b": {"c": 3}}]',
+                              hook)
+        assert res == [2, 2]
+        assert calls == [{}, {u"a": 1, u"b": 0}, {u"c": 3},
+                         {u"a": 2, u"b": 1}]
+
+    def test_object_pairs_hook(self):
+        import _pypyjson
+        s = '{"a": 1, "b": {"x": []}, "a": 2, "c": {}}'
+        res = _pypyjson.loads(s, None, list)
+        assert res == [(u"a", 1), (u"b", [(u"x", [])]), (u"a", 2), (u"c", [])]
+        # object_pairs_hook takes priority over object_hook
+        res = _pypyjson.loads('[{"a": 1}, {"a": 2}, {"a": 3}]', dict, tuple)
+        assert res == [((u"a", 1),), ((u"a", 2),), ((u"a", 3),)]
+        s = "[%s]" % ", ".join(['{"x": %d, "y": "%d"}' % (i, i)
+                                for i in range(100)])
+        res = _pypyjson.loads(s, object_pairs_hook=list)
+        assert res[57] == [(u"x", 57), (u"y", u"57")]
+        raises(ValueError, _pypyjson.loads, '{"a": 1 "b"}', None, list)
+
+    def test_parse_float_int(self):
+        import _pypyjson
+        s = '[1, -25, 1.5, -2.5e3, 12345678901234567890123, 0]'
+        res = _pypyjson.loads(s, parse_float=lambda x: ("f", x),
+                              parse_int=lambda x: ("i", x))
+        assert res == [("i", "1"), ("i", "-25"), ("f", "1.5"),
+                       ("f", "-2.5e3"), ("i", "12345678901234567890123"),
+                       ("i", "0")]
+        # NaN and Infinity are not passed to parse_float
+        res = _pypyjson.loads('[NaN, -Infinity]', parse_float=str)
+        assert res[1] == float("-inf")
+
+    def test_loads_hooks_json_module(self):
+        import json
+        s = '{"z": 1.25, "a": {"y": 2}}'
+        res = json.loads(s, object_pairs_hook=list, parse_float=str)
+        assert res == [(u"z", "1.25"), (u"a", [(u"y", 2)])]
+        assert json.loads(s, object_hook=len) == 2
+        assert json.loads(u'[1]', parse_int=float) == [1.0]
+
+    def test_incremental_values(self):
+        import _pypyjson
+        text = '{"a": [1, "x]}"]}\n"s\\"t" 12 3.5\ntrue null {"a": []}\n-7'
+        dec = _pypyjson.IncrementalDecoder()
+        res = []
+        for c in text:
+            res.extend(dec.feed(c))
+        res.extend(dec.close())
+        assert res == [{u"a": [1, u"x]}"]}, u's"t', 12, 3.5, True, None,
+                       {u"a": []}, -7]
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed(text) == res[:-1]
+        assert dec.close() == [-7]
+
+    def test_incremental_array(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder(True)
+        assert dec.feed(' [ {"a"') == []
+        assert dec.feed(': 1}, 2') == [{u"a": 1}]
+        assert dec.feed('3 , [], "x"') == [23, [], u"x"]
+        assert dec.feed(' ]\n') == []
+        assert dec.close() == []
+        dec = _pypyjson.IncrementalDecoder(array=True)
+        assert dec.feed('[]') == []
+        assert dec.close() == []
+        dec = _pypyjson.IncrementalDecoder(array=True)
+        assert dec.feed('[1, 2') == [1]
+        raises(ValueError, dec.close)
+        dec = _pypyjson.IncrementalDecoder(array=True)
+        raises(ValueError, dec.feed, '[1 2]')
+        dec = _pypyjson.IncrementalDecoder(array=True)
+        raises(ValueError, dec.feed, '{}')
+
+    def test_incremental_errors(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed('[1, {"a": 2') == []
+        exc = raises(ValueError, dec.close)
+        assert str(exc.value) == "Unterminated object starting at char 5"
+        dec = _pypyjson.IncrementalDecoder()
+        raises(ValueError, dec.feed, '[1}')
+        raises(TypeError, _pypyjson.IncrementalDecoder().feed, u"1")
+        # the positions are counted from the start of the stream
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed('1 2\n[3, ') == [1, 2]
+        exc = raises(ValueError, dec.feed, '4 5]')
+        assert str(exc.value) == "Unexpected '5' when decoding array (char 10)"
+        dec = _pypyjson.IncrementalDecoder(array=True)
+        assert dec.feed('[1, 2') == [1]
+        exc = raises(ValueError, dec.feed, ' 3]')
+        assert str(exc.value) == (
+            "Unexpected '3' when decoding a stream of array items (char 6)")
+        # after an error, the decoder starts again with a new stream
+        assert dec.feed('[4,') == [4]
+        assert dec.feed(' 5]') == [5]
+        assert dec.close() == []
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed('"abc') == []
+        raises(ValueError, dec.feed, '\x01"')
+        assert dec.feed('"def" 6') == [u"def"]
+        assert dec.close() == [6]
+
+    def test_incremental_buffer_and_hooks(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder(object_pairs_hook=list,
+                                           parse_float=str)
+        assert dec.feed(buffer('{"a": 1.5} {"b": 2}\n')) == [
+            [(u"a", "1.5")], [(u"b", 2)]]
+        assert dec.close() == []
+
+    def test_iterdecode(self):
+        import _pypyjson
+        from StringIO import StringIO
+        lines = ['{"id": %d, "name": "n%d"}' % (i, i) for i in range(50)]
+        f = StringIO("\n".join(lines))
+        res = list(_pypyjson.iterdecode(f, chunk_size=7))
+        assert len(res) == 50
+        assert res[42] == {u"id": 42, u"name": u"n42"}
+        data = "[" + ", ".join(lines) + "]"
+        res = list(_pypyjson.iterdecode(data, array=True, chunk_size=5,
+                                        object_hook=lambda d: d[u"id"]))
+        assert res == range(50)
+
+    def test_dumps(self):
+        import _pypyjson
+        assert _pypyjson.dumps(None) == 'null'
+        assert _pypyjson.dumps([True, False, 1, -2, 10 ** 20, 1.5]) == (
+            '[true, false, 1, -2, 100000000000000000000, 1.5]')
+        assert _pypyjson.dumps([]) == '[]'
+        assert _pypyjson.dumps({}) == '{}'
+        assert _pypyjson.dumps((1, "a\n", u"\u1234")) == (
+            '[1, "a\\n", "\\u1234"]')
+        assert _pypyjson.dumps([[1, 2], [1.0, 2.0], ["x", None]]) == (
+            '[[1, 2], [1.0, 2.0], ["x", null]]')
+        assert _pypyjson.dumps({"a": [{}]}) == '{"a": [{}]}'
+        assert _pypyjson.dumps([{1: 2}, {None: 3}, {1.5: 4}, {False: 5}]) == (
+            '[{"1": 2}, {"null": 3}, {"1.5": 4}, {"false": 5}]')
+        exc = raises(TypeError, _pypyjson.dumps, {(1,): 2})
+        assert str(exc.value) == "key (1,) is not a string"
+        assert _pypyjson.dumps({(1,): 2, "a": 3}, skipkeys=True) == '{"a": 3}'
+
+    def test_dumps_options(self):
+        import _pypyjson
+        d = {"b": [1, 2], "a": {"c": None}, "d": []}
+        assert _pypyjson.dumps(d, sort_keys=True) == (
+            '{"a": {"c": null}, "b": [1, 2], "d": []}')
+        assert _pypyjson.dumps(d, True, None, ',', ':') == (
+            '{"a":{"c":null},"b":[1,2],"d":[]}')
+        assert _pypyjson.dumps(d, True, 2, ',', ': ') == (
+            '{\n  "a": {\n    "c": null\n  },\n'
+            '  "b": [\n    1,\n    2\n  ],\n  "d": []\n}')
+        assert _pypyjson.dumps([1], False, 0) == '[\n1\n]'
+
+    def test_dumps_float(self):
+        import _pypyjson
+        nan = float("nan")
+        inf = float("inf")
+        assert _pypyjson.dumps([nan, inf, -inf, 0.1]) == (
+            '[NaN, Infinity, -Infinity, 0.1]')
+        assert _pypyjson.dumps({inf: 1}) == '{"Infinity": 1}'
+        exc = raises(ValueError, _pypyjson.dumps, [-inf], allow_nan=False)
+        assert str(exc.value) == (
+            "Out of range float values are not JSON compliant: -inf")
+
+    def test_dumps_circular(self):
+        import _pypyjson
+        l = [1]
+        l.append(l)
+        exc = raises(ValueError, _pypyjson.dumps, {"a": l})
+        assert str(exc.value) == "Circular reference detected"
+        x = [1]
+        assert _pypyjson.dumps([x, x, {"a": x}]) == (
+            '[[1], [1], {"a": [1]}]')
+
+    def test_dumps_fallback(self):
+        import _pypyjson
+        class MyList(list):
+            pass
+        class MyDict(dict):
+            pass
+        class MyStr(str):
+            pass
+        class MyInt(int):
+            def __str__(self):
+                return "42"
+        assert _pypyjson.dumps([1, object()]) is None
+        assert _pypyjson.dumps({"a": set()}) is None
+        assert _pypyjson.dumps([MyList()]) is None
+        assert _pypyjson.dumps(MyDict()) is None
+        assert _pypyjson.dumps([MyStr("x"), MyInt(1)]) is None
+        assert _pypyjson.dumps({MyInt(1): 2}) is None
+        assert _pypyjson.dumps([MyStr("x")]) == '["x"]'
+        class Key(object):
+            def __lt__(self, other):
+                raise AssertionError("sorted at interp-level")
+        assert _pypyjson.dumps({Key(): 1, Key(): 2}, sort_keys=True) is None
+
+    def test_dumps_json_module(self):
+        import json
+        class Point(object):
+            pass
+        def default(o):
+            return [1, 2]
+        assert json.dumps({"p": [Point()]}, default=default,
+                          sort_keys=True) == '{"p": [[1, 2]]}'
+        assert json.dumps({"a": [u"\xe9", 1.5]}) == (
+            '{"a": ["\\u00e9", 1.5]}')
+        assert json.dumps([1, 2], indent=1, separators=(',', ':')) == (
+            '[\n 1,\n 2\n]')
+        #
+        # app-level code is called only once, by the app-level encoder
+        calls = []
+        class MyInt(int):
+            def __str__(self):
+                calls.append(self)
+                return "42"
+        assert json.dumps([MyInt(1), Point()], default=default) == (
+            '[42, [1, 2]]')
+        assert len(calls) == 1
+        #
+        # the interp-level encoder is not used if FLOAT_REPR is changed
+        import json.encoder
+        old_repr = json.encoder.FLOAT_REPR
+        json.encoder.FLOAT_REPR = lambda f: "%.2f" % f
+        try:
+            assert json.dumps([0.125]) == '[0.12]'
+        finally:
+            json.encoder.FLOAT_REPR = old_repr
+
     def test_error_position(self):
         import _pypyjson
         test_cases = [
@@ -13,7 +13,7 @@ from rpython.rlib.rstring import StringBuilder
 #
 # Constants and exposed functions
 
-from rpython.rlib.rsre import rsre_core, rsre_utf8
+from rpython.rlib.rsre import rsre_core, rsre_prefilter, rsre_set, rsre_utf8
 from rpython.rlib.rsre.rsre_char import CODESIZE, MAXREPEAT, getlower, set_unicode_db
 
 
@@ -112,6 +112,35 @@ class W_SRE_Pattern(W_Root):
         space = self.space
         raise oefmt(space.w_TypeError, "cannot copy this pattern object")
 
+    def fget_prefilter(self, space):
+        """None, or a tuple (literals, offset): every match contains one of
+        the literals, starting 'offset' characters after the start of the
+        match, or anywhere in the match if 'offset' is None.  Searches look
+        for these literals before trying to match."""
+        prefilter = self.code.prefilter
+        if prefilter is None:
+            return space.w_None
+        is_unicode = space.isinstance_w(self.w_pattern, space.w_unicode)
+        literals_w = []
+        for literal in prefilter.literals:
+            builder = StringBuilder(len(literal))
+            for c in literal:
+                if is_unicode:
+                    rutf8.unichr_as_utf8_append(builder, c,
+                                                allow_surrogates=True)
+                else:
+                    builder.append(chr(c))
+            if is_unicode:
+                w_literal = space.newutf8(builder.build(), len(literal))
+            else:
+                w_literal = space.newbytes(builder.build())
+            literals_w.append(w_literal)
+        if prefilter.offset == rsre_prefilter.VARIABLE:
+            w_offset = space.w_None
+        else:
+            w_offset = space.newint(prefilter.offset)
+        return space.newtuple([space.newtuple(literals_w), w_offset])
+
     def make_ctx(self, w_string, pos=0, endpos=sys.maxint):
         """Make a StrMatchContext, BufMatchContext, UnicodeAsciiMatchContext or
         a Utf8MatchContext for searching in the given w_string object."""
@@ -481,9 +510,110 @@ W_SRE_Pattern.typedef = TypeDef(
     groups       = interp_attrproperty('num_groups', W_SRE_Pattern,
         wrapfn="newint"),
     pattern      = interp_attrproperty_w('w_pattern', W_SRE_Pattern),
+    prefilter    = GetSetProperty(W_SRE_Pattern.fget_prefilter),
 )
 W_SRE_Pattern.typedef.acceptable_as_base_class = False
 
+# ____________________________________________________________
+#
+# SRE_RegexSet class
+
+class W_SRE_RegexSet(W_Root):
+    """A set of patterns: the searches find in one pass over the string
+    which ones match (see rpython/rlib/rsre/rsre_set.py)."""
+    _immutable_fields_ = ["patterns_w[*]", "regexset"]
+
+    def make_ctx(self, w_string, pos, endpos):
+        return self.patterns_w[0].make_ctx(w_string, pos, endpos)
+
+    def found_w(self, found):
+        return self.space.newlist([self.space.newint(index)
+                                   for index in range(len(found))
+                                   if found[index]])
+
+    @unwrap_spec(pos=int, endpos=int)
+    def search_w(self, w_string, pos=0, endpos=sys.maxint):
+        """Returns the sorted list of the indexes of the patterns that
+        match somewhere in the string."""
+        if not self.patterns_w:
+            return self.space.newlist([])
+        ctx = self.make_ctx(w_string, pos, endpos)
+        return self.found_w(self.search_ctx(ctx))
+
+    @unwrap_spec(pos=int, endpos=int)
+    def match_w(self, w_string, pos=0, endpos=sys.maxint):
+        """Returns the sorted list of the indexes of the patterns that
+        match at the start of the string."""
+        if not self.patterns_w:
+            return self.space.newlist([])
+        ctx = self.make_ctx(w_string, pos, endpos)
+        try:
+            found = rsre_set.match_set_context(ctx, self.regexset)
+        except rsre_core.Error as e:
+            raise OperationError(self.space.w_RuntimeError,
+                                 self.space.newtext(e.msg))
+        return self.found_w(found)
+
+    @unwrap_spec(pos=int, endpos=int)
+    def search_matches_w(self, w_string, pos=0, endpos=sys.maxint):
+        """Returns a list of pairs (index, match object) for the patterns
+        that match somewhere in the string."""
+        space = self.space
+        if not self.patterns_w:
+            return space.newlist([])
+        ctx = self.make_ctx(w_string, pos, endpos)
+        found = self.search_ctx(ctx)
+        result_w = []
+        for index in range(len(found)):
+            if found[index]:
+                w_match = self.patterns_w[index].search_w(w_string, pos,
+                                                          endpos)
+                result_w.append(space.newtuple([space.newint(index),
+                                                w_match]))
+        return space.newlist(result_w)
+
+    def search_ctx(self, ctx):
+        try:
+            return rsre_set.search_set_context(ctx, self.regexset)
+        except rsre_core.Error as e:
+            raise OperationError(self.space.w_RuntimeError,
+                                 self.space.newtext(e.msg))
+
+    def fget_patterns(self, space):
+        return space.newtuple([w_pattern for w_pattern in self.patterns_w])
+
+
+@unwrap_spec(flags=int)
+def SRE_RegexSet__new__(space, w_subtype, w_patterns, flags=0):
+    # the patterns are SRE_Pattern objects, or strings that are compiled
+    # with re.compile(pattern, flags)
+    patterns_w = []
+    for w_pattern in space.listview(w_patterns):
+        if not isinstance(w_pattern, W_SRE_Pattern):
+            w_re = import_re(space)
+            w_pattern = space.call_method(w_re, "compile", w_pattern,
+                                          space.newint(flags))
+        patterns_w.append(space.interp_w(W_SRE_Pattern, w_pattern))
+    #
+    w_srset = space.allocate_instance(W_SRE_RegexSet, w_subtype)
+    srset = space.interp_w(W_SRE_RegexSet, w_srset)
+    srset.space = space
+    srset.patterns_w = [w_pattern for w_pattern in patterns_w]
+    srset.regexset = rsre_set.RegexSet([w_pattern.code
+                                        for w_pattern in patterns_w])
+    return w_srset
+
+
+W_SRE_RegexSet.typedef = TypeDef(
+    'SRE_RegexSet',
+    __new__        = interp2app(SRE_RegexSet__new__),
+    match          = interp2app(W_SRE_RegexSet.match_w),
+    search         = interp2app(W_SRE_RegexSet.search_w),
+    search_matches = interp2app(W_SRE_RegexSet.search_matches_w),
+    patterns       = GetSetProperty(W_SRE_RegexSet.fget_patterns),
+)
+W_SRE_RegexSet.typedef.acceptable_as_base_class = False
+
 # ____________________________________________________________
 #
 # SRE_Match class
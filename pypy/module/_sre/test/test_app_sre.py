@@ -1073,6 +1073,81 @@ class AppTestOptimizations:
         assert re.search(".+ab", "wowowowawoabwowo")
         assert None == re.search(".+ab", "wowowaowowo")
 
+    def test_prefilter(self):
+        import re
+        p = re.compile(r'\s(ERROR|FATAL)\s.*user=(\w+)')
+        assert p.prefilter == (('ERROR', 'FATAL'), 1)
+        assert p.search('x ERRORS user=a FATAL user=bob').groups() == (
+            'FATAL', 'bob')
+        assert p.search('x FATAL user') is None
+        assert re.compile(r'\d+foo').prefilter == (('foo',), None)
+        assert re.compile(u'\\w(\u1234\u5678)').prefilter == (
+            (u'\u1234\u5678',), 1)
+        assert re.compile(r'[a-z]+').prefilter is None
+        assert re.findall(u'.(\u1234x|yz)', u'ayz\u1234\u1234xyz') == [
+            u'yz', u'\u1234x']
+        assert re.sub(r'\d(ab|cd)', '-', 'xab1ab2cd3') == 'xab--3'
+
+    def test_dfa(self):
+        import re
+        # these take an exponential time with backtracking only
+        assert re.search(r'(a|aa)*b', 'a' * 200) is None
+        assert re.match(r'(?:x+x+)+y', 'x' * 60) is None
+        m = re.search(r'(a|aa)*b', 'c' + 'a' * 30 + 'b')
+        assert m.span() == (1, 32)
+        assert m.group(1) == 'a'
+        assert re.findall(r'(?:ab|c)+', 'xabcab ccx') == ['abcab', 'cc']
+        assert re.findall(u'(?:\u1234|b)+', u'a\u1234b\u1234ab') == [
+            u'\u1234b\u1234', u'b']
+        assert re.sub(r'(?:ab)+?', '-', 'ababx') == '--x'
+
+
+class AppTestRegexSet:
+    def test_search(self):
+        import re
+        s = re.compile_set([r'^GET ', r'/users/(\d+)$', r'\.png\b', r'(\w)\1'])
+        assert s.search('GET /users/42') == [0, 1]
+        assert s.search('POST /a.png') == [2]
+        assert s.search('GET /x.png/users/7') == [0, 1, 2]
+        assert s.search('aa') == [3]
+        assert s.search('GET /users/42', 1) == [1]
+        assert s.search('GET /users/42', 0, 8) == [0]
+        assert s.search('') == []
+
+    def test_match(self):
+        import re
+        s = re.compile_set([r'a+b', r'(?:ab)+', r'b'])
+        assert s.match('abab') == [0, 1]
+        assert s.match('xabab', 1) == [0, 1]
+        assert s.match('bab') == [2]
+
+    def test_search_matches(self):
+        import re
+        s = re.compile_set([r'(\d+)', r'x(y)?', r'z'])
+        result = s.search_matches('ab 12 x')
+        assert [index for index, m in result] == [0, 1]
+        assert result[0][1].group(1) == '12'
+        assert result[1][1].span() == (6, 7)
+
+    def test_flags_and_patterns(self):
+        import re, _sre
+        p = re.compile(r'ab')
+        s = re.compile_set([p, r'cd'], re.I)
+        assert s.search('xCD') == [1]
+        assert s.patterns[0] is p
+        assert s.patterns[1].flags & re.I
+        s = _sre.RegexSet([p])
+        assert s.search('ab') == [0]
+        assert _sre.RegexSet([]).search('ab') == []
+        raises(TypeError, _sre.RegexSet, [42])
+
+    def test_unicode(self):
+        import re
+        s = re.compile_set([u'\u1234+x', u'(?:a|\u1235)+$', u'b'])
+        assert s.search(u'a\u1234\u1234xa\u1235') == [0, 1]
+        assert s.match(u'a\u1234\u1234xa\u1235', 1) == [0]
+        assert s.search_matches(u'\u1234xb')[1][1].span() == (2, 3)
+
 
 class AppTestUnicodeExtra:
     def test_string_attribute(self):
@@ -19,9 +19,24 @@ def dump_rpy_heap(file):
     we also write 'typeids.txt' and 'typeids.lst' in the same directory,
     if they don't already exist.
     """
+    _dump_to(file, gc._dump_rpy_heap)
+
+def dump_heap_profile(file):
+    """Write the samples of the heap profiler (see start_heap_profiling())
+    that are still alive, or that died since they were promoted out of the
+    nursery, to the given file (which can be a file, a file name, or a file
+    descriptor).  Use 'pypy/tool/gcdump.py --profile' to read it.
+
+    If the argument is a filename and the 'zlib' module is available,
+    we also write 'typeids.txt' and 'typeids.lst' in the same directory,
+    if they don't already exist.
+    """
+    _dump_to(file, gc._dump_heap_profile)
+
+def _dump_to(file, dump_fd):
     if isinstance(file, str):
         f = open(file, 'wb')
-        gc._dump_rpy_heap(f.fileno())
+        dump_fd(f.fileno())
         f.close()
         try:
             import zlib, os
@@ -47,7 +62,7 @@ def dump_rpy_heap(file):
             if hasattr(file, 'flush'):
                 file.flush()
             fd = file.fileno()
-        gc._dump_rpy_heap(fd)
+        dump_fd(fd)
 
 class GcStats(object):
     def __init__(self, s):
@@ -65,6 +80,9 @@ class GcStats(object):
         self.memory_allocated_sum = self._format(self._s.total_allocated_memory + self._s.total_memory_pressure +
                                             self._s.jit_backend_allocated)
         self.total_gc_time = self._s.total_gc_time
+        self.max_pause = self._s.max_pause
+        self.pause_histogram = self._s.pause_histogram
+        self.pause_limits = self._s.pause_limits
 
     def _format(self, v):
         if v < 1000000:
@@ -72,6 +90,21 @@ class GcStats(object):
             return "%.1fkB" % (v / 1024.)
         return "%.1fMB" % (v / 1024. / 1024.)
 
+    def _format_pauses(self):
+        if self.max_pause:
+            lines = ["\n    Target GC pause:         %.3fms" %
+                         (self.max_pause / 1000.0)]
+        else:
+            lines = [""]
+        lines.append("    GC pauses:")
+        for i, count in enumerate(self.pause_histogram):
+            if i < len(self.pause_limits):
+                label = "<= %.1fms" % (self.pause_limits[i] / 1000.0)
+            else:
+                label = " > %.1fms" % (self.pause_limits[-1] / 1000.0)
+            lines.append("       %-10s %d" % (label, count))
+        return "\n".join(lines)
+
     def __repr__(self):
         if self._s.total_memory_pressure != -1:
             extra = "\n    memory pressure:    %s" % self.total_memory_pressure
@@ -95,7 +128,7 @@ class GcStats(object):
     -----------------------------
     Total:                   %s
 
-    Total time spent in GC:  %s
+    Total time spent in GC:  %s%s
     """ % (self.total_gc_memory, self.peak_memory,
               self.total_arena_memory,
               self.total_rawmalloced_memory,
@@ -111,7 +144,8 @@ class GcStats(object):
            self.jit_backend_allocated,
            extra,
            self.memory_allocated_sum,
-           self.total_gc_time / 1000.0)
+           self.total_gc_time / 1000.0,
+           self._format_pauses())
 
 
 def get_stats(memory_pressure=False):
@@ -0,0 +1,389 @@
+"""
+A sampling heap profiler.  The GC samples one allocation every 'interval'
+bytes allocated in the nursery (see GcHooks.allocation_sample_interval()),
+and we record the vmprof stack of the allocation.  The sampled objects that
+survive their first minor collection are logged together with their type
+id, and dropped from the log again when they die, so that the log only
+grows with the number of sampled objects alive.  The log can be
+aggregated with pypy/tool/gcdump.py.
+
+Format of the log written by dump(), one machine word per item:
+
+    [PROFILE_MAGIC] [interval]
+    [TAG_ALLOC] [sample_id] [size] [typeid] [depth] [code_id]*depth
+    ...
+    [TAG_CODE] [code_id] [length] [the name, padded to a multiple of words]
+    ...
+    [-1]
+
+where the code_ids are the vmprof unique ids of the code objects, innermost
+first, and the names are in vmprof format ('py:name:line:filename').
+"""
+
+import os
+from rpython.rlib import rgc
+from rpython.rlib.rarithmetic import LONG_BIT
+from rpython.rlib.rvmprof import traceback, rvmprof
+from rpython.rtyper.lltypesystem import lltype, rffi
+from pypy.interpreter.error import oefmt, wrap_oserror
+from pypy.interpreter.gateway import unwrap_spec
+
+WORD = LONG_BIT // 8
+
+PROFILE_MAGIC = 0x48505246    # "HPRF"
+TAG_ALLOC = 1
+TAG_CODE = 3
+END = -1
+
+MAX_DEPTH = 32
+DEFAULT_INTERVAL = 512 * 1024
+
+SIGNEDARRAY = rffi.CArray(lltype.Signed)
+
+
+class RawSignedList(object):
+    """A growable list of Signed in raw memory, usable from the GC hooks
+    (where we cannot allocate GC objects)."""
+
+    def __init__(self):
+        self.items = lltype.nullptr(SIGNEDARRAY)
+        self.length = 0
+        self.allocated = 0
+
+    def append(self, value):
+        if self.length == self.allocated:
+            self._grow(self.length + 1)
+        self.items[self.length] = value
+        self.length += 1
+
+    def _grow(self, minsize):
+        newsize = self.allocated * 2
+        if newsize < minsize:
+            newsize = minsize
+        if newsize < 64:
+            newsize = 64
+        newitems = lltype.malloc(SIGNEDARRAY, newsize, flavor='raw')
+        i = 0
+        while i < self.length:
+            newitems[i] = self.items[i]
+            i += 1
+        if self.items:
+            lltype.free(self.items, flavor='raw')
+        self.items = newitems
+        self.allocated = newsize
+
+    def clear(self):
+        if self.items:
+            lltype.free(self.items, flavor='raw')
+        self.items = lltype.nullptr(SIGNEDARRAY)
+        self.length = 0
+        self.allocated = 0
+
+    def write(self, fd):
+        if self.length > 0:
+            data = rffi.charpsize2str(rffi.cast(rffi.CCHARP, self.items),
+                                      self.length * WORD)
+            _write_all(fd, data)
+
+
+class RawSignedIndex(object):
+    """A hash table in raw memory mapping sample_ids, which are
+    non-negative, to Signed values, usable from the GC hooks.  It uses
+    linear probing; the sample_ids are consecutive numbers, so they are
+    used directly as hashes."""
+
+    def __init__(self):
+        self.keys = lltype.nullptr(SIGNEDARRAY)
+        self.values = lltype.nullptr(SIGNEDARRAY)
+        self.mask = -1
+        self.count = 0
+
+    def _lookup(self, key):
+        # returns the slot of 'key', or the empty slot where it would go
+        mask = self.mask
+        keys = self.keys
+        i = key & mask
+        while keys[i] != -1 and keys[i] != key:
+            i = (i + 1) & mask
+        return i
+
+    def get(self, key):
+        if self.count == 0:
+            return -1
+        i = self._lookup(key)
+        if self.keys[i] == -1:
+            return -1
+        return self.values[i]
+
+    def set(self, key, value):
+        if (self.count + 1) * 2 > self.mask + 1:
+            self._resize((self.mask + 1) * 2)
+        i = self._lookup(key)
+        if self.keys[i] == -1:
+            self.keys[i] = key
+            self.count += 1
+        self.values[i] = value
+
+    def remove(self, key):
+        if self.count == 0:
+            return
+        i = self._lookup(key)
+        keys = self.keys
+        if keys[i] == -1:
+            return
+        # move back the following entries of the cluster, so that no
+        # deleted marker is needed
+        mask = self.mask
+        j = i
+        while True:
+            keys[i] = -1
+            while True:
+                j = (j + 1) & mask
+                if keys[j] == -1:
+                    self.count -= 1
+                    return
+                home = keys[j] & mask
+                # the entry at 'j' can move to 'i' unless its home slot
+                # is cyclically in (i, j]
+                if i <= j:
+                    if i < home <= j:
+                        continue
+                elif i < home or home <= j:
+                    continue
+                break
+            keys[i] = keys[j]
+            self.values[i] = self.values[j]
+            i = j
+
+    def _resize(self, newsize):
+        if newsize < 64:
+            newsize = 64
+        oldkeys = self.keys
+        oldvalues = self.values
+        oldsize = self.mask + 1
+        self.keys = lltype.malloc(SIGNEDARRAY, newsize, flavor='raw')
+        self.values = lltype.malloc(SIGNEDARRAY, newsize, flavor='raw')
+        self.mask = newsize - 1
+        i = 0
+        while i < newsize:
+            self.keys[i] = -1
+            i += 1
+        i = 0
+        while i < oldsize:
+            key = oldkeys[i]
+            if key != -1:
+                j = self._lookup(key)
+                self.keys[j] = key
+                self.values[j] = oldvalues[i]
+            i += 1
+        if oldkeys:
+            lltype.free(oldkeys, flavor='raw')
+            lltype.free(oldvalues, flavor='raw')
+
+    def clear(self):
+        if self.keys:
+            lltype.free(self.keys, flavor='raw')
+            lltype.free(self.values, flavor='raw')
+        self.keys = lltype.nullptr(SIGNEDARRAY)
+        self.values = lltype.nullptr(SIGNEDARRAY)
+        self.mask = -1
+        self.count = 0
+
+
+def _write_all(fd, data):
+    while data:
+        count = os.write(fd, data)
+        data = data[count:]
+
+
+class HeapProfiler(object):
+    """The state of the heap profiler, driven by the GC hooks of
+    hook.LowLevelGcHooks."""
+
+    def __init__(self, space):
+        self.space = space
+        self.interval = 0
+        # the sampled objects that are still in the nursery, as records
+        # [sample_id] [size] [depth] [code_id]*depth; the sample_id is
+        # set to -1 when the object leaves the nursery
+        self.young = RawSignedList()
+        self.young_count = 0
+        # sample_id -> index of its record in 'young'
+        self.young_index = RawSignedIndex()
+        # the log of the sampled objects that survived the nursery; the
+        # sample_id of a record is set to -1 when the object dies, and
+        # such records are removed when they are half of the log
+        self.log = RawSignedList()
+        self.log_dead = 0
+        # sample_id -> index of its record in 'log', for the live samples
+        self.log_index = RawSignedIndex()
+        self.samples = 0
+        self.died_young = 0
+
+    def start(self, interval):
+        self.interval = interval
+
+    def stop(self):
+        self.interval = 0
+
+    def reset(self):
+        self.young.clear()
+        self.young_count = 0
+        self.young_index.clear()
+        self.log.clear()
+        self.log_dead = 0
+        self.log_index.clear()
+        self.samples = 0
+        self.died_young = 0
+
+    @rgc.no_collect
+    def record_allocation(self, sample_id, size):
+        self.samples += 1
+        young = self.young
+        self.young_index.set(sample_id, young.length)
+        young.append(sample_id)
+        young.append(size)
+        depth_index = young.length
+        young.append(0)
+        array_p, array_length = traceback.traceback(MAX_DEPTH)
+        depth = 0
+        if array_p:
+            i = 0
+            while i < array_length - 1 and depth < MAX_DEPTH:
+                tag = array_p[i]
+                if (tag == rvmprof.VMPROF_CODE_TAG or
+                        tag == rvmprof.VMPROF_JITTED_TAG):
+                    young.append(array_p[i + 1])
+                    depth += 1
+                i += 2
+            lltype.free(array_p, flavor='raw')
+        young.items[depth_index] = depth
+        self.young_count += 1
+
+    @rgc.no_collect
+    def _forget_young(self, index):
+        self.young_index.remove(self.young.items[index])
+        self.young.items[index] = -1
+        self.young_count -= 1
+        if self.young_count == 0:
+            self.young.length = 0
+
+    @rgc.no_collect
+    def record_promoted(self, sample_id, typeid):
+        index = self.young_index.get(sample_id)
+        if index < 0:
+            return     # sampled before the profiler was reset
+        young = self.young
+        log = self.log
+        depth = young.items[index + 2]
+        self.log_index.set(sample_id, log.length)
+        log.append(TAG_ALLOC)
+        log.append(sample_id)
+        log.append(young.items[index + 1])
+        log.append(typeid)
+        log.append(depth)
+        i = 0
+        while i < depth:
+            log.append(young.items[index + 3 + i])
+            i += 1
+        self._forget_young(index)
+
+    @rgc.no_collect
+    def _compact_log(self):
+        log = self.log
+        i = 0
+        j = 0
+        while i < log.length:
+            size = 5 + log.items[i + 4]
+            if log.items[i + 1] != -1:
+                self.log_index.set(log.items[i + 1], j)
+                k = 0
+                while k < size:
+                    log.items[j + k] = log.items[i + k]
+                    k += 1
+                j += size
+            i += size
+        log.length = j
+        self.log_dead = 0
+
+    @rgc.no_collect
+    def record_freed(self, sample_id, typeid):
+        index = self.young_index.get(sample_id)
+        if index >= 0:
+            self.died_young += 1
+            self._forget_young(index)
+            return
+        index = self.log_index.get(sample_id)
+        if index < 0:
+            return     # sampled before the profiler was reset
+        self.log_index.remove(sample_id)
+        log = self.log
+        log.items[index + 1] = -1
+        self.log_dead += 5 + log.items[index + 4]
+        if self.log_dead * 2 >= log.length:
+            self._compact_log()
+
+    def dump(self, fd):
+        self._compact_log()
+        header = RawSignedList()
+        header.append(PROFILE_MAGIC)
+        header.append(self.interval)
+        header.write(fd)
+        header.clear()
+        self.log.write(fd)
+        self._dump_code_names(fd)
+        trailer = RawSignedList()
+        trailer.append(END)
+        trailer.write(fd)
+        trailer.clear()
+
+    def _dump_code_names(self, fd):
+        if not self.space.config.objspace.usemodules._vmprof:
+            return
+        from pypy.interpreter.pycode import PyCode
+        from pypy.module._vmprof.interp_vmprof import _get_full_name
+        needed = {}
+        log = self.log
+        i = 0
+        while i < log.length:
+            depth = log.items[i + 4]
+            for j in range(depth):
+                needed[log.items[i + 5 + j]] = None
+            i += 5 + depth
+        for wref in PyCode._vmprof_weak_list.get_all_handles():
+            code = wref()
+            if code is not None and code._vmprof_unique_id in needed:
+                name = _get_full_name(code)
+                record = RawSignedList()
+                record.append(TAG_CODE)
+                record.append(code._vmprof_unique_id)
+                record.append(len(name))
+                record.write(fd)
+                record.clear()
+                padding = (WORD - len(name) % WORD) % WORD
+                _write_all(fd, name + '\x00' * padding)
+
+
+@unwrap_spec(interval=int)
+def start_heap_profiling(space, interval=DEFAULT_INTERVAL):
+    """Start sampling one allocation every 'interval' bytes allocated.
+    The samples that survive are kept until dump_heap_profile()."""
+    if interval <= 0:
+        raise oefmt(space.w_ValueError, "the interval must be positive")
+    space.fromcache(HeapProfiler).start(interval)
+
+def stop_heap_profiling(space):
+    """Stop sampling the allocations.  The samples taken so far are kept,
+    and their death is still recorded."""
+    space.fromcache(HeapProfiler).stop()
+
+def reset_heap_profile(space):
+    """Forget all the samples taken so far."""
+    space.fromcache(HeapProfiler).reset()
+
+@unwrap_spec(fd=int)
+def _dump_heap_profile(space, fd):
+    try:
+        space.fromcache(HeapProfiler).dump(fd)
+    except OSError as e:
+        raise wrap_oserror(space, e)
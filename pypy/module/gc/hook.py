@@ -7,6 +7,7 @@ from pypy.interpreter.gateway import interp2app, unwrap_spec, WrappedDefault
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.typedef import TypeDef, interp_attrproperty, GetSetProperty
 from pypy.interpreter.executioncontext import AsyncAction
+from pypy.module.gc.heapprof import HeapProfiler
 
 inf = float("inf")
 
@@ -24,6 +25,7 @@ class LowLevelGcHooks(GcHooks):
     def __init__(self, space):
         self.space = space
         self.w_hooks = space.fromcache(W_AppLevelHooks)
+        self.heapprof = space.fromcache(HeapProfiler)
 
     def is_gc_minor_enabled(self):
         return self.w_hooks.gc_minor_enabled
@@ -34,6 +36,17 @@ class LowLevelGcHooks(GcHooks):
     def is_gc_collect_enabled(self):
         return self.w_hooks.gc_collect_enabled
 
+    def allocation_sample_interval(self):
+        return self.heapprof.interval
+
+    def on_gc_minor_nursery(self, nursery_size, surviving_bytes):
+        # like 'total_memory_used', 'nursery_size' is the value after the
+        # last of the minor collections reported by the next hook call;
+        # like 'duration', 'surviving_bytes' is summed over all of them
+        action = self.w_hooks.gc_minor
+        action.nursery_size = nursery_size
+        action.surviving_bytes += surviving_bytes
+
     def on_gc_minor(self, duration, total_memory_used, pinned_objects):
         action = self.w_hooks.gc_minor
         action.count += 1
@@ -54,6 +67,11 @@ class LowLevelGcHooks(GcHooks):
         action.newstate = newstate
         action.fire()
 
+    def on_gc_collect_durations(self, duration_marking, duration_sweeping):
+        action = self.w_hooks.gc_collect
+        action.duration_marking = duration_marking
+        action.duration_sweeping = duration_sweeping
+
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
@@ -68,6 +86,15 @@ class LowLevelGcHooks(GcHooks):
         action.rawmalloc_bytes_after = rawmalloc_bytes_after
         action.fire()
 
+    def on_gc_allocation_sample(self, sample_id, size):
+        self.heapprof.record_allocation(sample_id, size)
+
+    def on_gc_sample_promoted(self, sample_id, typeindex):
+        self.heapprof.record_promoted(sample_id, typeindex)
+
+    def on_gc_sample_freed(self, sample_id, typeindex):
+        self.heapprof.record_freed(sample_id, typeindex)
+
 
 class W_AppLevelHooks(W_Root):
 
@@ -133,6 +160,7 @@ class NoRecursiveAction(AsyncAction):
 class GcMinorHookAction(NoRecursiveAction):
     total_memory_used = 0
     pinned_objects = 0
+    nursery_size = 0
 
     def __init__(self, space):
         NoRecursiveAction.__init__(self, space)
@@ -144,6 +172,7 @@ class GcMinorHookAction(NoRecursiveAction):
         self.duration = 0.0
         self.duration_min = inf
         self.duration_max = 0.0
+        self.surviving_bytes = 0
 
     def fix_annotation(self):
         # the annotation of the class and its attributes must be completed
@@ -156,6 +185,8 @@ class GcMinorHookAction(NoRecursiveAction):
             self.duration_max = NonConstant(-53.2)
             self.total_memory_used = NonConstant(r_uint(42))
             self.pinned_objects = NonConstant(-42)
+            self.nursery_size = NonConstant(-42)
+            self.surviving_bytes = NonConstant(-42)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -165,7 +196,9 @@ class GcMinorHookAction(NoRecursiveAction):
             self.duration_min,
             self.duration_max,
             self.total_memory_used,
-            self.pinned_objects)
+            self.pinned_objects,
+            self.nursery_size,
+            self.surviving_bytes)
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -218,6 +251,8 @@ class GcCollectHookAction(NoRecursiveAction):
     arenas_bytes = 0
     rawmalloc_bytes_before = 0
     rawmalloc_bytes_after = 0
+    duration_marking = 0.0
+    duration_sweeping = 0.0
 
     def __init__(self, space):
         NoRecursiveAction.__init__(self, space)
@@ -239,6 +274,8 @@ class GcCollectHookAction(NoRecursiveAction):
             self.arenas_bytes = NonConstant(r_uint(42))
             self.rawmalloc_bytes_before = NonConstant(r_uint(42))
             self.rawmalloc_bytes_after = NonConstant(r_uint(42))
+            self.duration_marking = NonConstant(-53.2)
+            self.duration_sweeping = NonConstant(-53.2)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -248,7 +285,9 @@ class GcCollectHookAction(NoRecursiveAction):
                                    self.arenas_count_after,
                                    self.arenas_bytes,
                                    self.rawmalloc_bytes_before,
-                                   self.rawmalloc_bytes_after)
+                                   self.rawmalloc_bytes_after,
+                                   self.duration_marking,
+                                   self.duration_sweeping)
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -256,13 +295,16 @@ class GcCollectHookAction(NoRecursiveAction):
 class W_GcMinorStats(W_Root):
 
     def __init__(self, count, duration, duration_min, duration_max,
-                 total_memory_used, pinned_objects):
+                 total_memory_used, pinned_objects, nursery_size,
+                 surviving_bytes):
         self.count = count
         self.duration = duration
         self.duration_min = duration_min
         self.duration_max = duration_max
         self.total_memory_used = total_memory_used
         self.pinned_objects = pinned_objects
+        self.nursery_size = nursery_size
+        self.surviving_bytes = surviving_bytes
 
 
 class W_GcCollectStepStats(W_Root):
@@ -298,7 +340,8 @@ class W_GcCollectStats(W_Root):
     def __init__(self, count, num_major_collects,
                  arenas_count_before, arenas_count_after,
                  arenas_bytes, rawmalloc_bytes_before,
-                 rawmalloc_bytes_after):
+                 rawmalloc_bytes_after, duration_marking,
+                 duration_sweeping):
         self.count = count
         self.num_major_collects = num_major_collects
         self.arenas_count_before = arenas_count_before
@@ -306,6 +349,15 @@ class W_GcCollectStats(W_Root):
         self.arenas_bytes = arenas_bytes
         self.rawmalloc_bytes_before = rawmalloc_bytes_before
         self.rawmalloc_bytes_after = rawmalloc_bytes_after
+        self.duration_marking = duration_marking
+        self.duration_sweeping = duration_sweeping
+
+    def descr_get_pause_histogram(self, space):
+        # read lazily: the histogram of the GC pauses so far, see
+        # rgc.GC_PAUSE_LIMITS
+        from pypy.module.gc.referents import (get_pause_histogram,
+                                              newtuple_of_ints)
+        return newtuple_of_ints(space, get_pause_histogram())
 
 
 # just a shortcut to make the typedefs shorter
@@ -346,7 +398,9 @@ W_GcMinorStats.typedef = TypeDef(
         "duration_min",
         "duration_max",
         "total_memory_used",
-        "pinned_objects"))
+        "pinned_objects",
+        "nursery_size",
+        "surviving_bytes"))
     )
 
 W_GcCollectStepStats.typedef = TypeDef(
@@ -372,6 +426,7 @@ W_GcCollectStepStats.typedef = TypeDef(
 
 W_GcCollectStats.typedef = TypeDef(
     "GcCollectStats",
+    pause_histogram=GetSetProperty(W_GcCollectStats.descr_get_pause_histogram),
     **wrap_many(W_GcCollectStats, (
         "count",
         "num_major_collects",
@@ -379,5 +434,7 @@ W_GcCollectStats.typedef = TypeDef(
         "arenas_count_after",
         "arenas_bytes",
         "rawmalloc_bytes_before",
-        "rawmalloc_bytes_after"))
+        "rawmalloc_bytes_after",
+        "duration_marking",
+        "duration_sweeping"))
     )
@@ -19,6 +19,7 @@ class Module(MixedModule):
                 space.config.translation.gctransformer == "framework"):
             self.appleveldefs.update({
                 'dump_rpy_heap': 'app_referents.dump_rpy_heap',
+                'dump_heap_profile': 'app_referents.dump_heap_profile',
                 'get_stats': 'app_referents.get_stats',
                 })
             self.interpleveldefs.update({
@@ -32,6 +33,10 @@ class Module(MixedModule):
                 'get_referrers': 'referents.get_referrers',
                 '_get_stats': 'referents.get_stats',
                 '_dump_rpy_heap': 'referents._dump_rpy_heap',
+                'start_heap_profiling': 'heapprof.start_heap_profiling',
+                'stop_heap_profiling': 'heapprof.stop_heap_profiling',
+                'reset_heap_profile': 'heapprof.reset_heap_profile',
+                '_dump_heap_profile': 'heapprof._dump_heap_profile',
                 'get_typeids_z': 'referents.get_typeids_z',
                 'get_typeids_list': 'referents.get_typeids_list',
                 'GcRef': 'referents.W_GcRef',
@@ -1,6 +1,7 @@
 from rpython.rlib import rgc, jit_hooks
 from pypy.interpreter.baseobjspace import W_Root
-from pypy.interpreter.typedef import TypeDef, interp_attrproperty
+from pypy.interpreter.typedef import (TypeDef, interp_attrproperty,
+    GetSetProperty)
 from pypy.interpreter.gateway import unwrap_spec, interp2app
 from pypy.interpreter.error import oefmt, wrap_oserror
 from rpython.rlib.objectmodel import we_are_translated
@@ -192,6 +193,21 @@ class W_GcStats(W_Root):
         self.peak_rawmalloced_memory = rgc.get_stats(rgc.PEAK_RAWMALLOCED_MEMORY)
         self.nursery_size = rgc.get_stats(rgc.NURSERY_SIZE)
         self.total_gc_time = rgc.get_stats(rgc.TOTAL_GC_TIME)
+        self.max_pause = rgc.get_stats(rgc.MAX_PAUSE)
+        self.pause_histogram = get_pause_histogram()
+
+    def descr_get_pause_histogram(self, space):
+        return newtuple_of_ints(space, self.pause_histogram)
+
+    def descr_get_pause_limits(self, space):
+        return newtuple_of_ints(space, list(rgc.GC_PAUSE_LIMITS))
+
+def get_pause_histogram():
+    return [rgc.get_stats(rgc.GC_PAUSE_HISTOGRAM + i)
+            for i in range(len(rgc.GC_PAUSE_LIMITS) + 1)]
+
+def newtuple_of_ints(space, lst):
+    return space.newtuple([space.newint(x) for x in lst])
 
 W_GcStats.typedef = TypeDef("GcStats",
     total_memory_pressure=interp_attrproperty("total_memory_pressure",
@@ -220,6 +236,10 @@ W_GcStats.typedef = TypeDef("GcStats",
         cls=W_GcStats, wrapfn="newint"),
     total_gc_time=interp_attrproperty("total_gc_time",
         cls=W_GcStats, wrapfn="newint"),
+    max_pause=interp_attrproperty("max_pause",
+        cls=W_GcStats, wrapfn="newint"),
+    pause_histogram=GetSetProperty(W_GcStats.descr_get_pause_histogram),
+    pause_limits=GetSetProperty(W_GcStats.descr_get_pause_limits),
 )
 
 @unwrap_spec(memory_pressure=bool)
@@ -0,0 +1,144 @@
+import os
+import pytest
+from rpython.tool.udir import udir
+from pypy.module.gc.heapprof import HeapProfiler, RawSignedIndex
+from pypy.module.gc.hook import LowLevelGcHooks
+from pypy.tool.gcdump import HeapProfile
+
+
+def test_raw_signed_index():
+    import random
+    index = RawSignedIndex()
+    assert index.get(5) == -1
+    index.remove(5)
+    expected = {}
+    r = random.Random(42)
+    for i in range(5000):
+        key = r.randrange(300)
+        if r.random() < 0.4:
+            index.remove(key)
+            expected.pop(key, None)
+        else:
+            index.set(key, i)
+            expected[key] = i
+        assert index.count == len(expected)
+    for key in range(300):
+        assert index.get(key) == expected.get(key, -1)
+    index.clear()
+    assert index.get(0) == -1
+
+
+class TestHeapProfiler(object):
+
+    def dump_and_load(self, profiler, name):
+        filename = str(udir.join(name))
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+        try:
+            profiler.dump(fd)
+        finally:
+            os.close(fd)
+        profile = HeapProfile()
+        profile.load_profile(filename)
+        return profile
+
+    def test_samples(self, space):
+        profiler = HeapProfiler(space)
+        profiler.start(1024)
+        for i in range(5):
+            profiler.record_allocation(i, 16 * (i + 1))
+        assert profiler.samples == 5
+        profiler.record_promoted(1, 42)
+        profiler.record_promoted(3, 43)
+        profiler.record_freed(0, 41)       # died young
+        profiler.record_freed(2, 41)       # died young
+        assert profiler.died_young == 2
+        profile = self.dump_and_load(profiler, 'heapprof1')
+        assert profile.interval == 1024
+        assert sorted(profile.live) == [1, 3]
+        assert profile.live[1][:2] == (32, 42)
+        assert profile.live[3][:2] == (64, 43)
+        #
+        profiler.record_freed(1, 42)       # promoted, then died
+        profile2 = self.dump_and_load(profiler, 'heapprof2')
+        assert sorted(profile2.live) == [3]
+        sites = profile2.summarize_sites(previous=profile)
+        [(count, size)] = [stat for (typenum, stack), stat in sites.items()
+                           if typenum == 42]
+        assert count == -1
+        assert size == -1024
+        profiler.reset()
+        assert profiler.samples == 0
+        profile3 = self.dump_and_load(profiler, 'heapprof3')
+        assert profile3.live == {}
+
+    def test_freed_samples_leave_the_log(self, space):
+        profiler = HeapProfiler(space)
+        profiler.start(1024)
+        profiler.record_allocation(0, 16)
+        profiler.record_promoted(0, 42)
+        length = profiler.log.length
+        for i in range(1, 1000):
+            profiler.record_allocation(i, 16)
+            profiler.record_promoted(i, 42)
+            profiler.record_freed(i, 42)
+            assert profiler.log.length <= 3 * length
+        profiler.record_freed(12345, 42)     # unknown, ignored
+        profile = self.dump_and_load(profiler, 'heapprof4')
+        assert sorted(profile.live) == [0]
+        assert profiler.log.length == length
+        profiler.record_freed(0, 42)
+        assert profiler.log.length == 0
+        assert profiler.log_index.count == 0
+        profiler.reset()
+
+    def test_many_samples(self, space):
+        profiler = HeapProfiler(space)
+        profiler.start(1024)
+        for i in range(2000):
+            profiler.record_allocation(i, 16)
+        for i in range(0, 2000, 2):
+            profiler.record_promoted(i, 42)
+        for i in range(1, 2000, 2):
+            profiler.record_freed(i, 42)
+        assert profiler.young.length == 0
+        assert profiler.young_index.count == 0
+        for i in range(0, 2000, 4):
+            profiler.record_freed(i, 42)
+        assert profiler.log_index.count == 500
+        profile = self.dump_and_load(profiler, 'heapprof5')
+        assert sorted(profile.live) == range(2, 2000, 4)
+        profiler.reset()
+
+    def test_interval_from_hooks(self, space):
+        gchooks = space.fromcache(LowLevelGcHooks)
+        assert gchooks.allocation_sample_interval() == 0
+        profiler = space.fromcache(HeapProfiler)
+        profiler.start(4096)
+        try:
+            assert gchooks.allocation_sample_interval() == 4096
+            gchooks.fire_gc_allocation_sample(7, 48)
+            gchooks.fire_gc_sample_promoted(7, 12)
+            assert profiler.log.length > 0
+        finally:
+            profiler.stop()
+            profiler.reset()
+        assert gchooks.allocation_sample_interval() == 0
+
+
+class AppTestHeapProfiler(object):
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            pytest.skip("these tests cannot work with -A")
+        cls.w_filename = cls.space.wrap(str(udir.join('heapprof_app')))
+
+    def test_start_stop_dump(self):
+        import gc
+        raises(ValueError, gc.start_heap_profiling, 0)
+        gc.start_heap_profiling(1024)
+        gc.stop_heap_profiling()
+        gc.dump_heap_profile(self.filename)
+        with open(self.filename, 'rb') as f:
+            data = f.read()
+        assert len(data) >= 3 * 4
+        gc.reset_heap_profile()
@@ -12,26 +12,29 @@ class AppTestGcHooks(object):
         space = cls.space
         gchooks = space.fromcache(LowLevelGcHooks)
 
-        @unwrap_spec(ObjSpace, int, r_uint, int)
-        def fire_gc_minor(space, duration, total_memory_used, pinned_objects):
-            gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects)
+        @unwrap_spec(ObjSpace, int, r_uint, int, int, int)
+        def fire_gc_minor(space, duration, total_memory_used, pinned_objects,
+                          nursery_size=0, surviving_bytes=0):
+            gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects,
+                                  nursery_size, surviving_bytes)
 
         @unwrap_spec(ObjSpace, int, int, int)
         def fire_gc_collect_step(space, duration, oldstate, newstate):
             gchooks.fire_gc_collect_step(duration, oldstate, newstate)
 
-        @unwrap_spec(ObjSpace, int, int, int, r_uint, r_uint, r_uint)
-        def fire_gc_collect(space, a, b, c, d, e, f):
-            gchooks.fire_gc_collect(a, b, c, d, e, f)
+        @unwrap_spec(ObjSpace, int, int, int, r_uint, r_uint, r_uint,
+                     float, float)
+        def fire_gc_collect(space, a, b, c, d, e, f, g=0.0, h=0.0):
+            gchooks.fire_gc_collect(a, b, c, d, e, f, g, h)
 
         @unwrap_spec(ObjSpace)
         def fire_many(space):
-            gchooks.fire_gc_minor(5.0, 0, 0)
-            gchooks.fire_gc_minor(7.0, 0, 0)
+            gchooks.fire_gc_minor(5.0, 0, 0, 4096, 100)
+            gchooks.fire_gc_minor(7.0, 0, 0, 8192, 200)
             gchooks.fire_gc_collect_step(5.0, 0, 0)
             gchooks.fire_gc_collect_step(15.0, 0, 0)
             gchooks.fire_gc_collect_step(22.0, 0, 0)
-            gchooks.fire_gc_collect(1, 2, 3, 4, 5, 6)
+            gchooks.fire_gc_collect(1, 2, 3, 4, 5, 6, 7.0, 8.0)
 
         cls.w_fire_gc_minor = space.wrap(interp2app(fire_gc_minor))
         cls.w_fire_gc_collect_step = space.wrap(interp2app(fire_gc_collect_step))
@@ -103,20 +106,22 @@ class AppTestGcHooks(object):
                         stats.arenas_count_after,
                         stats.arenas_bytes,
                         stats.rawmalloc_bytes_before,
-                        stats.rawmalloc_bytes_after))
+                        stats.rawmalloc_bytes_after,
+                        stats.duration_marking,
+                        stats.duration_sweeping))
         gc.hooks.on_gc_collect = on_gc_collect
-        self.fire_gc_collect(1, 2, 3, 4, 5, 6)
-        self.fire_gc_collect(7, 8, 9, 10, 11, 12)
+        self.fire_gc_collect(1, 2, 3, 4, 5, 6, 0.5, 1.5)
+        self.fire_gc_collect(7, 8, 9, 10, 11, 12, 2.5, 3.5)
         assert lst == [
-            (1, 1, 2, 3, 4, 5, 6),
-            (1, 7, 8, 9, 10, 11, 12),
+            (1, 1, 2, 3, 4, 5, 6, 0.5, 1.5),
+            (1, 7, 8, 9, 10, 11, 12, 2.5, 3.5),
             ]
         #
         gc.hooks.on_gc_collect = None
-        self.fire_gc_collect(42, 42, 42, 42, 42, 42)  # won't fire
+        self.fire_gc_collect(42, 42, 42, 42, 42, 42, 42.0, 42.0) # won't fire
         assert lst == [
-            (1, 1, 2, 3, 4, 5, 6),
-            (1, 7, 8, 9, 10, 11, 12),
+            (1, 1, 2, 3, 4, 5, 6, 0.5, 1.5),
+            (1, 7, 8, 9, 10, 11, 12, 2.5, 3.5),
             ]
 
     def test_consts(self):
@@ -139,7 +144,9 @@ class AppTestGcHooks(object):
 
             def on_gc_minor(self, stats):
                 self.minors.append((stats.count, stats.duration,
-                                    stats.duration_min, stats.duration_max))
+                                    stats.duration_min, stats.duration_max,
+                                    stats.nursery_size,
+                                    stats.surviving_bytes))
 
             def on_gc_collect_step(self, stats):
                 self.steps.append((stats.count, stats.duration,
@@ -150,7 +157,8 @@ class AppTestGcHooks(object):
         myhooks = MyHooks()
         gc.hooks.set(myhooks)
         self.fire_many()
-        assert myhooks.minors == [(2, 12, 5, 7)]
+        # 'nursery_size' is the last one, 'surviving_bytes' is the sum
+        assert myhooks.minors == [(2, 12, 5, 7, 8192, 300)]
         assert myhooks.steps == [(3, 42, 5, 22)]
 
     def test_clear_queue(self):
@@ -2,7 +2,7 @@
 Implementation of the interpreter-level default import logic.
 """
 
-import sys, os, stat
+import sys, os, stat, time
 
 from pypy.interpreter.module import Module
 from pypy.interpreter.gateway import interp2app, unwrap_spec
@@ -81,20 +81,22 @@ def has_init_module(space, filepart):
         return True
     return False
 
-def find_modtype(space, filepart):
+def find_modtype(space, filepart, names=None, partname=None):
     """Check which kind of module to import for the given filepart,
     which is a path without extension.  Returns PY_SOURCE, PY_COMPILED or
-    SEARCH_ERROR.
+    SEARCH_ERROR.  If 'names' is not None, it is the listing of the
+    directory of filepart, given by the DirectoryCache, and 'partname' is
+    the last part of filepart.
     """
     # check the .py file
     pyfile = filepart + ".py"
-    if file_exists(pyfile):
+    if may_exist(space, names, partname, ".py") and file_exists(pyfile):
         return PY_SOURCE, ".py", "U"
 
     # on Windows, also check for a .pyw file
     if _WIN32:
         pyfile = filepart + ".pyw"
-        if file_exists(pyfile):
+        if may_exist(space, names, partname, ".pyw") and file_exists(pyfile):
             return PY_SOURCE, ".pyw", "U"
 
     # The .py file does not exist.  By default on PyPy, lonepycfiles
@@ -105,18 +107,87 @@ def find_modtype(space, filepart):
     # check the .pyc file
     if space.config.objspace.lonepycfiles:
         pycfile = filepart + ".pyc"
-        if file_exists(pycfile):
+        if may_exist(space, names, partname, ".pyc") and file_exists(pycfile):
             # existing .pyc file
             return PY_COMPILED, ".pyc", "rb"
 
     if has_so_extension(space):
         so_extension = get_so_extension(space)
         pydfile = filepart + so_extension
-        if file_exists(pydfile):
+        if (may_exist(space, names, partname, so_extension) and
+                file_exists(pydfile)):
             return C_EXTENSION, so_extension, "rb"
 
     return SEARCH_ERROR, None, None
 
+
+class DirectoryCache(object):
+    """The listings of the directories where modules are looked for (only
+    with the 'dircache' option).  Looking for a module tries several file
+    names in every directory of sys.path: the names that are not in the
+    listing of the directory are known not to exist without a syscall.  A
+    listing is read again when the mtime of its directory changes, and
+    imp.invalidate_caches() forgets them all.  The listings are keyed by
+    the device and inode of the directories, so that a relative path
+    doesn't give the listing of another directory after a chdir()."""
+
+    # a directory modified less than this many seconds ago might still be
+    # modified without its mtime changing: its listing is not kept
+    MTIME_GRANULARITY = 2.0
+
+    def __init__(self, space):
+        self.listings = {}     # {(st_dev, st_ino): (mtime, {name: True})}
+        self.saved = 0         # the stat() calls that were not made
+        self.spent = 0         # the stat() and listdir() calls of the cache
+
+    def clear(self):
+        self.listings.clear()
+
+    def getnames(self, path):
+        """Returns the names in the directory 'path' as a dict, or None if
+        they are not known: the files must then be checked one by one."""
+        if not path:
+            path = os.curdir
+        self.spent += 1
+        try:
+            st = os.stat(path)
+        except OSError:
+            return {}       # no file can be found there
+        if not stat.S_ISDIR(st.st_mode):
+            return {}
+        mtime = st.st_mtime
+        key = (st.st_dev, st.st_ino)
+        entry = self.listings.get(key, None)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        self.spent += 1
+        try:
+            listing = os.listdir(path)
+        except OSError:
+            return None     # e.g. a directory without read permission
+        names = {}
+        for name in listing:
+            names[name] = True
+        if time.time() - mtime > self.MTIME_GRANULARITY:
+            self.listings[key] = (mtime, names)
+        return names
+
+def get_dircache(space):
+    if not space.config.objspace.dircache:
+        return None
+    return space.fromcache(DirectoryCache)
+
+def may_exist(space, names, partname, suffix):
+    """False if the file partname + suffix is known not to be in the
+    directory listing 'names'."""
+    if names is None:
+        return True
+    assert partname is not None
+    if (partname + suffix) in names:
+        return True
+    space.fromcache(DirectoryCache).saved += 1
+    return False
+
 if sys.platform.startswith('linux') or 'freebsd' in sys.platform:
     def case_ok(filename):
         return True
@@ -565,6 +636,7 @@ def find_module(space, modulename, w_modulename, partname, w_path,
     #     when w_path is null
 
     if w_path is not None:
+        dircache = get_dircache(space)
         for w_pathitem in space.unpackiterable(w_path):
             # sys.path_hooks import hook
             if (w_lib_extensions is not None and
@@ -578,14 +650,19 @@ def find_module(space, modulename, w_modulename, partname, w_path,
             path = space.fsencode_w(w_pathitem)
             filepart = os.path.join(path, partname)
             log_pyverbose(space, 2, "# trying %s\n" % (filepart,))
-            if os.path.isdir(filepart) and case_ok(filepart):
+            names = None
+            if dircache is not None:
+                names = dircache.getnames(path)
+            if (may_exist(space, names, partname, "") and
+                    os.path.isdir(filepart) and case_ok(filepart)):
                 if has_init_module(space, filepart):
                     return FindInfo(PKG_DIRECTORY, filepart, None)
                 else:
                     msg = ("Not importing directory '%s' missing __init__.py" %
                            (filepart,))
                     space.warn(space.newtext(msg), space.w_ImportWarning)
-            modtype, suffix, filemode = find_modtype(space, filepart)
+            modtype, suffix, filemode = find_modtype(space, filepart,
+                                                     names, partname)
             try:
                 if modtype in (PY_SOURCE, PY_COMPILED, C_EXTENSION):
                     assert suffix is not None
@@ -186,3 +186,22 @@ def release_lock(space):
 def reinit_lock(space):
     if space.config.objspace.usemodules.thread:
         importing.getimportlock(space).reinit_lock()
+
+#__________________________________________________________________
+
+def invalidate_caches(space):
+    """Forget the cached directory listings of the import system.  Needed
+    after creating a module in a directory whose mtime does not change."""
+    dircache = importing.get_dircache(space)
+    if dircache is not None:
+        dircache.clear()
+
+def dircache_stats(space):
+    """Return a tuple (saved, spent): the number of stat() calls that the
+    directory listing cache of the import system avoided, and the number
+    of stat() and listdir() calls it made itself."""
+    dircache = importing.get_dircache(space)
+    if dircache is None:
+        return space.newtuple([space.newint(0), space.newint(0)])
+    return space.newtuple([space.newint(dircache.saved),
+                           space.newint(dircache.spent)])
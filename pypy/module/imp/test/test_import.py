@@ -853,6 +853,139 @@ class AppTestImport:
         import devnullpkg
 
 
+class TestDirectoryCache:
+    def test_getnames(self):
+        d = udir.ensure('dircache', dir=1)
+        d.join('x.py').write('')
+        os.utime(str(d), (1000000, 1000000))
+        cache = importing.DirectoryCache(self.space)
+        names = cache.getnames(str(d))
+        assert 'x.py' in names
+        assert 'y.py' not in names
+        assert cache.spent == 2
+        assert cache.getnames(str(d)) is names
+        assert cache.spent == 3
+        # a new file that doesn't change the mtime is not seen
+        d.join('y.py').write('')
+        os.utime(str(d), (1000000, 1000000))
+        assert 'y.py' not in cache.getnames(str(d))
+        os.utime(str(d), (1000010, 1000010))
+        assert 'y.py' in cache.getnames(str(d))
+        os.utime(str(d), (1000000, 1000000))
+        d.join('z.py').write('')
+        os.utime(str(d), (1000000, 1000000))
+        assert 'z.py' in cache.getnames(str(d))     # a different mtime
+        cache.clear()
+        assert cache.listings == {}
+
+    def test_recently_modified(self):
+        d = udir.ensure('dircache_recent', dir=1)
+        d.join('x.py').write('')
+        cache = importing.DirectoryCache(self.space)
+        assert 'x.py' in cache.getnames(str(d))
+        assert cache.listings == {}
+        # the mtime may not change when the directory is modified again
+        d.join('y.py').write('')
+        now = os.stat(str(d)).st_mtime
+        os.utime(str(d), (now, now))
+        assert 'y.py' in cache.getnames(str(d))
+        assert cache.spent == 4
+
+    def test_relative_path(self):
+        d1 = udir.ensure('dircache_cwd1', dir=1)
+        d2 = udir.ensure('dircache_cwd2', dir=1)
+        d1.join('x.py').write('')
+        d2.join('y.py').write('')
+        os.utime(str(d1), (1000000, 1000000))
+        os.utime(str(d2), (1000000, 1000000))
+        cache = importing.DirectoryCache(self.space)
+        old = d1.chdir()
+        try:
+            assert 'x.py' in cache.getnames('')
+            d2.chdir()
+            names = cache.getnames('')
+            assert 'y.py' in names
+            assert 'x.py' not in names
+        finally:
+            old.chdir()
+
+    def test_not_a_directory(self):
+        d = udir.ensure('dircache2', dir=1)
+        d.join('x.py').write('')
+        cache = importing.DirectoryCache(self.space)
+        assert cache.getnames(str(d.join('missing'))) == {}
+        assert cache.getnames(str(d.join('x.py'))) == {}
+        assert cache.listings == {}
+
+    def test_find_modtype(self):
+        space = self.space
+        d = udir.ensure('dircache3', dir=1)
+        d.join('x.py').write('')
+        cache = space.fromcache(importing.DirectoryCache)
+        names = cache.getnames(str(d))
+        saved = cache.saved
+        assert importing.find_modtype(space, str(d.join('x')), names,
+                                      'x')[0] == importing.PY_SOURCE
+        assert cache.saved == saved
+        assert importing.find_modtype(space, str(d.join('y')), names,
+                                      'y')[0] == importing.SEARCH_ERROR
+        assert cache.saved > saved
+
+
+class AppTestDirectoryCache:
+    spaceconfig = {"objspace.dircache": True}
+
+    def setup_class(cls):
+        d = udir.ensure('dircache_app', dir=1)
+        cls.w_tmpdir = cls.space.wrap(str(d))
+
+    def test_new_module(self):
+        import sys, imp, os
+        os.utime(self.tmpdir, (1000000, 1000000))
+        sys.path.insert(0, self.tmpdir)
+        try:
+            saved, spent = imp._dircache_stats()
+            raises(ImportError, "import dircache_mod")
+            saved1, spent1 = imp._dircache_stats()
+            assert saved1 > saved
+            assert spent1 > spent
+            with open(os.path.join(self.tmpdir, 'dircache_mod.py'), 'w') as f:
+                f.write('x = 42\n')
+            # pretend that the mtime did not change
+            os.utime(self.tmpdir, (1000000, 1000000))
+            raises(ImportError, "import dircache_mod")
+            imp.invalidate_caches()
+            import dircache_mod
+            assert dircache_mod.x == 42
+        finally:
+            sys.path.pop(0)
+            sys.modules.pop('dircache_mod', None)
+
+    def test_mtime_changes(self):
+        import sys, os
+        sys.path.insert(0, self.tmpdir)
+        try:
+            raises(ImportError, "import dircache_mod2")
+            with open(os.path.join(self.tmpdir, 'dircache_mod2.py'), 'w') as f:
+                f.write('x = 43\n')
+            os.utime(self.tmpdir, (2000000, 2000000))
+            import dircache_mod2
+            assert dircache_mod2.x == 43
+        finally:
+            sys.path.pop(0)
+            sys.modules.pop('dircache_mod2', None)
+
+
+class AppTestNoDirectoryCache:
+    spaceconfig = {"objspace.dircache": False}
+
+    def test_stats(self):
+        import imp
+        raises(ImportError, "import dircache_missing")
+        assert imp._dircache_stats() == (0, 0)
+        imp.invalidate_caches()
+
+
 class TestAbi:
     def test_abi_tag(self):
         space1 = maketestobjspace(make_config(None, soabi='TEST'))
@@ -4,7 +4,8 @@ from rpython.rlib.jit import JitHookInterface, Counters
 
 from pypy.interpreter.error import OperationError
 from pypy.module.pypyjit.interp_resop import (Cache, wrap_greenkey,
-    WrappedOp, W_JitLoopInfo, wrap_oplist)
+    WrappedOp, W_JitLoopInfo, wrap_oplist, unwrap_pycode)
+from pypy.module.pypyjit.warmupcache import WarmupCache
 
 class PyPyJitIface(JitHookInterface):
     def are_hooks_enabled(self):
@@ -83,4 +84,15 @@ class PyPyJitIface(JitHookInterface):
             finally:
                 cache.in_recursion = False
 
+    def on_loop_compiled(self, jitdriver, greenkey):
+        # not gated by are_hooks_enabled(): the warm-up cache alone
+        # should not make all the other hooks build their arguments
+        warmupcache = self.space.fromcache(WarmupCache)
+        if not warmupcache.is_enabled():
+            return
+        if jitdriver.name != 'pypyjit':
+            return
+        pycode = unwrap_pycode(greenkey[2])
+        warmupcache.record(pycode, greenkey[0].getint(), greenkey[1].getint())
+
 pypy_hooks = PyPyJitIface()
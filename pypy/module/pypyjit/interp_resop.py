@@ -30,6 +30,10 @@ class Cache(object):
         self.no += 1
         return self.no - 1
 
+def unwrap_pycode(box):
+    ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT), box.getref_base())
+    return cast_base_ptr_to_instance(PyCode, ll_code)
+
 def wrap_greenkey(space, jitdriver, greenkey, greenkey_repr):
     if greenkey is None:
         return space.w_None
@@ -37,9 +41,7 @@ def wrap_greenkey(space, jitdriver, greenkey, greenkey_repr):
     if jitdriver_name == 'pypyjit':
         next_instr = greenkey[0].getint()
         is_being_profiled = greenkey[1].getint()
-        ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
-                                         greenkey[2].getref_base())
-        pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+        pycode = unwrap_pycode(greenkey[2])
         return space.newtuple([pycode, space.newint(next_instr),
                                space.newbool(bool(is_being_profiled))])
     else:
@@ -348,10 +350,12 @@ W_JitLoopInfo.typedef.acceptable_as_base_class = False
 
 
 class W_JitInfoSnapshot(W_Root):
-    def __init__(self, space, w_times, w_counters, w_counter_times):
+    def __init__(self, space, w_times, w_counters, w_counter_times,
+                 w_code_memory):
         self.w_loop_run_times = w_times
         self.w_counters = w_counters
         self.w_counter_times = w_counter_times
+        self.w_code_memory = w_code_memory
 
 W_JitInfoSnapshot.typedef = TypeDef(
     "JitInfoSnapshot",
@@ -362,7 +366,12 @@ W_JitInfoSnapshot.typedef = TypeDef(
                                        doc="various JIT counters"),
     counter_times = interp_attrproperty_w("w_counter_times",
                                             cls=W_JitInfoSnapshot,
-                                            doc="various JIT timers")
+                                            doc="various JIT timers"),
+    code_memory = interp_attrproperty_w("w_code_memory",
+                                          cls=W_JitInfoSnapshot,
+                                          doc="size of the machine code kept "
+                                              "alive and evicted, and the "
+                                              "max_code_size budget")
 )
 W_JitInfoSnapshot.typedef.acceptable_as_base_class = False
 
@@ -388,7 +397,20 @@ def get_stats_snapshot(space):
     space.setitem_str(w_counter_times, 'TRACING', space.newfloat(tr_time))
     b_time = jit_hooks.stats_get_times_value(None, Counters.BACKEND)
     space.setitem_str(w_counter_times, 'BACKEND', space.newfloat(b_time))
-    return W_JitInfoSnapshot(space, w_times, w_counters, w_counter_times)
+    w_code_memory = space.newdict()
+    space.setitem_str(w_code_memory, 'max_code_size',
+                      space.newint(jit_hooks.stats_memmgr_max_code_size(None)))
+    space.setitem_str(w_code_memory, 'code_size',
+                      space.newint(jit_hooks.stats_memmgr_code_size(None)))
+    space.setitem_str(w_code_memory, 'alive_loops',
+                      space.newint(jit_hooks.stats_memmgr_alive_loops(None)))
+    space.setitem_str(w_code_memory, 'evicted_loops',
+                      space.newint(jit_hooks.stats_memmgr_evicted_loops(None)))
+    space.setitem_str(w_code_memory, 'evicted_code_size',
+                      space.newint(
+                          jit_hooks.stats_memmgr_evicted_code_size(None)))
+    return W_JitInfoSnapshot(space, w_times, w_counters, w_counter_times,
+                             w_code_memory)
 
 def get_stats_asmmemmgr(space):
     """Returns the raw memory currently used by the JIT backend,
@@ -13,6 +13,11 @@ class Module(MixedModule):
         'trace_next_iteration': 'interp_jit.trace_next_iteration',
         'trace_next_iteration_hash': 'interp_jit.trace_next_iteration_hash',
         'releaseall': 'interp_jit.releaseall',
+        'enable_warmup_cache': 'warmupcache.enable_warmup_cache',
+        'disable_warmup_cache': 'warmupcache.disable_warmup_cache',
+        'enable_profile_recording': 'warmupcache.enable_profile_recording',
+        'export_profile': 'warmupcache.export_profile',
+        'import_profile': 'warmupcache.import_profile',
         'set_compile_hook': 'interp_resop.set_compile_hook',
         'set_abort_hook': 'interp_resop.set_abort_hook',
         'set_trace_too_long_hook': 'interp_resop.set_trace_too_long_hook',
@@ -42,3 +47,8 @@ class Module(MixedModule):
         w_obj = space.wrap(PARAMETERS)
         space.setattr(self, space.newtext('defaults'), w_obj)
         pypy_hooks.space = space
+
+    def shutdown(self, space):
+        # write the loops recorded in the warm-up cache since the last batch
+        from pypy.module.pypyjit.warmupcache import WarmupCache
+        space.fromcache(WarmupCache).flush()
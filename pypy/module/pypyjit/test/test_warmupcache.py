@@ -0,0 +1,161 @@
+import os
+from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.jit.metainterp.history import ConstInt, ConstPtr
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+from rpython.tool.udir import udir
+from pypy.module.pypyjit.hooks import pypy_hooks
+from pypy.module.pypyjit.interp_jit import pypyjitdriver
+from pypy.module.pypyjit.warmupcache import WarmupCache, code_key
+from pypy.module.pypyjit.warmupcache import bytecode_hash
+
+
+def test_bytecode_hash():
+    # the values of FNV-1a, which do not depend on the process
+    assert bytecode_hash('') == intmask(r_uint(0x811c9dc5))
+    assert bytecode_hash('a') == intmask(r_uint(0xe40c292c))
+    assert bytecode_hash('foobar') == intmask(r_uint(0xbf9cf968))
+
+
+class TestWarmupCache(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def make_code(self, space, source):
+        w_f = space.appexec([space.newtext(source)], """(source):
+            d = {}
+            exec source in d
+            return d['f']
+        """)
+        return w_f.code
+
+    def test_record_and_load(self, space):
+        filename = str(udir.join('test_warmupcache_1'))
+        code = self.make_code(space, "def f(n):\n"
+                                     "    while n: n -= 1")
+        cache = WarmupCache(space)
+        cache.enable(filename)
+        assert cache.pending == {}
+        cache.record(code, 6, 0)
+        cache.record(code, 6, 0)      # already recorded
+        cache.record(code, 3, 1)
+        cache.disable()
+        lines = open(filename).read().splitlines()
+        key = code_key(code)
+        assert lines == ['6\t0\t' + key, '3\t1\t' + key]
+        #
+        seen = []
+        cache = WarmupCache(space)
+        cache._trace_next_iteration = (
+            lambda pycode, next_instr, is_being_profiled:
+                seen.append((pycode, next_instr, is_being_profiled)))
+        cache.enable(filename)
+        assert cache.pending == {key: [6, 0, 3, 1]}
+        cache.new_code(code)
+        assert seen == [(code, 6, 0), (code, 3, 1)]
+        del seen[:]
+        other = self.make_code(space, "def f(n):\n"
+                                      "    return n")
+        cache.new_code(other)
+        assert seen == []
+        cache.record(code, 6, 0)      # loaded from the file
+        cache.disable()
+        assert len(open(filename).read().splitlines()) == 2
+
+    def test_record_in_batches(self, space):
+        filename = str(udir.join('test_warmupcache_4'))
+        code = self.make_code(space, "def f(n):\n"
+                                     "    while n: n -= 1")
+        cache = WarmupCache(space)
+        cache.FLUSH_BATCH = 3
+        cache.enable(filename)
+        cache.record(code, 2, 0)
+        cache.record(code, 4, 0)
+        assert not os.path.exists(filename)    # not written yet
+        cache.record(code, 6, 0)
+        assert len(open(filename).read().splitlines()) == 3
+        cache.record(code, 8, 0)
+        assert len(open(filename).read().splitlines()) == 3
+        cache.flush()
+        assert len(open(filename).read().splitlines()) == 4
+        cache.record(code, 10, 0)
+        cache.disable()
+        assert len(open(filename).read().splitlines()) == 5
+
+    def test_code_key_escaped(self, space):
+        filename = str(udir.join('test_warmupcache_3'))
+        code = self.make_code(space, "def f(n):\n"
+                                     "    while n: n -= 1")
+        code.co_filename = 'a\tb\nc\\t'
+        key = code_key(code)
+        assert key.endswith('\tf\ta\\tb\\nc\\\\t')
+        cache = WarmupCache(space)
+        cache.enable(filename)
+        cache.record(code, 6, 0)
+        cache.disable()
+        assert open(filename).read() == '6\t0\t%s\n' % (key,)
+        cache.enable(filename)
+        assert cache.pending == {key: [6, 0]}
+        cache.disable()
+
+    def test_new_code_hook(self, space):
+        filename = str(udir.join('test_warmupcache_2'))
+        source = "def f(n):\n    return n + 1"
+        code = self.make_code(space, source)
+        with open(filename, 'w') as f:
+            f.write('0\t0\t%s\n' % (code_key(code),))
+        cache = space.fromcache(WarmupCache)
+        seen = []
+        cache._trace_next_iteration = (
+            lambda pycode, next_instr, is_being_profiled:
+                seen.append((pycode.co_name, next_instr)))
+        cache.enable(filename)
+        try:
+            # the cache does not enable the other jit hooks
+            assert not pypy_hooks.are_hooks_enabled()
+            code2 = self.make_code(space, source)
+            assert seen == [('f', 0)]
+            #
+            # the new loops are recorded
+            greenkey = [ConstInt(4), ConstInt(0),
+                        ConstPtr(cast_instance_to_gcref(code2))]
+            pypy_hooks.on_loop_compiled(pypyjitdriver, greenkey)
+        finally:
+            cache.disable()
+            del cache._trace_next_iteration
+        assert not cache.is_enabled()
+        lines = open(filename).read().splitlines()
+        assert lines[-1] == '4\t0\t' + code_key(code2)
+
+    def test_export_import(self, space):
+        code = self.make_code(space, "def f(n):\n"
+                                     "    while n > 1: n -= 2")
+        cache = WarmupCache(space)
+        cache.record(code, 8, 0)
+        assert cache.export_profile() == ''    # not recording
+        cache.start_recording()
+        assert cache.is_enabled()
+        cache.record(code, 8, 0)
+        cache.record(code, 2, 0)
+        data = cache.export_profile()
+        key = code_key(code)
+        assert data == '8\t0\t%s\n2\t0\t%s\n' % (key, key)
+        cache.disable()
+        #
+        # another process imports the profile: existing code objects are
+        # found in the heap, new ones get it when they are created
+        seen = []
+        cache = space.fromcache(WarmupCache)
+        cache._trace_next_iteration = (
+            lambda pycode, next_instr, is_being_profiled:
+                seen.append((pycode, next_instr)))
+        cache._existing_code_objects = lambda: [code]
+        try:
+            cache.import_profile(data)
+            assert seen == [(code, 8), (code, 2)]
+            del seen[:]
+            code2 = self.make_code(space, "def f(n):\n"
+                                          "    while n > 1: n -= 2")
+            assert seen == [(code2, 8), (code2, 2)]
+        finally:
+            cache.disable()
+            del cache._trace_next_iteration
+            del cache._existing_code_objects
@@ -0,0 +1,260 @@
+"""An on-disk cache of where the JIT compiled loops in previous runs.
+
+Every time a loop or an entry bridge is compiled, we record a line with
+the green key where it starts: the code object, identified by its
+filename, name, first line number and a hash of its bytecode, and the
+'next_instr' and 'is_being_profiled' green arguments.  The lines are kept
+in memory and appended to the cache file in batches, when the cache is
+disabled, and at shutdown, not on the compile path of every loop.
+
+When a process starts with the same cache file, we load it, and every
+code object that is created with a matching identity gets its counters
+almost at the threshold, for all the green keys that were compiled
+before.  This way, the loops are traced the first few times they run,
+instead of after 'threshold' iterations.
+
+This is not a cache of traces or of machine code: the next run still
+interprets the first iterations, traces the loops and compiles them
+again.  Only the warm-up counting before tracing is skipped.  Caching
+the traces would need a way to revalidate them in a new process, where
+the addresses and the quasi-immutable state they depend on are different.
+
+The same lines can also be exported from a warmed-up process and
+imported in other processes without going through a file, with
+export_profile() and import_profile(); in this case the code objects that
+already exist when importing are looked up in the heap.
+"""
+
+from rpython.rlib import jit_hooks, rgc
+from rpython.rlib.jit import dont_look_inside
+from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.streamio import open_file_as_stream, StreamErrors
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.pycode import CodeHookCache, PyCode
+
+
+def bytecode_hash(co_code):
+    """A 32-bit FNV-1a hash of the bytecode.  Unlike compute_hash(), it
+    does not depend on the hash function configured for strings, which
+    may be seeded randomly in every process."""
+    x = r_uint(0x811c9dc5)
+    for c in co_code:
+        x = ((x ^ r_uint(ord(c))) * r_uint(0x01000193)) & r_uint(0xffffffff)
+    return intmask(x)
+
+def _escape(s):
+    """Escape the tabs and newlines, which separate the fields and the
+    lines of the cache file, and the backslashes."""
+    if '\\' not in s and '\t' not in s and '\n' not in s:
+        return s
+    builder = StringBuilder(len(s) + 8)
+    for c in s:
+        if c == '\\':
+            builder.append('\\\\')
+        elif c == '\t':
+            builder.append('\\t')
+        elif c == '\n':
+            builder.append('\\n')
+        else:
+            builder.append(c)
+    return builder.build()
+
+def code_key(pycode):
+    """The identity of a code object, stable across processes."""
+    return '%d\t%d\t%s\t%s' % (bytecode_hash(pycode.co_code),
+                               pycode.co_firstlineno,
+                               _escape(pycode.co_name),
+                               _escape(pycode.co_filename))
+
+
+class WarmupCache(object):
+    # number of recorded lines that are written to the file together
+    FLUSH_BATCH = 64
+
+    def __init__(self, space):
+        self.space = space
+        self.recording = False
+        self.filename = None
+        # {code_key: [next_instr, is_being_profiled, ...]}
+        self.pending = {}
+        # the lines already in the file, to avoid writing them twice,
+        # in order
+        self.recorded = {}
+        self.recorded_lines = []
+        # the recorded lines not written to the file yet
+        self.unwritten_lines = []
+
+    def is_enabled(self):
+        return self.recording
+
+    def enable(self, filename):
+        self.disable()
+        self.recording = True
+        self.filename = filename
+        try:
+            stream = open_file_as_stream(filename, 'r')
+            try:
+                data = stream.readall()
+            finally:
+                stream.close()
+        except StreamErrors:
+            pass     # no cache file yet, or unreadable: start empty
+        else:
+            self._load_lines(data)
+        self.space.fromcache(CodeHookCache)._interp_code_hook = self
+
+    def start_recording(self):
+        self.recording = True
+
+    def disable(self):
+        self.flush()
+        self.recording = False
+        self.filename = None
+        self.pending.clear()
+        self.recorded.clear()
+        del self.recorded_lines[:]
+        self.space.fromcache(CodeHookCache)._interp_code_hook = None
+
+    def _load_lines(self, data):
+        for line in data.split('\n'):
+            self._load_line(line)
+
+    def _load_line(self, line):
+        # format: next_instr \t is_being_profiled \t code_key
+        parts = line.split('\t', 2)
+        if len(parts) != 3:
+            return
+        try:
+            next_instr = int(parts[0])
+            is_being_profiled = int(parts[1])
+        except ValueError:
+            return
+        self._add_recorded(line)
+        key = parts[2]
+        try:
+            entries = self.pending[key]
+        except KeyError:
+            entries = self.pending[key] = []
+        entries.append(next_instr)
+        entries.append(is_being_profiled)
+
+    @dont_look_inside
+    def new_code(self, pycode):
+        """Called when a code object is created."""
+        try:
+            entries = self.pending[code_key(pycode)]
+        except KeyError:
+            return
+        i = 0
+        while i < len(entries):
+            self._trace_next_iteration(pycode, entries[i], entries[i + 1])
+            i += 2
+
+    def _trace_next_iteration(self, pycode, next_instr, is_being_profiled):
+        ll_pycode = cast_instance_to_gcref(pycode)
+        jit_hooks.trace_next_iteration('pypyjit', r_uint(next_instr),
+                                       is_being_profiled, ll_pycode)
+
+    def record(self, pycode, next_instr, is_being_profiled):
+        """Called when a loop is compiled at the given green key."""
+        if not self.recording:
+            return
+        line = '%d\t%d\t%s' % (next_instr, is_being_profiled,
+                               code_key(pycode))
+        if line in self.recorded:
+            return
+        self._add_recorded(line)
+        if self.filename is None:
+            return
+        self.unwritten_lines.append(line)
+        if len(self.unwritten_lines) >= self.FLUSH_BATCH:
+            self.flush()
+
+    def flush(self):
+        """Append the recorded lines that are not written yet to the file."""
+        if not self.unwritten_lines:
+            return
+        data = ''.join([line + '\n' for line in self.unwritten_lines])
+        del self.unwritten_lines[:]
+        filename = self.filename
+        if filename is None:
+            return
+        try:
+            stream = open_file_as_stream(filename, 'a')
+            try:
+                stream.write(data)
+            finally:
+                stream.close()
+        except StreamErrors:
+            pass     # the cache is only a hint, ignore errors
+
+    def _add_recorded(self, line):
+        if line not in self.recorded:
+            self.recorded[line] = None
+            self.recorded_lines.append(line)
+
+    def export_profile(self):
+        return ''.join([line + '\n' for line in self.recorded_lines])
+
+    def import_profile(self, data):
+        self._load_lines(data)
+        self.space.fromcache(CodeHookCache)._interp_code_hook = self
+        for pycode in self._existing_code_objects():
+            self.new_code(pycode)
+
+    def _existing_code_objects(self):
+        if not rgc.has_gcflag_extra():
+            return []
+        return rgc.do_get_objects(_try_cast_gcref_to_pycode)
+
+
+def _try_cast_gcref_to_pycode(gcref):
+    if rgc.get_gcflag_dummy(gcref):
+        return None
+    return rgc.try_cast_gcref_to_instance(PyCode, gcref)
+
+
+@unwrap_spec(filename='fsencode')
+def enable_warmup_cache(space, filename):
+    """enable_warmup_cache(filename)
+
+    Record in the given file the green keys of the loops that are
+    compiled from now on; and if the file exists, make the JIT trace
+    early the loops that were recorded in it by previous runs, as
+    soon as their code object is created.  The PYPY_JIT_CACHE
+    environment variable calls this function at startup.
+    """
+    space.fromcache(WarmupCache).enable(filename)
+
+def disable_warmup_cache(space):
+    """Stop using the file given to enable_warmup_cache(), and stop
+    recording the compiled loops."""
+    space.fromcache(WarmupCache).disable()
+
+def enable_profile_recording(space):
+    """Start recording the green keys of the loops that are compiled
+    from now on, for export_profile()."""
+    space.fromcache(WarmupCache).start_recording()
+
+def export_profile(space):
+    """export_profile() -> bytes
+
+    Return the green keys of the loops compiled since
+    enable_profile_recording() or enable_warmup_cache() was called, in a
+    format suitable for import_profile() in another process.
+    """
+    return space.newbytes(space.fromcache(WarmupCache).export_profile())
+
+@unwrap_spec(data='bytes')
+def import_profile(space, data):
+    """import_profile(data)
+
+    Make the JIT trace early the loops listed in 'data', a string returned
+    by export_profile() in another process.  This applies both to the code
+    objects that already exist and to the ones created later.  Typically
+    called in the master process of a pre-fork pool before the workers are
+    forked, or in each worker just after it starts.
+    """
+    space.fromcache(WarmupCache).import_profile(data)
@@ -174,9 +174,24 @@ def pypy_find_stdlib(space, executable):
     w_prefix = space.newtext(prefix)
     space.setitem(space.sys.w_dict, space.newtext('prefix'), w_prefix)
     space.setitem(space.sys.w_dict, space.newtext('exec_prefix'), w_prefix)
+    if space.config.objspace.preimportmodules:
+        fix_preimported_paths(space, prefix)
     return space.newlist([space.newtext(p) for p in path])
 
 
+def fix_preimported_paths(space, prefix):
+    """Point the __file__ and __path__ of the modules imported at
+    translation time to the stdlib found in 'prefix'."""
+    for name, w_module, relpath in get_state(space).preimported:
+        filename = os.path.join(prefix, relpath)
+        space.setattr(w_module, space.newtext('__file__'),
+                      space.newtext(filename))
+        if os.path.basename(relpath).startswith('__init__.'):
+            w_dirname = space.newtext(os.path.dirname(filename))
+            space.setattr(w_module, space.newtext('__path__'),
+                          space.newlist([w_dirname]))
+
+
 # ____________________________________________________________
 
 
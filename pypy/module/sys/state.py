@@ -14,6 +14,9 @@ class State:
         self.w_modules = space.newdict(module=True)
         self.w_warnoptions = space.newlist([])
         self.w_argv = space.newlist([])
+        # (name, w_module, relpath) of the modules imported at translation
+        # time, see pypy/goal/targetpypystandalone.py
+        self.preimported = []
 
         self.setinitialpath(space)
 
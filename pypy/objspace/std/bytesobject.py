@@ -59,6 +59,21 @@ class W_AbstractBytesObject(W_Root):
     def convert_to_w_unicode(self, space):
         return unicode_from_string(space, self)
 
+    def descr_getbuffer(self, space, w_flags):
+        #from pypy.objspace.std.bufferobject import W_Buffer
+        #return W_Buffer(StringBuffer(self._value))
+        return self
+
+    def descr_formatter_parser(self, space):
+        from pypy.objspace.std.newformat import str_template_formatter
+        tformat = str_template_formatter(space, space.bytes_w(self))
+        return tformat.formatter_parser()
+
+    def descr_formatter_field_name_split(self, space):
+        from pypy.objspace.std.newformat import str_template_formatter
+        tformat = str_template_formatter(space, space.bytes_w(self))
+        return tformat.formatter_field_name_split()
+
     def descr_add(self, space, w_other):
         """x.__add__(y) <==> x+y"""
 
@@ -468,11 +483,6 @@ class W_BytesObject(W_AbstractBytesObject):
         raise oefmt(space.w_TypeError,
                     "Cannot use string as modifiable buffer")
 
-    def descr_getbuffer(self, space, w_flags):
-        #from pypy.objspace.std.bufferobject import W_Buffer
-        #return W_Buffer(StringBuffer(self._value))
-        return self
-
     charbuf_w = str_w
 
     def listview_bytes(self):
@@ -502,7 +512,7 @@ class W_BytesObject(W_AbstractBytesObject):
     @staticmethod
     def _use_rstr_ops(space, w_other):
         from pypy.objspace.std.unicodeobject import W_UnicodeObject
-        return (isinstance(w_other, W_BytesObject) or
+        return (isinstance(w_other, W_AbstractBytesObject) or
                 isinstance(w_other, W_UnicodeObject))
 
     @staticmethod
@@ -616,34 +626,50 @@ class W_BytesObject(W_AbstractBytesObject):
 
     def descr_eq(self, space, w_other):
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            return self._compare_other_eq(space, w_other)
         return space.newbool(self._value == w_other._value)
 
     def descr_ne(self, space, w_other):
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            return self._compare_other_ne(space, w_other)
         return space.newbool(self._value != w_other._value)
 
     def descr_lt(self, space, w_other):
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            return self._compare_other_gt(space, w_other)
         return space.newbool(self._value < w_other._value)
 
     def descr_le(self, space, w_other):
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            return self._compare_other_ge(space, w_other)
         return space.newbool(self._value <= w_other._value)
 
     def descr_gt(self, space, w_other):
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            return self._compare_other_lt(space, w_other)
         return space.newbool(self._value > w_other._value)
 
     def descr_ge(self, space, w_other):
         if not isinstance(w_other, W_BytesObject):
-            return space.w_NotImplemented
+            return self._compare_other_le(space, w_other)
         return space.newbool(self._value >= w_other._value)
 
+    # the other string can be a rope, see ropeobject.py: it knows how to
+    # do the reflected comparison
+    def _make_compare_other(refl):
+        def _compare_other(self, space, w_other):
+            if not isinstance(w_other, W_AbstractBytesObject):
+                return space.w_NotImplemented
+            return getattr(w_other, 'descr_' + refl)(space, self)
+        return _compare_other
+    _compare_other_eq = _make_compare_other('eq')
+    _compare_other_ne = _make_compare_other('ne')
+    _compare_other_lt = _make_compare_other('lt')
+    _compare_other_le = _make_compare_other('le')
+    _compare_other_gt = _make_compare_other('gt')
+    _compare_other_ge = _make_compare_other('ge')
+    del _make_compare_other
+
     # auto-conversion fun
 
     _StringMethods_descr_add = descr_add
@@ -657,6 +683,10 @@ class W_BytesObject(W_AbstractBytesObject):
             from .bytearrayobject import W_BytearrayObject, _make_data
             self_as_bytearray = W_BytearrayObject(_make_data(self._value))
             return space.add(self_as_bytearray, w_other)
+        elif (space.config.objspace.std.withrope and
+                isinstance(w_other, W_AbstractBytesObject)):
+            from pypy.objspace.std.ropeobject import concatenate
+            return concatenate(space, self, w_other)
         return self._StringMethods_descr_add(space, w_other)
 
     _StringMethods__startswith = _startswith
@@ -819,15 +849,6 @@ class W_BytesObject(W_AbstractBytesObject):
     def descr_upper(self, space):
         return W_BytesObject(self._value.upper())
 
-    def descr_formatter_parser(self, space):
-        from pypy.objspace.std.newformat import str_template_formatter
-        tformat = str_template_formatter(space, space.bytes_w(self))
-        return tformat.formatter_parser()
-
-    def descr_formatter_field_name_split(self, space):
-        from pypy.objspace.std.newformat import str_template_formatter
-        tformat = str_template_formatter(space, space.bytes_w(self))
-        return tformat.formatter_field_name_split()
 
 
 def _create_list_from_bytes(value):
@@ -905,17 +926,18 @@ W_BytesObject.typedef = TypeDef(
     translate = interpindirect2app(W_AbstractBytesObject.descr_translate),
     upper = interpindirect2app(W_AbstractBytesObject.descr_upper),
     zfill = interpindirect2app(W_AbstractBytesObject.descr_zfill),
-    __buffer__ = interp2app(W_BytesObject.descr_getbuffer),
+    __buffer__ = interp2app(W_AbstractBytesObject.descr_getbuffer),
 
-    format = interpindirect2app(W_BytesObject.descr_format),
-    __format__ = interpindirect2app(W_BytesObject.descr__format__),
-    __mod__ = interpindirect2app(W_BytesObject.descr_mod),
-    __rmod__ = interpindirect2app(W_BytesObject.descr_rmod),
+    format = interpindirect2app(W_AbstractBytesObject.descr_format),
+    __format__ = interpindirect2app(W_AbstractBytesObject.descr__format__),
+    __mod__ = interpindirect2app(W_AbstractBytesObject.descr_mod),
+    __rmod__ = interpindirect2app(W_AbstractBytesObject.descr_rmod),
     __getnewargs__ = interpindirect2app(
         W_AbstractBytesObject.descr_getnewargs),
-    _formatter_parser = interp2app(W_BytesObject.descr_formatter_parser),
-    _formatter_field_name_split =
-        interp2app(W_BytesObject.descr_formatter_field_name_split),
+    _formatter_parser = interp2app(
+        W_AbstractBytesObject.descr_formatter_parser),
+    _formatter_field_name_split = interp2app(
+        W_AbstractBytesObject.descr_formatter_field_name_split),
 )
 W_BytesObject.typedef.flag_sequence_bug_compat = True
 
@@ -1,8 +1,11 @@
 """The builtin dict implementation"""
 
+import math
+
 from rpython.rlib import jit, rerased, objectmodel, rutf8
 from rpython.rlib.debug import mark_dict_non_null
 from rpython.rlib.objectmodel import newlist_hint, r_dict, specialize
+from rpython.rlib.unroll import unrolling_iterable
 from rpython.tool.sourcetools import func_renamer, func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -12,6 +15,8 @@ from pypy.interpreter.gateway import (
 from pypy.interpreter.mixedmodule import MixedModule
 from pypy.interpreter.signature import Signature
 from pypy.interpreter.typedef import TypeDef
+from pypy.objspace.std.tuplekey import (TUPLE_KEY_TYPES,
+    make_tuple_key_mixin, never_equal_to_tuple, tuple_key_suffix)
 from pypy.objspace.std.util import negate
 
 
@@ -412,6 +417,7 @@ def _add_indirections():
                     length w_keys values items \
                     iterkeys itervalues iteritems \
                     listview_bytes listview_ascii listview_int \
+                    listview_float \
                     view_as_kwargs".split()
 
     def make_method(method):
@@ -587,6 +593,9 @@ class DictStrategy(object):
     def listview_int(self, w_dict):
         return None
 
+    def listview_float(self, w_dict):
+        return None
+
     def view_as_kwargs(self, w_dict):
         return (None, None)
 
@@ -675,6 +684,11 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif self.space.is_w(w_type, self.space.w_float):
+            self.switch_to_float_strategy(w_dict)
+        elif (self.space.config.objspace.std.withtuplekeys and
+                  self.space.is_w(w_type, self.space.w_tuple)):
+            self.switch_to_tuple_key_strategy(w_dict, w_key)
         elif w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -698,6 +712,22 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def switch_to_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(FloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
+    @jit.unroll_safe
+    def switch_to_tuple_key_strategy(self, w_dict, w_key):
+        for strategycls in unroll_tuple_key_strategies:
+            strategy = self.space.fromcache(strategycls)
+            if strategy.is_correct_type(w_key):
+                w_dict.set_strategy(strategy)
+                w_dict.dstorage = strategy.get_empty_storage()
+                return
+        self.switch_to_object_strategy(w_dict)
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -1334,6 +1364,70 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.newfloat(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        # a NaN is only found again by identity, which needs the boxed key
+        return (space.is_w(space.type(w_obj), space.w_float) and
+                not math.isnan(space.float_w(w_obj)))
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_bytes) or
+                space.is_w(w_lookup_type, space.w_unicode)
+                )
+
+    def listview_float(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def wrapkey(space, key):
+        return space.newfloat(key)
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_float(self.listview_float(w_dict))
+
+create_iterator_classes(FloatDictStrategy)
+
+
+def make_tuple_key_strategy(typetuple):
+    suffix = tuple_key_suffix(typetuple)
+
+    class TupleKeyDictStrategy(make_tuple_key_mixin(typetuple),
+                               AbstractTypedStrategy, DictStrategy):
+        erase, unerase = rerased.new_erasing_pair("tuplekey_" + suffix)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def get_empty_storage(self):
+            return self.erase({})
+
+        def _never_equal_to(self, w_lookup_type):
+            return never_equal_to_tuple(self.space, w_lookup_type)
+
+    TupleKeyDictStrategy.__name__ = 'TupleKeyDictStrategy_' + suffix
+    create_iterator_classes(TupleKeyDictStrategy)
+    return TupleKeyDictStrategy
+
+tuple_key_strategies = [make_tuple_key_strategy(typetuple)
+                        for typetuple in TUPLE_KEY_TYPES]
+unroll_tuple_key_strategies = unrolling_iterable(tuple_key_strategies)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
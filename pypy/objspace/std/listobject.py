@@ -15,8 +15,10 @@ from rpython.rlib import debug, jit, rerased, rutf8
 from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.objectmodel import (
     import_from_mixin, instantiate, newlist_hint, resizelist_hint, specialize)
-from rpython.rlib.rarithmetic import ovfcheck
+from rpython.rlib.rarithmetic import LONG_BIT, ovfcheck
 from rpython.rlib import longlong2float
+from rpython.rlib.unroll import unrolling_iterable
+from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.tool.sourcetools import func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -42,6 +44,9 @@ __all__ = ['W_ListObject', 'make_range_list', 'make_empty_list_with_size']
 
 UNROLL_CUTOFF = 5
 
+# lists shorter than this are always copied, even with 'withcopyonwritelists'
+COPY_ON_WRITE_CUTOFF = 32
+
 
 def make_range_list(space, start, step, length):
     if length <= 0:
@@ -87,6 +92,10 @@ def get_strategy_from_list_objects(space, list_w, sizehint):
                 check_int_or_float = (type(w_obj) is W_FloatObject)
                 break
         else:
+            if space.config.objspace.std.withnarrowintlists:
+                strategy = narrow_int_strategy_from_list(space, list_w)
+                if strategy is not None:
+                    return strategy
             return space.fromcache(IntegerListStrategy)
 
     elif type(w_firstobj) is W_BytesObject:
@@ -243,6 +252,15 @@ class W_ListObject(W_Root):
                 self.space, storage, strategy)
         return w_objectlist
 
+    def _temporarily_unshared(self):
+        """Returns self, or a copy of self if it uses one of the
+        copy-on-write strategies. The strategies only know how to extend
+        or set a slice from lists that use the plain strategies."""
+        strategy = self.strategy
+        if isinstance(strategy, BaseCopyOnWriteListStrategy):
+            return strategy.unshared_copy(self)
+        return self
+
     def convert_to_cpy_strategy(self, space):
         from pypy.module.cpyext.sequence import CPyListStorage, CPyListStrategy
 
@@ -276,6 +294,11 @@ class W_ListObject(W_Root):
         with the same strategy and a copy of the storage"""
         return self.strategy.clone(self)
 
+    def unshared_copy(self):
+        """Returns a copy that doesn't share its storage with this list,
+        for the callers that modify the copy at once"""
+        return self.strategy.unshared_copy(self)
+
     def _resize_hint(self, hint):
         """Ensure the underlying list has room for at least hint
         elements without changing the len() of the list"""
@@ -385,6 +408,8 @@ class W_ListObject(W_Root):
         """Sets the slice of the list from start to start+step*slicelength to
         the sequence sequence_w.
         Used by setslice and setitem."""
+        if not self.strategy.is_empty_strategy():
+            sequence_w = sequence_w._temporarily_unshared()
         self.strategy.setslice(self, start, step, slicelength, sequence_w)
 
     def insert(self, index, w_item):
@@ -500,7 +525,7 @@ class W_ListObject(W_Root):
     def descr_add(self, space, w_list2):
         if not isinstance(w_list2, W_ListObject):
             return space.w_NotImplemented
-        w_clone = self.clone()
+        w_clone = self.unshared_copy()
         w_clone.extend(w_list2)
         return w_clone
 
@@ -767,6 +792,9 @@ class ListStrategy(object):
     def clone(self, w_list):
         raise NotImplementedError
 
+    def unshared_copy(self, w_list):
+        return self.clone(w_list)
+
     def copy_into(self, w_list, w_other):
         raise NotImplementedError
 
@@ -819,7 +847,7 @@ class ListStrategy(object):
         raise NotImplementedError
 
     def mul(self, w_list, times):
-        w_newlist = w_list.clone()
+        w_newlist = w_list.unshared_copy()
         w_newlist.inplace_mul(times)
         return w_newlist
 
@@ -848,6 +876,8 @@ class ListStrategy(object):
         space = self.space
         if type(w_any) is W_ListObject or (isinstance(w_any, W_ListObject) and
                                            space._uses_list_iter(w_any)):
+            if not self.is_empty_strategy():
+                w_any = w_any._temporarily_unshared()
             self._extend_from_list(w_list, w_any)
         elif space.is_generator(w_any):
             w_any.unpack_into_w(w_list)
@@ -946,7 +976,12 @@ class EmptyListStrategy(ListStrategy):
 
     def switch_to_correct_strategy(self, w_list, w_item):
         if type(w_item) is W_IntObject:
-            strategy = self.space.fromcache(IntegerListStrategy)
+            strategy = None
+            if self.space.config.objspace.std.withnarrowintlists:
+                value = w_item.int_w(self.space)
+                strategy = narrow_int_strategy(self.space, value, value)
+            if strategy is None:
+                strategy = self.space.fromcache(IntegerListStrategy)
         elif type(w_item) is W_BytesObject:
             strategy = self.space.fromcache(BytesListStrategy)
         elif type(w_item) is W_UnicodeObject and w_item.is_ascii():
@@ -1011,6 +1046,12 @@ class EmptyListStrategy(ListStrategy):
 
         intlist = space.unpackiterable_int(w_iterable)
         if intlist is not None:
+            if space.config.objspace.std.withnarrowintlists:
+                lo, hi = _int_bounds(intlist)
+                narrow = narrow_int_strategy(space, lo, hi)
+                if narrow is not None:
+                    narrow.store_ints(w_list, intlist)
+                    return
             w_list.strategy = strategy = space.fromcache(IntegerListStrategy)
             w_list.lstorage = strategy.erase(intlist)
             return
@@ -1340,6 +1381,24 @@ class AbstractUnwrappedStrategy(object):
     def list_is_correct_type(self, w_list):
         raise NotImplementedError("abstract base class")
 
+    # with 'withcopyonwritelists', the storage of a long enough list is
+    # shared with its copies, see BaseCopyOnWriteListStrategy
+    _copy_on_write = False
+
+    def copy_on_write_strategy(self):
+        raise NotImplementedError("abstract base class")
+
+    def _can_share(self, length):
+        return (self._copy_on_write and length >= COPY_ON_WRITE_CUTOFF and
+                self.space.config.objspace.std.withcopyonwritelists)
+
+    def _share_storage(self, w_list):
+        strategy = self.copy_on_write_strategy()
+        l = self.unerase(w_list.lstorage)
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.erase((l, 0, len(l)))
+        return strategy
+
     @jit.look_inside_iff(lambda space, w_list, list_w:
             jit.loop_unrolling_heuristic(list_w, len(list_w), UNROLL_CUTOFF))
     def init_from_list_w(self, w_list, list_w):
@@ -1353,15 +1412,22 @@ class AbstractUnwrappedStrategy(object):
 
     def clone(self, w_list):
         l = self.unerase(w_list.lstorage)
-        storage = self.erase(l[:])
-        w_clone = W_ListObject.from_storage_and_strategy(
+        if self._can_share(len(l)):
+            return self._share_storage(w_list).clone(w_list)
+        return self.unshared_copy(w_list)
+
+    def unshared_copy(self, w_list):
+        storage = self.erase(self.unerase(w_list.lstorage)[:])
+        return W_ListObject.from_storage_and_strategy(
                 self.space, storage, self)
-        return w_clone
 
     def _resize_hint(self, w_list, hint):
         resizelist_hint(self.unerase(w_list.lstorage), hint)
 
     def copy_into(self, w_list, w_other):
+        if self._can_share(self.length(w_list)):
+            self._share_storage(w_list).copy_into(w_list, w_other)
+            return
         w_other.strategy = self
         items = self.unerase(w_list.lstorage)[:]
         w_other.lstorage = self.erase(items)
@@ -1413,6 +1479,11 @@ class AbstractUnwrappedStrategy(object):
     def getslice(self, w_list, start, stop, step, length):
         if step == 1 and 0 <= start <= stop:
             l = self.unerase(w_list.lstorage)
+            # only share with slices that are not much shorter than the
+            # list, which they would keep alive
+            if self._can_share(length) and length * 2 >= len(l):
+                strategy = self._share_storage(w_list)
+                return strategy.getslice(w_list, start, stop, step, length)
             assert start >= 0
             assert stop >= 0
             sublist = l[start:stop]
@@ -1631,6 +1702,11 @@ class ObjectListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(ObjectListStrategy)
 
+    _copy_on_write = True
+
+    def copy_on_write_strategy(self):
+        return self.space.fromcache(CopyOnWriteObjectListStrategy)
+
     def init_from_list_w(self, w_list, list_w):
         w_list.lstorage = self.erase(list_w)
 
@@ -1668,6 +1744,11 @@ class IntegerListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(IntegerListStrategy)
 
+    _copy_on_write = True
+
+    def copy_on_write_strategy(self):
+        return self.space.fromcache(CopyOnWriteIntegerListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = IntSort(l, len(l))
@@ -1682,7 +1763,8 @@ class IntegerListStrategy(ListStrategy):
     _base_extend_from_list = _extend_from_list
 
     def _extend_from_list(self, w_list, w_other):
-        if isinstance(w_other.strategy, BaseRangeListStrategy):
+        if (isinstance(w_other.strategy, BaseRangeListStrategy) or
+                isinstance(w_other.strategy, BaseNarrowIntListStrategy)):
             l = self.unerase(w_list.lstorage)
             other = w_other.getitems_int()
             assert other is not None
@@ -1699,7 +1781,8 @@ class IntegerListStrategy(ListStrategy):
     _base_setslice = setslice
 
     def setslice(self, w_list, start, step, slicelength, w_other):
-        if w_other.strategy is self.space.fromcache(RangeListStrategy):
+        if (w_other.strategy is self.space.fromcache(RangeListStrategy) or
+                isinstance(w_other.strategy, BaseNarrowIntListStrategy)):
             storage = self.erase(w_other.getitems_int())
             w_other = W_ListObject.from_storage_and_strategy(
                     self.space, storage, self)
@@ -1743,6 +1826,193 @@ class IntegerListStrategy(ListStrategy):
         w_list.switch_to_object_strategy()
 
 
+def _int_bounds(ints):
+    lo = hi = 0
+    for value in ints:
+        if value < lo:
+            lo = value
+        elif value > hi:
+            hi = value
+    return lo, hi
+
+
+def narrow_int_strategy(space, lo, hi):
+    """Returns the narrowest of the NarrowIntListStrategies whose items can
+    hold all the ints between lo and hi, or None if there is none."""
+    for cls in unroll_narrow_int_strategies:
+        if cls.MIN_VALUE <= lo and hi <= cls.MAX_VALUE:
+            return space.fromcache(cls)
+    return None
+
+
+def narrow_int_strategy_from_list(space, list_w):
+    lo = hi = 0
+    for w_int in list_w:
+        assert isinstance(w_int, W_IntObject)
+        value = w_int.int_w(space)
+        if value < lo:
+            lo = value
+        elif value > hi:
+            hi = value
+    return narrow_int_strategy(space, lo, hi)
+
+
+class BaseNarrowIntListStrategy(ListStrategy):
+    """Base class of the strategies used for lists of ints when all of them
+    fit in a C char, short or int (only with the 'withnarrowintlists'
+    option). The items are stored in a list of that C type, which takes up
+    to 8 times less memory than the list of an IntegerListStrategy. When an
+    item that does not fit is stored, the list is widened in one go to the
+    narrowest strategy that can hold all the items, or else to
+    IntegerListStrategy; items that are not ints go through
+    IntegerListStrategy too."""
+
+    def getitems_int(self, w_list):
+        raise NotImplementedError
+
+    def store_ints(self, w_list, ints):
+        raise NotImplementedError
+
+    def widen(self, w_list, lo, hi):
+        ints = self.getitems_int(w_list)
+        strategy = narrow_int_strategy(self.space, lo, hi)
+        if strategy is None:
+            w_list.strategy = self.space.fromcache(IntegerListStrategy)
+            w_list.lstorage = IntegerListStrategy.erase(ints)
+        else:
+            strategy.store_ints(w_list, ints)
+
+    def switch_to_integer_strategy(self, w_list):
+        strategy = self.space.fromcache(IntegerListStrategy)
+        w_list.lstorage = strategy.erase(self.getitems_int(w_list))
+        w_list.strategy = strategy
+
+
+def make_narrow_int_strategy(TYPE, name):
+    bits = rffi.sizeof(TYPE) * 8
+    MIN = -(1 << (bits - 1))
+    MAX = (1 << (bits - 1)) - 1
+
+    class NarrowIntBaseTimSort(make_timsort_class()):
+        pass
+
+    class NarrowIntSort(NarrowIntBaseTimSort):
+        def lt(self, a, b):
+            return a < b
+
+    class NarrowIntListStrategy(BaseNarrowIntListStrategy):
+        import_from_mixin(AbstractUnwrappedStrategy)
+
+        _none_value = rffi.cast(TYPE, 0)
+
+        MIN_VALUE = MIN
+        MAX_VALUE = MAX
+
+        def wrap(self, item):
+            return self.space.newint(rffi.cast(lltype.Signed, item))
+
+        def unwrap(self, w_int):
+            return rffi.cast(TYPE, self.space.int_w(w_int))
+
+        erase, unerase = rerased.new_erasing_pair(name)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def is_correct_type(self, w_obj):
+            if type(w_obj) is not W_IntObject:
+                return False
+            value = w_obj.int_w(self.space)
+            return MIN <= value <= MAX
+
+        def list_is_correct_type(self, w_list):
+            return w_list.strategy is self.space.fromcache(
+                NarrowIntListStrategy)
+
+        def sort(self, w_list, reverse):
+            l = self.unerase(w_list.lstorage)
+            sorter = NarrowIntSort(l, len(l))
+            sorter.sort()
+            if reverse:
+                l.reverse()
+
+        def getitems_int(self, w_list):
+            l = self.unerase(w_list.lstorage)
+            ints = [0] * len(l)
+            for i in range(len(l)):
+                ints[i] = rffi.cast(lltype.Signed, l[i])
+            return ints
+
+        def store_ints(self, w_list, ints):
+            items = [self._none_value] * len(ints)
+            for i in range(len(ints)):
+                items[i] = rffi.cast(TYPE, ints[i])
+            w_list.strategy = self
+            w_list.lstorage = self.erase(items)
+
+        def switch_to_next_strategy(self, w_list, w_sample_item):
+            if type(w_sample_item) is W_IntObject:
+                value = w_sample_item.int_w(self.space)
+                self.widen(w_list, min(value, MIN), max(value, MAX))
+            else:
+                # IntegerListStrategy knows what to do with floats
+                self.switch_to_integer_strategy(w_list)
+
+
+        _base_extend_from_list = _extend_from_list
+
+        def _extend_from_list(self, w_list, w_other):
+            if (not self.list_is_correct_type(w_other) and
+                    not w_other.strategy.is_empty_strategy()):
+                ints = w_other.getitems_int()
+                if ints is None:
+                    self.switch_to_integer_strategy(w_list)
+                    w_list.extend(w_other)
+                    return
+                lo, hi = _int_bounds(ints)
+                if lo < MIN or hi > MAX:
+                    self.widen(w_list, min(lo, MIN), max(hi, MAX))
+                    w_list.extend(w_other)
+                    return
+                l = self.unerase(w_list.lstorage)
+                for value in ints:
+                    l.append(rffi.cast(TYPE, value))
+                return
+            return self._base_extend_from_list(w_list, w_other)
+
+
+        _base_setslice = setslice
+
+        def setslice(self, w_list, start, step, slicelength, w_other):
+            if (not self.list_is_correct_type(w_other) and
+                    w_other.length() != 0):
+                ints = w_other.getitems_int()
+                if ints is None:
+                    self.switch_to_integer_strategy(w_list)
+                    w_list.setslice(start, step, slicelength, w_other)
+                    return
+                lo, hi = _int_bounds(ints)
+                if lo < MIN or hi > MAX:
+                    self.widen(w_list, min(lo, MIN), max(hi, MAX))
+                    w_list.setslice(start, step, slicelength, w_other)
+                    return
+                w_other = W_ListObject.from_storage_and_strategy(
+                        self.space, self.erase([]), self)
+                self.store_ints(w_other, ints)
+            return self._base_setslice(w_list, start, step, slicelength,
+                                       w_other)
+
+    NarrowIntListStrategy.__name__ = 'NarrowIntListStrategy_%s' % name
+    return NarrowIntListStrategy
+
+Int8ListStrategy = make_narrow_int_strategy(rffi.SIGNEDCHAR, "int8")
+Int16ListStrategy = make_narrow_int_strategy(rffi.SHORT, "int16")
+narrow_int_strategies = [Int8ListStrategy, Int16ListStrategy]
+if LONG_BIT > 32:
+    Int32ListStrategy = make_narrow_int_strategy(rffi.INT, "int32")
+    narrow_int_strategies.append(Int32ListStrategy)
+unroll_narrow_int_strategies = unrolling_iterable(narrow_int_strategies)
+
+
 class FloatListStrategy(ListStrategy):
     import_from_mixin(AbstractUnwrappedStrategy)
 
@@ -1764,6 +2034,11 @@ class FloatListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(FloatListStrategy)
 
+    _copy_on_write = True
+
+    def copy_on_write_strategy(self):
+        return self.space.fromcache(CopyOnWriteFloatListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = FloatSort(l, len(l))
@@ -1981,6 +2256,11 @@ class BytesListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(BytesListStrategy)
 
+    _copy_on_write = True
+
+    def copy_on_write_strategy(self):
+        return self.space.fromcache(CopyOnWriteBytesListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = StringSort(l, len(l))
@@ -2024,6 +2304,200 @@ class AsciiListStrategy(ListStrategy):
     def getitems_ascii(self, w_list):
         return self.unerase(w_list.lstorage)
 
+class BaseCopyOnWriteListStrategy(ListStrategy):
+    """Base class of the strategies of the lists that share their items with
+    other lists (only with the 'withcopyonwritelists' option). Copying a
+    long enough list that uses the Object, Integer, Float or Bytes strategy,
+    or taking a long enough slice of it, switches the list to the matching
+    copy-on-write strategy and gives the copy the same storage, which
+    is a tuple (items, start, length). The first mutation of any of the
+    lists switches it back to the plain strategy, with a copy of its part
+    of the items."""
+
+    def materialize(self, w_list):
+        raise NotImplementedError
+
+    def unshared_copy(self, w_list):
+        raise NotImplementedError
+
+    def init_from_list_w(self, w_list, list_w):
+        raise NotImplementedError
+
+    def clone(self, w_list):
+        storage = w_list.lstorage  # lstorage is a tuple, no need to clone
+        return W_ListObject.from_storage_and_strategy(self.space, storage,
+                                                      self)
+
+    def copy_into(self, w_list, w_other):
+        w_other.strategy = self
+        w_other.lstorage = w_list.lstorage
+
+    def getstorage_copy(self, w_list):
+        # tuple is immutable
+        return w_list.lstorage
+
+    def getitems_fixedsize(self, w_list):
+        return self.getitems_copy(w_list)
+
+    def getitems_unroll(self, w_list):
+        return self.getitems_copy(w_list)
+
+    def _resize_hint(self, w_list, hint):
+        self.materialize(w_list)
+        w_list._resize_hint(hint)
+
+    def append(self, w_list, w_item):
+        self.materialize(w_list)
+        w_list.append(w_item)
+
+    def insert(self, w_list, index, w_item):
+        self.materialize(w_list)
+        w_list.insert(index, w_item)
+
+    def extend(self, w_list, w_any):
+        self.materialize(w_list)
+        w_list.extend(w_any)
+
+    def setitem(self, w_list, index, w_item):
+        self.materialize(w_list)
+        w_list.setitem(index, w_item)
+
+    def setslice(self, w_list, start, step, slicelength, sequence_w):
+        self.materialize(w_list)
+        w_list.setslice(start, step, slicelength, sequence_w)
+
+    def deleteslice(self, w_list, start, step, slicelength):
+        self.materialize(w_list)
+        w_list.deleteslice(start, step, slicelength)
+
+    def pop(self, w_list, index):
+        self.materialize(w_list)
+        return w_list.pop(index)
+
+    def pop_end(self, w_list):
+        self.materialize(w_list)
+        return w_list.pop_end()
+
+    def inplace_mul(self, w_list, times):
+        self.materialize(w_list)
+        w_list.inplace_mul(times)
+
+    def reverse(self, w_list):
+        self.materialize(w_list)
+        w_list.reverse()
+
+
+def make_copy_on_write_strategy(Strategy, name):
+    is_object = Strategy is ObjectListStrategy
+
+    class CopyOnWriteListStrategy(BaseCopyOnWriteListStrategy):
+        erase, unerase = rerased.new_erasing_pair("copy_on_write_" + name)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def _unshared_items(self, w_list):
+            items, start, length = self.unerase(w_list.lstorage)
+            assert start >= 0
+            stop = start + length
+            assert stop >= 0
+            return items[start:stop]
+
+        def _view(self, w_list):
+            # for the callers that don't modify the result
+            items, start, length = self.unerase(w_list.lstorage)
+            if start == 0 and length == len(items):
+                return items
+            return self._unshared_items(w_list)
+
+        def materialize(self, w_list):
+            strategy = self.space.fromcache(Strategy)
+            w_list.lstorage = strategy.erase(self._unshared_items(w_list))
+            w_list.strategy = strategy
+
+        def unshared_copy(self, w_list):
+            strategy = self.space.fromcache(Strategy)
+            storage = strategy.erase(self._unshared_items(w_list))
+            return W_ListObject.from_storage_and_strategy(
+                    self.space, storage, strategy)
+
+        def length(self, w_list):
+            return self.unerase(w_list.lstorage)[2]
+
+        def getitem(self, w_list, index):
+            items, start, length = self.unerase(w_list.lstorage)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError
+            return self.space.fromcache(Strategy).wrap(items[start + index])
+
+        def getitems_copy(self, w_list):
+            strategy = self.space.fromcache(Strategy)
+            items, start, length = self.unerase(w_list.lstorage)
+            items_w = [None] * length
+            for i in range(length):
+                items_w[i] = strategy.wrap(items[start + i])
+            return items_w
+
+        if Strategy is IntegerListStrategy:
+            def getitems_int(self, w_list):
+                return self._view(w_list)
+        elif Strategy is FloatListStrategy:
+            def getitems_float(self, w_list):
+                return self._view(w_list)
+        elif Strategy is BytesListStrategy:
+            def getitems_bytes(self, w_list):
+                return self._view(w_list)
+
+        def getslice(self, w_list, start, stop, step, length):
+            items, first, _ = self.unerase(w_list.lstorage)
+            if step == 1:
+                storage = self.erase((items, first + start, length))
+                return W_ListObject.from_storage_and_strategy(
+                        self.space, storage, self)
+            strategy = self.space.fromcache(Strategy)
+            subitems = [strategy._none_value] * length
+            index = first + start
+            for i in range(length):
+                subitems[i] = items[index]
+                index += step
+            return W_ListObject.from_storage_and_strategy(
+                    self.space, strategy.erase(subitems), strategy)
+
+        def find(self, w_list, w_obj, start, stop):
+            # the items are never modified in place, so the plain strategy
+            # can search them through a temporary list
+            strategy = self.space.fromcache(Strategy)
+            w_view = W_ListObject.from_storage_and_strategy(
+                    self.space, strategy.erase(self._view(w_list)), strategy)
+            return strategy.find(w_view, w_obj, start, stop)
+
+        def mul(self, w_list, times):
+            strategy = self.space.fromcache(Strategy)
+            storage = strategy.erase(self._unshared_items(w_list) * times)
+            return W_ListObject.from_storage_and_strategy(
+                    self.space, storage, strategy)
+
+        def sort(self, w_list, reverse):
+            self.materialize(w_list)
+            if is_object:
+                # sorted by W_ListObject.descr_sort()
+                w_list.descr_sort(self.space, None, None, reverse)
+            else:
+                w_list.sort(reverse)
+
+    CopyOnWriteListStrategy.__name__ = 'CopyOnWrite%s' % Strategy.__name__
+    return CopyOnWriteListStrategy
+
+CopyOnWriteObjectListStrategy = make_copy_on_write_strategy(
+    ObjectListStrategy, "object")
+CopyOnWriteIntegerListStrategy = make_copy_on_write_strategy(
+    IntegerListStrategy, "integer")
+CopyOnWriteFloatListStrategy = make_copy_on_write_strategy(
+    FloatListStrategy, "float")
+CopyOnWriteBytesListStrategy = make_copy_on_write_strategy(
+    BytesListStrategy, "bytes")
+
 # _______________________________________________________
 
 init_signature = Signature(['sequence'], None, None)
@@ -1,7 +1,9 @@
 import weakref, sys
 
 from rpython.rlib import jit, objectmodel, debug, rerased
-from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.debug import make_sure_not_resized
+from rpython.rlib.longlong2float import float2longlong, longlong2float
+from rpython.rlib.rarithmetic import intmask, r_uint, r_longlong
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.objspace.std.dictmultiobject import (
@@ -9,6 +11,8 @@ from pypy.objspace.std.dictmultiobject import (
     BaseValueIterator, BaseItemIterator, _never_equal_to_string,
     W_DictObject, BytesDictStrategy, UnicodeDictStrategy
 )
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
 from pypy.objspace.std.typeobject import MutableCell
 
 
@@ -29,11 +33,24 @@ NUM_DIGITS_POW2 = 1 << NUM_DIGITS
 # dict)
 LIMIT_MAP_ATTRIBUTES = 80
 
+# the kinds of values an attribute can store unboxed, see
+# UnboxedPlainAttribute
+BOXED = 0
+UNBOXED_INT = 1
+UNBOXED_FLOAT = 2
+
+
+class VersionTag(object):
+    pass
+
 
 class AbstractAttribute(object):
     _immutable_fields_ = ['terminator']
     cache_attrs = None
     _size_estimate = 0
+    # the number of attributes, which can be more than length() when some
+    # of them are unboxed
+    num_attrs = 0
 
     def __init__(self, space, terminator):
         self.space = space
@@ -49,9 +66,11 @@ class AbstractAttribute(object):
             jit.isconstant(obj) and
             not attr.ever_mutated
         ):
+            if isinstance(attr, UnboxedPlainAttribute):
+                return attr._pure_direct_read(obj)
             return self._pure_mapdict_read_storage(obj, attr.storageindex)
         else:
-            return obj._mapdict_read_storage(attr.storageindex)
+            return attr._direct_read(obj)
 
     @jit.elidable
     def _pure_mapdict_read_storage(self, obj, storageindex):
@@ -63,7 +82,7 @@ class AbstractAttribute(object):
             return self.terminator._write_terminator(obj, name, index, w_value)
         if not attr.ever_mutated:
             attr.ever_mutated = True
-        obj._mapdict_write_storage(attr.storageindex, w_value)
+        attr._direct_write(obj, w_value)
         return True
 
     def delete(self, obj, name, index):
@@ -133,17 +152,43 @@ class AbstractAttribute(object):
     def search(self, attrtype):
         return None
 
+    def _find_last_unboxed_attr(self):
+        attr = self
+        while isinstance(attr, PlainAttribute):
+            if isinstance(attr, UnboxedPlainAttribute):
+                return attr
+            attr = attr.back
+        return None
+
     @jit.elidable
-    def _get_new_attr(self, name, index):
+    def _get_new_attr(self, name, index, kind, version):
+        # 'version' is the terminator's version, changed whenever an
+        # attribute is replaced in one of the 'cache_attrs' of the tree
         cache = self.cache_attrs
         if cache is None:
             cache = self.cache_attrs = {}
         attr = cache.get((name, index), None)
         if attr is None:
-            attr = PlainAttribute(name, index, self)
+            if kind == BOXED:
+                attr = PlainAttribute(name, index, self)
+            else:
+                attr = UnboxedPlainAttribute(name, index, self, kind)
             cache[name, index] = attr
         return attr
 
+    @jit.dont_look_inside
+    def _replace_unboxed_attr(self, attr):
+        # the attribute 'attr' got a value of another type: from now on, use
+        # a generic attribute in its place in the tree of maps
+        key = (attr.name, attr.index)
+        new_attr = self.cache_attrs.get(key, None)
+        if new_attr is attr:
+            new_attr = PlainAttribute(attr.name, attr.index, self)
+            new_attr.order = attr.order
+            self.cache_attrs[key] = new_attr
+            self.terminator.version = VersionTag()
+        return new_attr
+
     def add_attr(self, obj, name, index, w_value):
         self._reorder_and_add(obj, name, index, w_value)
         if not jit.we_are_jitted():
@@ -155,7 +200,9 @@ class AbstractAttribute(object):
             oldattr._size_estimate = size_est
 
     def _add_attr_without_reordering(self, obj, name, index, w_value):
-        attr = self._get_new_attr(name, index)
+        kind = _unboxed_kind(self.space, index, w_value)
+        attr = self._get_new_attr(name, index, kind, self.terminator.version)
+        attr = _attr_for_kind(attr, kind)
         attr._switch_map_and_write_storage(obj, w_value)
 
     @jit.unroll_safe
@@ -170,11 +217,11 @@ class AbstractAttribute(object):
         # the order is important here: first change the map, then the storage,
         # for the benefit of the special subclasses
         obj._set_mapdict_map(self)
-        obj._mapdict_write_storage(self.storageindex, w_value)
+        self._write_new_storage(obj, w_value)
 
 
     @jit.elidable
-    def _find_branch_to_move_into(self, name, index):
+    def _find_branch_to_move_into(self, name, index, kind, version):
         # walk up the map chain to find an ancestor with lower order that
         # already has the current name as a child inserted
         current_order = sys.maxint
@@ -189,7 +236,7 @@ class AbstractAttribute(object):
                 # we reached the top, so we didn't find it anywhere,
                 # just add it to the top attribute
                 if not isinstance(current, PlainAttribute):
-                    return 0, self._get_new_attr(name, index)
+                    return 0, self._get_new_attr(name, index, kind, version)
 
             else:
                 return number_to_readd, attr
@@ -226,17 +273,19 @@ class AbstractAttribute(object):
         stack_index = 0
         while True:
             current = self
-            number_to_readd, attr = self._find_branch_to_move_into(name, index)
+            kind = _unboxed_kind(self.space, index, w_value)
+            number_to_readd, attr = self._find_branch_to_move_into(
+                    name, index, kind, self.terminator.version)
+            attr = _attr_for_kind(attr, kind)
             # we found the attributes further up, need to save the
             # previous values of the attributes we passed
             if number_to_readd:
                 if stack is None:
-                    stack = [erase_map(None)] * (self.length() * 2)
+                    stack = [erase_map(None)] * (self.num_attrs * 2)
                 current = self
                 for i in range(number_to_readd):
                     assert isinstance(current, PlainAttribute)
-                    w_self_value = obj._mapdict_read_storage(
-                            current.storageindex)
+                    w_self_value = current._direct_read(obj)
                     stack[stack_index] = erase_map(current)
                     stack[stack_index + 1] = erase_item(w_self_value)
                     stack_index += 2
@@ -268,18 +317,19 @@ class AbstractAttribute(object):
 
 
 class Terminator(AbstractAttribute):
-    _immutable_fields_ = ['w_cls']
+    _immutable_fields_ = ['w_cls', 'version?']
 
     def __init__(self, space, w_cls):
         AbstractAttribute.__init__(self, space, self)
         self.w_cls = w_cls
+        self.version = VersionTag()
 
     def _read_terminator(self, obj, name, index):
         return None
 
     def _write_terminator(self, obj, name, index, w_value):
         obj._get_mapdict_map().add_attr(obj, name, index, w_value)
-        if index == DICT and obj._get_mapdict_map().length() >= LIMIT_MAP_ATTRIBUTES:
+        if index == DICT and obj._get_mapdict_map().num_attrs >= LIMIT_MAP_ATTRIBUTES:
             space = self.space
             w_dict = obj.getdict(space)
             assert isinstance(w_dict, W_DictMultiObject)
@@ -374,7 +424,7 @@ class DevolvedDictTerminator(Terminator):
         return Terminator.set_terminator(self, obj, terminator)
 
 class PlainAttribute(AbstractAttribute):
-    _immutable_fields_ = ['name', 'index', 'storageindex', 'back', 'ever_mutated?', 'order']
+    _immutable_fields_ = ['name', 'index', 'storageindex', 'back', 'ever_mutated?', 'order', 'num_attrs']
 
     def __init__(self, name, index, back):
         AbstractAttribute.__init__(self, back.space, back.terminator)
@@ -382,6 +432,7 @@ class PlainAttribute(AbstractAttribute):
         self.index = index
         self.storageindex = back.length()
         self.back = back
+        self.num_attrs = back.num_attrs + 1
         self._size_estimate = self.length() * NUM_DIGITS_POW2
         self.ever_mutated = False
         self.order = len(back.cache_attrs) if back.cache_attrs else 0
@@ -390,6 +441,16 @@ class PlainAttribute(AbstractAttribute):
         w_value = self.read(obj, self.name, self.index)
         new_obj._get_mapdict_map().add_attr(new_obj, self.name, self.index, w_value)
 
+    def _direct_read(self, obj):
+        return obj._mapdict_read_storage(self.storageindex)
+
+    def _direct_write(self, obj, w_value):
+        obj._mapdict_write_storage(self.storageindex, w_value)
+
+    def _write_new_storage(self, obj, w_value):
+        # called when the map of 'obj' was just switched to self
+        obj._mapdict_write_storage(self.storageindex, w_value)
+
     def delete(self, obj, name, index):
         if index == self.index and name == self.name:
             # ok, attribute is deleted
@@ -423,7 +484,7 @@ class PlainAttribute(AbstractAttribute):
         new_obj = self.back.materialize_r_dict(space, obj, dict_w)
         if self.index == DICT:
             w_attr = space.newtext(self.name)
-            dict_w[w_attr] = obj._mapdict_read_storage(self.storageindex)
+            dict_w[w_attr] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -431,7 +492,7 @@ class PlainAttribute(AbstractAttribute):
     def materialize_str_dict(self, space, obj, str_dict):
         new_obj = self.back.materialize_str_dict(space, obj, str_dict)
         if self.index == DICT:
-            str_dict[self.name] = obj._mapdict_read_storage(self.storageindex)
+            str_dict[self.name] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -445,6 +506,148 @@ class PlainAttribute(AbstractAttribute):
     def __repr__(self):
         return "<PlainAttribute %s %s %s %r>" % (self.name, self.index, self.storageindex, self.back)
 
+
+class UnboxedStorage(W_Root):
+    """ The content of the storage slot shared by all the unboxed attributes
+    of an object. Never visible at app-level. """
+    def __init__(self, size):
+        self.values = make_sure_not_resized([0.0] * size)
+
+
+def _attr_for_kind(attr, kind):
+    # 'attr' was found in the 'cache_attrs' of its map: if it is unboxed but
+    # the new value is of another kind, use a generic attribute instead
+    if isinstance(attr, UnboxedPlainAttribute) and attr.kind != kind:
+        return attr.back._replace_unboxed_attr(attr)
+    return attr
+
+def _unboxed_kind(space, index, w_value):
+    if index == SPECIAL or not space.config.objspace.std.withunboxedattributes:
+        return BOXED
+    if type(w_value) is W_IntObject:
+        return UNBOXED_INT
+    if type(w_value) is W_FloatObject:
+        return UNBOXED_FLOAT
+    return BOXED
+
+
+class UnboxedPlainAttribute(PlainAttribute):
+    """ An attribute that, so far, only stored ints or only floats, and
+    keeps them unboxed. All the unboxed attributes of an object share one
+    storage slot, holding an UnboxedStorage: its list of floats contains the
+    values, the ints being stored as the bits of a float. When another kind
+    of value is written, the object is changed to use a PlainAttribute
+    instead, and so are the objects that get this attribute later. """
+    _immutable_fields_ = ['kind', 'listindex', 'firstunboxed', '_length']
+
+    def __init__(self, name, index, back, kind):
+        prev = back._find_last_unboxed_attr()
+        if prev is None:
+            # the first unboxed attribute allocates the storage slot
+            self.firstunboxed = True
+            self.listindex = 0
+            self._length = back.length() + 1
+        else:
+            self.firstunboxed = False
+            self.listindex = prev.listindex + 1
+            self._length = back.length()
+        self.kind = kind
+        PlainAttribute.__init__(self, name, index, back)
+        if prev is not None:
+            self.storageindex = prev.storageindex
+
+    def length(self):
+        return self._length
+
+    def _get_unboxed_storage(self, obj):
+        w_storage = obj._mapdict_read_storage(self.storageindex)
+        assert isinstance(w_storage, UnboxedStorage)
+        return w_storage
+
+    def _box(self, value):
+        if self.kind == UNBOXED_INT:
+            return self.space.newint(intmask(float2longlong(value)))
+        return self.space.newfloat(value)
+
+    def _unbox(self, w_value):
+        if self.kind == UNBOXED_INT:
+            assert isinstance(w_value, W_IntObject)
+            return longlong2float(r_longlong(w_value.intval))
+        assert isinstance(w_value, W_FloatObject)
+        return w_value.floatval
+
+    def _accepts(self, w_value):
+        if self.kind == UNBOXED_INT:
+            return type(w_value) is W_IntObject
+        return type(w_value) is W_FloatObject
+
+    def _direct_read(self, obj):
+        w_storage = self._get_unboxed_storage(obj)
+        return self._box(w_storage.values[self.listindex])
+
+    @jit.elidable
+    def _pure_direct_read(self, obj):
+        return self._direct_read(obj)
+
+    def _direct_write(self, obj, w_value):
+        if not self._accepts(w_value):
+            self._devolve_and_write(obj, w_value)
+            return
+        w_storage = self._get_unboxed_storage(obj)
+        w_storage.values[self.listindex] = self._unbox(w_value)
+
+    def _write_new_storage(self, obj, w_value):
+        if self.firstunboxed:
+            w_storage = UnboxedStorage(self.listindex + 1)
+            obj._mapdict_write_storage(self.storageindex, w_storage)
+        else:
+            w_storage = self._get_unboxed_storage(obj)
+            if self.listindex >= len(w_storage.values):
+                w_storage = self._grow_unboxed_storage(obj, w_storage)
+        if self._accepts(w_value):
+            w_storage.values[self.listindex] = self._unbox(w_value)
+        else:
+            self._devolve_and_write(obj, w_value)
+
+    @jit.unroll_safe
+    def _grow_unboxed_storage(self, obj, w_storage):
+        values = w_storage.values
+        w_new_storage = UnboxedStorage(max(self.listindex + 1, len(values) * 2))
+        for i in range(len(values)):
+            w_new_storage.values[i] = values[i]
+        obj._mapdict_write_storage(self.storageindex, w_new_storage)
+        return w_new_storage
+
+    @jit.dont_look_inside
+    def _devolve_and_write(self, obj, w_value):
+        self.back._replace_unboxed_attr(self)
+        # add all the attributes of obj again, in the same order and
+        # without reordering, with w_value for this one: this gives obj
+        # the generic attribute, at the same place
+        attrs = []
+        values_w = []
+        current = obj._get_mapdict_map()
+        while isinstance(current, PlainAttribute):
+            attrs.append(current)
+            if current is self:
+                values_w.append(w_value)
+            else:
+                values_w.append(current._direct_read(obj))
+            current = current.back
+        new_obj = current.copy(obj)
+        i = len(attrs) - 1
+        while i >= 0:
+            attr = attrs[i]
+            new_obj._get_mapdict_map()._add_attr_without_reordering(
+                new_obj, attr.name, attr.index, values_w[i])
+            i -= 1
+        obj._set_mapdict_storage_and_map(new_obj.storage, new_obj.map)
+
+    def __repr__(self):
+        return "<UnboxedPlainAttribute %s %s %s %s %r>" % (
+            self.name, self.index, self.storageindex, self.listindex,
+            self.back)
+
 class MapAttrCache(object):
     def __init__(self, space):
         SIZE = 1 << space.config.objspace.std.methodcachesizeexp
@@ -970,6 +1173,7 @@ class MapDictIteratorItems(BaseItemIterator):
 class CacheEntry(object):
     version_tag = None
     storageindex = 0
+    unboxed_attr = None # if the attribute is an UnboxedPlainAttribute
     w_method = None # for callmethod
     success_counter = 0
     failure_counter = 0
@@ -1002,7 +1206,8 @@ def init_mapdict_cache(pycode):
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
-def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None):
+def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None,
+                unboxed_attr=None):
     if not pycode.space._side_effects_ok():
         return
     entry = pycode._mapdict_caches[nameindex]
@@ -1012,6 +1217,7 @@ def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None
     entry.map_wref = weakref.ref(map)
     entry.version_tag = version_tag
     entry.storageindex = storageindex
+    entry.unboxed_attr = unboxed_attr
     entry.w_method = w_method
     if pycode.space.config.objspace.std.withmethodcachecounter:
         entry.failure_counter += 1
@@ -1023,6 +1229,8 @@ def LOAD_ATTR_caching(pycode, w_obj, nameindex):
     map = w_obj._get_mapdict_map()
     if entry.is_valid_for_map(map) and entry.w_method is None:
         # everything matches, it's incredibly fast
+        if entry.unboxed_attr is not None:
+            return entry.unboxed_attr._direct_read(w_obj)
         return w_obj._mapdict_read_storage(entry.storageindex)
     return LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map)
 LOAD_ATTR_caching._always_inline_ = True
@@ -1069,6 +1277,10 @@ def LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map):
                     # Note that if map.terminator is a DevolvedDictTerminator
                     # or the class provides its own dict, not using mapdict, then:
                     # map.find_map_attr will always return None if index==DICT.
+                    if isinstance(attr, UnboxedPlainAttribute):
+                        _fill_cache(pycode, nameindex, map, version_tag,
+                                    attr.storageindex, unboxed_attr=attr)
+                        return attr._direct_read(w_obj)
                     _fill_cache(pycode, nameindex, map, version_tag, attr.storageindex)
                     return w_obj._mapdict_read_storage(attr.storageindex)
     if space.config.objspace.std.withmethodcachecounter:
@@ -0,0 +1,166 @@
+"""Rope-backed str objects (only with the 'withrope' option).
+
+Concatenating two strings whose result is at least ROPE_MIN_LENGTH long
+gives a W_RopeBytesObject, which stores the result as a tree of pieces
+(see rpython/rlib/rope.py) instead of copying both strings.  Concatenating
+to it and taking long slices of it are O(log n) operations that give more
+W_RopeBytesObjects.  All the other operations need the flat string: it is
+built the first time, and kept."""
+
+import py
+
+from rpython.rlib import rope
+
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.bytesobject import W_AbstractBytesObject, W_BytesObject
+from pypy.objspace.std.sliceobject import W_SliceObject, normalize_simple_slice
+
+# shorter strings are always flat
+ROPE_MIN_LENGTH = 4096
+
+
+def _node(space, w_str):
+    if isinstance(w_str, W_RopeBytesObject):
+        return w_str.node
+    return rope.LiteralStringNode(space.bytes_w(w_str))
+
+
+def _flat(w_obj):
+    if isinstance(w_obj, W_RopeBytesObject):
+        return w_obj.force()
+    return w_obj
+
+
+def _new(node):
+    if node.length() < ROPE_MIN_LENGTH:
+        return W_BytesObject(node.flatten_string())
+    return W_RopeBytesObject(node)
+
+
+def concatenate(space, w_left, w_right):
+    """Returns w_left + w_right, where both are str objects."""
+    if (not isinstance(w_left, W_RopeBytesObject) and
+            not isinstance(w_right, W_RopeBytesObject)):
+        left = space.bytes_w(w_left)
+        right = space.bytes_w(w_right)
+        if len(left) + len(right) < ROPE_MIN_LENGTH:
+            return W_BytesObject(left + right)
+    try:
+        node = rope.concatenate(_node(space, w_left), _node(space, w_right))
+    except OverflowError:
+        raise oefmt(space.w_OverflowError, "string is too large")
+    return _new(node)
+
+
+class W_RopeBytesObject(W_AbstractBytesObject):
+    w_flat = None
+
+    def __init__(self, node):
+        self.node = node
+
+    def __repr__(self):
+        """representation for debugging purposes"""
+        return "%s(%r)" % (self.__class__.__name__, self.node)
+
+    def force(self):
+        w_flat = self.w_flat
+        if w_flat is None:
+            w_flat = W_BytesObject(self.node.flatten_string())
+            self.w_flat = w_flat
+            # the pieces are not needed any more
+            self.node = rope.LiteralStringNode(w_flat._value)
+        return w_flat
+
+    def unwrap(self, space):
+        return self.force()._value
+
+    def str_w(self, space):
+        return self.force()._value
+
+    def utf8_w(self, space):
+        return self.force()._value
+
+    charbuf_w = str_w
+
+    def buffer_w(self, space, flags):
+        return self.force().buffer_w(space, flags)
+
+    def readbuf_w(self, space):
+        return self.force().readbuf_w(space)
+
+    def writebuf_w(self, space):
+        return self.force().writebuf_w(space)
+
+    def listview_bytes(self):
+        return self.force().listview_bytes()
+
+    def ord(self, space):
+        return self.force().ord(space)
+
+    def descr_len(self, space):
+        return space.newint(self.node.length())
+
+    def descr_str(self, space):
+        return self
+
+    def descr_add(self, space, w_other):
+        if isinstance(w_other, W_AbstractBytesObject):
+            return concatenate(space, self, w_other)
+        return self.force().descr_add(space, w_other)
+
+    def descr_getitem(self, space, w_index):
+        length = self.node.length()
+        if isinstance(w_index, W_SliceObject):
+            start, stop, step, sl = w_index.indices4(space, length)
+            if sl == 0:
+                return W_BytesObject.EMPTY
+            elif step == 1:
+                return self._getslice(start, stop)
+            return self.force().descr_getitem(space, w_index)
+        index = space.getindex_w(w_index, space.w_IndexError, "string index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError, "string index out of range")
+        return space.newbytes(self.node.getchar(index))
+
+    def descr_getslice(self, space, w_start, w_stop):
+        start, stop = normalize_simple_slice(space, self.node.length(),
+                                             w_start, w_stop)
+        if start == stop:
+            return W_BytesObject.EMPTY
+        return self._getslice(start, stop)
+
+    def _getslice(self, start, stop):
+        assert 0 <= start <= stop
+        if start == 0 and stop == self.node.length():
+            return self
+        return _new(rope.getslice_one(self.node, start, stop))
+
+
+# all the other methods are those of the flat string; the arguments that
+# are ropes are flattened too, for the methods that only know W_BytesObject
+def _make_delegate(name):
+    import inspect
+    func = getattr(W_AbstractBytesObject, name).im_func
+    args = inspect.getargs(func.func_code)
+    assert not args.varargs and not args.keywords
+    argnames = args.args[2:]
+    lines = ['def %s(self, space%s):' % (
+        name, ''.join([', ' + arg for arg in argnames]))]
+    for arg in argnames:
+        if arg.startswith('w_'):
+            lines.append('    %s = _flat(%s)' % (arg, arg))
+    lines.append('    return self.force().%s(space%s)' % (
+        name, ''.join([', ' + arg for arg in argnames])))
+    d = {'_flat': _flat}
+    exec py.code.Source('\n'.join(lines)).compile() in d
+    return d[name]
+
+for _name in W_AbstractBytesObject.__dict__:
+    if (_name.startswith('descr_') and _name in W_BytesObject.__dict__ and
+            _name not in W_RopeBytesObject.__dict__):
+        setattr(W_RopeBytesObject, _name, _make_delegate(_name))
+del _name
+
+W_RopeBytesObject.typedef = W_BytesObject.typedef
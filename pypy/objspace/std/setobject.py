@@ -1,10 +1,16 @@
+import math
+
 from pypy.interpreter import gateway
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.signature import Signature
 from pypy.interpreter.typedef import TypeDef
 from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.floatobject import W_FloatObject
 from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.tuplekey import (TUPLE_KEY_TYPES,
+    make_tuple_key_mixin, tuple_key_suffix)
+from pypy.objspace.std.tupleobject import W_AbstractTupleObject
 from pypy.objspace.std.unicodeobject import W_UnicodeObject
 from pypy.objspace.std.util import IDTAG_SPECIAL, IDTAG_SHIFT
 
@@ -13,6 +19,7 @@ from rpython.rlib.objectmodel import iterkeys_with_hash, contains_with_hash
 from rpython.rlib.objectmodel import setitem_with_hash, delitem_with_hash
 from rpython.rlib.rarithmetic import intmask, r_uint
 from rpython.rlib import rerased, jit, rutf8
+from rpython.rlib.unroll import unrolling_iterable
 
 
 UNROLL_CUTOFF = 5
@@ -95,6 +102,10 @@ class W_BaseSetObject(W_Root):
         """ If this is an int set return its contents as a list of uwnrapped ints. Otherwise return None. """
         return self.strategy.listview_int(self)
 
+    def listview_float(self):
+        """ If this is a float set return its contents as a list of uwnrapped floats. Otherwise return None. """
+        return self.strategy.listview_float(self)
+
     def get_storage_copy(self):
         """ Returns a copy of the storage. Needed when we want to clone all elements from one set and
         put them into another. """
@@ -729,6 +740,9 @@ class SetStrategy(object):
     def listview_int(self, w_set):
         return None
 
+    def listview_float(self, w_set):
+        return None
+
     #def erase(self, storage):
     #    raise NotImplementedError
 
@@ -828,8 +842,16 @@ class EmptySetStrategy(SetStrategy):
             strategy = self.space.fromcache(IntegerSetStrategy)
         elif type(w_key) is W_BytesObject:
             strategy = self.space.fromcache(BytesSetStrategy)
-        elif type(w_key) is W_UnicodeObject and w_key.is_ascii():
-            strategy = self.space.fromcache(AsciiSetStrategy)
+        elif type(w_key) is W_UnicodeObject:
+            if w_key.is_ascii():
+                strategy = self.space.fromcache(AsciiSetStrategy)
+            else:
+                strategy = self.space.fromcache(UnicodeSetStrategy)
+        elif type(w_key) is W_FloatObject and not _is_nan(w_key):
+            strategy = self.space.fromcache(FloatSetStrategy)
+        elif (self.space.config.objspace.std.withtuplekeys and
+                  isinstance(w_key, W_AbstractTupleObject)):
+            strategy = _find_tuple_key_strategy(self.space, w_key)
         elif self.space.type(w_key).compares_by_identity():
             strategy = self.space.fromcache(IdentitySetStrategy)
         else:
@@ -1275,6 +1297,8 @@ class BytesSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1314,6 +1338,8 @@ class AsciiSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1329,6 +1355,73 @@ class AsciiSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def iter(self, w_set):
         return UnicodeIteratorImplementation(self.space, self, w_set)
 
+    def add(self, w_set, w_key):
+        if type(w_key) is W_UnicodeObject and not w_key.is_ascii():
+            # the keys are utf8 already, the storage can be reused as is
+            self.switch_to_unicode_strategy(w_set)
+            w_set.add(w_key)
+        else:
+            AbstractUnwrappedSetStrategy.add(self, w_set, w_key)
+
+    def update(self, w_set, w_other):
+        if w_other.strategy is self.space.fromcache(UnicodeSetStrategy):
+            self.switch_to_unicode_strategy(w_set)
+            w_set.update(w_other)
+        else:
+            AbstractUnwrappedSetStrategy.update(self, w_set, w_other)
+
+    def switch_to_unicode_strategy(self, w_set):
+        d = self.unerase(w_set.sstorage)
+        strategy = self.space.fromcache(UnicodeSetStrategy)
+        w_set.strategy = strategy
+        w_set.sstorage = strategy.erase(d)
+
+
+class UnicodeSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
+    erase, unerase = rerased.new_erasing_pair("utf8")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    intersect_jmp = jit.JitDriver(greens = [], reds = 'auto',
+                                  name='set(utf8).intersect')
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def get_empty_dict(self):
+        return {}
+
+    def is_correct_type(self, w_key):
+        return type(w_key) is W_UnicodeObject
+
+    def may_contain_equal_elements(self, strategy):
+        if strategy is self.space.fromcache(IntegerSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(EmptySetStrategy):
+            return False
+        elif strategy is self.space.fromcache(IdentitySetStrategy):
+            return False
+        return True
+
+    def unwrap(self, w_item):
+        return self.space.utf8_w(w_item)
+
+    def wrap(self, item):
+        return self.space.newutf8(item, rutf8.codepoints_in_utf8(item))
+
+    def iter(self, w_set):
+        return Utf8IteratorImplementation(self.space, self, w_set)
+
+    def update(self, w_set, w_other):
+        if w_other.strategy is self.space.fromcache(AsciiSetStrategy):
+            d_set = self.unerase(w_set.sstorage)
+            d_other = AsciiSetStrategy.unerase(w_other.sstorage)
+            d_set.update(d_other)
+        else:
+            AbstractUnwrappedSetStrategy.update(self, w_set, w_other)
+
 
 class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     erase, unerase = rerased.new_erasing_pair("integer")
@@ -1355,6 +1448,8 @@ class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
             return False
         elif strategy is self.space.fromcache(AsciiSetStrategy):
             return False
+        elif strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1371,6 +1466,50 @@ class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
         return IntegerIteratorImplementation(self.space, self, w_set)
 
 
+class FloatSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    intersect_jmp = jit.JitDriver(greens = [], reds = 'auto',
+                                  name='set(float).intersect')
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def get_empty_dict(self):
+        return {}
+
+    def listview_float(self, w_set):
+        return self.unerase(w_set.sstorage).keys()
+
+    def is_correct_type(self, w_key):
+        # a NaN is only found again by identity, which needs the boxed key
+        return type(w_key) is W_FloatObject and not _is_nan(w_key)
+
+    def may_contain_equal_elements(self, strategy):
+        if strategy is self.space.fromcache(BytesSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(AsciiSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(EmptySetStrategy):
+            return False
+        elif strategy is self.space.fromcache(IdentitySetStrategy):
+            return False
+        return True
+
+    def unwrap(self, w_item):
+        return self.space.float_w(w_item)
+
+    def wrap(self, item):
+        return self.space.newfloat(item)
+
+    def iter(self, w_set):
+        return FloatIteratorImplementation(self.space, self, w_set)
+
+
 class ObjectSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     erase, unerase = rerased.new_erasing_pair("object")
     erase = staticmethod(erase)
@@ -1446,6 +1585,10 @@ class IdentitySetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
             return False
         if strategy is self.space.fromcache(AsciiSetStrategy):
             return False
+        if strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
+        if strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         return True
 
     def unwrap(self, w_item):
@@ -1533,6 +1676,19 @@ class UnicodeIteratorImplementation(IteratorImplementation):
             return None
 
 
+class Utf8IteratorImplementation(IteratorImplementation):
+    def __init__(self, space, strategy, w_set):
+        IteratorImplementation.__init__(self, space, strategy, w_set)
+        d = strategy.unerase(w_set.sstorage)
+        self.iterator = d.iterkeys()
+
+    def next_entry(self):
+        for key in self.iterator:
+            return self.space.newutf8(key, rutf8.codepoints_in_utf8(key))
+        else:
+            return None
+
+
 class IntegerIteratorImplementation(IteratorImplementation):
     #XXX same implementation in dictmultiobject on dictstrategy-branch
     def __init__(self, space, strategy, w_set):
@@ -1547,6 +1703,19 @@ class IntegerIteratorImplementation(IteratorImplementation):
         else:
             return None
 
+class FloatIteratorImplementation(IteratorImplementation):
+    def __init__(self, space, strategy, w_set):
+        IteratorImplementation.__init__(self, space, strategy, w_set)
+        d = strategy.unerase(w_set.sstorage)
+        self.iterator = d.iterkeys()
+
+    def next_entry(self):
+        # note that this 'for' loop only runs once, at most
+        for key in self.iterator:
+            return self.space.newfloat(key)
+        else:
+            return None
+
 class IdentityIteratorImplementation(IteratorImplementation):
     def __init__(self, space, strategy, w_set):
         IteratorImplementation.__init__(self, space, strategy, w_set)
@@ -1573,6 +1742,63 @@ class RDictIteratorImplementation(IteratorImplementation):
             return None
 
 
+def make_tuple_key_strategy(typetuple):
+    suffix = tuple_key_suffix(typetuple)
+
+    class TupleKeySetStrategy(make_tuple_key_mixin(typetuple),
+                              AbstractUnwrappedSetStrategy, SetStrategy):
+        erase, unerase = rerased.new_erasing_pair("tuplekey_" + suffix)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        intersect_jmp = jit.JitDriver(greens = [], reds = 'auto',
+                                      name='set(tuple_%s).intersect' % suffix)
+
+        def get_empty_storage(self):
+            return self.erase({})
+
+        def get_empty_dict(self):
+            return {}
+
+        def may_contain_equal_elements(self, strategy):
+            # the tuples of another shape are never equal to ours
+            return strategy is self.space.fromcache(ObjectSetStrategy)
+
+        def iter(self, w_set):
+            return TupleKeyIteratorImplementation(self.space, self, w_set)
+
+    wrapkey = TupleKeySetStrategy.wrapkey.im_func
+
+    class TupleKeyIteratorImplementation(IteratorImplementation):
+        def __init__(self, space, strategy, w_set):
+            IteratorImplementation.__init__(self, space, strategy, w_set)
+            d = strategy.unerase(w_set.sstorage)
+            self.iterator = d.iterkeys()
+
+        def next_entry(self):
+            for key in self.iterator:
+                return wrapkey(self.space, key)
+            else:
+                return None
+
+    TupleKeySetStrategy.__name__ = 'TupleKeySetStrategy_' + suffix
+    TupleKeyIteratorImplementation.__name__ = (
+        'TupleKeyIteratorImplementation_' + suffix)
+    return TupleKeySetStrategy
+
+tuple_key_strategies = [make_tuple_key_strategy(typetuple)
+                        for typetuple in TUPLE_KEY_TYPES]
+unroll_tuple_key_strategies = unrolling_iterable(tuple_key_strategies)
+
+@jit.unroll_safe
+def _find_tuple_key_strategy(space, w_key):
+    for strategycls in unroll_tuple_key_strategies:
+        strategy = space.fromcache(strategycls)
+        if strategy.is_correct_type(w_key):
+            return strategy
+    return space.fromcache(ObjectSetStrategy)
+
+
 class W_SetIterObject(W_Root):
 
     def __init__(self, space, iterimplementation):
@@ -1606,6 +1832,9 @@ setiter_typedef = W_SetIterObject.typedef
 def newset(space):
     return r_dict(space.eq_w, space.hash_w, force_non_null=True)
 
+def _is_nan(w_float):
+    return math.isnan(w_float.floatval)
+
 def set_strategy_and_setdata(space, w_set, w_iterable):
     if w_iterable is None :
         w_set.strategy = strategy = space.fromcache(EmptySetStrategy)
@@ -1638,6 +1867,13 @@ def set_strategy_and_setdata(space, w_set, w_iterable):
         w_set.sstorage = strategy.get_storage_from_unwrapped_list(intlist)
         return
 
+    floatlist = space.listview_float(w_iterable)
+    if floatlist is not None and not _contains_nan(floatlist):
+        strategy = space.fromcache(FloatSetStrategy)
+        w_set.strategy = strategy
+        w_set.sstorage = strategy.get_storage_from_unwrapped_list(floatlist)
+        return
+
     length_hint = space.length_hint(w_iterable, 0)
 
     if jit.isconstant(length_hint) and length_hint:
@@ -1648,6 +1884,14 @@ def set_strategy_and_setdata(space, w_set, w_iterable):
     _update_from_iterable(space, w_set, w_iterable)
 
 
+@jit.look_inside_iff(lambda floatlist:
+        jit.loop_unrolling_heuristic(floatlist, len(floatlist), UNROLL_CUTOFF))
+def _contains_nan(floatlist):
+    for f in floatlist:
+        if math.isnan(f):
+            return True
+    return False
+
 @jit.unroll_safe
 def _pick_correct_strategy_unroll(space, w_set, w_iterable):
 
@@ -1679,6 +1923,37 @@ def _pick_correct_strategy_unroll(space, w_set, w_iterable):
         w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
         return
 
+    # check for non-ascii unicode
+    for w_item in iterable_w:
+        if type(w_item) is not W_UnicodeObject:
+            break
+    else:
+        w_set.strategy = space.fromcache(UnicodeSetStrategy)
+        w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
+        return
+
+    # check for floats
+    for w_item in iterable_w:
+        if type(w_item) is not W_FloatObject or _is_nan(w_item):
+            break
+    else:
+        w_set.strategy = space.fromcache(FloatSetStrategy)
+        w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
+        return
+
+    # check for tuples of ints or of strings.  A tuple has at most one of
+    # the shapes, so only the strategy of the first item can fit them all
+    if space.config.objspace.std.withtuplekeys:
+        strategy = _find_tuple_key_strategy(space, iterable_w[0])
+        if not isinstance(strategy, ObjectSetStrategy):
+            for w_item in iterable_w:
+                if not strategy.is_correct_type(w_item):
+                    break
+            else:
+                w_set.strategy = strategy
+                w_set.sstorage = strategy.get_storage_from_list(iterable_w)
+                return
+
     # check for compares by identity
     for w_item in iterable_w:
         if not space.type(w_item).compares_by_identity():
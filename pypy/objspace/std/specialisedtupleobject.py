@@ -1,6 +1,9 @@
 from pypy.interpreter.error import oefmt
-from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+from pypy.objspace.std.tupleobject import (W_AbstractTupleObject,
+    _unroll_condition, _unroll_condition_cmp)
 from pypy.objspace.std.util import negate
+from rpython.rlib import jit
+from rpython.rlib.debug import make_sure_not_resized
 from rpython.rlib.objectmodel import specialize
 from rpython.rlib.rarithmetic import intmask
 from rpython.rlib.unroll import unrolling_iterable
@@ -63,6 +66,17 @@ def make_specialised_class(typetuple):
         # same source code, but builds and returns a resizable list
         getitems_copy = func_with_new_name(tolist, 'getitems_copy')
 
+        def _getvalues(self):
+            values = [getattr(self, 'value0')] * typelen
+            for i in iter_n:
+                values[i] = getattr(self, 'value%s' % i)
+            return values
+
+        if typetuple == (int,) * typelen:
+            getitems_int = _getvalues
+        elif typetuple == (float,) * typelen:
+            getitems_float = _getvalues
+
         def descr_hash(self, space):
             mult = 1000003
             x = 0x345678
@@ -137,17 +151,137 @@ def make_specialised_class(typetuple):
     _specialisations.append(cls)
     return cls
 
+
+def make_array_class(typ):
+    """ Build the class of the tuples of any length whose items are all
+    ints, or all floats, which are stored unboxed in a fixed-size list.
+    """
+    if typ == int:
+        wrap = lambda space, x: space.newint(x)
+        suffix = 'ints'
+    elif typ == float:
+        wrap = lambda space, x: space.newfloat(x)
+        suffix = 'floats'
+    else:
+        assert 0
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['values[*]']
+
+        def __init__(self, space, values):
+            make_sure_not_resized(values)
+            self.space = space
+            self.values = values
+
+        def length(self):
+            return len(self.values)
+
+        def tolist(self):
+            values = self.values
+            list_w = [None] * len(values)
+            for i in range(len(values)):
+                list_w[i] = wrap(self.space, values[i])
+            return list_w
+
+        def getitems_copy(self):
+            return [wrap(self.space, value) for value in self.values]
+
+        if typ == int:
+            def getitems_int(self):
+                return self.values
+        else:
+            def getitems_float(self):
+                return self.values
+
+        def descr_hash(self, space):
+            return self._descr_hash(space)
+
+        @jit.look_inside_iff(lambda self, space: _unroll_condition(self))
+        def _descr_hash(self, space):
+            # the same as W_TupleObject.descr_hash, but without boxing
+            from pypy.objspace.std.intobject import _hash_int
+            from pypy.objspace.std.floatobject import _hash_float
+            mult = 1000003
+            x = 0x345678
+            z = len(self.values)
+            for value in self.values:
+                if typ == int:
+                    y = _hash_int(value)
+                else:
+                    y = _hash_float(space, value)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return space.newint(intmask(x))
+
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            if not isinstance(w_other, cls):
+                return self._descr_eq_generic(space, w_other)
+            return space.newbool(self._eq_values(w_other.values))
+
+        @jit.look_inside_iff(
+            lambda self, other_values: _unroll_condition(self))
+        def _eq_values(self, other_values):
+            values = self.values
+            if len(values) != len(other_values):
+                return False
+            for i in range(len(values)):
+                myval = values[i]
+                otherval = other_values[i]
+                if myval != otherval:
+                    if typ == float:
+                        # issue with NaNs, which should be equal here
+                        if float2longlong(myval) == float2longlong(otherval):
+                            continue
+                    return False
+            return True
+
+        @jit.look_inside_iff(_unroll_condition_cmp)
+        def _descr_eq_generic(self, space, w_other):
+            values = self.values
+            if len(values) != w_other.length():
+                return space.w_False
+            for i in range(len(values)):
+                w_myval = wrap(space, values[i])
+                if not space.eq_w(w_myval, w_other.getitem(space, i)):
+                    return space.w_False
+            return space.w_True
+
+        descr_ne = negate(descr_eq)
+
+        def getitem(self, space, index):
+            try:
+                return wrap(space, self.values[index])
+            except IndexError:
+                raise oefmt(space.w_IndexError, "tuple index out of range")
+
+    cls.__name__ = 'W_SpecialisedTupleObject_' + suffix
+    _specialisations.append(cls)
+    return cls
+
 # ---------- current specialized versions ----------
 
 _specialisations = []
 Cls_ii = make_specialised_class((int, int))
 Cls_oo = make_specialised_class((object, object))
 Cls_ff = make_specialised_class((float, float))
+Cls_ints = make_array_class(int)
+Cls_floats = make_array_class(float)
 
 def makespecialisedtuple(space, list_w):
     from pypy.objspace.std.intobject import W_IntObject
     from pypy.objspace.std.floatobject import W_FloatObject
-    if len(list_w) == 2:
+    if len(list_w) > 2:
+        w_first = list_w[0]
+        if type(w_first) is W_IntObject:
+            return _make_array_tuple(space, Cls_ints, W_IntObject, list_w)
+        elif type(w_first) is W_FloatObject:
+            return _make_array_tuple(space, Cls_floats, W_FloatObject, list_w)
+        raise NotSpecialised
+    elif len(list_w) == 2:
         w_arg1, w_arg2 = list_w
         if type(w_arg1) is W_IntObject:
             if type(w_arg2) is W_IntObject:
@@ -159,6 +293,21 @@ def makespecialisedtuple(space, list_w):
     else:
         raise NotSpecialised
 
+@specialize.arg(1, 2)
+def _make_array_tuple(space, Cls, W_Type, list_w):
+    for w_item in list_w:
+        if type(w_item) is not W_Type:
+            raise NotSpecialised
+    if Cls is Cls_ints:
+        values = [0] * len(list_w)
+        for i in range(len(list_w)):
+            values[i] = space.int_w(list_w[i])
+    else:
+        values = [0.0] * len(list_w)
+        for i in range(len(list_w)):
+            values[i] = space.float_w(list_w[i])
+    return Cls(space, values)
+
 # --------------------------------------------------
 # Special code based on list strategies to implement zip(),
 # here with two list arguments only.  This builds a zipped
@@ -1170,6 +1170,39 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "hi"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        d[-0.0] = "zero"
+        assert d[1.5] == "hi"
+        assert d[0.0] == "zero"
+        assert d.get(None) is None
+        assert d.keys() in ([1.5, -0.0], [-0.0, 1.5])
+        assert d.pop(1.5) == "hi"
+        assert d.items() == [(-0.0, "zero")]
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[0] == "zero"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        nan = float('nan')
+        d = {}
+        d[nan] = 1
+        assert d[nan] == 1
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        d = {2.5: 1}
+        d[nan] = 2
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[nan] == 2 and d[2.5] == 1
+
+    def test_tuple_key_identity(self):
+        k = (1, 2)
+        d = {k: 1}
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert list(d)[0] is k
+        assert d.keys()[0] is k
+        assert d.items()[0][0] is k
+        assert d.popitem()[0] is k
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
@@ -1198,6 +1231,79 @@ class AppTestStrategies(object):
         raises(RuntimeError, list, it)
 
 
+
+class AppTestTupleKeyStrategies(object):
+    spaceconfig = {"objspace.std.withtuplekeys": True}
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("__repr__ doesn't work on appdirect")
+
+    def w_get_strategy(self, obj):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        return r[r.find("(") + 1: r.find(")")]
+
+    def test_empty_to_tuple_key(self):
+        d = {}
+        d[(1, 2)] = "a"
+        assert "TupleKeyDictStrategy_ii" in self.get_strategy(d)
+        d[(3, 4)] = "b"
+        assert d[(1, 2)] == "a"
+        assert d[tuple([3, 4])] == "b"
+        assert d.get((5, 6)) is None
+        assert d.get(None) is None
+        assert d.keys() in ([(1, 2), (3, 4)], [(3, 4), (1, 2)])
+        assert sorted(d.items()) == [((1, 2), "a"), ((3, 4), "b")]
+        del d[(1, 2)]
+        assert d == {(3, 4): "b"}
+        assert "TupleKeyDictStrategy_ii" in self.get_strategy(d)
+        assert d[(3.0, 4L)] == "b"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        #
+        d = {(1, 2, 3): 1}
+        assert "TupleKeyDictStrategy_iii" in self.get_strategy(d)
+        d = {("a", "b"): 1}
+        assert "TupleKeyDictStrategy_ss" in self.get_strategy(d)
+        d[("c", "d")] = 2
+        assert d.pop(("a", "b")) == 1
+        assert d.keys() == [("c", "d")]
+        assert "TupleKeyDictStrategy_ss" in self.get_strategy(d)
+        d[("a", "b", "c")] = 3
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {("c", "d"): 2, ("a", "b", "c"): 3}
+        d = {("a", "b", "c"): 1}
+        assert "TupleKeyDictStrategy_sss" in self.get_strategy(d)
+        d = {(1, "b"): 1}
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        d = {(1, 2, 3, 4): 1}
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        class T(tuple):
+            pass
+        d = {T((1, 2)): 1}
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+
+    def test_tuple_key_copy_update(self):
+        d = dict.fromkeys([(i, i + 1) for i in range(10)], 0)
+        assert "TupleKeyDictStrategy_ii" in self.get_strategy(d)
+        d2 = d.copy()
+        assert "TupleKeyDictStrategy_ii" in self.get_strategy(d2)
+        assert d2 == d
+        d2.update({(100, 101): 1})
+        assert len(d2) == 11 and d2[(100, 101)] == 1
+        assert "TupleKeyDictStrategy_ii" in self.get_strategy(d2)
+        assert sorted(d2)[-1] == (100, 101)
+
+    def test_tuple_key_rewrapped(self):
+        # the keys are stored unwrapped, so they come back as equal tuples
+        k = (1, 2)
+        d = {k: 1}
+        assert "TupleKeyDictStrategy_ii" in self.get_strategy(d)
+        assert list(d) == [k]
+        assert d.keys() == [k]
+        assert d.items() == [(k, 1)]
+        assert d.popitem() == (k, 1)
+
 class FakeWrapper(object):
     hash_count = 0
     def unwrap(self, space):
@@ -1307,6 +1413,8 @@ class Config:
         class std:
             methodcachesizeexp = 11
             withmethodcachecounter = False
+            withunboxedattributes = False
+            withtuplekeys = False
 
 FakeSpace.config = Config()
 
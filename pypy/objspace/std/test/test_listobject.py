@@ -1669,6 +1669,78 @@ class AppTestListObject(object):
             assert L3.index(-0.0, i) == i
 
 
+class AppTestNarrowIntLists(AppTestListObject):
+    spaceconfig = {"objspace.std.withnarrowintlists": True,
+                   "usemodules": ["array"]}
+
+    def test_narrow_strategy(self):
+        import __pypy__
+        l = [1, 2, -3]
+        assert __pypy__.strategy(l) == "NarrowIntListStrategy_int8"
+        l.append(1000)
+        assert __pypy__.strategy(l) == "NarrowIntListStrategy_int16"
+        assert sorted(l) == [-3, 1, 2, 1000]
+        assert sum(l[1:]) == 999
+        l.append(1.5)
+        assert __pypy__.strategy(l) == "IntOrFloatListStrategy"
+        assert l == [1, 2, -3, 1000, 1.5]
+
+    def test_array_from_narrow_list(self):
+        import array
+        l = [5, -7, 300]
+        assert array.array('l', l).tolist() == l
+        assert array.array('h', l).tolist() == l
+
+
+class AppTestCopyOnWriteLists(AppTestListObject):
+    spaceconfig = {"objspace.std.withcopyonwritelists": True}
+
+    def test_copies_are_independent(self):
+        import __pypy__
+        l = range(100)
+        l2 = l[:]
+        l3 = list(l)
+        l4 = l[10:90]
+        assert __pypy__.strategy(l2) == "CopyOnWriteIntegerListStrategy"
+        assert __pypy__.strategy(l4) == "CopyOnWriteIntegerListStrategy"
+        l.append(100)
+        l2[0] = 'x'
+        del l3[:50]
+        l4.sort(reverse=True)
+        assert l == range(101)
+        assert l2 == ['x'] + range(1, 100)
+        assert l3 == range(50, 100)
+        assert l4 == range(89, 9, -1)
+        assert __pypy__.strategy(l4) == "IntegerListStrategy"
+
+    def test_shared_slice_operations(self):
+        l = [str(i) for i in range(100)]
+        s = l[20:80]
+        assert len(s) == 60
+        assert s[0] == '20' and s[-1] == '79'
+        assert s[::10] == ['20', '30', '40', '50', '60', '70']
+        assert '50' in s and '10' not in s
+        assert s.index('25') == 5
+        assert s * 2 == l[20:80] + l[20:80]
+        assert sorted(s) == sorted(l[20:80])
+        s += ['x']
+        assert s[-1] == 'x' and len(s) == 61
+        assert l[-1] == '99'
+
+    def test_add_and_mul_dont_share(self):
+        # the result is modified at once, so the operand must not switch
+        # to a copy-on-write strategy
+        import __pypy__
+        a = [i for i in range(100)]
+        assert a + [1] == range(100) + [1]
+        assert __pypy__.strategy(a) == "IntegerListStrategy"
+        assert a * 2 == range(100) * 2
+        assert __pypy__.strategy(a) == "IntegerListStrategy"
+        b = [str(i) for i in range(100)]
+        assert (b + ['x'])[-1] == 'x'
+        assert __pypy__.strategy(b) == "BytesListStrategy"
+
+
 class AppTestRangeListForcing:
     """Tests for range lists that test forcing. Regular tests should go in
     AppTestListObject so they can be run -A against CPython as well. Separate
@@ -4,7 +4,9 @@ from pypy.objspace.std.listobject import (
     W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy,
     FloatListStrategy, BytesListStrategy, RangeListStrategy,
     SimpleRangeListStrategy, make_range_list, AsciiListStrategy,
-    IntOrFloatListStrategy)
+    IntOrFloatListStrategy, Int8ListStrategy, Int16ListStrategy,
+    CopyOnWriteIntegerListStrategy, CopyOnWriteObjectListStrategy,
+    COPY_ON_WRITE_CUTOFF)
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
 
@@ -1051,6 +1053,172 @@ class TestW_ListStrategies(TestW_ListObject):
         assert isinstance(w_item, space.StringObjectCls)
 
 
+class TestW_NarrowIntListStrategies:
+    spaceconfig = {"objspace.std.withnarrowintlists": True}
+
+    def test_check_strategy(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(-128), w(127)])
+        assert isinstance(l.strategy, Int8ListStrategy)
+        l = W_ListObject(space, [w(1), w(128)])
+        assert isinstance(l.strategy, Int16ListStrategy)
+        l = W_ListObject(space, [w(1), w(sys.maxint)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l = W_ListObject(space, [])
+        l.append(w(5))
+        assert isinstance(l.strategy, Int8ListStrategy)
+
+    def test_widen(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.append(w(300))
+        assert isinstance(l.strategy, Int16ListStrategy)
+        assert space.unwrap(l) == [1, 2, 3, 300]
+        l.setitem(0, w(-sys.maxint))
+        assert isinstance(l.strategy, IntegerListStrategy)
+        assert space.unwrap(l) == [-sys.maxint, 2, 3, 300]
+
+        l = W_ListObject(space, [w(1), w(2)])
+        l.insert(0, w(1.5))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [1.5, 1, 2]
+
+        l = W_ListObject(space, [w(1), w(2)])
+        l.append(w("a"))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == [1, 2, "a"]
+
+    def test_extend_and_setslice(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2)])
+        l.extend(W_ListObject(space, [w(3), w(1000)]))
+        assert isinstance(l.strategy, Int16ListStrategy)
+        l.extend(make_range_list(space, 5, 1, 2))
+        assert isinstance(l.strategy, Int16ListStrategy)
+        assert space.unwrap(l) == [1, 2, 3, 1000, 5, 6]
+        l.extend(W_ListObject(space, [w(sys.maxint)]))
+        assert isinstance(l.strategy, IntegerListStrategy)
+        assert space.unwrap(l) == [1, 2, 3, 1000, 5, 6, sys.maxint]
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.setslice(1, 1, 1, W_ListObject(space, [w(40000), w(5)]))
+        assert not isinstance(l.strategy, Int8ListStrategy)
+        assert not isinstance(l.strategy, Int16ListStrategy)
+        assert space.unwrap(l) == [1, 40000, 5, 3]
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.setslice(0, 1, 2, W_ListObject(space, [w(2.5)]))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [2.5, 3]
+
+        l = W_ListObject(space, [w(1000), w(2000)])
+        w_ints = W_ListObject.newlist_int(space, [7, 8])
+        w_ints.extend(l)
+        assert isinstance(w_ints.strategy, IntegerListStrategy)
+        assert space.unwrap(w_ints) == [7, 8, 1000, 2000]
+
+    def test_sort_slice_and_getitems_int(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(3), w(-1), w(2), w(-100)])
+        l.sort(False)
+        assert space.unwrap(l) == [-100, -1, 2, 3]
+        l.sort(True)
+        assert space.unwrap(l) == [3, 2, -1, -100]
+        w_slice = l.getslice(1, 3, 1, 2)
+        assert isinstance(w_slice.strategy, Int8ListStrategy)
+        assert space.unwrap(w_slice) == [2, -1]
+        assert l.getitems_int() == [3, 2, -1, -100]
+        assert space.listview_int(l) == [3, 2, -1, -100]
+        assert l.find(w(-1)) == 2
+        py.test.raises(ValueError, l.find, w(1000))
+
+
+class TestW_CopyOnWriteListStrategies:
+    spaceconfig = {"objspace.std.withcopyonwritelists": True}
+
+    def test_clone_shares(self):
+        space = self.space
+        n = COPY_ON_WRITE_CUTOFF
+        w_l = W_ListObject.newlist_int(space, range(n))
+        w_copy = w_l.clone()
+        assert isinstance(w_l.strategy, CopyOnWriteIntegerListStrategy)
+        assert isinstance(w_copy.strategy, CopyOnWriteIntegerListStrategy)
+        assert w_l.lstorage is w_copy.lstorage
+        w_copy.append(space.wrap(-1))
+        assert isinstance(w_copy.strategy, IntegerListStrategy)
+        assert space.unwrap(w_copy) == range(n) + [-1]
+        assert space.unwrap(w_l) == range(n)
+        w_l.setitem(0, space.wrap(42))
+        assert isinstance(w_l.strategy, IntegerListStrategy)
+        assert space.unwrap(w_l) == [42] + range(1, n)
+        assert space.unwrap(w_copy) == range(n) + [-1]
+
+    def test_short_lists_are_copied(self):
+        space = self.space
+        w_l = W_ListObject.newlist_int(space, [1, 2, 3])
+        w_copy = w_l.clone()
+        assert isinstance(w_l.strategy, IntegerListStrategy)
+        assert isinstance(w_copy.strategy, IntegerListStrategy)
+
+    def test_slices(self):
+        space = self.space
+        n = COPY_ON_WRITE_CUTOFF * 2
+        w_l = W_ListObject.newlist_int(space, range(n))
+        w_slice = w_l.getslice(1, n - 1, 1, n - 2)
+        assert isinstance(w_slice.strategy, CopyOnWriteIntegerListStrategy)
+        assert space.unwrap(w_slice) == range(1, n - 1)
+        assert w_slice.length() == n - 2
+        assert space.int_w(w_slice.getitem(0)) == 1
+        assert space.int_w(w_slice.getitem(-1)) == n - 2
+        py.test.raises(IndexError, w_slice.getitem, n - 2)
+        assert w_slice.getitems_int() == range(1, n - 1)
+        assert w_slice.find(space.wrap(5)) == 4
+        py.test.raises(ValueError, w_slice.find, space.wrap(0))
+        w_sub = w_slice.getslice(2, 5, 1, 3)
+        assert space.unwrap(w_sub) == [3, 4, 5]
+        w_sub = w_slice.getslice(0, n - 2, 3, (n - 2 + 2) // 3)
+        assert isinstance(w_sub.strategy, IntegerListStrategy)
+        assert space.unwrap(w_sub) == range(1, n - 1, 3)
+        # a short slice of a long list does not keep the list alive
+        w_l = W_ListObject.newlist_int(space, range(n * 4))
+        w_sub = w_l.getslice(0, COPY_ON_WRITE_CUTOFF, 1, COPY_ON_WRITE_CUTOFF)
+        assert isinstance(w_sub.strategy, IntegerListStrategy)
+
+    def test_extend_from_shared(self):
+        space = self.space
+        n = COPY_ON_WRITE_CUTOFF
+        w_l = W_ListObject.newlist_int(space, range(n))
+        w_copy = W_ListObject(space, [])
+        w_copy.extend(w_l)
+        assert isinstance(w_copy.strategy, CopyOnWriteIntegerListStrategy)
+        w_floats = W_ListObject.newlist_float(space, [0.5])
+        w_floats.extend(w_copy)
+        assert isinstance(w_floats.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(w_floats) == [0.5] + range(n)
+        w_copy.extend(w_copy)
+        assert isinstance(w_copy.strategy, IntegerListStrategy)
+        assert space.unwrap(w_copy) == range(n) * 2
+        assert space.unwrap(w_l) == range(n)
+
+    def test_objects(self):
+        space = self.space
+        n = COPY_ON_WRITE_CUTOFF
+        items_w = [space.newtuple([space.wrap(i)]) for i in range(n)]
+        w_l = W_ListObject(space, items_w[:])
+        w_copy = w_l.clone()
+        assert isinstance(w_copy.strategy, CopyOnWriteObjectListStrategy)
+        assert w_copy.getitems() == items_w
+        assert w_copy.find(space.newtuple([space.wrap(3)])) == 3
+        w_copy.sort(True)
+        assert isinstance(w_copy.strategy, ObjectListStrategy)
+        assert w_copy.getitems() == items_w[::-1]
+        assert w_l.getitems() == items_w
+
+
 class TestW_ListStrategiesDisabled:
     spaceconfig = {"objspace.std.withliststrategies": False}
 
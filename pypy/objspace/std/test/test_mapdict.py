@@ -6,6 +6,8 @@ class Config:
         class std:
             methodcachesizeexp = 11
             withmethodcachecounter = False
+            withunboxedattributes = False
+            withtuplekeys = False
 
 space = FakeSpace()
 space.config = Config
@@ -1372,6 +1374,219 @@ class TestDictSubclassShortcutBug(object):
                 """)
         assert w_dict.user_overridden_class
 
+class TestUnboxedAttributes(object):
+    spaceconfig = {"objspace.std.withunboxedattributes": True}
+
+    def get_obj(self, source):
+        return self.space.appexec([], """():
+            class A(object):
+                pass
+            a = A()
+%s
+            return a
+        """ % source)
+
+    def test_unboxed_storage(self):
+        w_obj = self.get_obj("""
+            a.x = 1
+            a.y = 2.5
+            a.z = "z"
+            a.t = -7
+        """)
+        map = w_obj._get_mapdict_map()
+        attrs = {}
+        while isinstance(map, PlainAttribute):
+            attrs[map.name] = map
+            map = map.back
+        assert isinstance(attrs["x"], UnboxedPlainAttribute)
+        assert attrs["x"].kind == UNBOXED_INT
+        assert attrs["y"].kind == UNBOXED_FLOAT
+        assert type(attrs["z"]) is PlainAttribute
+        assert attrs["t"].kind == UNBOXED_INT
+        # the unboxed attributes share one storage slot
+        assert attrs["x"].firstunboxed
+        assert not attrs["y"].firstunboxed
+        assert attrs["y"].storageindex == attrs["t"].storageindex == 0
+        assert attrs["z"].storageindex == 1
+        assert w_obj._get_mapdict_map().length() == 2
+        w_storage = w_obj._mapdict_read_storage(0)
+        assert isinstance(w_storage, UnboxedStorage)
+        assert w_storage.values[1] == 2.5
+        assert [attrs[name].listindex for name in "xyt"] == [0, 1, 2]
+        space = self.space
+        assert space.int_w(w_obj.getdictvalue(space, "t")) == -7
+
+    def test_devolve(self):
+        space = self.space
+        w_objs = space.appexec([], """():
+            class A(object):
+                pass
+            def make(x, y):
+                a = A()
+                a.x = x
+                a.y = y
+                return a
+            return make, make(1, 2), make(3, 4)
+        """)
+        w_make, w_obj, w_obj2 = space.fixedview(w_objs)
+        map = w_obj._get_mapdict_map()
+        assert isinstance(map, UnboxedPlainAttribute)
+        version = map.terminator.version
+        w_obj.setdictvalue(space, "x", space.newtext("x"))
+        # the lookups in 'cache_attrs' give another result now
+        assert map.terminator.version is not version
+        assert space.text_w(w_obj.getdictvalue(space, "x")) == "x"
+        assert space.int_w(w_obj.getdictvalue(space, "y")) == 2
+        newmap = w_obj._get_mapdict_map()
+        assert type(newmap.back) is PlainAttribute
+        assert newmap.back.name == "x"
+        # the other object keeps the unboxed attribute until a new value is
+        # written, but objects created later use the generic attribute
+        assert w_obj2._get_mapdict_map() is map
+        w_obj3 = space.call_function(w_make, space.newint(5), space.newint(6))
+        assert w_obj3._get_mapdict_map() is newmap
+        w_obj2.setdictvalue(space, "x", space.w_None)
+        assert w_obj2._get_mapdict_map() is newmap
+        assert space.int_w(w_obj2.getdictvalue(space, "y")) == 4
+
+
+class TestUnboxedAttributesDisabled(object):
+    spaceconfig = {"objspace.std.withunboxedattributes": False}
+
+    def test_no_unboxing(self):
+        w_obj = self.space.appexec([], """():
+            class A(object):
+                pass
+            a = A()
+            a.x = 1
+            a.y = 2.5
+            return a
+        """)
+        map = w_obj._get_mapdict_map()
+        assert type(map) is PlainAttribute
+        assert type(map.back) is PlainAttribute
+
+
+class AppTestUnboxedAttributes(object):
+    spaceconfig = {"objspace.std.withunboxedattributes": True}
+
+    def test_values(self):
+        import sys
+        class A(object):
+            pass
+        a = A()
+        a.i = sys.maxint
+        a.j = -sys.maxint - 1
+        a.f = -0.0
+        a.n = float("nan")
+        a.b = True
+        assert a.i == sys.maxint
+        assert type(a.i) is int
+        assert a.j == -sys.maxint - 1
+        assert str(a.f) == "-0.0"
+        assert a.n != a.n
+        assert a.b is True
+        a.i += 1
+        assert a.i == sys.maxint + 1
+        a.f = 1.5
+        assert a.f == 1.5
+        assert a.__dict__ == {"i": sys.maxint + 1, "j": -sys.maxint - 1,
+                              "f": 1.5, "n": a.n, "b": True}
+
+    def test_many_attributes(self):
+        class A(object):
+            pass
+        objs = []
+        for i in range(10):
+            a = A()
+            for j in range(20):
+                if j % 3 == 0:
+                    setattr(a, "x%d" % j, i * j)
+                elif j % 3 == 1:
+                    setattr(a, "x%d" % j, i * j + 0.5)
+                else:
+                    setattr(a, "x%d" % j, str(i * j))
+            objs.append(a)
+        objs[5].x3 = "changed"
+        for i, a in enumerate(objs):
+            for j in range(20):
+                value = getattr(a, "x%d" % j)
+                if i == 5 and j == 3:
+                    assert value == "changed"
+                elif j % 3 == 0:
+                    assert value == i * j
+                elif j % 3 == 1:
+                    assert value == i * j + 0.5
+                else:
+                    assert value == str(i * j)
+
+    def test_change_type_and_delete(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2.0
+        a.z = 3
+        a.y = 4
+        assert (a.x, a.y, a.z) == (1, 4, 3)
+        assert type(a.y) is int
+        del a.x
+        assert not hasattr(a, "x")
+        assert (a.y, a.z) == (4, 3)
+        a.x = 5.5
+        assert (a.x, a.y, a.z) == (5.5, 4, 3)
+        b = A()
+        b.x = 6
+        b.y = 7
+        b.z = 8
+        assert (b.x, b.y, b.z) == (6, 7, 8)
+        b.__dict__["z"] = None
+        assert b.z is None
+        b.__dict__.clear()
+        assert not hasattr(b, "y")
+
+    def test_change_type_keeps_order(self):
+        class A(object):
+            pass
+        b = A()
+        b.x = 1
+        b.y = 2
+        b.z = 3
+        # 'c' is moved to the same maps as 'b' when it gets 'x'
+        c = A()
+        c.z = 3
+        c.x = 1
+        c.y = 2.5
+        keys = list(c.__dict__)
+        c.x = 1.5
+        assert list(c.__dict__) == keys
+        assert (c.x, c.y, c.z) == (1.5, 2.5, 3)
+
+    def test_slots(self):
+        class A(object):
+            __slots__ = ["x", "y"]
+        a = A()
+        a.x = 1
+        a.y = 2.5
+        assert (a.x, a.y) == (1, 2.5)
+        a.x = "a"
+        assert (a.x, a.y) == ("a", 2.5)
+        del a.y
+        raises(AttributeError, "a.y")
+
+    def test_class_change(self):
+        class A(object):
+            pass
+        class B(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2.0
+        a.__class__ = B
+        assert type(a) is B
+        assert (a.x, a.y) == (1, 2.0)
+
+
 def test_newdict_instance():
     w_dict = space.newdict(instance=True)
     assert type(w_dict.get_strategy()) is MapDictStrategy
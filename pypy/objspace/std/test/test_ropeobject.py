@@ -0,0 +1,87 @@
+from pypy.objspace.std import ropeobject
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.ropeobject import W_RopeBytesObject
+from pypy.objspace.std.test import test_bytesobject
+
+
+class TestW_RopeBytesObject:
+    spaceconfig = {"objspace.std.withrope": True}
+
+    def test_concatenate(self):
+        space = self.space
+        n = ropeobject.ROPE_MIN_LENGTH
+        w_short = space.add(space.newbytes('a'), space.newbytes('b'))
+        assert type(w_short) is W_BytesObject
+        w_long = space.add(space.newbytes('a' * n), space.newbytes('b'))
+        assert type(w_long) is W_RopeBytesObject
+        assert w_long.w_flat is None
+        assert space.len_w(w_long) == n + 1
+        w_long = space.add(w_long, space.newbytes('c'))
+        assert type(w_long) is W_RopeBytesObject
+        w_long = space.add(space.newbytes('d'), w_long)
+        assert type(w_long) is W_RopeBytesObject
+        assert w_long.w_flat is None
+        assert space.bytes_w(w_long) == 'd' + 'a' * n + 'bc'
+        assert w_long.w_flat is not None
+
+    def test_slice(self):
+        space = self.space
+        n = ropeobject.ROPE_MIN_LENGTH
+        w_long = space.add(space.newbytes('x' * n), space.newbytes('y' * n))
+        w_slice = space.getslice(w_long, space.newint(1), space.newint(-1))
+        assert type(w_slice) is W_RopeBytesObject
+        assert space.len_w(w_slice) == 2 * n - 2
+        w_slice = space.getslice(w_long, space.newint(n - 2),
+                                 space.newint(n + 2))
+        assert type(w_slice) is W_BytesObject
+        assert space.bytes_w(w_slice) == 'xxyy'
+        assert space.bytes_w(space.getitem(w_long, space.newint(-1))) == 'y'
+        assert w_long.w_flat is None
+
+    def test_compare_and_hash(self):
+        space = self.space
+        n = ropeobject.ROPE_MIN_LENGTH
+        w_a = space.add(space.newbytes('a' * n), space.newbytes('b'))
+        w_b = space.add(space.newbytes('a'), space.newbytes('a' * (n - 1) + 'b'))
+        w_flat = space.newbytes('a' * n + 'b')
+        assert space.eq_w(w_a, w_b)
+        assert space.eq_w(w_a, w_flat)
+        assert space.eq_w(w_flat, w_b)
+        assert space.hash_w(w_a) == space.hash_w(w_flat)
+        assert space.is_true(space.lt(w_flat, space.add(w_b, w_b)))
+
+
+class AppTestRopeBytesObject(test_bytesobject.AppTestBytesObject):
+    """Runs all the str tests with ropes for all the concatenations."""
+    spaceconfig = {"objspace.std.withrope": True}
+
+    def setup_class(cls):
+        cls.saved_min_length = ropeobject.ROPE_MIN_LENGTH
+        ropeobject.ROPE_MIN_LENGTH = 2
+
+    def teardown_class(cls):
+        ropeobject.ROPE_MIN_LENGTH = cls.saved_min_length
+
+    def test_rope(self):
+        import __pypy__
+        s = 'abc' + 'def'
+        assert 'Rope' in __pypy__.internal_repr(s)
+        assert s == 'abcdef' and 'abcdef' == s
+        assert s[1:4] == 'bcd'
+        assert s[::2] == 'ace'
+        assert s[-1] == 'f'
+        assert s.upper() == 'ABCDEF'
+        t = s
+        for i in range(10):
+            t += s
+        assert len(t) == 66
+        assert t == 'abcdef' * 11
+        assert hash(t) == hash('abcdef' * 11)
+        assert {t: 1}['abcdef' * 11] == 1
+        assert str(t) is t
+        assert 'cde' in t
+        assert t.find(s[2:5]) == 2
+        assert '{0}-{0}'.format(s) == 'abcdef-abcdef'
+        assert '%s!' % s == 'abcdef!'
+        assert s + u'g' == u'abcdefg'
+        assert bytearray('x') + s == bytearray('xabcdef')
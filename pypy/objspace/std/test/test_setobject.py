@@ -81,6 +81,7 @@ class TestW_SetObject:
     def test_create_set_from_list(self):
         from pypy.interpreter.baseobjspace import W_Root
         from pypy.objspace.std.setobject import BytesSetStrategy, ObjectSetStrategy
+        from pypy.objspace.std.setobject import FloatSetStrategy
         from pypy.objspace.std.floatobject import W_FloatObject
 
         w = self.space.wrap
@@ -116,6 +117,12 @@ class TestW_SetObject:
         w_list = W_ListObject(self.space, [w(1.0), w(2.0), w(3.0)])
         w_set = W_SetObject(self.space)
         _initialize_set(self.space, w_set, w_list)
+        assert w_set.strategy is self.space.fromcache(FloatSetStrategy)
+        assert w_set.strategy.unerase(w_set.sstorage) == {1.0:None, 2.0:None, 3.0:None}
+
+        w_list = W_ListObject(self.space, [w(1.0), w(float('nan')), w(3.0)])
+        w_set = W_SetObject(self.space)
+        _initialize_set(self.space, w_set, w_list)
         assert w_set.strategy is self.space.fromcache(ObjectSetStrategy)
         for item in w_set.strategy.unerase(w_set.sstorage):
             assert isinstance(item, W_FloatObject)
@@ -1069,6 +1076,81 @@ class AppTestAppSetTest:
         s.intersection_update(set())
         assert strategy(s) == "EmptySetStrategy"
 
+    def test_float_strategy(self):
+        from __pypy__ import strategy
+        s = set([1.5, 2.5, -0.0])
+        assert strategy(s) == "FloatSetStrategy"
+        s.add(0.0)
+        assert len(s) == 3
+        assert 2.5 in s
+        assert 3.5 not in s
+        t = set()
+        t.add(2.5)
+        t.add(7.0)
+        assert strategy(t) == "FloatSetStrategy"
+        assert strategy(s | t) == "FloatSetStrategy"
+        assert s | t == set([1.5, 2.5, 0.0, 7.0])
+        assert strategy(s & t) == "FloatSetStrategy"
+        assert s & t == set([2.5])
+        assert strategy(s - t) == "FloatSetStrategy"
+        assert s - t == set([1.5, 0.0])
+        assert s ^ t == set([1.5, 0.0, 7.0])
+        assert s.isdisjoint(set(["a"]))
+        assert not s.issubset(set([1.5, 2.5]))
+        assert set([1.5]).issubset(s)
+        assert set([1.0, 2.0]) == set([1, 2])
+        assert sorted(list(s)) == [0.0, 1.5, 2.5]
+        nan = float('nan')
+        s = set([1.5, nan])
+        assert strategy(s) == "ObjectSetStrategy"
+        assert nan in s
+        s = set([1.5])
+        s.add(nan)
+        assert strategy(s) == "ObjectSetStrategy"
+        assert nan in s and 1.5 in s
+        s = set([1.5])
+        assert 1 not in s
+        assert strategy(s) == "ObjectSetStrategy"
+
+    def test_unicode_strategy(self):
+        from __pypy__ import strategy
+        s = set([u"\xe9t\xe9", u"hiver"])
+        assert strategy(s) == "UnicodeSetStrategy"
+        assert u"\xe9t\xe9" in s and u"hiver" in s
+        assert u"\xe9" not in s
+        assert sorted(s) == [u"hiver", u"\xe9t\xe9"]
+        assert [len(x) for x in sorted(s)] == [5, 3]
+        s = set([u"a", u"b"])
+        assert strategy(s) == "AsciiSetStrategy"
+        s.add(u"\u1234")
+        assert strategy(s) == "UnicodeSetStrategy"
+        assert s == set([u"a", u"b", u"\u1234"])
+        t = set([u"a", u"c"])
+        assert strategy(t) == "AsciiSetStrategy"
+        assert strategy(s | t) == "UnicodeSetStrategy"
+        assert s | t == set([u"a", u"b", u"c", u"\u1234"])
+        t |= s
+        assert strategy(t) == "UnicodeSetStrategy"
+        assert t == set([u"a", u"b", u"c", u"\u1234"])
+        assert s & set([u"\u1234", u"x"]) == set([u"\u1234"])
+        assert s - set([u"\u1234"]) == set([u"a", u"b"])
+        assert set([u"\u1234"]).isdisjoint(set([1, 2]))
+        s = set()
+        s.add(u"\u1234")
+        assert strategy(s) == "UnicodeSetStrategy"
+
+    def test_tuple_key_identity(self):
+        from __pypy__ import strategy
+        k = ("a", "b")
+        s = set([k])
+        assert strategy(s) == "ObjectSetStrategy"
+        assert list(s)[0] is k
+        assert s.pop() is k
+        s = set([(1, 2)])
+        s.add(k)
+        assert strategy(s) == "ObjectSetStrategy"
+        assert [x for x in s if x is k] == [k]
+
     def test_weird_exception_from_iterable(self):
         def f():
            raise ValueError
@@ -1086,3 +1168,53 @@ class AppTestAppSetTest:
         if hasattr(frozenset.copy, 'im_func'):
             e = raises(TypeError, frozenset.copy.im_func, 42)
             assert "'set-or-frozenset'" in str(e.value)
+
+
+class AppTestTupleKeySetStrategies:
+    spaceconfig = {"objspace.std.withtuplekeys": True}
+
+    def test_tuple_key_strategy(self):
+        from __pypy__ import strategy
+        s = set()
+        s.add((1, 2))
+        assert strategy(s) == "TupleKeySetStrategy_ii"
+        s.add((3, 4))
+        assert (1, 2) in s
+        assert (5, 6) not in s
+        assert sorted(s) == [(1, 2), (3, 4)]
+        t = set([(3, 4), (5, 6)])
+        assert strategy(s | t) == "TupleKeySetStrategy_ii"
+        assert s & t == set([(3, 4)])
+        assert s - t == set([(1, 2)])
+        assert not s.isdisjoint(t)
+        assert s.isdisjoint(set([("a", "b")]))
+        assert s != set([(1, 2, 3)])
+        assert s == set([(1, 2), (3, 4)])
+        s.discard((1, 2))
+        assert s == set([(3, 4)])
+        assert strategy(s) == "TupleKeySetStrategy_ii"
+        assert (3.0, 4L) in s
+        assert strategy(s) == "ObjectSetStrategy"
+        #
+        s = set([("a", "b", "c"), ("d", "e", "f")])
+        assert strategy(s) == "TupleKeySetStrategy_sss"
+        s.add(("g", "h"))
+        assert strategy(s) == "ObjectSetStrategy"
+        assert len(s) == 3 and ("g", "h") in s
+        s = set([(1, "a")])
+        assert strategy(s) == "ObjectSetStrategy"
+        s = frozenset([(1, 2, 3)])
+        assert strategy(s) == "TupleKeySetStrategy_iii"
+        assert hash(s) == hash(frozenset([(1, 2, 3)]))
+
+    def test_tuple_key_rewrapped(self):
+        from __pypy__ import strategy
+        k = ("a", "b")
+        s = set([k])
+        assert strategy(s) == "TupleKeySetStrategy_ss"
+        assert list(s) == [k]
+        assert s.pop() == k
+        s = set([(1, 2)])
+        s.add(k)
+        assert strategy(s) == "ObjectSetStrategy"
+        assert sorted(s) == [(1, 2), k]
@@ -144,3 +144,28 @@ class TestW_SetStrategies:
         #
         #s = W_SetObject(space, self.wrapped([u"a", u"b"]))
         #assert sorted(space.listview_unicode(s)) == [u"a", u"b"]
+
+
+class TestW_TupleKeySetStrategies:
+    spaceconfig = {"objspace.std.withtuplekeys": True}
+
+    def wrapped(self, l):
+        return W_ListObject(self.space, [self.space.wrap(x) for x in l])
+
+    def test_from_list_of_tuples(self):
+        from pypy.objspace.std.setobject import tuple_key_strategies
+        TupleKeySetStrategy_ii = tuple_key_strategies[0]
+        space = self.space
+        s = W_SetObject(space, self.wrapped([(1, 2), (3, 4)]))
+        assert s.strategy is space.fromcache(TupleKeySetStrategy_ii)
+        assert sorted(s.strategy.unerase(s.sstorage).keys()) == [(1, 2),
+                                                                 (3, 4)]
+        s.add(space.wrap((5, 6)))
+        assert s.strategy is space.fromcache(TupleKeySetStrategy_ii)
+        s.add(space.wrap((5, 6, 7)))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+        assert s.length() == 4
+        s = W_SetObject(space, self.wrapped([(1, 2), (3, 4), (5, 6, 7)]))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+        s = W_SetObject(space, self.wrapped([("a", "b"), (3, 4)]))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
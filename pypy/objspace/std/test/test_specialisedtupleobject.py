@@ -49,8 +49,28 @@ class TestW_SpecialisedTupleObject():
         hash_test([1, (1, 2)])
         hash_test([1, ('a', 2)])
         hash_test([1, ()])
-        hash_test([1, 2, 3], must_be_specialized=False)
+        hash_test([1, 2, 3])
+        hash_test([1.5, -2.0, 3.25, 1e300, -0.0])
+        hash_test([1, 2.0, 3], must_be_specialized=False)
         hash_test([1 << 62, 0])
+        hash_test([1 << 62, 0, -1, -(1 << 62)])
+
+    def test_array_tuples(self):
+        space = self.space
+        w_tuple = space.newtuple([space.wrap(i) for i in range(5)])
+        assert isinstance(w_tuple, W_SpecialisedTupleObject_ints)
+        assert w_tuple.getitems_int() == [0, 1, 2, 3, 4]
+        assert w_tuple.getitems_float() is None
+        w_tuple = space.newtuple([space.wrap(0.5)] * 3)
+        assert isinstance(w_tuple, W_SpecialisedTupleObject_floats)
+        assert w_tuple.getitems_float() == [0.5, 0.5, 0.5]
+        assert w_tuple.getitems_int() is None
+        w_tuple = space.newtuple([space.wrap(1), space.wrap(2)])
+        assert w_tuple.getitems_int() == [1, 2]
+        w_tuple = space.newtuple([space.wrap(1), space.wrap(2),
+                                  space.wrap(3L)])
+        assert isinstance(w_tuple, W_TupleObject)
+        assert w_tuple.getitems_int() is None
 
     try:
         from hypothesis import given, strategies
@@ -101,9 +121,55 @@ class AppTestW_SpecialisedTupleObject:
         assert len(t) == 2
 
     def test_notspecialisedtuple(self):
-        assert not self.isspecialised((42, 43, 44, 45))
+        assert not self.isspecialised((42, 43, 44, 45.5))
+        assert not self.isspecialised((42, 43, 44, 2 ** 100))
         assert not self.isspecialised((1.5,))
 
+    def test_array_tuples(self):
+        t = (42, 43, 44, 45)
+        assert self.isspecialised(t, '_ints')
+        assert len(t) == 4
+        assert t[0] == 42 and t[-1] == 45
+        raises(IndexError, "t[4]")
+        raises(IndexError, "t[-5]")
+        assert list(t) == [42, 43, 44, 45]
+        assert t[1:] == (43, 44, 45)
+        assert self.isspecialised(t[1:], '_ints')
+        assert self.isspecialised(t + (1,), '_ints')
+        assert 44 in t and 44.0 in t and 46 not in t
+        t = (1.5, 2.5, -0.0)
+        assert self.isspecialised(t, '_floats')
+        assert t == (1.5, 2.5, 0.0)
+        assert t[2] == 0.0
+        assert self.isspecialised(t * 3, '_floats')
+        assert len(t * 3) == 9
+
+    def test_array_tuples_eq_hash(self):
+        a = (1, 2, 3, 4, 5)
+        b = tuple([1, 2, 3, 4, 5])
+        assert a == b and not a != b
+        assert hash(a) == hash(b)
+        assert a == (1.0, 2.0, 3.0, 4.0, 5.0)
+        assert hash(a) == hash((1.0, 2.0, 3.0, 4.0, 5.0))
+        assert a == (1, 2L, 3, 4, 5)
+        assert hash(a) == hash((1, 2L, 3, 4, 5))
+        assert a != (1, 2, 3, 4)
+        assert a != (1, 2, 3, 4, 6)
+        assert a != (1, 2, 3, 4, 5.5)
+        assert a < (1, 2, 3, 4, 6)
+        assert (1, 2, 3) > (1, 2)
+        N = float('nan')
+        T = (N, N, N)
+        assert T == (N, N, N)
+        assert N in T
+        assert (0.0, 0.0, 1.0) == (-0.0, -0.0, 1.0)
+        assert hash((0.0, 0.0, 1.0)) == hash((-0.0, -0.0, 1.0))
+        d = {(1, 2, 3): 'a', (1.5, 2.5, 3.5): 'b'}
+        assert d[tuple([1, 2, 3])] == 'a'
+        assert d[(1.0, 2.0, 3.0)] == 'a'
+        assert d[(1.5, 2.5, 3.5)] == 'b'
+        assert (1, 2, 3) in set([(1, 2, 3), (4, 5, 6)])
+
     def test_slicing_to_specialised(self):
         t = (1, 2, 3)
         assert self.isspecialised(t[0:2])
@@ -226,7 +292,7 @@ class AppTestW_SpecialisedTupleObject:
         assert a == (2.2,) + b
         assert not a != (2.2,) + b
         #
-        if not self.isspecialised((1, 2, 3)):
+        if not self.isspecialised((1, 2.2, '333')):
             skip("don't have specialization for 3-tuples")
         a = (1, 2.2, '333')
         assert self.isspecialised(a)
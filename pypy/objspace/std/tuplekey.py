@@ -0,0 +1,114 @@
+"""Shared code of the dict and set strategies whose keys are all tuples of
+two or three ints, or of two or three strings.  Such keys are stored as
+RPython tuples of their unwrapped items: the dicts hash and compare them
+item by item, without calling space.hash_w() and space.eq_w(), and without
+keeping a boxed tuple and its boxed items alive for every key.  The keys
+that come out are new tuples, so these strategies are only used with the
+'withtuplekeys' option."""
+
+from rpython.rlib.unroll import unrolling_iterable
+
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+
+
+# the shapes of keys that get a strategy
+TUPLE_KEY_TYPES = [(int, int), (int, int, int), (str, str), (str, str, str)]
+
+
+def tuple_key_suffix(typetuple):
+    return ''.join([t.__name__[0] for t in typetuple])
+
+
+def never_equal_to_tuple(space, w_lookup_type):
+    """Handles the case of a non tuple key lookup: these types never compare
+    equal to a tuple."""
+    return (space.is_w(w_lookup_type, space.w_NoneType) or
+            space.is_w(w_lookup_type, space.w_int) or
+            space.is_w(w_lookup_type, space.w_bool) or
+            space.is_w(w_lookup_type, space.w_float) or
+            space.is_w(w_lookup_type, space.w_bytes) or
+            space.is_w(w_lookup_type, space.w_unicode))
+
+
+def make_tuple_key_mixin(typetuple):
+    """ Returns a mixin with the is_correct_type(), unwrap(), wrap() and
+    wrapkey() methods of a strategy whose keys are the tuples of the given
+    shape. """
+    typelen = len(typetuple)
+    itemtype = typetuple[0]
+    assert typetuple == (itemtype,) * typelen
+    assert typelen == 2 or typelen == 3
+    if itemtype == int:
+        W_ItemType = W_IntObject
+        def unwrap_item(w_item):
+            assert isinstance(w_item, W_IntObject)
+            return w_item.intval
+        wrap_item = lambda space, item: space.newint(item)
+    elif itemtype == str:
+        W_ItemType = W_BytesObject
+        def unwrap_item(w_item):
+            assert isinstance(w_item, W_BytesObject)
+            return w_item._value
+        wrap_item = lambda space, item: space.newbytes(item)
+    else:
+        assert 0
+    iter_n = unrolling_iterable(range(typelen))
+
+    def build_key(items):
+        if typelen == 2:
+            return (items[0], items[1])
+        else:
+            return (items[0], items[1], items[2])
+
+    def _unwrapkey(space, w_key):
+        # reads the items in place: no list of items is built
+        assert isinstance(w_key, W_AbstractTupleObject)
+        if itemtype == int:
+            items = w_key.getitems_int()
+            if items is not None:
+                return build_key(items)
+        item0 = unwrap_item(w_key.getitem(space, 0))
+        item1 = unwrap_item(w_key.getitem(space, 1))
+        if typelen == 2:
+            return (item0, item1)
+        else:
+            return (item0, item1, unwrap_item(w_key.getitem(space, 2)))
+
+    def _wrapkey(space, key):
+        items_w = [None] * typelen
+        for i in iter_n:
+            items_w[i] = wrap_item(space, key[i])
+        return space.newtuple(items_w)
+
+    class TupleKeyMixin(object):
+        _mixin_ = True
+
+        def is_correct_type(self, w_key):
+            space = self.space
+            if not isinstance(w_key, W_AbstractTupleObject):
+                return False
+            if not space.is_w(space.type(w_key), space.w_tuple):
+                return False
+            if w_key.length() != typelen:
+                return False
+            if itemtype == int and w_key.getitems_int() is not None:
+                return True
+            # getitem() does not copy the items of a W_TupleObject
+            for i in iter_n:
+                if type(w_key.getitem(space, i)) is not W_ItemType:
+                    return False
+            return True
+
+        def unwrap(self, w_key):
+            return _unwrapkey(self.space, w_key)
+
+        def wrap(self, key):
+            return _wrapkey(self.space, key)
+
+        def wrapkey(space, key):
+            return _wrapkey(space, key)
+
+    TupleKeyMixin.__name__ = 'TupleKeyMixin_' + tuple_key_suffix(typetuple)
+    return TupleKeyMixin
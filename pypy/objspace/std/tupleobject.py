@@ -81,6 +81,18 @@ class W_AbstractTupleObject(W_Root):
         """Returns a copy of the items, as a resizable list."""
         raise NotImplementedError
 
+    def getitems_int(self):
+        """Returns the items as a fixed-size list of unboxed ints if the
+        tuple is stored that way, and None otherwise.  The list must not be
+        modified."""
+        return None
+
+    def getitems_float(self):
+        """Returns the items as a fixed-size list of unboxed floats if the
+        tuple is stored that way, and None otherwise.  The list must not be
+        modified."""
+        return None
+
     def length(self):
         raise NotImplementedError
 
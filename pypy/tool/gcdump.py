@@ -4,8 +4,13 @@ Prints a human-readable total out of a dumpfile produced
 by gc.dump_rpy_heap(), and optionally a typeids.txt.
 
 Syntax:  dump.py  <dumpfile>  [<typeids.txt>]
+         dump.py  --profile  [<old_profile>]  <profile>  [<typeids.txt>]
 
 By default, typeids.txt is loaded from the same dir as dumpfile.
+
+With --profile, reads instead the output of gc.dump_heap_profile() and
+prints an estimate of the live memory per allocation site.  If two
+profiles of the same process are given, prints the growth between them.
 """
 import sys, array, struct, os
 
@@ -101,21 +106,136 @@ class Stat(object):
         print >> sys.stderr, 'done'
 
 
+class HeapProfile(Stat):
+    """Aggregates the output of gc.dump_heap_profile(); see the docstring
+    of pypy/module/gc/heapprof.py for the format."""
+    PROFILE_MAGIC = 0x48505246
+    TAG_ALLOC, TAG_CODE = 1, 3
+    TOP = 25
+
+    def load_profile(self, filename):
+        a = self.load_dump_file(filename)
+        assert a[0] == self.PROFILE_MAGIC, "not a heap profile"
+        assert a[-1] == -1, "invalid or truncated heap profile"
+        self.interval = a[1]
+        self.live = {}        # {sample_id: (size, typenum, stack)}
+        self.codenames = {}   # {code_id: name}
+        i = 2
+        while a[i] != -1:
+            tag = a[i]
+            if tag == self.TAG_ALLOC:
+                depth = a[i + 4]
+                stack = tuple(a[i + 5:i + 5 + depth])
+                self.live[a[i + 1]] = (a[i + 2], a[i + 3], stack)
+                i += 5 + depth
+            elif tag == self.TAG_CODE:
+                length = a[i + 2]
+                nwords = (length + a.itemsize - 1) // a.itemsize
+                data = a[i + 3:i + 3 + nwords].tostring()
+                self.codenames[a[i + 1]] = data[:length]
+                i += 3 + nwords
+            else:
+                raise AssertionError("bad tag %d in heap profile" % (tag,))
+
+    def get_code_name(self, code_id):
+        name = self.codenames.get(code_id)
+        if name is None:
+            return '<code %d>' % (code_id,)
+        # vmprof format: 'py:name:line:filename'
+        parts = name.split(':', 3)
+        if len(parts) == 4:
+            return '%s (%s:%s)' % (parts[1], parts[3], parts[2])
+        return name
+
+    def estimated_size(self, size):
+        # each sample stands for 'interval' bytes of allocations
+        return max(size, self.interval)
+
+    def summarize_sites(self, previous=None):
+        """Return a dict {(typenum, stack): [count, estimated_bytes]} of
+        the live samples.  If 'previous' is another HeapProfile of the
+        same process, only count the samples that are not in it."""
+        sites = {}
+        for sample_id, (size, typenum, stack) in self.live.items():
+            if previous is not None and sample_id in previous.live:
+                continue
+            try:
+                stat = sites[typenum, stack]
+            except KeyError:
+                stat = sites[typenum, stack] = [0, 0]
+            stat[0] += 1
+            stat[1] += self.estimated_size(size)
+        if previous is not None:
+            # and subtract the samples that died in-between
+            for sample_id, (size, typenum, stack) in previous.live.items():
+                if sample_id in self.live:
+                    continue
+                try:
+                    stat = sites[typenum, stack]
+                except KeyError:
+                    stat = sites[typenum, stack] = [0, 0]
+                stat[0] -= 1
+                stat[1] -= previous.estimated_size(size)
+        return sites
+
+    def print_profile(self, previous=None):
+        sites = self.summarize_sites(previous).items()
+        sites.sort(key=lambda (key, stat): -abs(stat[1]))
+        total = 0
+        for key, stat in sites:
+            total += stat[1]
+        for (typenum, stack), stat in sites[:self.TOP]:
+            print '%8d %8.2fM  %s' % (stat[0], stat[1] / (1024.0*1024.0),
+                                      self.get_type_name(typenum))
+            for code_id in stack:
+                print '%20s%s' % ('', self.get_code_name(code_id))
+        if previous is not None:
+            print 'total growth %.1fM (estimated)' % (total / (1024.0*1024.0),)
+        else:
+            print 'total %.1fM (estimated)' % (total / (1024.0*1024.0),)
+
+
+def load_typeids_near(stat, filename, typeid_name=None):
+    if typeid_name is None:
+        typeid_name = os.path.join(os.path.dirname(filename), 'typeids.txt')
+    if os.path.isfile(typeid_name):
+        stat.load_typeids(typeid_name)
+    else:
+        import zlib, gc
+        stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
+
+
+def main_profile(args):
+    typeid_name = None
+    if args and args[-1].endswith('.txt'):
+        typeid_name = args.pop()
+    if len(args) not in (1, 2):
+        print >> sys.stderr, __doc__
+        sys.exit(2)
+    previous = None
+    if len(args) == 2:
+        previous = HeapProfile()
+        previous.load_profile(args[0])
+    profile = HeapProfile()
+    profile.load_profile(args[-1])
+    load_typeids_near(profile, args[-1], typeid_name)
+    profile.print_profile(previous)
+
+
 if __name__ == '__main__':
     if len(sys.argv) <= 1:
         print >> sys.stderr, __doc__
         sys.exit(2)
+    if sys.argv[1] == '--profile':
+        main_profile(sys.argv[2:])
+        sys.exit(0)
     stat = Stat()
     stat.summarize(sys.argv[1])
     #
     if len(sys.argv) > 2:
         typeid_name = sys.argv[2]
     else:
-        typeid_name = os.path.join(os.path.dirname(sys.argv[1]), 'typeids.txt')
-    if os.path.isfile(typeid_name):
-        stat.load_typeids(typeid_name)
-    else:
-        import zlib, gc
-        stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
+        typeid_name = None
+    load_typeids_near(stat, sys.argv[1], typeid_name)
     #
     stat.print_summary()
@@ -24,9 +24,13 @@ from rpython.rlib.rarithmetic import ovfcheck, r_uint, r_ulonglong, intmask
 from rpython.rlib.objectmodel import Symbolic, compute_hash
 
 class LLAsmInfo(object):
+    asmaddr = 0
+
     def __init__(self, lltrace):
         self.ops_offset = None
         self.lltrace = lltrace
+        # a fake size for the machine code, for the memory manager
+        self.asmlen = 16 * len(lltrace.operations)
 
 class LLTrace(object):
     has_been_freed = False
@@ -356,6 +360,7 @@ class LLGraphCPU(model.AbstractCPU):
         clt._llgraph_loop = lltrace
         clt._llgraph_alltraces = [lltrace]
         self._record_labels(lltrace)
+        return LLAsmInfo(lltrace)
 
     def compile_bridge(self, faildescr, inputargs, operations,
                        original_loop_token, log=True, logger=None):
@@ -261,7 +261,7 @@ def compile_loop(metainterp, greenkey, start, inputargs, jumpargs,
     metainterp_sd.jitlog.start_new_trace(metainterp_sd,
             faildescr=None, entry_bridge=False)
     #
-    enable_opts = jitdriver_sd.warmstate.enable_opts
+    enable_opts = metainterp.get_enable_opts()
     jitcell_token = make_jitcell_token(jitdriver_sd)
     cut_at = history.get_trace_position()
     history.record(rop.JUMP, jumpargs, None, descr=jitcell_token)
@@ -352,7 +352,7 @@ def compile_retrace(metainterp, greenkey, start,
 
     cut = history.get_trace_position()
     history.record(rop.JUMP, jumpargs[:], None, descr=loop_jitcell_token)
-    enable_opts = jitdriver_sd.warmstate.enable_opts
+    enable_opts = metainterp.get_enable_opts()
     call_pure_results = metainterp.call_pure_results
     loop_data = UnrolledLoopData(trace, loop_jitcell_token, start_state,
                                  call_pure_results=call_pure_results,
@@ -542,6 +542,12 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
     if hooks is not None:
         debug_info.asminfo = asminfo
         hooks.after_compile(debug_info)
+    if asminfo is not None and metainterp_sd.warmrunnerdesc is not None:
+        metainterp_sd.warmrunnerdesc.memory_manager.record_code_size(
+            original_jitcell_token, asminfo.asmlen)
+    if metainterp_sd.warmrunnerdesc is not None:
+        metainterp_sd.warmrunnerdesc.hooks.on_loop_compiled(
+            jitdriver_sd.jitdriver, greenkey)
     metainterp_sd.stats.add_new_loop(loop)
     if not we_are_translated():
         metainterp_sd.stats.compiled()
@@ -592,6 +598,9 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
     if hooks is not None:
         debug_info.asminfo = asminfo
         hooks.after_compile_bridge(debug_info)
+    if asminfo is not None and metainterp_sd.warmrunnerdesc is not None:
+        metainterp_sd.warmrunnerdesc.memory_manager.record_code_size(
+            original_loop_token, asminfo.asmlen)
     if not we_are_translated():
         metainterp_sd.stats.compiled()
     metainterp_sd.log("compiled new bridge")
@@ -1002,7 +1011,7 @@ class ResumeFromInterpDescr(ResumeDescr):
                              orig_inputargs, metainterp.box_names_memo)
         # send the new_loop to warmspot.py, to be called directly the next time
         jitdriver_sd.warmstate.attach_procedure_to_interp(
-            self.original_greenkey, jitcell_token)
+            self.original_greenkey, jitcell_token, metainterp.baseline_tier)
         metainterp_sd.stats.add_jitcell_token(jitcell_token)
         record_loop_or_bridge(metainterp_sd, new_loop)
 
@@ -1029,7 +1038,7 @@ def compile_trace(metainterp, resumekey, runtime_boxes, ends_with_jump=False):
     inputargs = metainterp.history.inputargs[:]
     trace = metainterp.history.trace
     jitdriver_sd = metainterp.jitdriver_sd
-    enable_opts = jitdriver_sd.warmstate.enable_opts
+    enable_opts = metainterp.get_enable_opts()
     call_pure_results = metainterp.call_pure_results
     resumestorage = resumekey.get_resumestorage()
 
@@ -421,6 +421,10 @@ class JitCellToken(AbstractDescr):
     # and more data specified by the backend when the loop is compiled
     number = -1
     generation = r_int64(0)
+    # for the 'max_code_size' budget of memmgr.py: the size of the machine
+    # code of the loop and its bridges, and how many times it was entered
+    code_size = 0
+    entry_count = 0
     # one purpose of LoopToken is to keep alive the CompiledLoopToken
     # returned by the backend.  When the LoopToken goes away, the
     # CompiledLoopToken has its __del__ called, which frees the assembler
@@ -1,6 +1,8 @@
 import math
+from collections import OrderedDict
 from rpython.rlib.rarithmetic import r_int64
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
+from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.objectmodel import we_are_translated
 
 #
@@ -19,6 +21,24 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# In addition, if a 'max_code_size' is set, the memory manager keeps
+# track of the size of the machine code of each LoopToken (including its
+# bridges).  When the total for the alive loops goes above the budget,
+# the least recently used ones are removed from 'alive_loops', the least
+# often entered first among loops of the same generation.  Like above,
+# the memory is really released when the GC frees the LoopTokens.
+# For this, 'alive_loops' is ordered by generation: a LoopToken is moved
+# to the end when its generation changes, so the candidates for eviction
+# are found at the start without sorting all the alive loops.
+#
+
+def _evict_before(looptoken1, looptoken2):
+    return (looptoken1.generation < looptoken2.generation or
+            (looptoken1.generation == looptoken2.generation and
+             looptoken1.entry_count < looptoken2.entry_count))
+
+EvictionOrder = make_timsort_class(lt=_evict_before)
+
 
 class MemoryManager(object):
 
@@ -37,7 +57,11 @@ class MemoryManager(object):
         # per second
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
-        self.alive_loops = {}
+        self.alive_loops = OrderedDict()    # in generation order
+        self.alive_code_size = 0     # total code_size of the alive_loops
+        self.max_code_size = 0
+        self.evicted_loops = 0
+        self.evicted_code_size = 0
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,17 +73,39 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_max_code_size(self, max_code_size):
+        self.max_code_size = max_code_size
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
+        if self.max_code_size > 0:
+            self._enforce_max_code_size()
+
+    def record_code_size(self, looptoken, size):
+        looptoken.code_size += size
+        if looptoken in self.alive_loops:
+            self.alive_code_size += size
+
+    def get_alive_code_size(self):
+        return self.alive_code_size
 
     def keep_loop_alive(self, looptoken):
+        looptoken.entry_count += 1
         if looptoken.generation != self.current_generation:
             looptoken.generation = self.current_generation
+            if looptoken in self.alive_loops:
+                del self.alive_loops[looptoken]      # move it to the end
+            else:
+                self.alive_code_size += looptoken.code_size
             self.alive_loops[looptoken] = None
 
+    def _forget_loop(self, looptoken):
+        del self.alive_loops[looptoken]
+        self.alive_code_size -= looptoken.code_size
+
     def _kill_old_loops_now(self):
         debug_start("jit-mem-collect")
         oldtotal = len(self.alive_loops)
@@ -70,7 +116,7 @@ class MemoryManager(object):
         for looptoken in self.alive_loops.keys():
             if (0 <= looptoken.generation < max_generation or
                 looptoken.invalidated):
-                del self.alive_loops[looptoken]
+                self._forget_loop(looptoken)
         newtotal = len(self.alive_loops)
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
@@ -82,8 +128,44 @@ class MemoryManager(object):
             rgc.collect(); rgc.collect(); rgc.collect()
         debug_stop("jit-mem-collect")
 
+    def _enforce_max_code_size(self):
+        excess = self.alive_code_size - self.max_code_size
+        if excess <= 0:
+            return
+        debug_start("jit-mem-evict")
+        debug_print("Code size before:", self.alive_code_size)
+        # take the oldest loops, in whole generations, until they are
+        # enough to cover the excess; only these few ones are sorted
+        candidates = []
+        size = 0
+        for looptoken in self.alive_loops:
+            if looptoken.generation >= self.current_generation - 1:
+                break      # just compiled or used, and so are the next ones
+            if (size >= excess and
+                    looptoken.generation != candidates[-1].generation):
+                break
+            candidates.append(looptoken)
+            size += looptoken.code_size
+        EvictionOrder(candidates).sort()
+        freed = 0
+        for victim in candidates:
+            if self.alive_code_size <= self.max_code_size:
+                break
+            self._forget_loop(victim)
+            self.evicted_loops += 1
+            self.evicted_code_size += victim.code_size
+            freed += 1
+        debug_print("Loop tokens evicted:", freed)
+        debug_print("Code size after: ", self.alive_code_size)
+        if not we_are_translated() and freed > 0:
+            victim = candidates = None
+            from rpython.rlib import rgc
+            rgc.collect(); rgc.collect(); rgc.collect()
+        debug_stop("jit-mem-evict")
+
     def release_all_loops(self):
         debug_start("jit-mem-releaseall")
         debug_print("Loop tokens cleared:", len(self.alive_loops))
         self.alive_loops.clear()
+        self.alive_code_size = 0
         debug_stop("jit-mem-releaseall")
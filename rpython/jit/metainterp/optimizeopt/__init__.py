@@ -25,6 +25,10 @@ ALL_OPTS_DICT = dict.fromkeys([name for name, _ in ALL_OPTS])
 ALL_OPTS_LIST = [name for name, _ in ALL_OPTS]
 ALL_OPTS_NAMES = ':'.join([name for name, _ in ALL_OPTS])
 
+# the optimizations that the baseline tier does not run: they are the
+# most expensive ones, and they mostly pay off in loops
+BASELINE_SKIPPED_OPTS = dict.fromkeys(['heap', 'unroll'])
+
 assert ENABLE_ALL_OPTS == ALL_OPTS_NAMES, (
     'please fix rlib/jit.py to say ENABLE_ALL_OPTS = %r' % (ALL_OPTS_NAMES,))
 
@@ -2070,6 +2070,15 @@ class MetaInterp(object):
 
         self.aborted_tracing_jitdriver = None
         self.aborted_tracing_greenkey = None
+        # True if we are tracing a function from its start for the
+        # baseline tier (see the 'baseline_threshold' parameter)
+        self.baseline_tier = False
+
+    def get_enable_opts(self):
+        warmstate = self.jitdriver_sd.warmstate
+        if self.baseline_tier:
+            return warmstate.baseline_opts
+        return warmstate.enable_opts
 
     def retrace_needed(self, trace, exported_state):
         self.partial_trace = trace
@@ -2595,12 +2604,21 @@ class MetaInterp(object):
         # raises in case it works -- which is the common case, hopefully,
         # at least for bridges starting from a guard.
 
+        if self.baseline_tier:
+            # the baseline tier doesn't compile loops: they are traced
+            # when they reach the normal threshold.  Don't try the baseline
+            # tier again from this function's start, as it would abort
+            # here again every 'baseline_threshold' calls.
+            greenkey = self.current_merge_points[0][0][:num_green_args]
+            self.jitdriver_sd.warmstate.disable_baseline_tier(greenkey)
+            raise SwitchToBlackhole(Counters.ABORT_BASELINE_LOOP)
+
         # Search in current_merge_points for original_boxes with compatible
         # green keys, representing the beginning of the same loop as the one
         # we end now.
 
         can_use_unroll = (self.staticdata.cpu.supports_guard_gc_type and
-            'unroll' in self.jitdriver_sd.warmstate.enable_opts)
+            'unroll' in self.get_enable_opts())
         for j in range(len(self.current_merge_points)-1, -1, -1):
             original_boxes, start = self.current_merge_points[j]
             assert len(original_boxes) == len(live_arg_boxes)
@@ -29,7 +29,8 @@ def _get_jitcodes(testself, CPUClass, func, values,
             self.__product_token = token
 
     class FakeWarmRunnerState(object):
-        def attach_procedure_to_interp(self, greenkey, procedure_token):
+        def attach_procedure_to_interp(self, greenkey, procedure_token,
+                                       baseline=False):
             assert greenkey == []
             self._cell.set_procedure_token(procedure_token)
 
@@ -696,6 +696,77 @@ class BasicTests:
         assert res == 84 - 61 - 62
         self.check_history(call_n=1)   # because the trace starts immediately
 
+    def _baseline_interpreter(self):
+        myjitdriver = JitDriver(greens = ['pc', 'code'],
+                                reds = ['n', 'acc', 'box'])
+        class Box(object):
+            def __init__(self, value):
+                self.value = value
+        def interp(code, n, box):
+            pc = acc = 0
+            while pc < len(code):
+                myjitdriver.jit_merge_point(pc=pc, code=code, n=n, acc=acc,
+                                            box=box)
+                op = code[pc]
+                if op == '+':
+                    acc += box.value
+                elif op == 'j':
+                    n -= 1
+                    if n > 0:
+                        pc = 1
+                        myjitdriver.can_enter_jit(pc=pc, code=code, n=n,
+                                                  acc=acc, box=box)
+                        continue
+                pc += 1
+            return acc
+        def main(which, n, threshold, function_threshold):
+            set_param(None, 'threshold', threshold)
+            set_param(None, 'function_threshold', function_threshold)
+            set_param(None, 'baseline_threshold', 2)
+            code = ['a++', 'a+j'][which]
+            box = Box(n)
+            res = 0
+            for i in range(10):
+                res += interp(code, n, box)
+            return res
+        return main
+
+    def test_baseline_tier(self):
+        main = self._baseline_interpreter()
+        res = self.meta_interp(main, [0, 5, 8, -1])
+        assert res == main(0, 5, 8, -1)
+        # compiled from the function's start, even though
+        # 'function_threshold' is never reached
+        self.check_jitcell_token_count(1)
+        self.check_aborted_count(0)
+
+    def test_baseline_tier_leaves_loops(self):
+        main = self._baseline_interpreter()
+        res = self.meta_interp(main, [1, 5, 8, -1])
+        assert res == main(1, 5, 8, -1)
+        # the loop is compiled by the normal tier, and the baseline trace
+        # of the function's start aborted when it reached it
+        self.check_aborted_count(1)
+        self.check_jitcell_token_count(1)
+
+    def test_baseline_tier_aborts_once(self):
+        main = self._baseline_interpreter()
+        # the loop never reaches the normal threshold: the baseline tier
+        # gives up on this function after the first abort
+        res = self.meta_interp(main, [1, 5, 1000, -1])
+        assert res == main(1, 5, 1000, -1)
+        self.check_aborted_count(1)
+        self.check_jitcell_token_count(0)
+
+    def test_baseline_tier_then_full(self):
+        main = self._baseline_interpreter()
+        # compiled by the baseline tier after 2 calls, and compiled again
+        # with all the optimizations after 5 calls
+        res = self.meta_interp(main, [0, 5, 8, 5])
+        assert res == main(0, 5, 8, 5)
+        self.check_aborted_count(0)
+        self.check_jitcell_token_count(2)
+
     def test_unroll_one_loop_iteration(self):
         def unroll(code):
             return code == 0
@@ -76,6 +76,9 @@ class FakeMetaInterp:
         virtualizable_info = None
         vec = False
 
+    def get_enable_opts(self):
+        return self.jitdriver_sd.warmstate.enable_opts
+
 def test_compile_loop():
     cpu = FakeCPU()
     staticdata = FakeMetaInterpStaticData()
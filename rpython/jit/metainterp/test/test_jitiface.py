@@ -1,6 +1,7 @@
 
 import py
 from rpython.rlib.jit import JitDriver, JitHookInterface, Counters, dont_look_inside
+from rpython.rlib.jit import set_param
 from rpython.rlib import jit_hooks
 from rpython.jit.metainterp.test.support import LLJitMixin
 from rpython.jit.codewriter.policy import JitPolicy
@@ -144,6 +145,28 @@ class JitHookInterfaceTests(object):
 
         self.meta_interp(main, [], ProfilerClass=Profiler)
 
+    def test_get_memmgr_stats(self):
+        driver = JitDriver(greens = ['m'], reds = ['i'])
+
+        def loop(m, i):
+            while i > 0:
+                driver.jit_merge_point(m=m, i=i)
+                i -= 1
+
+        def main():
+            set_param(None, 'max_code_size', 1)
+            for m in range(5):
+                loop(m, 30)
+            assert jit_hooks.stats_memmgr_max_code_size(None) == 1
+            # all the loops but the most recent ones are evicted
+            evicted = jit_hooks.stats_memmgr_evicted_loops(None)
+            assert evicted >= 3
+            assert jit_hooks.stats_memmgr_evicted_code_size(None) > 0
+            assert jit_hooks.stats_memmgr_alive_loops(None) <= 5 - evicted
+            assert jit_hooks.stats_memmgr_code_size(None) > 0
+
+        self.meta_interp(main, [])
+
     def test_get_stats_empty(self):
         driver = JitDriver(greens = [], reds = ['i'])
         def loop(i):
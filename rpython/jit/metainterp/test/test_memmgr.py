@@ -21,6 +21,8 @@ from rpython.rlib import rgc
 class FakeLoopToken:
     generation = 0
     invalidated = False
+    code_size = 0
+    entry_count = 0
 
 
 class _TestMemoryManager:
@@ -79,6 +81,89 @@ class _TestMemoryManager:
                 assert tokens[i] in memmgr.alive_loops
 
 
+    def test_max_code_size(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(250)
+        tokens = [FakeLoopToken() for i in range(6)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 100)
+            memmgr.next_generation()
+            memmgr.keep_loop_alive(tokens[0])    # tokens[0] is used a lot
+        # the budget allows two loops and a half: the least recently used
+        # ones are evicted, but not tokens[0]
+        assert memmgr.alive_loops == dict.fromkeys([tokens[0], tokens[5]])
+        assert memmgr.get_alive_code_size() == 200
+        assert memmgr.evicted_loops == 4
+        assert memmgr.evicted_code_size == 400
+
+    def test_alive_code_size(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(3, 1)
+        tokens = [FakeLoopToken() for i in range(3)]
+        memmgr.record_code_size(tokens[0], 50)   # before keep_loop_alive
+        memmgr.keep_loop_alive(tokens[0])
+        assert memmgr.get_alive_code_size() == 50
+        memmgr.keep_loop_alive(tokens[1])
+        memmgr.record_code_size(tokens[1], 100)
+        memmgr.record_code_size(tokens[1], 20)   # a bridge
+        assert memmgr.get_alive_code_size() == 170
+        memmgr.next_generation()
+        memmgr.keep_loop_alive(tokens[0])        # already alive
+        assert memmgr.get_alive_code_size() == 170
+        for i in range(3):
+            memmgr.next_generation()
+            memmgr.keep_loop_alive(tokens[2])
+        assert memmgr.alive_loops == {tokens[2]: None}
+        assert memmgr.get_alive_code_size() == 0
+        memmgr.record_code_size(tokens[2], 10)
+        memmgr.record_code_size(tokens[1], 10)   # not alive any more
+        assert memmgr.get_alive_code_size() == 10
+        memmgr.release_all_loops()
+        assert memmgr.get_alive_code_size() == 0
+
+    def test_max_code_size_entry_count(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        tokens = [FakeLoopToken() for i in range(4)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 100)
+        for i in range(5):
+            memmgr.keep_loop_alive(tokens[1])
+            memmgr.keep_loop_alive(tokens[2])
+        memmgr.keep_loop_alive(tokens[3])
+        memmgr.next_generation()
+        memmgr.next_generation()
+        # all in the same generation: the least often entered go first
+        memmgr.set_max_code_size(200)
+        memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys(tokens[1:3])
+
+    def test_alive_loops_in_generation_order(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        tokens = [FakeLoopToken() for i in range(5)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.record_code_size(token, 100)
+            memmgr.next_generation()
+        memmgr.keep_loop_alive(tokens[1])
+        memmgr.keep_loop_alive(tokens[1])
+        memmgr.next_generation()
+        memmgr.keep_loop_alive(tokens[3])
+        assert memmgr.alive_loops.keys() == [tokens[0], tokens[2], tokens[4],
+                                             tokens[1], tokens[3]]
+        memmgr.next_generation()
+        memmgr.next_generation()
+        # only the two oldest generations are needed
+        memmgr.set_max_code_size(300)
+        memmgr.next_generation()
+        assert memmgr.alive_loops.keys() == [tokens[4], tokens[1], tokens[3]]
+        assert memmgr.get_alive_code_size() == 300
+
+
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
     # behavior just rename this class to TestIntegration.
@@ -212,3 +212,21 @@ def test_make_jitdriver_callbacks_5():
     state.make_jitdriver_callbacks()
     res = state.can_never_inline(5, 42.5)
     assert res is True
+
+def test_baseline_tier_params():
+    class FakeWarmRunnerDesc:
+        rtyper = None
+        cpu = None
+        memory_manager = None
+        jitcounter = DeterministicJitCounter()
+    state = WarmEnterState(FakeWarmRunnerDesc(), None)
+    assert state.baseline_threshold == 0
+    assert state.increment_baseline_threshold == 0.0
+    assert 'heap' in state.enable_opts
+    assert 'heap' not in state.baseline_opts
+    assert 'unroll' not in state.baseline_opts
+    assert 'virtualize' in state.baseline_opts
+    state.set_param_baseline_threshold(100)
+    assert state.increment_baseline_threshold > state.increment_threshold
+    state.set_param_enable_opts('intbounds:heap')
+    assert state.baseline_opts == {'intbounds': None}
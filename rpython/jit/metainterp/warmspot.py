@@ -208,7 +208,7 @@ def reset_stats():
 def reset_jit():
     """Helper for some tests (see micronumpy/test/test_zjit.py)"""
     reset_stats()
-    pyjitpl._warmrunnerdesc.memory_manager.alive_loops.clear()
+    pyjitpl._warmrunnerdesc.memory_manager.release_all_loops()
     pyjitpl._warmrunnerdesc.jitcounter._clear_all()
 
 def get_translator():
@@ -580,7 +580,7 @@ class WarmRunnerDesc(object):
 
         def maybe_enter_jit(*args):
             try:
-                maybe_compile_and_run(state.increment_threshold, *args)
+                maybe_compile_and_run(state.increment_threshold, 0.0, *args)
             except Exception as e:
                 crash_in_jit(e)
         maybe_enter_jit._always_inline_ = True
@@ -942,9 +942,13 @@ class WarmRunnerDesc(object):
 
         def ll_portal_runner(*args):
             try:
-                # maybe enter from the function's start.
+                # maybe enter from the function's start.  With the
+                # baseline tier, the function is compiled cheaply after
+                # fewer calls, and compiled again with all optimizations
+                # when it reaches 'function_threshold'.
                 maybe_compile_and_run(
-                    state.increment_function_threshold, *args)
+                    state.increment_function_threshold,
+                    state.increment_baseline_threshold, *args)
                 #
                 # then run the normal portal function, i.e. the
                 # interpreter's main loop.  It might enter the jit
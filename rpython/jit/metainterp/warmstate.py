@@ -137,6 +137,12 @@ JC_TRACING         = 0x01
 JC_DONT_TRACE_HERE = 0x02
 JC_TEMPORARY       = 0x04
 JC_TRACING_OCCURRED= 0x08
+JC_BASELINE        = 0x10
+JC_NO_BASELINE     = 0x20
+
+# xor-ed with the hash of a greenkey to get the slot of the JitCounter
+# where the baseline tier counts
+BASELINE_HASH = r_uint(0x5bd1e995)
 
 class BaseJitCell(object):
     """Subclasses of BaseJitCell are used in tandem with the single
@@ -183,6 +189,15 @@ class BaseJitCell(object):
         this particular function.  (We only set this flag when aborting
         due to a trace too long, so we use the same flag as a hint to
         also mean "please trace from here as soon as possible".)
+
+        JC_BASELINE: the wref_procedure_token was compiled by the
+        baseline tier.  We keep ticking the JitCounter for the same
+        hash, and trace again with all optimizations when the normal
+        threshold is reached.
+
+        JC_NO_BASELINE: the baseline tier aborted when tracing from this
+        greenkey, because it reached a loop.  Don't try it again; only
+        the normal threshold applies.
     """
     flags = 0     # JC_xxx flags
     wref_procedure_token = None
@@ -214,6 +229,8 @@ class BaseJitCell(object):
             return False    # don't remove JitCells with a procedure_token
         if self.flags & JC_TRACING:
             return False    # don't remove JitCells that are being traced
+        if self.flags & JC_NO_BASELINE:
+            return False    # don't forget that the baseline tier failed
         if self.flags & JC_DONT_TRACE_HERE:
             # if we have this flag, and we *had* a procedure_token but
             # we no longer have one, then remove me.  this prevents this
@@ -252,6 +269,10 @@ class WarmEnterState(object):
     def set_param_function_threshold(self, threshold):
         self.increment_function_threshold = self._compute_threshold(threshold)
 
+    def set_param_baseline_threshold(self, threshold):
+        self.baseline_threshold = threshold
+        self.increment_baseline_threshold = self._compute_threshold(threshold)
+
     def set_param_trace_eagerness(self, value):
         self.increment_trace_eagerness = self._compute_threshold(value)
 
@@ -269,6 +290,7 @@ class WarmEnterState(object):
 
     def set_param_enable_opts(self, value):
         from rpython.jit.metainterp.optimizeopt import ALL_OPTS_DICT, ALL_OPTS_NAMES
+        from rpython.jit.metainterp.optimizeopt import BASELINE_SKIPPED_OPTS
 
         d = {}
         if NonConstant(False):
@@ -281,6 +303,13 @@ class WarmEnterState(object):
                     raise ValueError('Unknown optimization ' + name)
                 d[name] = None
         self.enable_opts = d
+        # the functions compiled by the baseline tier skip the expensive
+        # optimizations
+        baseline_opts = {}
+        for name in d:
+            if name not in BASELINE_SKIPPED_OPTS:
+                baseline_opts[name] = None
+        self.baseline_opts = baseline_opts
 
     def set_param_loop_longevity(self, value):
         # note: it's a global parameter, not a per-jitdriver one
@@ -288,6 +317,12 @@ class WarmEnterState(object):
             self.warmrunnerdesc.memory_manager is not None):   # all for tests
             self.warmrunnerdesc.memory_manager.set_max_age(value)
 
+    def set_param_max_code_size(self, value):
+        # note: it's a global parameter, not a per-jitdriver one
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # all for tests
+            self.warmrunnerdesc.memory_manager.set_max_code_size(value)
+
     def set_param_retrace_limit(self, value):
         if self.warmrunnerdesc:
             if self.warmrunnerdesc.memory_manager:
@@ -325,10 +360,19 @@ class WarmEnterState(object):
         debug_print("disabled inlining", loc)
         debug_stop("jit-disableinlining")
 
-    def attach_procedure_to_interp(self, greenkey, procedure_token):
+    def disable_baseline_tier(self, greenkey):
+        cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
+        cell.flags |= JC_NO_BASELINE
+
+    def attach_procedure_to_interp(self, greenkey, procedure_token,
+                                   baseline=False):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         old_token = cell.get_procedure_token()
         cell.set_procedure_token(procedure_token)
+        if baseline:
+            cell.flags |= JC_BASELINE
+        else:
+            cell.flags &= ~JC_BASELINE
         if old_token is not None:
             self.cpu.redirect_call_assembler(old_token, procedure_token)
             # procedure_token is also kept alive by any loop that used
@@ -411,7 +455,7 @@ class WarmEnterState(object):
             fail_descr.handle_fail(deadframe, metainterp_sd, jitdriver_sd)
             assert 0, "should have raised"
 
-        def bound_reached(hash, cell, *args):
+        def bound_reached(hash, cell, baseline, *args):
             if not confirm_enter_jit(*args):
                 return
             jitcounter.decay_all_counters()
@@ -420,6 +464,7 @@ class WarmEnterState(object):
             # start tracing
             from rpython.jit.metainterp.pyjitpl import MetaInterp
             metainterp = MetaInterp(metainterp_sd, jitdriver_sd)
+            metainterp.baseline_tier = baseline
             greenargs = args[:num_green_args]
             if cell is None:
                 cell = JitCell(*greenargs)
@@ -430,10 +475,20 @@ class WarmEnterState(object):
             finally:
                 cell.flags &= ~JC_TRACING
 
-        def maybe_compile_and_run(increment_threshold, *args):
+        def tick_baseline(hash, increment_baseline):
+            # the baseline tier counts in its own slot of the jitcounter
+            if increment_baseline == 0.0:
+                return False
+            return jitcounter.tick(hash ^ BASELINE_HASH, increment_baseline)
+
+        def maybe_compile_and_run(increment_threshold, increment_baseline,
+                                  *args):
             """Entry point to the JIT.  Called at the point with the
             can_enter_jit() hint, and at the start of a function
-            with a different threshold.
+            with a different threshold.  If 'increment_baseline' is not
+            0.0, the function is first compiled by the baseline tier when
+            it reaches that threshold, and compiled again normally when it
+            reaches the normal one.
             """
             # Look for the cell corresponding to the current greenargs.
             # Search for the JitCell that is of the correct subclass of
@@ -450,7 +505,9 @@ class WarmEnterState(object):
             else:
                 # not found. increment the counter
                 if jitcounter.tick(hash, increment_threshold):
-                    bound_reached(hash, None, *args)
+                    bound_reached(hash, None, False, *args)
+                elif tick_baseline(hash, increment_baseline):
+                    bound_reached(hash, None, True, *args)
                 return
 
             # Here, we have found 'cell'.
@@ -462,11 +519,19 @@ class WarmEnterState(object):
                     return
                 # attached by compile_tmp_callback().  count normally
                 if jitcounter.tick(hash, increment_threshold):
-                    bound_reached(hash, cell, *args)
+                    bound_reached(hash, cell, False, *args)
+                elif (not (cell.flags & JC_NO_BASELINE) and
+                          tick_baseline(hash, increment_baseline)):
+                    bound_reached(hash, cell, True, *args)
                 return
             # machine code was already compiled for these greenargs
             procedure_token = cell.get_procedure_token()
             if procedure_token is None:
+                if cell.flags & JC_NO_BASELINE:
+                    # the baseline tier failed here; count normally
+                    if jitcounter.tick(hash, increment_threshold):
+                        bound_reached(hash, cell, False, *args)
+                    return
                 if cell.flags & JC_DONT_TRACE_HERE:
                     if not cell.has_seen_a_procedure_token():
                         # A JC_DONT_TRACE_HERE, i.e. a non-inlinable function.
@@ -477,12 +542,18 @@ class WarmEnterState(object):
                         else:
                             tick = True
                         if tick:
-                            bound_reached(hash, cell, *args)
+                            bound_reached(hash, cell, False, *args)
                         return
                 # it was an aborted compilation, or maybe a weakref that
                 # has been freed
                 jitcounter.cleanup_chain(hash)
                 return
+            if cell.flags & JC_BASELINE:
+                # compiled by the baseline tier: compile it again with all
+                # the optimizations when the normal threshold is reached
+                if jitcounter.tick(hash, increment_threshold):
+                    bound_reached(hash, cell, False, *args)
+                    return
             if not confirm_enter_jit(*args):
                 return
             # extract and unspecialize the red arguments to pass to
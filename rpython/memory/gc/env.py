@@ -49,6 +49,30 @@ def read_float_from_env(varname):
         return 0.0
     return value
 
+def read_time_from_env(varname):
+    """Read a duration, in seconds.  Accepts the suffixes s, ms and us
+    (lower case or upper case); without suffix, the value is in seconds.
+    """
+    value = os.environ.get(varname)
+    if value:
+        value = value.lower()
+        if value.endswith('ms'):
+            factor = 0.001
+            value = value[:-2]
+        elif value.endswith('us'):
+            factor = 0.000001
+            value = value[:-2]
+        elif value.endswith('s'):
+            factor = 1.0
+            value = value[:-1]
+        else:
+            factor = 1.0
+        try:
+            return float(value) * factor
+        except ValueError:
+            pass
+    return 0.0
+
 
 # ____________________________________________________________
 # Get the total amount of RAM installed in a system.
@@ -21,11 +21,26 @@ class GcHooks(object):
     def is_gc_collect_enabled(self):
         return False
 
+    def allocation_sample_interval(self):
+        """
+        Return the number of bytes allocated in the nursery between two
+        samples of the heap profiler, or 0 to disable sampling.  The GC
+        calls this after every minor collection.
+        """
+        return 0
+
     def on_gc_minor(self, duration, total_memory_used, pinned_objects):
         """
         Called after a minor collection
         """
 
+    def on_gc_minor_nursery(self, nursery_size, surviving_bytes):
+        """
+        Called just before on_gc_minor(), with the size of the nursery after
+        the minor collection (it changes if the GC resizes the nursery at
+        runtime) and the total size of the objects moved out of it.
+        """
+
     def on_gc_collect_step(self, duration, oldstate, newstate):
         """
         Called after each individual step of a major collection, in case the GC is
@@ -45,12 +60,41 @@ class GcHooks(object):
         Called after a major collection is fully done
         """
 
+    def on_gc_collect_durations(self, duration_marking, duration_sweeping):
+        """
+        Called just before on_gc_collect(), with the total time spent in
+        the marking (including the scanning of the roots) and in the
+        sweeping steps of this major collection.
+        """
+
+    def on_gc_allocation_sample(self, sample_id, size):
+        """
+        Called when an allocation of ``size`` bytes in the nursery is
+        sampled (see allocation_sample_interval()).  It is called from the
+        allocation itself, so the stack is the one of the program; but the
+        object is not initialized yet.  ``sample_id`` is a unique number.
+        """
+
+    def on_gc_sample_promoted(self, sample_id, typeindex):
+        """
+        Called during the minor collection that moves a sampled object out
+        of the nursery.
+        """
+
+    def on_gc_sample_freed(self, sample_id, typeindex):
+        """
+        Called when a sampled object is found to be dead, either during a
+        minor collection or at the end of the marking of a major collection.
+        """
+
     # the fire_* methods are meant to be called from the GC are should NOT be
     # overridden
 
     @rgc.no_collect
-    def fire_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def fire_gc_minor(self, duration, total_memory_used, pinned_objects,
+                      nursery_size, surviving_bytes):
         if self.is_gc_minor_enabled():
+            self.on_gc_minor_nursery(nursery_size, surviving_bytes)
             self.on_gc_minor(duration, total_memory_used, pinned_objects)
 
     @rgc.no_collect
@@ -62,9 +106,23 @@ class GcHooks(object):
     def fire_gc_collect(self, num_major_collects,
                         arenas_count_before, arenas_count_after,
                         arenas_bytes, rawmalloc_bytes_before,
-                        rawmalloc_bytes_after):
+                        rawmalloc_bytes_after, duration_marking,
+                        duration_sweeping):
         if self.is_gc_collect_enabled():
+            self.on_gc_collect_durations(duration_marking, duration_sweeping)
             self.on_gc_collect(num_major_collects,
                                arenas_count_before, arenas_count_after,
                                arenas_bytes, rawmalloc_bytes_before,
                                rawmalloc_bytes_after)
+
+    @rgc.no_collect
+    def fire_gc_allocation_sample(self, sample_id, size):
+        self.on_gc_allocation_sample(sample_id, size)
+
+    @rgc.no_collect
+    def fire_gc_sample_promoted(self, sample_id, typeindex):
+        self.on_gc_sample_promoted(sample_id, typeindex)
+
+    @rgc.no_collect
+    def fire_gc_sample_freed(self, sample_id, typeindex):
+        self.on_gc_sample_freed(sample_id, typeindex)
@@ -52,6 +52,32 @@ Environment variables can be used to fine-tune the following parameters:
                          in time.  Defaults to a conservative value depending
                          on nursery size and maximum object size inside the
                          nursery.  Useful for debugging by setting it to 0.
+
+ PYPY_GC_LAZY_SWEEP      If set to non-zero, the pages of small objects are
+                         not swept by the major collection steps.  Instead,
+                         a page is swept by the allocator the first time it
+                         needs a page of that size class.  The pages left
+                         are swept before the next major collection starts,
+                         or at once by a full collection.
+
+ PYPY_GC_MAX_PAUSE       Target for the duration of the GC pauses, like
+                         '2ms' or '500us'.  If set, the size of each
+                         incremental step of a major collection is computed
+                         from the marking and sweeping rates measured so
+                         far, instead of from PYPY_GC_INCREMENT_STEP.
+                         This is a target, not a guarantee: more steps are
+                         done if the program allocates faster than the
+                         major collection progresses.
+
+ PYPY_GC_NURSERY_MAX     If set to more than the nursery size, the nursery
+                         is resized at runtime: it grows up to this size
+                         while very few objects survive the minor
+                         collections, and shrinks back if many of them
+                         survive (or if the minor collections take longer
+                         than PYPY_GC_MAX_PAUSE).
+
+ PYPY_GC_NURSERY_MIN     The smallest size of the nursery when it is resized
+                         at runtime.  Defaults to the initial nursery size.
 """
 # XXX Should find a way to bound the major collection threshold by the
 # XXX total addressable size.  Maybe by keeping some minimarkpage arenas
@@ -64,6 +90,7 @@ import sys
 import os
 import time
 from rpython.rtyper.lltypesystem import lltype, llmemory, llarena, llgroup
+from rpython.rtyper.lltypesystem import rffi
 from rpython.rtyper.lltypesystem.lloperation import llop
 from rpython.rtyper.lltypesystem.llmemory import raw_malloc_usage
 from rpython.memory.gc.base import GCBase, MovingGCBase
@@ -73,6 +100,7 @@ from rpython.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
 from rpython.rlib.rarithmetic import LONG_BIT_SHIFT
 from rpython.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
 from rpython.rlib.objectmodel import specialize
+from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib import rgc
 from rpython.memory.gc.minimarkpage import out_of_memory
 
@@ -188,6 +216,16 @@ STATE_FINALIZING = 3
 
 GC_STATES = ['SCANNING', 'MARKING', 'SWEEPING', 'FINALIZING']
 
+unrolling_pause_limits = unrolling_iterable(rgc.GC_PAUSE_LIMITS)
+
+# PYPY_GC_NURSERY_MAX: the nursery size is reconsidered after this number
+# of minor collections.  It grows if the fraction of the nursery that
+# survived the minor collections is below NURSERY_GROW_BELOW, and shrinks
+# if it is above NURSERY_SHRINK_ABOVE.
+NURSERY_ADAPT_PERIOD = 8
+NURSERY_GROW_BELOW = 0.02
+NURSERY_SHRINK_ABOVE = 0.15
+
 
 FORWARDSTUB = lltype.GcStruct('forwarding_stub',
                               ('forw', llmemory.Address))
@@ -302,10 +340,43 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.growth_rate_max = growth_rate_max
         self.num_major_collects = 0
         self.min_heap_size = 0.0
+        self.min_heap_size_from_env = 0.0          # PYPY_GC_MIN, if set
         self.max_heap_size = 0.0
         self.max_heap_size_already_raised = False
         self.max_delta = float(r_uint(-1))
         self.max_number_of_pinned_objects = 0      # computed later
+        self.max_pinned_from_env = False           # PYPY_GC_MAX_PINNED
+        self.gc_lazy_sweep = False
+        #
+        # PYPY_GC_MAX_PAUSE: the target duration of a pause, in seconds
+        # (0.0 if not enabled), and the rates measured so far in bytes of
+        # objects marked per second and in pages swept per second.
+        self.max_pause = 0.0
+        self.marking_rate = 0.0
+        self.sweeping_rate = 0.0
+        self.last_minor_collection_time = 0.0
+        #
+        # PYPY_GC_NURSERY_MAX: the bounds of the nursery size when it is
+        # resized at runtime (0 if not enabled), and the statistics of
+        # the minor collections since the last decision.
+        self.nursery_size_min = 0
+        self.nursery_size_max = 0
+        self.nursery_window_count = 0
+        self.nursery_window_survived = 0
+        self.nursery_window_too_slow = False
+        #
+        # Heap profiler (see GcHooks.allocation_sample_interval()): when a
+        # sample point is armed, 'nursery_top' is lowered to it and the
+        # real 'nursery_top' is saved in 'allocation_sample_top'.
+        self.allocation_sample_interval = 0
+        self.allocation_sample_remaining = 0
+        self.allocation_sample_top = llmemory.NULL
+        self.next_allocation_sample_id = 0
+        #
+        # The histogram of the pauses, see rgc.GC_PAUSE_LIMITS.
+        self.pause_histogram = lltype.malloc(
+            rffi.CArray(lltype.Signed), len(rgc.GC_PAUSE_LIMITS) + 1,
+            flavor='raw', zero=True, immortal=True)
         #
         self.card_page_indices = card_page_indices
         if self.card_page_indices > 0:
@@ -382,6 +453,22 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.rawmalloced_total_size = r_uint(0)
         self.rawmalloced_peak_size = r_uint(0)
         self.total_gc_time = 0.0
+        #
+        # Time spent so far in the marking (including the initial scanning)
+        # and in the sweeping steps of the current major collection.  They
+        # are reported to the hooks when the major collection is done.
+        self.major_marking_time = 0.0
+        self.major_sweeping_time = 0.0
+        #
+        # PYPY_GC_LAZY_SWEEP: the number of bytes of the objects marked in
+        # the ArenaCollection by the current major collection.  These are
+        # the blocks that the sweep will not free, so together with what
+        # was allocated since, it's the memory used once the sweep is done.
+        self.arena_bytes_marked = 0
+        #
+        # PYPY_GC_LAZY_SWEEP: the 'arenas_bytes' reported to the hooks
+        # once the last pages of the major collection are swept.
+        self.arenas_bytes_after_sweep = r_uint(0)
 
         self.gc_state = STATE_SCANNING
 
@@ -436,6 +523,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.old_objects_pointing_to_pinned = self.AddressStack()
         self.updated_old_objects_pointing_to_pinned = False
         #
+        # The objects sampled by the heap profiler, as pairs of addresses
+        # (object, sample_id cast to an address).
+        self.young_allocation_samples = self.AddressStack()
+        self.old_allocation_samples = self.AddressStack()
+        #
         # Allocate a nursery.  In case of auto_nursery_size, start by
         # allocating a very small nursery, enough to do things like look
         # up the env var, which requires the GC; and then really
@@ -480,6 +572,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             min_heap_size = env.read_uint_from_env('PYPY_GC_MIN')
             if min_heap_size > 0:
                 self.min_heap_size = float(min_heap_size)
+                self.min_heap_size_from_env = self.min_heap_size
             else:
                 # defaults to 8 times the nursery
                 self.min_heap_size = newsize * 8
@@ -505,6 +598,21 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.gc_nursery_debug = True
             else:
                 self.gc_nursery_debug = False
+            #
+            lazy_sweep = env.read_uint_from_env('PYPY_GC_LAZY_SWEEP')
+            if lazy_sweep > 0:
+                self.gc_lazy_sweep = True
+            #
+            max_pause = env.read_time_from_env('PYPY_GC_MAX_PAUSE')
+            if max_pause > 0.0:
+                self.max_pause = max_pause
+            #
+            nursery_max = env.read_from_env('PYPY_GC_NURSERY_MAX')
+            if nursery_max > newsize and self.debug_tiny_nursery < 0:
+                nursery_min = env.read_from_env('PYPY_GC_NURSERY_MIN')
+                if nursery_min < minsize or nursery_min > newsize:
+                    nursery_min = newsize
+                self.set_nursery_size_bounds(nursery_min, nursery_max)
             self._minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
@@ -519,10 +627,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #
             if env_max_number_of_pinned_objects >= 0: # 0 allows to disable pinning completely
                 self.max_number_of_pinned_objects = env_max_number_of_pinned_objects
+                self.max_pinned_from_env = True
         else:
-            # Estimate this number conservatively
-            bigobj = self.nonlarge_max + 1
-            self.max_number_of_pinned_objects = self.nursery_size / (bigobj * 2)
+            self._estimate_max_number_of_pinned_objects()
+
+    def _estimate_max_number_of_pinned_objects(self):
+        # Estimate this number conservatively
+        bigobj = self.nonlarge_max + 1
+        self.max_number_of_pinned_objects = self.nursery_size / (bigobj * 2)
 
     def enable(self):
         self.enabled = True
@@ -813,8 +925,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         step.  If there is no major GC but the threshold is reached, start a
         major GC.
         """
+        start = time.time()
         self._minor_collection()
         if not self.enabled and not force_enabled:
+            self.record_pause(time.time() - start)
             return
 
         # If the gc_state is STATE_SCANNING, we're not in the middle
@@ -844,8 +958,58 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self._minor_collection()
                 self.major_collection_step(extrasize)
 
+        self.record_pause(time.time() - start)
         self.rrc_invoke_callback()
 
+    def record_pause(self, duration):
+        """Account for a pause of the program, i.e. a minor collection
+        together with the major collection steps that followed it."""
+        microseconds = int(duration * 1000000.0)
+        index = 0
+        for limit in unrolling_pause_limits:
+            if microseconds <= limit:
+                break
+            index += 1
+        self.pause_histogram[index] += 1
+
+    def _major_step_time_budget(self):
+        # PYPY_GC_MAX_PAUSE: the time that a major collection step should
+        # take, knowing that the minor collection before it is part of the
+        # same pause.  Never less than a quarter of the target, to still
+        # make progress if the minor collections alone take too long.
+        budget = self.max_pause - self.last_minor_collection_time
+        if budget < self.max_pause * 0.25:
+            budget = self.max_pause * 0.25
+        return budget
+
+    def _update_rate(self, rate, amount, duration):
+        # exponential moving average of 'amount / duration'
+        if duration <= 0.0:
+            return rate
+        new_rate = amount / duration
+        if rate == 0.0:
+            return new_rate
+        return 0.5 * rate + 0.5 * new_rate
+
+    def _sweep_pages_limit(self):
+        # Visit at most '3 * nursery_size' bytes, or, with PYPY_GC_MAX_PAUSE,
+        # as many pages as we measured we can sweep in the time budget.
+        if self.max_pause > 0.0 and self.sweeping_rate > 0.0:
+            limit = int(self.sweeping_rate * self._major_step_time_budget())
+            if limit < 1:
+                limit = 1
+            return limit
+        return 3 * self.nursery_size // self.ac.page_size
+
+    def _sweep_pages_step(self, limit):
+        start = time.time()
+        done = self.ac.mass_free_incremental(self._free_if_unvisited, limit)
+        if not done:
+            # exactly 'limit' pages were swept
+            self.sweeping_rate = self._update_rate(
+                self.sweeping_rate, float(limit), time.time() - start)
+        return done
+
 
     def collect_and_reserve(self, totalsize):
         """To call when nursery_free overflows nursery_top.
@@ -855,6 +1019,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
         major collection, and finally reserve totalsize bytes.
         """
 
+        if self.allocation_sample_top:
+            # we reached a sample point of the heap profiler
+            result = self.take_allocation_sample(totalsize)
+            if result:
+                return result
+        #
         minor_collection_count = 0
         while True:
             self.nursery_free = llmemory.NULL      # debug: don't use me
@@ -931,9 +1101,110 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if self.nursery_top - self.nursery_free > self.debug_tiny_nursery:
                 self.nursery_free = self.nursery_top - self.debug_tiny_nursery
         #
+        if self.allocation_sample_interval > 0:
+            self.arm_allocation_sample()
         return result
     collect_and_reserve._dont_inline_ = True
 
+    def arm_allocation_sample(self):
+        """Lower 'nursery_top' to the next sample point of the heap
+        profiler, if it is in the current free area of the nursery.  This
+        way, the allocation that crosses it (including from the JIT)
+        ends up in collect_and_reserve()."""
+        ll_assert(not self.allocation_sample_top, "sample point armed twice")
+        free = self.nursery_top - self.nursery_free
+        if self.allocation_sample_remaining < free:
+            self.allocation_sample_top = self.nursery_top
+            self.nursery_top = (self.nursery_free +
+                                self.allocation_sample_remaining)
+        else:
+            # the rest of this area will be used before the sample point
+            self.allocation_sample_remaining -= free
+
+    def disarm_allocation_sample(self):
+        if self.allocation_sample_top:
+            self.allocation_sample_remaining = (self.nursery_top -
+                                                self.nursery_free)
+            self.nursery_top = self.allocation_sample_top
+            self.allocation_sample_top = llmemory.NULL
+
+    def take_allocation_sample(self, totalsize):
+        """Called when an allocation crosses the sample point: allocate
+        the object at the sample point and record it.  Returns NULL if the
+        object doesn't fit in the rest of the free area."""
+        sample_at = self.nursery_top
+        self.disarm_allocation_sample()
+        self.allocation_sample_remaining = self.allocation_sample_interval
+        if sample_at + totalsize > self.nursery_top:
+            return llmemory.NULL
+        # the few bytes between the previous allocation and 'sample_at'
+        # are skipped, like the end of an area before a pinned object
+        self.nursery_free = sample_at + totalsize
+        sample_id = self.next_allocation_sample_id
+        self.next_allocation_sample_id += 1
+        obj = sample_at + self.gcheaderbuilder.size_gc_header
+        self.young_allocation_samples.append(obj)
+        self.young_allocation_samples.append(
+            self._sample_id_as_adr(sample_id))
+        self.hooks.fire_gc_allocation_sample(
+            sample_id, llmemory.raw_malloc_usage(totalsize))
+        self.arm_allocation_sample()
+        return sample_at
+
+    def _sample_id_as_adr(self, sample_id):
+        # only odd numbers, like in _next_id(), to make lltype and
+        # llmemory happy
+        return llmemory.cast_int_to_adr(sample_id * 2 + 1)
+
+    def _sample_id_from_adr(self, adr):
+        return llmemory.cast_adr_to_int(adr) >> 1
+
+    def _type_index(self, obj):
+        return self.get_member_index(self.get_type_id(obj))
+
+    def resolve_young_allocation_samples(self):
+        # Called during a minor collection, when all the surviving objects
+        # have been moved out of the nursery.
+        remaining = self.AddressStack()
+        while self.young_allocation_samples.non_empty():
+            sample_id = self._sample_id_from_adr(
+                self.young_allocation_samples.pop())
+            obj = self.young_allocation_samples.pop()
+            if self.is_forwarded(obj):
+                obj = self.get_forwarding_address(obj)
+                self.old_allocation_samples.append(obj)
+                self.old_allocation_samples.append(
+                    self._sample_id_as_adr(sample_id))
+                self.hooks.fire_gc_sample_promoted(sample_id,
+                                                   self._type_index(obj))
+            elif (self.header(obj).tid & (GCFLAG_PINNED | GCFLAG_VISITED) ==
+                      (GCFLAG_PINNED | GCFLAG_VISITED)):
+                # surviving pinned object: still in the nursery
+                remaining.append(obj)
+                remaining.append(self._sample_id_as_adr(sample_id))
+            else:
+                self.hooks.fire_gc_sample_freed(sample_id,
+                                                self._type_index(obj))
+        self.young_allocation_samples.delete()
+        self.young_allocation_samples = remaining
+
+    def resolve_old_allocation_samples(self):
+        # Called at the end of the marking phase of a major collection,
+        # before the unmarked objects are freed.
+        remaining = self.AddressStack()
+        while self.old_allocation_samples.non_empty():
+            sample_id = self._sample_id_from_adr(
+                self.old_allocation_samples.pop())
+            obj = self.old_allocation_samples.pop()
+            if self.header(obj).tid & GCFLAG_VISITED:
+                remaining.append(obj)
+                remaining.append(self._sample_id_as_adr(sample_id))
+            else:
+                self.hooks.fire_gc_sample_freed(sample_id,
+                                                self._type_index(obj))
+        self.old_allocation_samples.delete()
+        self.old_allocation_samples = remaining
+
 
     # XXX kill alloc_young and make it always True
     def external_malloc(self, typeid, length, alloc_young):
@@ -1091,6 +1362,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.next_major_collection_threshold < 0:
             # cannot trigger a full collection now, but we can ensure
             # that one will occur very soon
+            self.disarm_allocation_sample()
             self.nursery_free = self.nursery_top
 
     def can_optimize_clean_setarrayitems(self):
@@ -1416,9 +1688,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def _debug_check_object_scanning(self, obj):
         # This check is called before scanning starts.
         # Scanning is done in a single step.
-        # the GCFLAG_VISITED should not be set between collections
-        ll_assert(self.header(obj).tid & GCFLAG_VISITED == 0,
-                  "unexpected GCFLAG_VISITED")
+        # the GCFLAG_VISITED should not be set between collections,
+        # apart from the objects in the pages that are still waiting to
+        # be swept lazily.
+        if self.header(obj).tid & GCFLAG_VISITED:
+            size_gc_header = self.gcheaderbuilder.size_gc_header
+            ll_assert(self.ac.is_sweeping_lazily() and
+                      self._arena_block_size(obj) > 0 and
+                      self.ac.is_in_unswept_page(obj - size_gc_header),
+                      "unexpected GCFLAG_VISITED")
 
         # All other invariants from the sweeping phase should still be
         # satisfied.
@@ -1711,6 +1989,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #
         start = time.time()
         debug_start("gc-minor")
+        self.disarm_allocation_sample()
         #
         # All nursery barriers are invalid from this point on.  They
         # are evaluated anew as part of the minor collection.
@@ -1835,6 +2114,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.young_rawmalloced_objects:
             self.free_young_rawmalloced_objects()
         #
+        # Tell the heap profiler which of its samples survived.
+        if self.young_allocation_samples.non_empty():
+            self.resolve_young_allocation_samples()
+        #
         # All live nursery objects are out of the nursery or pinned inside
         # the nursery.  Create nursery barriers to protect the pinned objects,
         # fill the rest of the nursery with zeros and reset the current nursery
@@ -1907,13 +2190,88 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #
         self.root_walker.finished_minor_collection()
         #
+        if self.nursery_size_max > 0:
+            self._adapt_nursery_size(time.time() - start)
+        #
+        interval = self.hooks.allocation_sample_interval()
+        if interval != self.allocation_sample_interval:
+            self.allocation_sample_interval = interval
+            self.allocation_sample_remaining = interval
+        #
         debug_stop("gc-minor")
         duration = time.time() - start
         self.total_gc_time += duration
+        self.last_minor_collection_time = duration
         self.hooks.fire_gc_minor(
             duration=duration,
             total_memory_used=total_memory_used,
-            pinned_objects=self.pinned_objects_in_nursery)
+            pinned_objects=self.pinned_objects_in_nursery,
+            nursery_size=self.nursery_size,
+            surviving_bytes=self.nursery_surviving_size)
+
+    def set_nursery_size_bounds(self, nursery_min, nursery_max):
+        """Enable resizing the nursery at runtime, between the given
+        bounds (see PYPY_GC_NURSERY_MAX)."""
+        self.nursery_size_min = nursery_min & ~(WORD-1)
+        self.nursery_size_max = nursery_max & ~(WORD-1)
+
+    def _adapt_nursery_size(self, duration):
+        # Called at the end of a minor collection, with the nursery empty
+        # apart from the pinned objects.
+        self.nursery_window_count += 1
+        self.nursery_window_survived += self.nursery_surviving_size
+        if self.max_pause > 0.0 and duration > self.max_pause:
+            self.nursery_window_too_slow = True
+        if self.nursery_window_count < NURSERY_ADAPT_PERIOD:
+            return
+        if (self.pinned_objects_in_nursery > 0 or
+                self.debug_rotating_nurseries):
+            # can't move the nursery now; try again next time
+            return
+        survival = (float(self.nursery_window_survived) /
+                    (self.nursery_window_count * float(self.nursery_size)))
+        newsize = self.nursery_size
+        if self.nursery_window_too_slow or survival > NURSERY_SHRINK_ABOVE:
+            newsize = (newsize // 2) & ~(WORD-1)
+            if newsize < self.nursery_size_min:
+                newsize = self.nursery_size_min
+        elif survival < NURSERY_GROW_BELOW:
+            newsize = newsize * 2
+            if newsize > self.nursery_size_max:
+                newsize = self.nursery_size_max
+        debug_print("nursery survival rate:", survival)
+        self.nursery_window_count = 0
+        self.nursery_window_survived = 0
+        self.nursery_window_too_slow = False
+        if newsize != self.nursery_size:
+            self._resize_nursery(newsize)
+
+    def _resize_nursery(self, newsize):
+        ll_assert(self.pinned_objects_in_nursery == 0,
+                  "resizing the nursery with pinned objects")
+        ll_assert(not self.nursery_barriers.non_empty(),
+                  "resizing the nursery with nursery barriers")
+        debug_start("gc-set-nursery-size")
+        debug_print("resizing the nursery from", self.nursery_size,
+                    "to", newsize)
+        llarena.arena_free(self.nursery)
+        oldsize = self.nursery_size
+        self.nursery_size = newsize
+        self.nursery = self._alloc_nursery()
+        self.nursery_free = self.nursery
+        self.nursery_top = self.nursery + self.nursery_size
+        # the values computed from the nursery size follow it, unless
+        # they were given explicitly
+        if self.min_heap_size_from_env > 0.0:
+            min_heap_size = self.min_heap_size_from_env
+        else:
+            min_heap_size = self.min_heap_size * (float(newsize) / oldsize)
+        self.min_heap_size = max(min_heap_size, newsize *
+                                          self.major_collection_threshold)
+        if not self.max_pinned_from_env:
+            self._estimate_max_number_of_pinned_objects()
+        debug_print("min heap size:", self.min_heap_size)
+        debug_stop("gc-set-nursery-size")
 
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
@@ -2017,8 +2375,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 ll_assert(not self.is_in_nursery(obj),
                           "expected nursery obj in collect_cardrefs_to_nursery")
                 if self.gc_state == STATE_MARKING:
-                    self.header(obj).tid &= ~GCFLAG_VISITED
-                    self.more_objects_to_trace.append(obj)
+                    self._add_to_more_objects_to_trace(obj, None)
 
 
     def collect_oldrefs_to_nursery(self):
@@ -2283,6 +2640,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
     def _add_to_more_objects_to_trace(self, obj, ignored):
         ll_assert(not self.is_in_nursery(obj), "unexpected nursery obj here")
+        if self.gc_lazy_sweep and self.header(obj).tid & GCFLAG_VISITED:
+            # it will be counted again when it is visited again
+            self.arena_bytes_marked -= self._arena_block_size(obj)
         self.header(obj).tid &= ~GCFLAG_VISITED
         self.more_objects_to_trace.append(obj)
 
@@ -2298,6 +2658,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # Then do a complete collection again.
         self.gc_step_until(STATE_MARKING)
         self.gc_step_until(STATE_SCANNING)
+        #
+        # PYPY_GC_LAZY_SWEEP: a full collection must free the memory now,
+        # so sweep the pages that are left.
+        while self.ac.is_sweeping_lazily():
+            self._minor_collection()
+            self.major_collection_step()
 
     def gc_step_until(self, state):
         while self.gc_state != state:
@@ -2363,10 +2729,26 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.threshold_objects_made_old += r_uint(self.nursery_size // 2)
 
 
-        if self.gc_state == STATE_SCANNING:
+        lazy_sweep_step = False
+        if self.gc_state == STATE_SCANNING and self.ac.is_sweeping_lazily():
+            # PYPY_GC_LAZY_SWEEP: before we can start marking again, the
+            # pages that the allocator didn't sweep must be swept.  Do it
+            # incrementally, staying in STATE_SCANNING until it's done.
+            # This is still part of the previous major collection, which
+            # is reported to the hooks only now.
+            lazy_sweep_step = True
+            if self._sweep_pages_step(self._sweep_pages_limit()):
+                self._report_major_collection(
+                    self.arenas_bytes_after_sweep,
+                    self.major_sweeping_time + (time.time() - start))
+            #END SCANNING (lazy sweep leftovers)
+        elif self.gc_state == STATE_SCANNING:
             # starting a major GC cycle: reset these two counters
             self.size_objects_made_old = r_uint(0)
             self.threshold_objects_made_old = r_uint(self.nursery_size // 2)
+            self.major_marking_time = 0.0
+            self.major_sweeping_time = 0.0
+            self.arena_bytes_marked = 0
 
             self.objects_to_trace = self.AddressStack()
             self.collect_roots()
@@ -2378,12 +2760,29 @@ class IncrementalMiniMarkGC(MovingGCBase):
                         self.objects_to_trace.length(),
                         "plus",
                         self.more_objects_to_trace.length())
-            estimate = self.gc_increment_step
-            estimate_from_nursery = self.nursery_surviving_size * 2
-            if estimate_from_nursery > estimate:
-                estimate = estimate_from_nursery
-            estimate = intmask(estimate)
+            pacing = self.max_pause > 0.0 and self.marking_rate > 0.0
+            if pacing:
+                # PYPY_GC_MAX_PAUSE: mark as much as the measured rate
+                # allows in the time budget.  If that's not enough to
+                # keep up with the program, the loop in
+                # minor_collection_with_major_progress() does more steps.
+                estimate = int(self.marking_rate *
+                               self._major_step_time_budget())
+                if estimate < self.ac.page_size:
+                    estimate = self.ac.page_size
+            else:
+                estimate = self.gc_increment_step
+                estimate_from_nursery = self.nursery_surviving_size * 2
+                if estimate_from_nursery > estimate:
+                    estimate = estimate_from_nursery
+                estimate = intmask(estimate)
+            marking_start = time.time()
             remaining = self.visit_all_objects_step(estimate)
+            if remaining == 0:
+                # the whole 'estimate' was consumed (or slightly more)
+                self.marking_rate = self._update_rate(
+                    self.marking_rate, float(estimate),
+                    time.time() - marking_start)
             #
             if remaining >= estimate // 2:
                 if self.more_objects_to_trace.non_empty():
@@ -2391,11 +2790,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     # there are more objects added during the marking steps
                     # of this major collection.  Visit them all now.
                     # The idea is to ensure termination at the cost of some
-                    # incrementality, in theory.
+                    # incrementality, in theory.  With PYPY_GC_MAX_PAUSE,
+                    # only continue with the rest of this step's budget;
+                    # the loop in minor_collection_with_major_progress()
+                    # ensures termination.
                     swap = self.objects_to_trace
                     self.objects_to_trace = self.more_objects_to_trace
                     self.more_objects_to_trace = swap
-                    self.visit_all_objects()
+                    if pacing:
+                        self.visit_all_objects_step(remaining)
+                    else:
+                        self.visit_all_objects()
 
             # XXX A simplifying assumption that should be checked,
             # finalizers/weak references are rare and short which means that
@@ -2436,8 +2841,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # Destructors
                 if self.old_objects_with_destructors.non_empty():
                     self.deal_with_old_objects_with_destructors()
+                #
+                # Tell the heap profiler which of its samples died.
+                if self.old_allocation_samples.non_empty():
+                    self.resolve_old_allocation_samples()
                 # objects_to_trace processed fully, can move on to sweeping
                 self.ac.mass_free_prepare()
+                if self.gc_lazy_sweep:
+                    self.ac.start_lazy_sweep(self._free_if_unvisited)
                 self.start_free_rawmalloc_objects()
                 #
                 # get rid of objects pointing to pinned objects that were not
@@ -2472,14 +2883,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 debug_print("freeing raw objects:", limit-nobjects,
                             "freed, limit was", limit)
                 done = False    # the 2nd half below must still be done
+            elif self.ac.is_sweeping_lazily():
+                # PYPY_GC_LAZY_SWEEP: leave the pages to the allocator
+                debug_print("leaving the GC pages to be swept lazily")
+                done = True
             else:
                 # Ask the ArenaCollection to visit a fraction of the objects.
                 # Free the ones that have not been visited above, and reset
                 # GCFLAG_VISITED on the others.  Visit at most '3 *
-                # nursery_size' bytes.
-                limit = 3 * self.nursery_size // self.ac.page_size
-                done = self.ac.mass_free_incremental(self._free_if_unvisited,
-                                                     limit)
+                # nursery_size' bytes (see _sweep_pages_limit()).
+                limit = self._sweep_pages_limit()
+                done = self._sweep_pages_step(limit)
                 status = done and "No more pages left." or "More to do."
                 debug_print("freeing GC objects, up to", limit, "pages.", status)
             # XXX tweak the limits above
@@ -2488,13 +2902,25 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.num_major_collects += 1
                 #
                 # We also need to reset the GCFLAG_VISITED on prebuilt GC objects.
+                if self.ac.is_sweeping_lazily():
+                    self.prebuilt_root_objects.foreach(
+                        self._uncount_marked_prebuilt_object, None)
                 self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
                 #
+                # With PYPY_GC_LAZY_SWEEP, the pages are not swept yet: count
+                # the memory used in the ArenaCollection as if they were.
+                if self.ac.is_sweeping_lazily():
+                    arenas_bytes = self.ac.memory_used_after_sweep(
+                        self.arena_bytes_marked)
+                else:
+                    arenas_bytes = self.ac.total_memory_used
+                #
                 # Set the threshold for the next major collection to be when we
                 # have allocated 'major_collection_threshold' times more than
                 # we currently have -- but no more than 'max_delta' more than
                 # we currently have.
-                total_memory_used = float(self.get_total_memory_used())
+                total_memory_used = float(arenas_bytes +
+                                          self.rawmalloced_total_size)
                 total_memory_used -= float(self.kept_alive_by_finalizer)
                 if total_memory_used < 0:
                     total_memory_used = 0
@@ -2503,26 +2929,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
                         total_memory_used + self.max_delta),
                     reserving_size)
                 #
-                # Print statistics
-                debug_start("gc-collect-done")
-                debug_print("arenas:               ",
-                            self.stat_ac_arenas_count, " => ",
-                            self.ac.arenas_count)
-                debug_print("bytes used in arenas: ",
-                            self.ac.total_memory_used)
-                debug_print("bytes raw-malloced:   ",
-                            self.stat_rawmalloced_total_size, " => ",
-                            self.rawmalloced_total_size)
-                debug_print("next major collection threshold: ",
-                            self.next_major_collection_threshold)
-                debug_stop("gc-collect-done")
-                self.hooks.fire_gc_collect(
-                    num_major_collects=self.num_major_collects,
-                    arenas_count_before=self.stat_ac_arenas_count,
-                    arenas_count_after=self.ac.arenas_count,
-                    arenas_bytes=self.ac.total_memory_used,
-                    rawmalloc_bytes_before=self.stat_rawmalloced_total_size,
-                    rawmalloc_bytes_after=self.rawmalloced_total_size)
+                # Print statistics and call the hooks, unless the pages
+                # are left to the allocator: then it's done when the last
+                # of them is swept, in STATE_SCANNING.
+                if self.ac.is_sweeping_lazily():
+                    self.arenas_bytes_after_sweep = arenas_bytes
+                else:
+                    self._report_major_collection(
+                        arenas_bytes,
+                        self.major_sweeping_time + (time.time() - start))
                 #
                 # Max heap size: gives an upper bound on the threshold.  If we
                 # already have at least this much allocated, raise MemoryError.
@@ -2563,11 +2978,40 @@ class IncrementalMiniMarkGC(MovingGCBase):
         debug_stop("gc-collect-step")
         duration = time.time() - start
         self.total_gc_time += duration
+        if oldstate == STATE_SWEEPING or lazy_sweep_step:
+            self.major_sweeping_time += duration
+        elif oldstate == STATE_SCANNING or oldstate == STATE_MARKING:
+            self.major_marking_time += duration
         self.hooks.fire_gc_collect_step(
             duration=duration,
             oldstate=oldstate,
             newstate=self.gc_state)
 
+    def _report_major_collection(self, arenas_bytes, sweeping_time):
+        debug_start("gc-collect-done")
+        debug_print("arenas:               ",
+                    self.stat_ac_arenas_count, " => ",
+                    self.ac.arenas_count)
+        debug_print("bytes used in arenas: ", arenas_bytes)
+        debug_print("bytes raw-malloced:   ",
+                    self.stat_rawmalloced_total_size, " => ",
+                    self.rawmalloced_total_size)
+        debug_print("next major collection threshold: ",
+                    self.next_major_collection_threshold)
+        debug_print("time spent marking:   ",
+                    self.major_marking_time)
+        debug_print("time spent sweeping:  ", sweeping_time)
+        debug_stop("gc-collect-done")
+        self.hooks.fire_gc_collect(
+            num_major_collects=self.num_major_collects,
+            arenas_count_before=self.stat_ac_arenas_count,
+            arenas_count_after=self.ac.arenas_count,
+            arenas_bytes=arenas_bytes,
+            rawmalloc_bytes_before=self.stat_rawmalloced_total_size,
+            rawmalloc_bytes_after=self.rawmalloced_total_size,
+            duration_marking=self.major_marking_time,
+            duration_sweeping=sweeping_time)
+
     def _sweep_old_objects_pointing_to_pinned(self, obj, new_list):
         if self.header(obj).tid & GCFLAG_VISITED:
             new_list.append(obj)
@@ -2583,6 +3027,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def _reset_gcflag_visited(self, obj, ignored):
         self.header(obj).tid &= ~GCFLAG_VISITED
 
+    def _uncount_marked_prebuilt_object(self, obj, ignored):
+        # prebuilt objects are not in the ArenaCollection, but visit()
+        # counted them in 'arena_bytes_marked' like the others
+        if self.header(obj).tid & GCFLAG_VISITED:
+            self.arena_bytes_marked -= self._arena_block_size(obj)
+
     def free_rawmalloced_object_if_unvisited(self, obj, check_flag):
         if self.header(obj).tid & check_flag:
             self.header(obj).tid &= ~check_flag   # survives
@@ -2733,10 +3183,22 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # into the 'objects_to_trace' list.
             self.trace(obj, self._collect_ref_rec, None)
 
+        if self.gc_lazy_sweep:
+            self.arena_bytes_marked += self._arena_block_size(obj)
+
         size_gc_header = self.gcheaderbuilder.size_gc_header
         totalsize = size_gc_header + self.get_size(obj)
         return raw_malloc_usage(totalsize)
 
+    def _arena_block_size(self, obj):
+        # The size of the block of 'obj' in the ArenaCollection, or 0 if
+        # 'obj' is too big to be there.
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        totalsize = raw_malloc_usage(size_gc_header + self.get_size(obj))
+        if totalsize > self.small_request_threshold:
+            return 0
+        return (totalsize + (WORD - 1)) & ~(WORD - 1)
+
     # ----------
     # id() and identityhash() support
 
@@ -3071,6 +3533,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
             return intmask(self.nursery_size)
         elif stats_no == rgc.TOTAL_GC_TIME:
             return int(self.total_gc_time * 1000)
+        elif stats_no == rgc.MAX_PAUSE:
+            return int(self.max_pause * 1000000.0)
+        elif stats_no >= rgc.GC_PAUSE_HISTOGRAM:
+            index = stats_no - rgc.GC_PAUSE_HISTOGRAM
+            if index <= len(rgc.GC_PAUSE_LIMITS):
+                return self.pause_histogram[index]
         return 0
 
 
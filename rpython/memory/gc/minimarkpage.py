@@ -143,6 +143,15 @@ class ArenaCollection(object):
         self.peak_memory_used = r_uint(0)
         self.total_memory_alloced = r_uint(0)
         self.peak_memory_alloced = r_uint(0)
+        #
+        # the part of 'total_memory_used' that is in the pages not swept
+        # yet, counting both the surviving and the dead blocks
+        self.old_memory_used = r_uint(0)
+        #
+        # lazy sweeping: if 'lazy_ok_to_free_func' is not None, the pages
+        # still in the 'old_xxx' lists are swept by allocate_new_page()
+        # when it needs a page of their size class.  See start_lazy_sweep().
+        self.lazy_ok_to_free_func = None
 
 
     def _new_page_ptr_list(self, length):
@@ -197,6 +206,13 @@ class ArenaCollection(object):
     def allocate_new_page(self, size_class):
         """Allocate and return a new page for the given size_class."""
         #
+        # If we are sweeping lazily, first try to get a page with some
+        # room left by sweeping the old pages of the same size class.
+        if self.lazy_ok_to_free_func is not None:
+            page = self.lazy_sweep_size_class(size_class)
+            if page != PAGE_NULL:
+                return page
+        #
         # Allocate a new arena if needed.
         if self.current_arena == ARENA_NULL:
             self.allocate_new_arena()
@@ -329,7 +345,10 @@ class ArenaCollection(object):
         """
         self.peak_memory_used = max(self.peak_memory_used,
                                     self.total_memory_used)
-        self.total_memory_used = r_uint(0)
+        # note: 'total_memory_used' is not reset here.  Instead,
+        # walk_page() subtracts the size of the blocks it frees, so that
+        # the pages not swept yet are still accounted for.
+        self.old_memory_used = self.total_memory_used
         #
         size_class = self.small_request_threshold >> WORD_POWER_2
         self.size_class_with_old_pages = size_class
@@ -370,10 +389,93 @@ class ArenaCollection(object):
         if size_class >= 0:
             self._rehash_arenas_lists()
             self.size_class_with_old_pages = -1
+            self.lazy_ok_to_free_func = None
         #
         return True
 
 
+    def start_lazy_sweep(self, ok_to_free_func):
+        """To call after mass_free_prepare(), instead of (or before)
+        mass_free_incremental().  From now on, the pages not swept yet are
+        swept by allocate_new_page() when it needs a page of their size
+        class.  The pages that the allocator doesn't need must still be
+        swept by mass_free_incremental(), e.g. before the next marking.
+        """
+        self.lazy_ok_to_free_func = ok_to_free_func
+
+
+    def is_sweeping_lazily(self):
+        return self.lazy_ok_to_free_func is not None
+
+
+    def is_in_unswept_page(self, addr):
+        """For debugging: is 'addr' in one of the old pages that are not
+        swept yet?"""
+        pageaddr = start_of_page(llarena.getfakearenaaddress(addr),
+                                 self.page_size)
+        size_class = self.size_class_with_old_pages
+        while size_class >= 1:
+            page = self.old_page_for_size[size_class]
+            while page != PAGE_NULL:
+                if self._page_address(page) == pageaddr:
+                    return True
+                page = page.nextpage
+            page = self.old_full_page_for_size[size_class]
+            while page != PAGE_NULL:
+                if self._page_address(page) == pageaddr:
+                    return True
+                page = page.nextpage
+            size_class -= 1
+        return False
+
+    def _page_address(self, page):
+        return llarena.getfakearenaaddress(llmemory.cast_ptr_to_adr(page))
+
+
+    def memory_used_after_sweep(self, surviving):
+        """Return the value that 'total_memory_used' will have once all the
+        old pages are swept, if 'surviving' bytes in them are not freed.
+        """
+        surviving = r_uint(surviving)
+        if surviving >= self.old_memory_used:
+            return self.total_memory_used
+        return self.total_memory_used - (self.old_memory_used - surviving)
+
+
+    def lazy_sweep_size_class(self, size_class):
+        """Sweep the old pages of 'size_class' until we find one that has
+        room for at least one more block.  Returns it, after putting it into
+        'page_for_size[size_class]', or PAGE_NULL if no old page is left.
+        """
+        ok_to_free_func = self.lazy_ok_to_free_func
+        nblocks = self.nblocks_for_size[size_class]
+        block_size = size_class * WORD
+        while True:
+            # Try first the pages that were not full, they are more likely
+            # to still have room after sweeping.
+            page = self.old_page_for_size[size_class]
+            if page != PAGE_NULL:
+                self.old_page_for_size[size_class] = page.nextpage
+            else:
+                page = self.old_full_page_for_size[size_class]
+                if page == PAGE_NULL:
+                    return PAGE_NULL
+                self.old_full_page_for_size[size_class] = page.nextpage
+            #
+            surviving = self.walk_page(page, block_size, ok_to_free_func)
+            if surviving == nblocks:
+                page.nextpage = self.full_page_for_size[size_class]
+                self.full_page_for_size[size_class] = page
+            elif surviving > 0:
+                ll_assert(self.page_for_size[size_class] == PAGE_NULL,
+                      "lazy_sweep_size_class() called but a page is waiting")
+                page.nextpage = PAGE_NULL
+                self.page_for_size[size_class] = page
+                return page
+            else:
+                self.free_page(page)
+
+
     def mass_free(self, ok_to_free_func):
         """For each object, if ok_to_free_func(obj) returns True, then free
         the object.
@@ -517,6 +619,7 @@ class ArenaCollection(object):
         obj = llarena.getfakearenaaddress(llmemory.cast_ptr_to_adr(page))
         obj += self.hdrsize
         surviving = 0    # initially
+        freed = 0
         skip_free_blocks = page.nfree
         #
         while True:
@@ -554,6 +657,7 @@ class ArenaCollection(object):
                     #
                     # Update the number of free objects in the page.
                     page.nfree += 1
+                    freed += 1
                     #
                 else:
                     # The object survives.
@@ -562,7 +666,8 @@ class ArenaCollection(object):
             obj += block_size
         #
         # Update the global total size of objects.
-        self.total_memory_used += r_uint(surviving * block_size)
+        self.total_memory_used -= r_uint(freed * block_size)
+        self.old_memory_used -= r_uint(freed * block_size)
         #
         # Return the number of surviving objects.
         return surviving
@@ -21,6 +21,7 @@ class SimpleArenaCollection(object):
         self.all_objects = []
         self.total_memory_used = 0
         self.arenas_count = 0
+        self.lazy_ok_to_free_func = None
 
     def malloc(self, size):
         nsize = raw_malloc_usage(size)
@@ -51,8 +52,17 @@ class SimpleArenaCollection(object):
             max_pages -= 0.1
             if max_pages <= 0:
                 return False
+        self.lazy_ok_to_free_func = None
         return True
 
+    def start_lazy_sweep(self, ok_to_free_func):
+        # malloc() doesn't sweep anything here: the old objects are only
+        # freed by the next call to mass_free_incremental()
+        self.lazy_ok_to_free_func = ok_to_free_func
+
+    def is_sweeping_lazily(self):
+        return self.lazy_ok_to_free_func is not None
+
     def mass_free(self, ok_to_free_func):
         self.mass_free_prepare()
         res = self.mass_free_incremental(ok_to_free_func, sys.maxint)
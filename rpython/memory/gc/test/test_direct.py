@@ -844,3 +844,176 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
             (incminimark.STATE_SWEEPING, incminimark.STATE_FINALIZING),
             (incminimark.STATE_FINALIZING, incminimark.STATE_SCANNING)
             ]
+
+
+class TestIncrementalMiniMarkGCLazySweep(TestIncrementalMiniMarkGCFull):
+
+    def setup_method(self, meth):
+        TestIncrementalMiniMarkGCFull.setup_method(self, meth)
+        self.gc.gc_lazy_sweep = True
+
+    def major_collection_steps(self):
+        # like gc.collect(), but without sweeping the pages at the end
+        self.gc.gc_step_until(incminimark.STATE_SCANNING)
+        self.gc.gc_step_until(incminimark.STATE_MARKING)
+        self.gc.gc_step_until(incminimark.STATE_SCANNING)
+
+    def test_lazy_sweep(self):
+        for i in range(10):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        dead = self.stackroots[1::2]
+        del self.stackroots[1::2]
+        self.major_collection_steps()
+        # the major collection is done, but its pages are left to the
+        # allocator: the dead objects are not freed yet
+        assert self.gc.gc_state == incminimark.STATE_SCANNING
+        assert self.gc.ac.is_sweeping_lazily()
+        assert [p.x for p in dead] == [1, 3, 5, 7, 9]
+        #
+        # the next object moved out of the nursery sweeps pages until it
+        # finds one with room, but not all of them
+        p = self.malloc(S)
+        p.x = 42
+        self.stackroots.append(p)
+        self.gc._minor_collection()
+        def is_freed(p):
+            try:
+                p.x
+            except RuntimeError:
+                return True
+            return False
+        assert 0 < len([p for p in dead if is_freed(p)]) < len(dead)
+        #
+        # starting the next major collection first sweeps all the
+        # remaining pages
+        self.major_collection_steps()
+        assert [p.x for p in self.stackroots] == [0, 2, 4, 6, 8, 42]
+        for p in dead:
+            py.test.raises(RuntimeError, 'p.x')
+
+    def test_lazy_sweep_full_collect(self):
+        # an explicit full collection doesn't leave pages to the allocator
+        for i in range(10):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        dead = self.stackroots[:]
+        del self.stackroots[:]
+        self.major_collection_steps()
+        assert self.gc.ac.is_sweeping_lazily()
+        self.gc.collect()
+        assert not self.gc.ac.is_sweeping_lazily()
+        for p in dead:
+            py.test.raises(RuntimeError, 'p.x')
+
+    def test_lazy_sweep_threshold(self):
+        # the threshold of the next major collection and the hook
+        # statistics don't count the dead objects that are not swept yet
+        def collect_dead_objects():
+            for i in range(400):
+                self.stackroots.append(self.malloc(S))
+            self.gc.collect()
+            del self.stackroots[:]
+            self.major_collection_steps()
+            return (self.gc.next_major_collection_threshold,
+                    self.gc.ac.memory_used_after_sweep(
+                        self.gc.arena_bytes_marked))
+        lazy_threshold, lazy_used = collect_dead_objects()
+        assert self.gc.ac.is_sweeping_lazily()
+        assert self.gc.ac.total_memory_used > lazy_used
+        self.gc.collect()
+        self.gc.gc_lazy_sweep = False
+        threshold, used = collect_dead_objects()
+        assert not self.gc.ac.is_sweeping_lazily()
+        assert lazy_used == self.gc.ac.total_memory_used
+        assert lazy_threshold == threshold
+
+
+class TestIncrementalMiniMarkGCMaxPause(TestIncrementalMiniMarkGCFull):
+
+    def setup_method(self, meth):
+        TestIncrementalMiniMarkGCFull.setup_method(self, meth)
+        self.gc.max_pause = 0.002
+
+    def test_pause_histogram(self):
+        from rpython.rlib import rgc
+        def histogram():
+            return [self.gc.get_stats(rgc.GC_PAUSE_HISTOGRAM + i)
+                    for i in range(len(rgc.GC_PAUSE_LIMITS) + 1)]
+        assert self.gc.get_stats(rgc.MAX_PAUSE) == 2000
+        before = sum(histogram())
+        for i in range(5):
+            self.gc.minor_collection_with_major_progress()
+        assert sum(histogram()) == before + 5
+        self.gc.record_pause(0.00015)
+        self.gc.record_pause(1.0)
+        after = histogram()
+        assert after[1] >= 1
+        assert after[-1] >= 1
+        assert sum(after) == before + 7
+
+    def test_step_budgets_from_rates(self):
+        gc = self.gc
+        gc.last_minor_collection_time = 0.0005
+        assert abs(gc._major_step_time_budget() - 0.0015) < 1e-9
+        gc.last_minor_collection_time = 0.01
+        assert abs(gc._major_step_time_budget() - 0.0005) < 1e-9
+        #
+        # no rate measured yet: the default limit
+        gc.sweeping_rate = 0.0
+        default = 3 * gc.nursery_size // gc.ac.page_size
+        assert gc._sweep_pages_limit() == default
+        gc.sweeping_rate = 40000.0     # pages per second
+        assert 19 <= gc._sweep_pages_limit() <= 20
+        gc.sweeping_rate = 1.0
+        assert gc._sweep_pages_limit() == 1
+        #
+        assert gc._update_rate(0.0, 100.0, 0.5) == 200.0
+        assert gc._update_rate(100.0, 100.0, 0.5) == 150.0
+        assert gc._update_rate(100.0, 100.0, 0.0) == 100.0
+
+    def test_marking_is_paced(self):
+        for i in range(50):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        self.gc.debug_gc_step()
+        assert self.gc.gc_state == incminimark.STATE_MARKING
+        steps = 0
+        while self.gc.gc_state == incminimark.STATE_MARKING:
+            self.gc.marking_rate = 1.0     # too slow: one page per step
+            self.gc.debug_gc_step()
+            steps += 1
+        assert steps > 1
+        self.gc.collect()
+        assert [p.x for p in self.stackroots] == range(50)
+
+
+class TestIncrementalMiniMarkGCAdaptiveNursery(TestIncrementalMiniMarkGCFull):
+
+    def setup_method(self, meth):
+        TestIncrementalMiniMarkGCFull.setup_method(self, meth)
+        size = self.gc.nursery_size
+        self.gc.set_nursery_size_bounds(size // 2, size * 4)
+
+    def test_resize_updates_limits(self):
+        size = self.gc.nursery_size
+        min_heap_size = self.gc.min_heap_size
+        max_pinned = self.gc.max_number_of_pinned_objects
+        self.gc._resize_nursery(size * 4)
+        assert self.gc.min_heap_size == min_heap_size * 4
+        assert self.gc.max_number_of_pinned_objects == max_pinned * 4
+        self.gc._resize_nursery(size // 2)
+        assert self.gc.min_heap_size == min_heap_size / 2
+        assert self.gc.max_number_of_pinned_objects == max_pinned // 2
+        # explicit values are kept
+        self.gc.min_heap_size_from_env = min_heap_size * 10
+        self.gc.max_pinned_from_env = True
+        self.gc.max_number_of_pinned_objects = 3
+        self.gc._resize_nursery(size * 2)
+        assert self.gc.min_heap_size == min_heap_size * 10
+        assert self.gc.max_number_of_pinned_objects == 3
+        self.gc._resize_nursery(size)
@@ -26,12 +26,26 @@ class MyGcHooks(GcHooks):
         self.steps = []
         self.collects = []
         self.durations = []
+        self.phase_durations = []
+        self.nursery_sizes = []
+        self.sample_interval = 0
+        self.samples = []
+        self.promoted = []
+        self.freed = []
+
+    def allocation_sample_interval(self):
+        return self.sample_interval
+
+    def on_gc_minor_nursery(self, nursery_size, surviving_bytes):
+        self.nursery_sizes.append(nursery_size)
+        self.surviving_bytes = surviving_bytes
 
     def on_gc_minor(self, duration, total_memory_used, pinned_objects):
         self.durations.append(duration)
         self.minors.append({
             'total_memory_used': total_memory_used,
-            'pinned_objects': pinned_objects})
+            'pinned_objects': pinned_objects,
+            'surviving_bytes': self.surviving_bytes})
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
         self.durations.append(duration)
@@ -39,6 +53,9 @@ class MyGcHooks(GcHooks):
             'oldstate': oldstate,
             'newstate': newstate})
 
+    def on_gc_collect_durations(self, duration_marking, duration_sweeping):
+        self.phase_durations.append((duration_marking, duration_sweeping))
+
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
@@ -51,6 +68,15 @@ class MyGcHooks(GcHooks):
             'rawmalloc_bytes_before': rawmalloc_bytes_before,
             'rawmalloc_bytes_after': rawmalloc_bytes_after})
 
+    def on_gc_allocation_sample(self, sample_id, size):
+        self.samples.append((sample_id, size))
+
+    def on_gc_sample_promoted(self, sample_id, typeindex):
+        self.promoted.append((sample_id, typeindex))
+
+    def on_gc_sample_freed(self, sample_id, typeindex):
+        self.freed.append((sample_id, typeindex))
+
 
 class TestIncMiniMarkHooks(BaseDirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
@@ -68,9 +94,11 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         self.malloc(S)
         self.gc._minor_collection()
         assert self.gc.hooks.minors == [
-            {'total_memory_used': 0, 'pinned_objects': 0}
+            {'total_memory_used': 0, 'pinned_objects': 0,
+             'surviving_bytes': 0}
             ]
         assert self.gc.hooks.durations[0] > 0.
+        assert self.gc.hooks.nursery_sizes == [self.gc.nursery_size]
         self.gc.hooks.reset()
         #
         # these objects survive, so the total_memory_used is > 0
@@ -78,9 +106,32 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         self.stackroots.append(self.malloc(S))
         self.gc._minor_collection()
         assert self.gc.hooks.minors == [
-            {'total_memory_used': self.size_of_S*2, 'pinned_objects': 0}
+            {'total_memory_used': self.size_of_S*2, 'pinned_objects': 0,
+             'surviving_bytes': self.size_of_S*2}
             ]
 
+    def test_on_gc_minor_nursery_resized(self):
+        from rpython.memory.gc import incminimark as m
+        self.gc.hooks._gc_minor_enabled = True
+        initial = self.gc.nursery_size
+        self.gc.set_nursery_size_bounds(initial, initial * 4)
+        # nothing survives: the nursery grows, up to the maximum
+        for i in range(m.NURSERY_ADAPT_PERIOD * 3):
+            self.malloc(S)
+            self.gc._minor_collection()
+        sizes = self.gc.hooks.nursery_sizes
+        assert sizes[0] == initial
+        assert sizes[m.NURSERY_ADAPT_PERIOD - 1] == initial * 2
+        assert sizes[-1] == initial * 4
+        self.gc.hooks.reset()
+        #
+        # now most of the nursery survives: it shrinks back
+        for i in range(m.NURSERY_ADAPT_PERIOD * 3):
+            while self.gc.nursery_free + self.size_of_S <= self.gc.nursery_top:
+                self.stackroots.append(self.malloc(S))
+            self.gc._minor_collection()
+        assert self.gc.hooks.nursery_sizes[-1] == initial
+
     def test_on_gc_collect(self):
         from rpython.memory.gc import incminimark as m
         self.gc.hooks._gc_collect_step_enabled = True
@@ -104,6 +155,12 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         assert len(self.gc.hooks.durations) == 4 # 4 steps
         for d in self.gc.hooks.durations:
             assert d > 0.0
+        # the marking time covers the SCANNING and MARKING steps, the
+        # sweeping time covers (most of) the SWEEPING step
+        [(marking, sweeping)] = self.gc.hooks.phase_durations
+        durations = self.gc.hooks.durations
+        assert marking == durations[0] + durations[1]
+        assert 0.0 < sweeping <= durations[2]
         self.gc.hooks.reset()
         #
         self.stackroots.append(self.malloc(S))
@@ -117,6 +174,79 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
              'rawmalloc_bytes_before': 0}
             ]
 
+    def test_on_gc_collect_lazy_sweep(self):
+        # with PYPY_GC_LAZY_SWEEP, the major collection is reported when
+        # its last pages are swept, and the time of the sweeping steps
+        # done in STATE_SCANNING counts as sweeping time
+        from rpython.memory.gc import incminimark as m
+        self.gc.gc_lazy_sweep = True
+        self.gc.hooks._gc_collect_step_enabled = True
+        self.gc.hooks._gc_collect_enabled = True
+        for i in range(400):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        assert not self.gc.ac.is_sweeping_lazily()
+        del self.stackroots[:]
+        self.gc.hooks.reset()
+        self.gc.gc_step_until(m.STATE_MARKING)
+        self.gc.gc_step_until(m.STATE_SCANNING)
+        assert self.gc.ac.is_sweeping_lazily()
+        assert self.gc.hooks.collects == []
+        marking_time = self.gc.major_marking_time
+        nsteps = len(self.gc.hooks.durations)
+        while self.gc.ac.is_sweeping_lazily():
+            self.gc.debug_gc_step()
+        [collect] = self.gc.hooks.collects
+        assert collect['num_major_collects'] == self.gc.num_major_collects
+        assert collect['arenas_bytes'] == 0
+        [(marking, sweeping)] = self.gc.hooks.phase_durations
+        assert marking == marking_time
+        assert sweeping >= sum(self.gc.hooks.durations[nsteps:-1])
+        assert self.gc.major_marking_time == marking_time
+
+    def test_allocation_samples(self):
+        hooks = self.gc.hooks
+        hooks.sample_interval = self.size_of_S * 3
+        self.gc._minor_collection()     # the GC polls the interval here
+        for i in range(40):
+            self.stackroots.append(self.malloc(S))
+        assert len(hooks.samples) >= 5
+        for (sample_id, size) in hooks.samples:
+            assert size == self.size_of_S
+        sample_ids = [sample_id for (sample_id, size) in hooks.samples]
+        assert sample_ids == range(len(sample_ids))
+        self.gc._minor_collection()
+        # all the samples survived
+        typeindex = self.gc._type_index(
+            llmemory.cast_ptr_to_adr(self.stackroots[0]))
+        assert sorted(hooks.promoted) == [(i, typeindex) for i in sample_ids]
+        assert hooks.freed == []
+        #
+        # they are reported dead by the next major collection
+        hooks.reset()
+        del self.stackroots[:]
+        self.gc.collect()
+        assert sorted(hooks.freed) == [(i, typeindex) for i in sample_ids]
+        assert hooks.promoted == []
+        #
+        # objects that die young are reported by the minor collection
+        hooks.reset()
+        hooks.sample_interval = self.size_of_S * 3
+        for i in range(40):
+            self.malloc(S)
+        self.gc._minor_collection()
+        assert len(hooks.samples) >= 5
+        assert hooks.promoted == []
+        assert sorted(hooks.freed) == sorted(
+            [(sample_id, typeindex) for (sample_id, size) in hooks.samples])
+        #
+        # no sampling once the interval is back to 0
+        hooks.reset()
+        self.gc._minor_collection()
+        for i in range(40):
+            self.malloc(S)
+        assert hooks.samples == []
+
     def test_hook_disabled(self):
         self.gc._minor_collection()
         self.gc.collect()
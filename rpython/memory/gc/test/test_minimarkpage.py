@@ -1,4 +1,4 @@
-import py
+import py, sys
 from rpython.memory.gc.minimarkpage import ArenaCollection
 from rpython.memory.gc.minimarkpage import PAGE_HEADER, PAGE_PTR
 from rpython.memory.gc.minimarkpage import PAGE_NULL, WORD
@@ -400,9 +400,52 @@ def test_mass_free_half_page_becomes_more_free():
     assert freepages(ac) == NULL
     assert ac.full_page_for_size[2] == PAGE_NULL
 
+def test_lazy_sweep():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "22 ", fill_with_objects=2)
+    ac.total_memory_used = 4 * (2*WORD)     # 2 objects in each page
+    page0 = getpage(ac, 0)
+    page1 = getpage(ac, 1)
+    ok_to_free = OkToFree(ac, 0.5)
+    ac.mass_free_prepare()
+    ac.start_lazy_sweep(ok_to_free)
+    assert ac.is_sweeping_lazily()
+    assert ac.page_for_size[2] == PAGE_NULL
+    #
+    # malloc() sweeps a single old page of size class 2, and reuses
+    # the block that was just freed in it
+    obj = ac.malloc(2*WORD)
+    assert ok_to_free.seen == {hdrsize + 0*WORD: False,
+                               hdrsize + 2*WORD: True}
+    chkob(ac, 0, 2*WORD, obj)
+    assert ac.page_for_size[2] == page0
+    #
+    # a different size class doesn't touch the old pages of size class 2
+    obj = ac.malloc(3*WORD)
+    chkob(ac, 2, 0, obj)
+    assert len(ok_to_free.seen) == 2
+    #
+    # the rest is swept by mass_free_incremental()
+    ac.mass_free_incremental(ok_to_free, sys.maxint)
+    assert not ac.is_sweeping_lazily()
+    assert len(ok_to_free.seen) == 4
+    assert ac.total_memory_used == 2 * (2*WORD) + 2*WORD + 3*WORD
+
+def test_lazy_sweep_frees_empty_pages():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "22", fill_with_objects=2)
+    ac.total_memory_used = 4 * (2*WORD)     # 2 objects in each page
+    ok_to_free = OkToFree(ac, True)
+    ac.mass_free_prepare()
+    ac.start_lazy_sweep(ok_to_free)
+    assert ac.lazy_sweep_size_class(2) == PAGE_NULL
+    assert len(ok_to_free.seen) == 4
+    assert ac.current_arena.nfreepages == 2
+    assert ac.total_memory_used == 0
+
 # ____________________________________________________________
 
-def test_random(incremental=False):
+def test_random(incremental=False, lazy=False):
     import random
     pagesize = hdrsize + 24*WORD
     num_pages = 3
@@ -448,7 +491,14 @@ def test_random(incremental=False):
                                   multiarenas=True)
             live_objects_extra = {}
             fresh_extra = 0
-            if not incremental:
+            if lazy:
+                ac.mass_free_prepare()
+                ac.start_lazy_sweep(ok_to_free)
+                for i in range(random.randrange(0, 50)):
+                    allocate_object(live_objects_extra)
+                fresh_extra = sum(live_objects_extra.values())
+                ac.mass_free_incremental(ok_to_free, sys.maxint)
+            elif not incremental:
                 ac.mass_free(ok_to_free)
             else:
                 ac.mass_free_prepare()
@@ -477,3 +527,6 @@ def test_random(incremental=False):
 
 def test_random_incremental():
     test_random(incremental=True)
+
+def test_random_lazy():
+    test_random(lazy=True)
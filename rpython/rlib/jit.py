@@ -548,11 +548,19 @@ ENABLE_ALL_OPTS = (
 PARAMETER_DOCS = {
     'threshold': 'number of times a loop has to run for it to become hot',
     'function_threshold': 'number of times a function must run for it to become traced from start',
+    'baseline_threshold': 'number of times a function must run for it to be '
+                          'traced from start and compiled with only the cheap '
+                          'optimizations, leaving its loops to the normal '
+                          'threshold (0=disabled, should be lower than '
+                          'function_threshold)',
     'trace_eagerness': 'number of times a guard has to fail before we start compiling a bridge',
     'decay': 'amount to regularly decay counters by (0=none, 1000=max)',
     'trace_limit': 'number of recorded operations before we abort tracing with ABORT_TOO_LONG',
     'inlining': 'inline python functions or not (1/0)',
     'loop_longevity': 'a parameter controlling how long loops will be kept before being freed, an estimate',
+    'max_code_size': 'maximum size of the machine code kept alive, in bytes '
+                     '(or with a suffix KB, MB or GB); the least recently '
+                     'used loops are freed to stay below (0=no limit)',
     'retrace_limit': 'how many times we can try retracing before giving up',
     'max_retrace_guards': 'number of extra guards a retrace can cause',
     'max_unroll_loops': 'number of extra unrollings a loop can cause',
@@ -569,11 +577,13 @@ PARAMETER_DOCS = {
 
 PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'function_threshold': 1619, # slightly more than one above, also prime
+              'baseline_threshold': 0,
               'trace_eagerness': 200,
               'decay': 40,
               'trace_limit': 6000,
               'inlining': 1,
               'loop_longevity': 1000,
+              'max_code_size': 0,
               'retrace_limit': 0,
               'max_retrace_guards': 15,
               'max_unroll_loops': 0,
@@ -813,6 +823,28 @@ class TraceLimitTooHigh(Exception):
     jit_opencoder_model
     """
 
+def _parse_size(value):
+    """Parse a number of bytes, with an optional suffix KB, MB or GB
+    (lower case or upper case).  Raises ValueError if the result does
+    not fit in a Signed."""
+    if len(value) > 1 and value[-1] in 'bB':
+        value = value[:-1]
+    factor = 1
+    if len(value) > 1:
+        if value[-1] in 'kK':
+            factor = 1024
+        elif value[-1] in 'mM':
+            factor = 1024 * 1024
+        elif value[-1] in 'gG':
+            factor = 1024 * 1024 * 1024
+    if factor != 1:
+        value = value[:-1]
+    from rpython.rlib.rarithmetic import ovfcheck
+    try:
+        return ovfcheck(int(value) * factor)
+    except OverflowError:
+        raise ValueError    # does not fit in a Signed, e.g. 4GB on 32-bit
+
 @specialize.arg(0)
 def set_user_param(driver, text):
     """Set the tunable JIT parameters from a user-supplied string
@@ -843,7 +875,10 @@ def set_user_param(driver, text):
                     try:
                         if name1 == 'trace_limit' and int(value) > 2**14:
                             raise TraceLimitTooHigh
-                        set_param(driver, name1, int(value))
+                        if name1 == 'max_code_size':
+                            set_param(driver, name1, _parse_size(value))
+                        else:
+                            set_param(driver, name1, int(value))
                     except ValueError:
                         raise
                     break
@@ -1155,6 +1190,13 @@ class JitHookInterface(object):
         instance, overwrite for custom behavior
         """
 
+    def on_loop_compiled(self, jitdriver, greenkey):
+        """ A hook called after a loop or an entry bridge has compiled
+        assembler, with the jitdriver and greenkey where it starts.  Unlike
+        the other hooks, it is called even if are_hooks_enabled() returns
+        False, so it should return quickly when it has nothing to do.
+        """
+
 def record_exact_class(value, cls):
     """
     Assure the JIT that value is an instance of cls. This is a precise
@@ -1329,6 +1371,7 @@ class Counters(object):
     ABORT_BAD_LOOP
     ABORT_ESCAPE
     ABORT_FORCE_QUASIIMMUT
+    ABORT_BASELINE_LOOP
     NVIRTUALS
     NVHOLES
     NVREUSED
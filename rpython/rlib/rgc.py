@@ -845,7 +845,15 @@ def cast_gcref_to_int(gcref):
 (TOTAL_MEMORY, TOTAL_ALLOCATED_MEMORY, TOTAL_MEMORY_PRESSURE,
  PEAK_MEMORY, PEAK_ALLOCATED_MEMORY, TOTAL_ARENA_MEMORY,
  TOTAL_RAWMALLOCED_MEMORY, PEAK_ARENA_MEMORY, PEAK_RAWMALLOCED_MEMORY,
- NURSERY_SIZE, TOTAL_GC_TIME) = range(11)
+ NURSERY_SIZE, TOTAL_GC_TIME, MAX_PAUSE, GC_PAUSE_HISTOGRAM) = range(13)
+
+# The histogram of the GC pauses: get_stats(GC_PAUSE_HISTOGRAM + i) is the
+# number of pauses that took at most GC_PAUSE_LIMITS[i] microseconds (and
+# more than the previous limit).  The extra, last bucket
+# get_stats(GC_PAUSE_HISTOGRAM + len(GC_PAUSE_LIMITS)) counts the longer
+# pauses.  GC_PAUSE_HISTOGRAM must stay the last of the numbers above.
+GC_PAUSE_LIMITS = (100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000,
+                   100000)
 
 @not_rpython
 def get_stats(stat_no):
@@ -2,6 +2,7 @@ import sys
 from rpython.rlib.debug import check_nonneg
 from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib.rsre import rsre_char, rsre_constants as consts
+from rpython.rlib.rsre import rsre_prefilter, rsre_dfa
 from rpython.tool.sourcetools import func_with_new_name
 from rpython.rlib.objectmodel import we_are_translated, not_rpython
 from rpython.rlib import jit
@@ -51,10 +52,16 @@ class EndOfString(Exception):
     pass
 
 class CompiledPattern(object):
-    _immutable_fields_ = ['pattern[*]', 'flags']
+    _immutable_fields_ = ['pattern[*]', 'flags', 'prefilter', 'dfa_wanted']
 
     def __init__(self, pattern, flags):
         self.pattern = pattern
+        # the literals that every match contains, or None
+        self.prefilter = rsre_prefilter.find_prefilter(pattern)
+        # if the searches should run on a lazy DFA (see rsre_dfa.py); the
+        # DfaSet is only built when it is first needed
+        self.dfa_wanted = rsre_dfa.has_general_repeat(pattern, flags)
+        self.dfas = None
         if not consts.V37:      # 'flags' is ignored in >=3.7 mode
             self.flags = flags
         # check we don't get the old value of MAXREPEAT
@@ -297,6 +304,10 @@ class StrMatchContext(FixedMatchContext):
     def get_single_byte(self, base_position, index):
         return self.str(base_position + index)
 
+    def find_bytes(self, s, start):
+        # returns the position of the first 's' at or after 'start', or -1
+        return self._string.find(s, start, self.end)
+
     def _real_pos(self, index):
         return index     # overridden by tests
 
@@ -1284,6 +1295,10 @@ def match_context(ctx, pattern):
     ctx.original_pos = ctx.match_start
     if ctx.end < ctx.match_start:
         return False
+    if pattern.dfa_wanted and ctx.match_mode == MODE_ANY:
+        found = dfa_match(ctx, pattern)
+        if found >= 0:
+            return found == 1
     ctx.jitdriver_Match.jit_merge_point(ctx=ctx, pattern=pattern)
     return sre_match(ctx, pattern, 0, ctx.match_start, None) is not None
 
@@ -1291,6 +1306,10 @@ def search_context(ctx, pattern):
     ctx.original_pos = ctx.match_start
     if ctx.end < ctx.match_start:
         return False
+    if pattern.dfa_wanted and ctx.match_mode == MODE_ANY:
+        found = dfa_search(ctx, pattern)
+        if found >= 0:
+            return found == 1
     base = 0
     charset = False
     if pattern.pat(base) == consts.OPCODE_INFO:
@@ -1301,6 +1320,8 @@ def search_context(ctx, pattern):
         else:
             charset = (flags & consts.SRE_INFO_CHARSET)
         base += 1 + pattern.pat(1)
+    if pattern.prefilter is not None:
+        return prefilter_search(ctx, pattern, base)
     if pattern.pat(base) == consts.OPCODE_LITERAL:
         return literal_search(ctx, pattern, base)
     if charset:
@@ -1365,6 +1386,167 @@ def charset_search(ctx, pattern, base):
         start = ctx.next(start)
     return False
 
+install_jitdriver_spec('PrefilterSearch',
+                       greens=['base', 'pattern'],
+                       reds=['limit', 'start', 'ctx'],
+                       debugprint=(1, 0))
+@specializectx
+def prefilter_search(ctx, pattern, base):
+    # every match contains one of the literals of the pattern's prefilter:
+    # look for them first, and only try to match at the start positions
+    # from which a match could contain the literal that was found
+    start = ctx.match_start
+    limit = -1      # the last start position that is worth trying
+    while True:
+        ctx.jitdriver_PrefilterSearch.jit_merge_point(ctx=ctx, pattern=pattern,
+                                            start=start, limit=limit, base=base)
+        if start > limit:
+            offset = pattern.prefilter.offset
+            if offset < 0:      # rsre_prefilter.VARIABLE
+                found = find_prefilter_literal(ctx, pattern.prefilter, start)
+                if found < ctx.ZERO:
+                    return False
+                limit = found
+            else:
+                # the literal is exactly 'offset' characters after the start
+                try:
+                    found = ctx.next_n(start, offset, ctx.end)
+                except EndOfString:
+                    return False
+                found = find_prefilter_literal(ctx, pattern.prefilter, found)
+                if found < ctx.ZERO:
+                    return False
+                start = ctx.prev_n(found, offset, ctx.ZERO)
+                limit = start
+        if sre_match(ctx, pattern, base, start, None) is not None:
+            ctx.match_start = start
+            return True
+        if start >= ctx.end:
+            return False
+        start = ctx.next(start)
+
+@specializectx
+@jit.dont_look_inside
+def find_prefilter_literal(ctx, prefilter, start):
+    # returns the position of the first of the prefilter's literals found
+    # at or after 'start', or -1
+    if prefilter.bytes_literal is not None and isinstance(ctx, StrMatchContext):
+        return ctx.find_bytes(prefilter.bytes_literal, start)
+    literals = prefilter.literals
+    position = start
+    while position < ctx.end:
+        char_ord = ctx.str(position)
+        for literal in literals:
+            if (literal[0] == char_ord and
+                    literal_at(ctx, literal, ctx.next(position))):
+                return position
+        position = ctx.next(position)
+    return -1
+
+@specializectx
+def literal_at(ctx, literal, position):
+    # checks that the characters literal[1:] are at 'position'
+    for i in range(1, len(literal)):
+        if position >= ctx.end or ctx.str(position) != literal[i]:
+            return False
+        position = ctx.next(position)
+    return True
+
+# The searches and matches on the lazy DFA of the pattern.  They return 1
+# if there is a match, 0 if there is none, and -1 if the DFA gave up: the
+# caller must then use the backtracking matcher.
+
+@specializectx
+@jit.dont_look_inside
+def dfa_search(ctx, pattern):
+    dfas = rsre_dfa.get_dfas(pattern)
+    if dfas is None:
+        return -1
+    try:
+        end = dfa_run_forward(ctx, dfas.search_dfa(), ctx.match_start)
+        if end < ctx.ZERO:
+            return 0
+        start = dfa_run_reverse(ctx, dfas.reverse_dfa(), end)
+    except rsre_dfa.GaveUp:
+        dfas.gave_up = True
+        return -1
+    return dfa_found(ctx, pattern, dfas, start, end)
+
+@specializectx
+@jit.dont_look_inside
+def dfa_match(ctx, pattern):
+    dfas = rsre_dfa.get_dfas(pattern)
+    if dfas is None:
+        return -1
+    start = ctx.match_start
+    try:
+        end = dfa_run_forward(ctx, dfas.match_dfa(), start)
+    except rsre_dfa.GaveUp:
+        dfas.gave_up = True
+        return -1
+    if end < ctx.ZERO:
+        return 0
+    return dfa_found(ctx, pattern, dfas, start, end)
+
+@specializectx
+def dfa_found(ctx, pattern, dfas, start, end):
+    if dfas.has_marks:
+        # the DFA doesn't know about the groups: find them by matching
+        # at the known start
+        if sre_match(ctx, pattern, 0, start, None) is None:
+            return -1
+    else:
+        ctx.match_end = end
+        ctx.match_marks = None
+    ctx.match_start = start
+    return 1
+
+@specializectx
+def dfa_assertions(ctx, program, position):
+    # the mask of the AT operators of the program that succeed at 'position'
+    mask = 0
+    for i in range(len(program.at_codes)):
+        if sre_at(ctx, program.at_codes[i], position):
+            mask |= 1 << i
+    return mask
+
+@specializectx
+def dfa_run_forward(ctx, dfa, position):
+    # returns the end of the match found from 'position', or -1
+    end = -1
+    state = 0
+    has_assertions = len(dfa.program.at_codes) > 0
+    while True:
+        if has_assertions:
+            mask = dfa_assertions(ctx, dfa.program, position)
+            if mask:
+                state = dfa.assertions_transition(state, mask)
+        if dfa.is_match(state):
+            end = position
+        if dfa.is_dead(state) or position >= ctx.end:
+            return end
+        state = dfa.transition(state, ctx.str(position))
+        position = ctx.next(position)
+
+@specializectx
+def dfa_run_reverse(ctx, dfa, position):
+    # runs the reversed pattern backward from 'position': returns the
+    # smallest start of a match that ends there
+    start = position
+    state = 0
+    has_assertions = len(dfa.program.at_codes) > 0
+    while True:
+        if has_assertions:
+            mask = dfa_assertions(ctx, dfa.program, position)
+            if mask:
+                state = dfa.assertions_transition(state, mask)
+        if dfa.is_match(state):
+            start = position
+        if dfa.is_dead(state) or position <= ctx.match_start:
+            return start
+        position = ctx.prev(position)
+        state = dfa.transition(state, ctx.str(position))
+
 install_jitdriver_spec('FastSearch',
                        greens=['i', 'prefix_len', 'pattern'],
                        reds=['string_position', 'ctx'],
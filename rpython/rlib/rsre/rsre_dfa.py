@@ -0,0 +1,594 @@
+"""
+Lazy DFA for the patterns with general repeats.
+
+A pattern like '(a|aa)*b' makes the backtracking matcher of rsre_core
+take an exponential time to find out that there is no match.  If the
+pattern has no backreferences and no lookaround, we can instead run it
+on a DFA: the compiled code is turned into an NFA program, whose DFA
+states are built lazily, the first time they are reached.  Each step is
+then a table lookup, and a search is linear in the length of the string.
+
+The states are ordered lists of NFA instructions, like in RE2: the order
+is the priority of the threads, which gives the same leftmost-first
+results as backtracking.  A search runs the DFA forward to find the end
+of the match, then a DFA of the reversed pattern backward from there to
+find its start.  The DFA does not track the groups: if the pattern has
+some, the backtracking matcher is run at the known start of the match.
+
+There are at most MAX_STATES states per DFA.  If more are needed, the
+pattern goes back to using the backtracking matcher only.
+"""
+
+from rpython.rlib.rsre import rsre_char, rsre_constants as consts
+from rpython.rlib.rstring import StringBuilder
+
+MAX_PROGRAM_SIZE = 5000    # NFA instructions, after expanding the {m,n}
+MAX_STATES = 1000          # DFA states, per DFA
+
+# the same for the DFA of a set of patterns (see rsre_set.py)
+SET_MAX_PROGRAM_SIZE = 50000
+SET_MAX_STATES = 4000
+
+# the NFA instructions
+CHAR = 0        # <ppos> <index>: the one-character operator at 'ppos' in
+                #                 the code of the pattern number 'index'
+ASSERT = 1      # <bit>: the AT operator number 'bit' in 'program.at_codes'
+SPLIT = 2       # <pc1> <pc2>: continue at 'pc1', with priority, and 'pc2'
+JUMP = 3        # <pc1>: continue at 'pc1'
+MATCH = 4       # <index>: the pattern number 'index' matches
+
+
+class Unsupported(Exception):
+    pass
+
+class GaveUp(Exception):
+    pass
+
+
+class Program(object):
+    """An NFA program: the instructions are stored in three lists."""
+
+    def __init__(self, max_size=MAX_PROGRAM_SIZE):
+        self.ops = []
+        self.args1 = []
+        self.args2 = []
+        self.at_codes = []       # the AT codes used by ASSERT instructions
+        self.has_marks = False
+        self.max_size = max_size
+
+    def emit(self, op, arg1=0, arg2=0):
+        pc = len(self.ops)
+        if pc >= self.max_size:
+            raise Unsupported
+        self.ops.append(op)
+        self.args1.append(arg1)
+        self.args2.append(arg2)
+        return pc
+
+    def patch(self, pc, arg1, arg2=0):
+        self.args1[pc] = arg1
+        self.args2[pc] = arg2
+
+    def at_bit(self, atcode):
+        for i in range(len(self.at_codes)):
+            if self.at_codes[i] == atcode:
+                return i
+        self.at_codes.append(atcode)
+        return len(self.at_codes) - 1
+
+    def append(self, other, index):
+        """Copies the program 'other' at the end of this one, as the program
+        of the pattern number 'index'."""
+        base = len(self.ops)
+        if base + len(other.ops) > self.max_size:
+            raise Unsupported
+        for pc in range(len(other.ops)):
+            op = other.ops[pc]
+            arg1 = other.args1[pc]
+            arg2 = other.args2[pc]
+            if op == CHAR or op == MATCH:
+                if op == MATCH:
+                    arg1 = index
+                else:
+                    arg2 = index
+            elif op == ASSERT:
+                arg1 = self.at_bit(other.at_codes[arg1])
+            elif op == SPLIT:
+                arg1 += base
+                arg2 += base
+            elif op == JUMP:
+                arg1 += base
+            self.emit(op, arg1, arg2)
+        if other.has_marks:
+            self.has_marks = True
+
+
+def _is_char_op(op):
+    # the one-character operators that char_matches() knows about
+    return (op == consts.OPCODE_LITERAL or
+            op == consts.OPCODE_NOT_LITERAL or
+            op == consts.OPCODE_ANY or
+            op == consts.OPCODE_ANY_ALL or
+            op == consts.OPCODE_IN or
+            op == consts.OPCODE_IN_IGNORE or
+            op == consts.OPCODE_LITERAL_IGNORE or
+            op == consts.OPCODE_NOT_LITERAL_IGNORE or
+            op == consts.OPCODE_CATEGORY or
+            consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE) or
+            consts.eq(op, consts.OPCODE37_LITERAL_UNI_IGNORE) or
+            consts.eq(op, consts.OPCODE37_NOT_LITERAL_UNI_IGNORE))
+
+def char_matches(pattern, ppos, char_ord):
+    op = pattern.pattern[ppos]
+    if op == consts.OPCODE_LITERAL:
+        return char_ord == pattern.pattern[ppos + 1]
+    elif op == consts.OPCODE_NOT_LITERAL:
+        return char_ord != pattern.pattern[ppos + 1]
+    elif op == consts.OPCODE_ANY:
+        return not rsre_char.is_linebreak(char_ord)
+    elif op == consts.OPCODE_ANY_ALL:
+        return True
+    elif op == consts.OPCODE_IN:
+        return rsre_char.check_charset(None, pattern, ppos + 2, char_ord)
+    elif op == consts.OPCODE_IN_IGNORE:
+        return rsre_char.check_charset(None, pattern, ppos + 2,
+                                       pattern.lowa(char_ord))
+    elif op == consts.OPCODE_LITERAL_IGNORE:
+        return pattern.lowa(char_ord) == pattern.pattern[ppos + 1]
+    elif op == consts.OPCODE_NOT_LITERAL_IGNORE:
+        return pattern.lowa(char_ord) != pattern.pattern[ppos + 1]
+    elif op == consts.OPCODE_CATEGORY:
+        return rsre_char.category_dispatch(pattern.pattern[ppos + 1],
+                                           char_ord)
+    elif consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE):
+        return rsre_char.check_charset(None, pattern, ppos + 2,
+                                       rsre_char.getlower_unicode(char_ord))
+    elif consts.eq(op, consts.OPCODE37_LITERAL_UNI_IGNORE):
+        return (rsre_char.getlower_unicode(char_ord) ==
+                pattern.pattern[ppos + 1])
+    elif consts.eq(op, consts.OPCODE37_NOT_LITERAL_UNI_IGNORE):
+        return (rsre_char.getlower_unicode(char_ord) !=
+                pattern.pattern[ppos + 1])
+    return False
+
+
+def _at(code, i):
+    # the code can come from anywhere: stop at the end instead of crashing
+    if 0 <= i < len(code):
+        return code[i]
+    return consts.OPCODE_FAILURE
+
+def _item_end(code, i):
+    # returns the position after the operator at code[i], if it is one
+    # that the DFA supports
+    op = _at(code, i)
+    if (op == consts.OPCODE_ANY or op == consts.OPCODE_ANY_ALL):
+        return i + 1
+    elif (op == consts.OPCODE_IN or op == consts.OPCODE_IN_IGNORE or
+          consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE) or
+          op == consts.OPCODE_INFO or
+          op == consts.OPCODE_REPEAT_ONE or
+          op == consts.OPCODE_MIN_REPEAT_ONE):
+        nexti = i + 1 + _at(code, i + 1)
+    elif _is_char_op(op) or op == consts.OPCODE_MARK or op == consts.OPCODE_AT:
+        nexti = i + 2
+    elif op == consts.OPCODE_REPEAT:
+        # <REPEAT> <skip> <1=min> <2=max> item <UNTIL> tail
+        nexti = i + 1 + _at(code, i + 1) + 1
+    elif op == consts.OPCODE_BRANCH:
+        # <BRANCH> <0=skip> code <JUMP> ... <NULL>
+        j = i + 1
+        while _at(code, j) > 0:
+            j += _at(code, j)
+        nexti = j + 1
+    else:
+        # backreferences, lookaround, and the operators with LOC_IGNORE,
+        # whose result depends on the current locale
+        raise Unsupported
+    if nexti <= i or nexti > len(code):
+        raise Unsupported
+    return nexti
+
+def has_general_repeat(pattern, flags):
+    """Checks if the DFA supports the compiled code 'pattern', and if it
+    contains REPEAT operators.  These are the patterns that may need an
+    exponential time with backtracking."""
+    if not consts.V37 and flags & consts.SRE_FLAG_LOCALE:
+        return False
+    try:
+        return _has_general_repeat(pattern, 0, len(pattern))
+    except Unsupported:
+        return False
+
+def _has_general_repeat(code, i, end):
+    result = False
+    while i < end:
+        op = _at(code, i)
+        if op == consts.OPCODE_SUCCESS:
+            break
+        nexti = _item_end(code, i)
+        if op == consts.OPCODE_REPEAT:
+            result = True
+            _has_general_repeat(code, i + 4, nexti - 1)
+        elif op == consts.OPCODE_BRANCH:
+            j = i + 1
+            while _at(code, j) > 0:
+                if _has_general_repeat(code, j + 1, j + _at(code, j) - 2):
+                    result = True
+                j += _at(code, j)
+        i = nexti
+    return result
+
+
+class _Compiler(object):
+    """Turns compiled code into an NFA program, possibly for the reversed
+    pattern, i.e. matching the strings of the pattern read backward."""
+
+    def __init__(self, code, reverse):
+        self.code = code
+        self.reverse = reverse
+        self.program = Program()
+
+    def compile(self):
+        self.compile_sequence(0, len(self.code))
+        self.program.emit(MATCH)
+        return self.program
+
+    def compile_sequence(self, i, end):
+        code = self.code
+        items = []
+        while i < end:
+            if _at(code, i) == consts.OPCODE_SUCCESS:
+                break
+            items.append(i)
+            i = _item_end(code, i)
+        if self.reverse:
+            items.reverse()
+        for i in items:
+            self.compile_item(i)
+
+    def compile_item(self, i):
+        code = self.code
+        program = self.program
+        op = _at(code, i)
+        if _is_char_op(op):
+            program.emit(CHAR, i)
+        elif op == consts.OPCODE_AT:
+            program.emit(ASSERT, program.at_bit(_at(code, i + 1)))
+        elif op == consts.OPCODE_MARK:
+            program.has_marks = True
+        elif op == consts.OPCODE_INFO:
+            pass
+        elif op == consts.OPCODE_BRANCH:
+            self.compile_branch(i)
+        elif (op == consts.OPCODE_REPEAT_ONE or
+              op == consts.OPCODE_MIN_REPEAT_ONE):
+            # <REPEAT_ONE> <skip> <1=min> <2=max> item <SUCCESS> tail
+            self.compile_repeat(i + 4, i + 1 + _at(code, i + 1),
+                                _at(code, i + 2), _at(code, i + 3),
+                                op == consts.OPCODE_REPEAT_ONE)
+        elif op == consts.OPCODE_REPEAT:
+            # <REPEAT> <skip> <1=min> <2=max> item <UNTIL> tail
+            until = i + 1 + _at(code, i + 1)
+            self.compile_repeat(i + 4, until, _at(code, i + 2),
+                                _at(code, i + 3),
+                                _at(code, until) == consts.OPCODE_MAX_UNTIL)
+        else:
+            raise Unsupported
+
+    def compile_branch(self, i):
+        # <BRANCH> <0=skip> code <JUMP> ... <NULL>
+        code = self.code
+        program = self.program
+        jumps = []
+        j = i + 1
+        while _at(code, j) > 0:
+            nextj = j + _at(code, j)
+            if _at(code, nextj) > 0:
+                split = program.emit(SPLIT)
+                self.compile_sequence(j + 1, nextj - 2)
+                jumps.append(program.emit(JUMP))
+                program.patch(split, split + 1, len(program.ops))
+            else:
+                self.compile_sequence(j + 1, nextj - 2)
+            j = nextj
+        for jump in jumps:
+            program.patch(jump, len(program.ops))
+
+    def compile_repeat(self, start, end, min, max, greedy):
+        program = self.program
+        if max != rsre_char.MAXREPEAT and max < min:
+            raise Unsupported
+        for k in range(min):
+            self.compile_body(start, end)
+        if max == rsre_char.MAXREPEAT:
+            loop = program.emit(SPLIT)
+            self.compile_body(start, end)
+            program.emit(JUMP, loop)
+            self.patch_split(loop, len(program.ops), greedy)
+        else:
+            splits = []
+            for k in range(max - min):
+                splits.append(program.emit(SPLIT))
+                self.compile_body(start, end)
+            for split in splits:
+                self.patch_split(split, len(program.ops), greedy)
+
+    def patch_split(self, split, exit, greedy):
+        if greedy:
+            self.program.patch(split, split + 1, exit)
+        else:
+            self.program.patch(split, exit, split + 1)
+
+    def compile_body(self, start, end):
+        body = len(self.program.ops)
+        self.compile_sequence(start, end)
+        # the backtracking matcher has special cases for the repeated
+        # items that can match an empty string: don't try to emulate them
+        if self.can_be_empty(body, len(self.program.ops)):
+            raise Unsupported
+
+    def can_be_empty(self, start, end):
+        program = self.program
+        seen = [False] * (end - start)
+        pending = [start]
+        while pending:
+            pc = pending.pop()
+            if not start <= pc < end:
+                return True
+            if seen[pc - start]:
+                continue
+            seen[pc - start] = True
+            op = program.ops[pc]
+            if op == JUMP:
+                pending.append(program.args1[pc])
+            elif op == SPLIT:
+                pending.append(program.args1[pc])
+                pending.append(program.args2[pc])
+            elif op == ASSERT:
+                pending.append(pc + 1)
+        return False
+
+def compile_program(code, reverse):
+    """Returns the NFA program of the compiled code, or None if the DFA
+    doesn't support it."""
+    try:
+        return _Compiler(code, reverse).compile()
+    except Unsupported:
+        return None
+
+def compile_set_program(patterns):
+    """Returns the NFA program that runs the programs of all the patterns in
+    parallel, and the list of the indexes of the patterns that are in it.
+    The others are not supported by the DFA, or too large.  The program is
+    None if none of the patterns is in it."""
+    programs = []
+    indexes = []
+    size = 0
+    for index in range(len(patterns)):
+        program = compile_program(patterns[index].pattern, False)
+        if program is None:
+            continue
+        if size + len(program.ops) + 1 > SET_MAX_PROGRAM_SIZE:
+            continue
+        size += len(program.ops) + 1
+        programs.append(program)
+        indexes.append(index)
+    if not programs:
+        return None, indexes
+    result = Program(SET_MAX_PROGRAM_SIZE)
+    # <SPLIT> to the first program and the next <SPLIT>, and so on; the
+    # last <SPLIT> goes to the last two programs
+    splits = []
+    for i in range(len(programs) - 1):
+        splits.append(result.emit(SPLIT))
+    starts = []
+    for i in range(len(programs)):
+        starts.append(len(result.ops))
+        result.append(programs[i], indexes[i])
+    for i in range(len(splits)):
+        if i + 1 < len(splits):
+            result.patch(splits[i], starts[i], splits[i + 1])
+        else:
+            result.patch(splits[i], starts[i], starts[i + 1])
+    return result, indexes
+
+
+class Dfa(object):
+    """The lazily built DFA of a Program, whose CHAR instructions refer to
+    the code of the given 'patterns'.  States are numbers, and 0 is the
+    start state.  In 'leftmost_first' mode, the threads that have a lower
+    priority than a MATCH are dropped.  In 'restart' mode, the program is
+    also started at each new position, with the lowest priority."""
+
+    def __init__(self, patterns, program, leftmost_first, restart,
+                 max_states):
+        self.patterns = patterns
+        self.program = program
+        self.leftmost_first = leftmost_first
+        self.restart = restart
+        self.max_states = max_states
+        self.seen = [0] * len(program.ops)
+        self.generation = 0
+        self.states = {}          # {key: state}
+        self.state_pcs = []       # the CHAR, ASSERT and MATCH instructions
+        self.state_match = []
+        self.state_matched = []   # the indexes of the MATCH instructions
+        self.state_restart = []   # if the program is still started again
+        self.state_dead = []
+        self.transitions = []     # lists of 256 states, -1 if not known yet
+        self.other_transitions = []   # dicts {char_ord or ~mask: state}
+        pcs = []
+        self.generation += 1
+        self.add_closure(0, pcs, 0)
+        self.get_state(pcs, restart)
+
+    def is_match(self, state):
+        return self.state_match[state]
+
+    def is_dead(self, state):
+        return self.state_dead[state]
+
+    def matched(self, state):
+        """The indexes of the patterns that match in this state."""
+        return self.state_matched[state]
+
+    def transition(self, state, char_ord):
+        """The state after reading the character 'char_ord'."""
+        if 0 <= char_ord < 256:
+            result = self.transitions[state][char_ord]
+            if result < 0:
+                result = self.compute(state, char_ord, 0)
+                self.transitions[state][char_ord] = result
+        else:
+            result = self.other_transitions[state].get(char_ord, -1)
+            if result < 0:
+                result = self.compute(state, char_ord, 0)
+                self.other_transitions[state][char_ord] = result
+        return result
+
+    def assertions_transition(self, state, mask):
+        """The state after the ASSERT instructions whose bit is set in 'mask'
+        succeed, at the same position."""
+        key = ~mask
+        result = self.other_transitions[state].get(key, -1)
+        if result < 0:
+            result = self.compute(state, 0, mask)
+            self.other_transitions[state][key] = result
+        return result
+
+    def compute(self, state, char_ord, mask):
+        program = self.program
+        # once there is a match, the matches that start later have a lower
+        # priority: stop starting the program again
+        restart = self.state_restart[state]
+        if self.leftmost_first and self.state_match[state]:
+            restart = False
+        self.generation += 1
+        pcs = []
+        for pc in self.state_pcs[state]:
+            op = program.ops[pc]
+            if mask:
+                # same position: the threads not at a successful ASSERT
+                # stay where they are
+                if op == ASSERT and (mask >> program.args1[pc]) & 1:
+                    if self.add_closure(pc + 1, pcs, mask):
+                        break
+                elif self.seen[pc] != self.generation:
+                    self.seen[pc] = self.generation
+                    pcs.append(pc)
+                    if op == MATCH and self.leftmost_first:
+                        break
+            elif op == CHAR:
+                pattern = self.patterns[program.args2[pc]]
+                if char_matches(pattern, program.args1[pc], char_ord):
+                    if self.add_closure(pc + 1, pcs, 0):
+                        break
+        else:
+            if restart and not mask:
+                self.add_closure(0, pcs, 0)
+        return self.get_state(pcs, restart)
+
+    def add_closure(self, pc, pcs, mask):
+        # adds to 'pcs', in priority order, the instructions that can be
+        # reached from 'pc' without reading a character.  Returns True if
+        # it added a MATCH that makes the rest useless.
+        program = self.program
+        pending = [pc]
+        while pending:
+            pc = pending.pop()
+            if self.seen[pc] == self.generation:
+                continue
+            self.seen[pc] = self.generation
+            op = program.ops[pc]
+            if op == JUMP:
+                pending.append(program.args1[pc])
+            elif op == SPLIT:
+                pending.append(program.args2[pc])
+                pending.append(program.args1[pc])
+            elif op == ASSERT and (mask >> program.args1[pc]) & 1:
+                pending.append(pc + 1)
+            else:
+                pcs.append(pc)
+                if op == MATCH and self.leftmost_first:
+                    return True
+        return False
+
+    def get_state(self, pcs, restart):
+        builder = StringBuilder(len(pcs) * 2 + 1)
+        builder.append("\x01" if restart else "\x00")
+        for pc in pcs:
+            builder.append(chr(pc & 0xff))
+            builder.append(chr(pc >> 8))
+        key = builder.build()
+        state = self.states.get(key, -1)
+        if state >= 0:
+            return state
+        state = len(self.state_pcs)
+        if state >= self.max_states:
+            raise GaveUp
+        program = self.program
+        matched = []
+        dead = True
+        for pc in pcs:
+            if program.ops[pc] == MATCH:
+                matched.append(program.args1[pc])
+            elif program.ops[pc] == CHAR:
+                dead = False
+        match = len(matched) > 0
+        if restart and not (self.leftmost_first and match):
+            dead = False
+        self.states[key] = state
+        self.state_pcs.append(pcs)
+        self.state_match.append(match)
+        self.state_matched.append(matched)
+        self.state_restart.append(restart)
+        self.state_dead.append(dead)
+        self.transitions.append([-1] * 256)
+        self.other_transitions.append({})
+        return state
+
+
+class DfaSet(object):
+    """The DFAs of a CompiledPattern, built when they are first needed."""
+
+    _search_dfa = None
+    _match_dfa = None
+    _reverse_dfa = None
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.program = compile_program(pattern.pattern, False)
+        self.gave_up = self.program is None
+        self.has_marks = self.program is not None and self.program.has_marks
+
+    def search_dfa(self):
+        if self._search_dfa is None:
+            self._search_dfa = Dfa([self.pattern], self.program, True, True,
+                                   MAX_STATES)
+        return self._search_dfa
+
+    def match_dfa(self):
+        if self._match_dfa is None:
+            self._match_dfa = Dfa([self.pattern], self.program, True, False,
+                                  MAX_STATES)
+        return self._match_dfa
+
+    def reverse_dfa(self):
+        if self._reverse_dfa is None:
+            program = compile_program(self.pattern.pattern, True)
+            if program is None:
+                raise GaveUp
+            self._reverse_dfa = Dfa([self.pattern], program, False, False,
+                                    MAX_STATES)
+        return self._reverse_dfa
+
+def get_dfas(pattern):
+    """Returns the DfaSet of the pattern, or None if it gave up."""
+    dfas = pattern.dfas
+    if dfas is None:
+        dfas = DfaSet(pattern)
+        pattern.dfas = dfas
+    if dfas.gave_up:
+        return None
+    return dfas
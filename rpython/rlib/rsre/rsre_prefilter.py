@@ -0,0 +1,223 @@
+"""
+Required literals of a compiled pattern.
+
+When a pattern does not start with a literal prefix, searching for it
+means trying to match it at every position of the string.  But many
+patterns contain literal text further on, or an alternation of literal
+texts like '(ERROR|FATAL)', that every match must contain.  This module
+finds such literals in the compiled code, so that the searches can first
+look for them with a fast scan, and only try to match at the positions
+where they can be found.
+"""
+
+from rpython.rlib.rsre import rsre_constants as consts
+
+VARIABLE = -1      # an offset or a width that is not known in advance
+
+
+class Prefilter(object):
+    """Every match of the pattern contains one of the 'literals' (lists of
+    character codes).  It starts 'offset' characters after the start of
+    the match, or anywhere in the match if 'offset' is VARIABLE."""
+
+    _immutable_fields_ = ['literals[*]', 'offset', 'bytes_literal']
+
+    def __init__(self, literals, offset):
+        self.literals = [literal for literal in literals]   # a fixed list
+        self.offset = offset
+        # if there is only one literal and it fits in a byte string, it is
+        # also stored as a byte string: it is searched with str.find()
+        self.bytes_literal = None
+        if len(literals) == 1:
+            for c in literals[0]:
+                if not 0 <= c < 256:
+                    break
+            else:
+                self.bytes_literal = ''.join([chr(c) for c in literals[0]])
+
+    def __repr__(self):
+        return '<Prefilter %r at %d>' % (self.literals, self.offset)
+
+
+def find_prefilter(code):
+    """Returns the Prefilter of the compiled pattern 'code', or None if
+    there is no required literal that is worth searching for."""
+    found = []
+    i = 0
+    if _at(code, 0) == consts.OPCODE_INFO:
+        i = 1 + _at(code, 1)
+    _walk(code, i, len(code), 0, found)
+    best_literals = None
+    best_offset = VARIABLE
+    best_score = 0
+    for literals, offset in found:
+        score = _shortest(literals) * 4
+        if offset != VARIABLE:
+            score += 2
+        if len(literals) == 1:
+            score += 1
+        if score > best_score:
+            best_literals = literals
+            best_offset = offset
+            best_score = score
+    if best_literals is None:
+        return None
+    if (best_offset == 0 and len(best_literals) == 1 and
+            len(best_literals[0]) == 1):
+        return None     # literal_search() does that already
+    return Prefilter(best_literals, best_offset)
+
+def _at(code, i):
+    # the code can come from anywhere: stop at the end instead of crashing
+    if 0 <= i < len(code):
+        return code[i]
+    return consts.OPCODE_FAILURE
+
+def _shortest(literals):
+    result = len(literals[0])
+    for literal in literals:
+        result = min(result, len(literal))
+    return result
+
+def _add_width(offset, width):
+    if offset == VARIABLE or width == VARIABLE:
+        return VARIABLE
+    return offset + width
+
+def _is_char_op(op):
+    # the operators <OP> <arg> that match exactly one character
+    return (op == consts.OPCODE_NOT_LITERAL or
+            op == consts.OPCODE_LITERAL_IGNORE or
+            op == consts.OPCODE_NOT_LITERAL_IGNORE or
+            op == consts.OPCODE_CATEGORY or
+            consts.eq(op, consts.OPCODE37_LITERAL_UNI_IGNORE) or
+            consts.eq(op, consts.OPCODE37_LITERAL_LOC_IGNORE) or
+            consts.eq(op, consts.OPCODE37_NOT_LITERAL_UNI_IGNORE) or
+            consts.eq(op, consts.OPCODE37_NOT_LITERAL_LOC_IGNORE))
+
+def _is_charset_op(op):
+    # the operators <OP> <skip> <set> that match exactly one character
+    return (op == consts.OPCODE_IN or
+            op == consts.OPCODE_IN_IGNORE or
+            consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE) or
+            consts.eq(op, consts.OPCODE37_IN_LOC_IGNORE))
+
+def _is_groupref_op(op):
+    return (op == consts.OPCODE_GROUPREF or
+            op == consts.OPCODE_GROUPREF_IGNORE or
+            consts.eq(op, consts.OPCODE37_GROUPREF_UNI_IGNORE) or
+            consts.eq(op, consts.OPCODE37_GROUPREF_LOC_IGNORE))
+
+def _walk(code, i, end, offset, found):
+    """Walks the operators of code[i:end], which match one after the other
+    starting 'offset' characters after the start of the match.  If 'found'
+    is not None, appends to it the (literals, offset) that every match
+    contains.  Returns the offset after the operators, or VARIABLE."""
+    run = []            # the current run of LITERAL operators
+    run_offset = offset
+    while i < end:
+        op = _at(code, i)
+        if op == consts.OPCODE_LITERAL:
+            if not run:
+                run_offset = offset
+            run.append(_at(code, i + 1))
+            offset = _add_width(offset, 1)
+            i += 2
+            continue
+        if op == consts.OPCODE_MARK:
+            i += 2
+            continue
+        if run:
+            if found is not None:
+                found.append(([run], run_offset))
+            run = []
+        if op == consts.OPCODE_SUCCESS:
+            break
+        elif op == consts.OPCODE_ANY or op == consts.OPCODE_ANY_ALL:
+            width = 1
+            nexti = i + 1
+        elif _is_char_op(op):
+            width = 1
+            nexti = i + 2
+        elif _is_charset_op(op):
+            width = 1
+            nexti = i + 1 + _at(code, i + 1)
+        elif op == consts.OPCODE_AT:
+            width = 0
+            nexti = i + 2
+        elif (op == consts.OPCODE_ASSERT or
+              op == consts.OPCODE_ASSERT_NOT or
+              op == consts.OPCODE_INFO):
+            width = 0
+            nexti = i + 1 + _at(code, i + 1)
+        elif (op == consts.OPCODE_REPEAT_ONE or
+              op == consts.OPCODE_MIN_REPEAT_ONE):
+            # <REPEAT_ONE> <skip> <1=min> <2=max> item <SUCCESS> tail
+            width = VARIABLE
+            if _at(code, i + 2) == _at(code, i + 3):
+                width = _at(code, i + 2)
+            nexti = i + 1 + _at(code, i + 1)
+        elif op == consts.OPCODE_REPEAT:
+            # <REPEAT> <skip> <1=min> <2=max> item <UNTIL> tail
+            width = VARIABLE
+            nexti = i + 1 + _at(code, i + 1) + 1
+        elif _is_groupref_op(op):
+            width = VARIABLE
+            nexti = i + 2
+        elif op == consts.OPCODE_BRANCH:
+            nexti, width = _walk_branch(code, i, offset, found)
+        else:
+            # GROUPREF_EXISTS, or anything unexpected: don't look further
+            return VARIABLE
+        if nexti <= i:
+            return VARIABLE
+        offset = _add_width(offset, width)
+        i = nexti
+    if run and found is not None:
+        found.append(([run], run_offset))
+    return offset
+
+def _walk_branch(code, i, offset, found):
+    # <BRANCH> <0=skip> code <JUMP> ... <NULL>
+    # Returns the position after the branch and its width.  If all the
+    # alternatives are literals, appends them to 'found'.
+    literals = []
+    width = -2      # not known yet
+    j = i + 1
+    while _at(code, j):
+        nextj = j + _at(code, j)
+        if nextj <= j:
+            return nextj, VARIABLE
+        jump = nextj - 2
+        literal = _pure_literal(code, j + 1, jump)
+        if literals is not None:
+            if literal is None:
+                literals = None
+            else:
+                literals.append(literal)
+        alt_width = _walk(code, j + 1, jump, 0, None)
+        if width == -2:
+            width = alt_width
+        elif width != alt_width:
+            width = VARIABLE
+        j = nextj
+    if width == -2:
+        width = VARIABLE
+    if literals and found is not None:
+        found.append((literals, offset))
+    return j + 1, width
+
+def _pure_literal(code, i, end):
+    # returns the characters matched by code[i:end] if it is made of
+    # LITERAL operators and possibly MARKs, or None
+    result = []
+    while i < end:
+        op = _at(code, i)
+        if op == consts.OPCODE_LITERAL:
+            result.append(_at(code, i + 1))
+        elif op != consts.OPCODE_MARK:
+            return None
+        i += 2
+    if not result:
+        return None
+    return result
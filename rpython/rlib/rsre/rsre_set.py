@@ -0,0 +1,134 @@
+"""
+Sets of patterns that are searched together.
+
+Code that classifies strings often tries many patterns one after the
+other on the same string, and each search scans the string again.  A
+RegexSet combines the NFA programs of all its patterns (see rsre_dfa.py)
+into a single lazy DFA, which finds in one pass over the string which of
+the patterns match.  The patterns that the DFA doesn't support, or when
+the combined DFA has too many states, are searched one by one with the
+backtracking matcher.
+"""
+
+import sys
+from rpython.rlib import jit
+from rpython.rlib.rsre import rsre_dfa
+from rpython.rlib.rsre.rsre_core import StrMatchContext, specializectx
+from rpython.rlib.rsre.rsre_core import dfa_assertions, _adjust
+from rpython.rlib.rsre.rsre_core import search_context, match_context
+
+
+class RegexSet(object):
+    """A set of CompiledPatterns.  The DFAs are built when they are first
+    needed."""
+
+    _search_dfa = None
+    _match_dfa = None
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.program, self.dfa_indexes = rsre_dfa.compile_set_program(
+            patterns)
+        self.gave_up = False
+
+    def fallback_indexes(self):
+        # the indexes of the patterns that the DFA doesn't find
+        if self.program is None or self.gave_up:
+            return range(len(self.patterns))
+        result = []
+        j = 0
+        for index in range(len(self.patterns)):
+            if (j < len(self.dfa_indexes) and
+                    self.dfa_indexes[j] == index):
+                j += 1
+            else:
+                result.append(index)
+        return result
+
+    def search_dfa(self):
+        if self._search_dfa is None:
+            self._search_dfa = rsre_dfa.Dfa(self.patterns, self.program,
+                                            False, True,
+                                            rsre_dfa.SET_MAX_STATES)
+        return self._search_dfa
+
+    def match_dfa(self):
+        if self._match_dfa is None:
+            self._match_dfa = rsre_dfa.Dfa(self.patterns, self.program,
+                                           False, False,
+                                           rsre_dfa.SET_MAX_STATES)
+        return self._match_dfa
+
+
+def search_set_context(ctx, regexset):
+    """Returns a list of booleans: which patterns of the set match somewhere
+    in the ctx, starting at or after ctx.match_start."""
+    return _find_set(ctx, regexset, False)
+
+def match_set_context(ctx, regexset):
+    """Returns a list of booleans: which patterns of the set match at
+    ctx.match_start."""
+    return _find_set(ctx, regexset, True)
+
+def _find_set(ctx, regexset, anchored):
+    start = ctx.match_start
+    found = [False] * len(regexset.patterns)
+    use_dfa = regexset.program is not None and not regexset.gave_up
+    if use_dfa and ctx.end >= start:
+        try:
+            if anchored:
+                dfa = regexset.match_dfa()
+            else:
+                dfa = regexset.search_dfa()
+            set_run(ctx, dfa, found, len(regexset.dfa_indexes))
+        except rsre_dfa.GaveUp:
+            regexset.gave_up = True
+            found = [False] * len(regexset.patterns)
+    for index in regexset.fallback_indexes():
+        ctx.reset(start)
+        if anchored:
+            found[index] = match_context(ctx, regexset.patterns[index])
+        else:
+            found[index] = search_context(ctx, regexset.patterns[index])
+    ctx.reset(start)
+    return found
+
+@specializectx
+@jit.dont_look_inside
+def set_run(ctx, dfa, found, remaining):
+    # sets found[index] to True for the patterns that match, until the
+    # end of the string or until the 'remaining' patterns are all found
+    position = ctx.match_start
+    state = 0
+    has_assertions = len(dfa.program.at_codes) > 0
+    while True:
+        if has_assertions:
+            mask = dfa_assertions(ctx, dfa.program, position)
+            if mask:
+                state = dfa.assertions_transition(state, mask)
+        for index in dfa.matched(state):
+            if not found[index]:
+                found[index] = True
+                remaining -= 1
+        if remaining == 0 or dfa.is_dead(state) or position >= ctx.end:
+            return
+        state = dfa.transition(state, ctx.str(position))
+        position = ctx.next(position)
+
+
+def _indexes(found):
+    return [index for index in range(len(found)) if found[index]]
+
+def search(regexset, string, start=0, end=sys.maxint):
+    """Returns the indexes of the patterns that match in the string."""
+    assert isinstance(regexset, RegexSet)
+    start, end = _adjust(start, end, len(string))
+    ctx = StrMatchContext(string, start, end)
+    return _indexes(search_set_context(ctx, regexset))
+
+def match(regexset, string, start=0, end=sys.maxint):
+    """Returns the indexes of the patterns that match at 'start'."""
+    assert isinstance(regexset, RegexSet)
+    start, end = _adjust(start, end, len(string))
+    ctx = StrMatchContext(string, start, end)
+    return _indexes(match_set_context(ctx, regexset))
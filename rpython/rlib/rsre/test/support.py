@@ -74,6 +74,13 @@ class MatchContextForTests(StrMatchContext):
         assert isinstance(position, Position)
         return ord(self._string[position._p])
 
+    def find_bytes(self, s, position):
+        assert isinstance(position, Position)
+        r = self._string.find(s, position._p, self.end._p)
+        if r < 0:
+            return -1
+        return Position(r)
+
     def debug_check_pos(self, position):
         assert isinstance(position, Position)
 
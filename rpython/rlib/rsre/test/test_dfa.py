@@ -0,0 +1,106 @@
+import re, time
+from rpython.rlib.rsre import rsre_core, rsre_dfa, rsre_utf8
+from rpython.rlib.rsre.rpy import get_code
+from rpython.rlib.rsre.test import support
+
+
+PATTERNS = [
+    r'(a|aa)*b', r'(ab|a)*c?', r'(a|b)*?c', r'x(ab)+y', r'(ab){2,3}',
+    r'(ab){2,3}?', r'(?:a|bc){0,2}d', r'(a|b)*', r'(?:\d+\.)+\d+',
+    r'(?:x|y)+\b', r'\b(?:\w+\s)+', r'^(?:a|b)+$', r'(?m)^(?:ab)+$',
+    r'(?i)(?:AB|c)+', r'(?:[ab]c)+(d)', r'(a)(?:b|c)*(d)?', r'(?:(a)|b)+',
+    r'(?:a.)+', r'(?s)(?:a.)+', r'(?:\w\W)*', r'(?:ab|cd)*\Z',
+    r'(?:ab)*(?:abc)', r'(?:a+b)+', r'(?:a*?b)+c',
+    ]
+
+STRINGS = [
+    '', 'a', 'b', 'aab', 'ababc', 'xababy', 'xaby', 'abab', 'ababab',
+    'bcbcad', 'cd', '12.34.5', '12.', 'xy yx', 'ab\nab', 'ABcab',
+    'acbcd', 'abd', 'a\nab', '1 2 3', 'abcd', 'abcabab', 'aabab',
+    'aaab aab ab', 'aabaabc',
+    ]
+
+
+def check(pattern, string):
+    code = get_code(pattern)
+    assert code.dfa_wanted
+    expected = re.compile(pattern)
+    for start in range(len(string) + 1):
+        m = expected.search(string, start)
+        ctx = rsre_core.search(code, string, start)
+        if m is None:
+            assert ctx is None
+        else:
+            assert ctx is not None
+            for i in range(len(m.groups()) + 1):
+                assert ctx.span(i) == m.span(i), (pattern, string, start)
+        m = expected.match(string, start)
+        ctx = rsre_core.match(code, string, start)
+        if m is None:
+            assert ctx is None
+        else:
+            assert ctx is not None
+            assert ctx.span() == m.span(), (pattern, string, start)
+
+
+def test_same_as_re():
+    for pattern in PATTERNS:
+        for string in STRINGS:
+            check(pattern, string)
+
+def test_same_as_re_positions():
+    for pattern in PATTERNS:
+        code = get_code(pattern)
+        for string in STRINGS:
+            m = re.search(pattern, string)
+            ctx = support.search(code, string)
+            if m is None:
+                assert ctx is None
+            else:
+                assert ctx.match_start._p == m.start()
+                assert ctx.match_end._p == m.end()
+
+def test_same_as_re_utf8():
+    for pattern in PATTERNS:
+        code = get_code(unicode(pattern))
+        for string in STRINGS:
+            m = re.search(pattern, string)
+            ctx = rsre_utf8.utf8search(code, string)
+            if m is None:
+                assert ctx is None
+            else:
+                assert ctx.match_start == m.start()
+                assert ctx.match_end == m.end()
+
+def test_unicode():
+    code = get_code(u'(?:\u1234|b)+c', re.UNICODE)
+    assert code.dfa_wanted
+    s = u'a\u1234b\u1234cd'.encode('utf-8')
+    ctx = rsre_utf8.utf8search(code, s)
+    assert (ctx.match_start, ctx.match_end) == (1, 9)
+
+def test_not_wanted():
+    for pattern in [r'abc', r'a+b*', r'(a|b)c', r'(a|b)*\1',
+                    r'(?:a(?=b))*', r'(?:(?<=a)b)*', r'(a)?(?(1)b|c)']:
+        assert not get_code(pattern).dfa_wanted
+    # the repeated items that can match an empty string
+    for pattern in [r'(?:a?)*', r'(?:a|)*', r'(?:\b)*']:
+        code = get_code(pattern)
+        assert rsre_dfa.get_dfas(code) is None
+        assert rsre_core.search(code, 'xa').span() == (0, 0)
+
+def test_exponential():
+    t = time.time()
+    assert rsre_core.search(get_code(r'(a|aa)*b'), 'a' * 100) is None
+    assert rsre_core.match(get_code(r'(x+x+)+y'), 'x' * 50) is None
+    assert rsre_core.search(get_code(r'(?:a|a)*c(x)'), 'a' * 100) is None
+    assert time.time() - t < 10.0
+
+def test_gave_up(monkeypatch):
+    monkeypatch.setattr(rsre_dfa, 'MAX_STATES', 3)
+    code = get_code(r'(?:ab|cd|ef)*g')
+    assert rsre_core.search(code, 'xabcdefg').span() == (1, 8)
+    assert code.dfas.gave_up
+    assert rsre_dfa.get_dfas(code) is None
+    assert rsre_core.search(code, 'xabcdefg', 2).span() == (3, 8)
+    assert rsre_core.search(code, 'xabc') is None
@@ -0,0 +1,46 @@
+from rpython.rlib.rsre.rpy import get_code
+from rpython.rlib.rsre.rsre_prefilter import VARIABLE
+
+
+def prefilter(regexp):
+    p = get_code(regexp).prefilter
+    if p is None:
+        return None
+    literals = [''.join([chr(c) for c in literal]) for literal in p.literals]
+    return literals, p.offset
+
+
+def test_no_prefilter():
+    assert prefilter(r'[a-z]+') is None
+    assert prefilter(r'a\w+') is None
+    assert prefilter(r'(?i)abc') is None
+    assert prefilter(r'(a|\d)b?') is None
+    assert prefilter(r'(abc)*') is None
+
+def test_literal():
+    assert prefilter(r'foo') == (['foo'], 0)
+    assert prefilter(r'\d+foo\w') == (['foo'], VARIABLE)
+    assert prefilter(r'\d\d-x(y)z') == (['-xyz'], 2)
+    assert prefilter(r'.{3}ab') == (['ab'], 3)
+    assert prefilter(r'.{3,4}ab') == (['ab'], VARIABLE)
+    assert prefilter(r'\bab') == (['ab'], 0)
+    assert prefilter(r'(a|\d)bc?') == (['b'], 1)
+
+def test_alternation():
+    assert prefilter(r'\s(ERROR|FATAL)\s.*user=(\w+)') == (
+        ['ERROR', 'FATAL'], 1)
+    assert prefilter(r'(?:a|b\d)(foo|bar)') == (['foo', 'bar'], VARIABLE)
+    assert prefilter(r'x(?:ab|cd)ef') == (['ef'], 3)
+
+def test_longest_literal():
+    assert prefilter(r'ab\d+cdef') == (['cdef'], VARIABLE)
+    assert prefilter(r'abc\d+de') == (['abc'], 0)
+
+def test_bytes_literal():
+    assert get_code(r'\w+foo').prefilter.bytes_literal == 'foo'
+    assert get_code(u'\\w+\u1234x').prefilter.bytes_literal is None
+    assert get_code(r'(ab|cd)').prefilter.bytes_literal is None
+
+def test_groupref_exists():
+    assert prefilter(r'(a)?x(?(1)b|c)def') == (['x'], VARIABLE)
+    assert prefilter(r'(a)?xyz(?(1)b|c)d') == (['xyz'], VARIABLE)
@@ -230,6 +230,31 @@ class BaseTestSearch:
                     assert match is None
                     assert res is None
 
+    def test_prefilter(self):
+        for pattern in [r'\s(ERROR|FATAL)\s.*user=(\w+)',
+                        r'a.*foobar', r'x*abc', r'(a|bb)c', r'[ab]cd(ef|gh)',
+                        r'(?:ab|cd)\d+', r'\d\dxy']:
+            r_code, r = get_code_and_re(pattern)
+            assert r_code.prefilter is not None
+            for string in ['', 'abc', 'xxabcbbc ERROR user=bob',
+                           ' FATAL  user=x user=y', ' ERROR ', 'ERROR user=',
+                           'zzbcdghacdef', 'aaa foobar', 'ab12 cd3', '1xy12xy']:
+                for start in range(len(string) + 1):
+                    match = r.search(string, start)
+                    res = self.search(r_code, string, start)
+                    if match is None:
+                        assert res is None
+                    else:
+                        assert res is not None
+                        assert res.span() == (self.P(match.start()),
+                                              self.P(match.end()))
+
+    def test_prefilter_end(self):
+        r_code, r = get_code_and_re(r'.(ab|cd)')
+        assert self.search(r_code, 'xab', 0, 2) is None
+        res = self.search(r_code, 'xxcdab', 0, 5)
+        assert res.span() == (self.P(1), self.P(4))
+
 
 class TestSearchCustom(BaseTestSearch):
     search = staticmethod(support.search)
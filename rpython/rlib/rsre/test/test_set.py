@@ -0,0 +1,87 @@
+import re
+from rpython.rlib.rsre import rsre_dfa, rsre_set, rsre_utf8
+from rpython.rlib.rsre.rpy import get_code
+from rpython.rlib.rsre.test.support import MatchContextForTests, Position
+
+
+PATTERNS = [r'GET /users/(\d+)$', r'/static/', r'\.(?:png|jpe?g)\b',
+            r'^POST ', r'(a|aa)*b', r'(?i)admin', r'(\w)\1', r'(?=x)xy',
+            r'$', r'q*']
+
+STRINGS = ['GET /users/42', 'GET /users/42/x', 'GET /static/a.png',
+           'POST /Admin', 'x.jpeg', 'aaab', 'xyz', 'aa', '']
+
+
+def make_set(patterns):
+    return rsre_set.RegexSet([get_code(p) for p in patterns])
+
+def expected_search(patterns, string, start=0):
+    return [i for i in range(len(patterns))
+            if re.compile(patterns[i]).search(string, start)]
+
+def expected_match(patterns, string, start=0):
+    return [i for i in range(len(patterns))
+            if re.compile(patterns[i]).match(string, start)]
+
+
+def test_search():
+    regexset = make_set(PATTERNS)
+    # the patterns with a backreference or a lookahead are searched alone
+    assert regexset.fallback_indexes() == [6, 7]
+    for string in STRINGS:
+        for start in range(len(string) + 1):
+            assert rsre_set.search(regexset, string, start) == (
+                expected_search(PATTERNS, string, start))
+
+def test_match():
+    regexset = make_set(PATTERNS)
+    for string in STRINGS:
+        for start in range(len(string) + 1):
+            assert rsre_set.match(regexset, string, start) == (
+                expected_match(PATTERNS, string, start))
+
+def test_positions():
+    regexset = make_set(PATTERNS)
+    for string in STRINGS:
+        ctx = MatchContextForTests(string, Position(0), Position(len(string)))
+        found = rsre_set.search_set_context(ctx, regexset)
+        assert [i for i in range(len(found)) if found[i]] == (
+            expected_search(PATTERNS, string))
+        assert ctx.match_start == Position(0)
+
+def test_utf8():
+    patterns = [u'\u1234+x', u'(?:a|\u1235)+$', u'b']
+    regexset = rsre_set.RegexSet([get_code(p) for p in patterns])
+    s = u'a\u1234\u1234xa\u1235'.encode('utf-8')
+    ctx = rsre_utf8.Utf8MatchContext(s, 0, len(s))
+    assert rsre_set.search_set_context(ctx, regexset) == [True, True, False]
+    ctx = rsre_utf8.Utf8MatchContext(s, 1, len(s))
+    assert rsre_set.match_set_context(ctx, regexset) == [True, False, False]
+
+def test_empty_set():
+    regexset = make_set([])
+    assert regexset.program is None
+    assert rsre_set.search(regexset, 'abc') == []
+    assert rsre_set.match(regexset, 'abc') == []
+
+def test_stops_when_all_found():
+    regexset = make_set([r'a', r'b'])
+    dfa = regexset.search_dfa()
+    assert rsre_set.search(regexset, 'ab' + 'x' * 100) == [0, 1]
+    # no state was needed for the 'x'
+    assert len(dfa.state_pcs) <= 3
+
+def test_gave_up(monkeypatch):
+    monkeypatch.setattr(rsre_dfa, 'SET_MAX_STATES', 3)
+    patterns = [r'abc', r'(?:ab|cd)+e', r'xyz']
+    regexset = make_set(patterns)
+    assert rsre_set.search(regexset, 'cdcdabe') == [1]
+    assert regexset.gave_up
+    assert regexset.fallback_indexes() == [0, 1, 2]
+    assert rsre_set.search(regexset, 'xyzabc') == [0, 2]
+
+def test_program_size(monkeypatch):
+    monkeypatch.setattr(rsre_dfa, 'SET_MAX_PROGRAM_SIZE', 20)
+    regexset = make_set([r'a{10}', r'b{10}', r'c'])
+    assert regexset.fallback_indexes() == [1]
+    assert rsre_set.search(regexset, 'c' + 'b' * 10) == [1, 2]
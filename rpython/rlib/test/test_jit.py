@@ -1,11 +1,11 @@
-import py, pytest
+import py, pytest, sys
 
 from rpython.conftest import option
 from rpython.annotator.model import UnionError
 from rpython.rlib.jit import (hint, we_are_jitted, JitDriver, elidable_promote,
     JitHintError, oopspec, isconstant, conditional_call,
     elidable, unroll_safe, dont_look_inside, conditional_call_elidable,
-    enter_portal_frame, leave_portal_frame)
+    enter_portal_frame, leave_portal_frame, _parse_size)
 from rpython.rlib.rarithmetic import r_uint
 from rpython.rtyper.test.tool import BaseRtypingTest
 from rpython.rtyper.lltypesystem import lltype
@@ -93,6 +93,18 @@ def test_merge_enter_different():
     myjitdriver = JitDriver(greens=['n'], reds=[])
     py.test.raises(JitHintError, fn, 100)
 
+def test_parse_size():
+    assert _parse_size('1234') == 1234
+    assert _parse_size('16kb') == 16 * 1024
+    assert _parse_size('256MB') == 256 * 1024 * 1024
+    assert _parse_size('1G') == 1024 * 1024 * 1024
+    assert _parse_size('100b') == 100
+    py.test.raises(ValueError, _parse_size, 'MB')
+    py.test.raises(ValueError, _parse_size, '12TB')
+    too_big = sys.maxint // (1024 * 1024 * 1024) + 1
+    py.test.raises(ValueError, _parse_size, '%dGB' % too_big)
+    py.test.raises(ValueError, _parse_size, '%d' % (sys.maxint + 1))
+
 def test_invalid_hint_combinations_error():
     with pytest.raises(TypeError):
         @unroll_safe